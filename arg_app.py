@@ -1,5 +1,11 @@
 import streamlit as st
 from arg_database.connection import setup_database
+from arg_metrics.tracing import start_exporter_from_env
+from arg_database.export_server import start_export_server_from_env
+from arg_database.ingest import start_ingest_server_from_env
+from arg_database.snapshots import start_snapshot_refresher_from_env
+from arg_database.archive import start_archiver_from_env
+from arg_database.jobs import start_workers_from_env
 from authy.security import validate_username, validate_password, register_user, login_user
 from pathlib import Path
 import base64
@@ -14,6 +20,24 @@ st.set_page_config(
 # Initialize database on first run
 setup_database()
 
+# Serve latency metrics over HTTP if ARG_METRICS_PORT is set
+start_exporter_from_env()
+
+# Serve streaming table exports over HTTP if ARG_EXPORT_PORT is set
+start_export_server_from_env()
+
+# Accept incidents and tickets pushed by monitoring tools over HTTP if ARG_INGEST_PORT is set
+start_ingest_server_from_env()
+
+# Keep table snapshots current in the background if ARG_SNAPSHOT_INTERVAL is set
+start_snapshot_refresher_from_env()
+
+# Move old closed incidents and resolved tickets to archive tables if ARG_ARCHIVE_INTERVAL is set
+start_archiver_from_env()
+
+# Run exports, uploads and rebuilds in background worker processes (ARG_JOB_WORKERS, 0 to run them separately)
+start_workers_from_env()
+
 # Initialize session state variables for authentication
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -185,7 +209,7 @@ def main():
         show_login_page()
     else:
         # Redirect to dashboard page if user is logged in
-        st.switch_page("pages\dash.py")
+        st.switch_page("pages/dash.py")
 
 
 if __name__ == "__main__":
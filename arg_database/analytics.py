@@ -0,0 +1,282 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import arg_database.connection as connection
+from arg_database.invalidation import table_version
+from arg_metrics.tracing import trace, traced
+
+# |robust z| above this marks an anomaly (Iglewicz and Hoaglin's cut-off)
+ROBUST_Z_THRESHOLD = 3.5
+
+# MAD * 1/0.6745 estimates the standard deviation of normal data
+MAD_SCALE = 0.6745
+
+# Mean absolute deviation * 1.2533 estimates it when the MAD is zero
+MEAN_AD_SCALE = 1.2533
+
+# CUSUM slack and decision interval, in standard deviations of the daily count
+CUSUM_K = 0.5
+CUSUM_H = 5.0
+
+# A CUSUM alarm that ended within this many days of the latest data is still reported
+RECENT_DAYS = 30
+
+# Incident states that count towards a category's backlog
+UNRESOLVED_STATES = ("Open", "In Progress")
+
+# Base table -> rollup table maintained by its triggers (see tables.initialize_rollup_tables)
+ROLLUPS = {"it_tickets": "ticket_daily_rollup", "cyber_incidents": "incident_daily_rollup"}
+
+# level is "warning" or "info"; score is the robust z or CUSUM value behind it
+Finding = namedtuple("Finding", ["level", "subject", "score", "message"])
+
+# Table -> (database path, table version, rollup DataFrame)
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def robust_z(values):
+    """
+    Robust z-scores: distance from the median in MADs
+
+    0.6745 * (x - median) / MAD, so a single extreme value cannot hide
+    itself by inflating the spread the way it does with mean and standard
+    deviation. When more than half the values are equal the MAD is zero and
+    the mean absolute deviation is used instead.
+
+    Args:
+        values: Array-like of numbers; NaN entries are ignored
+
+    Returns:
+        np.ndarray: z-score per value (NaN where the value is NaN, and
+            everywhere when fewer than three values are given)
+    """
+    values = np.asarray(values, dtype=float)
+    z = np.full(values.shape, np.nan)
+    finite = np.isfinite(values)
+    if finite.sum() < 3:
+        return z
+    x = values[finite]
+    median = np.median(x)
+    deviation = np.abs(x - median)
+    mad = np.median(deviation)
+    if mad > 0:
+        z[finite] = MAD_SCALE * (x - median) / mad
+    else:
+        mean_ad = deviation.mean()
+        z[finite] = (x - median) / (MEAN_AD_SCALE * mean_ad) if mean_ad > 0 else 0.0
+    return z
+
+
+def cusum(counts, k=CUSUM_K):
+    """
+    Upper CUSUM of each row of a matrix of daily counts
+
+    Each row is standardised against its own baseline: the median and MAD,
+    or for sparse rows where the MAD is zero, the mean with a Poisson
+    standard deviation. Sigma is at least one count, so a single event in
+    an otherwise quiet series is not a surge. The recursion
+    S[t] = max(0, S[t-1] + y[t] - k) is evaluated for all rows at once via
+    its closed form S = C - min(0, running minimum of C), with C the
+    cumulative sum.
+
+    Args:
+        counts: 2-D array, one row per series, one column per day
+        k: Slack in standard deviations
+
+    Returns:
+        tuple: (S with the shape of counts, baseline per row, sigma per row)
+    """
+    counts = np.asarray(counts, dtype=float)
+    median = np.median(counts, axis=1, keepdims=True)
+    mad = np.median(np.abs(counts - median), axis=1, keepdims=True) / MAD_SCALE
+    mean = counts.mean(axis=1, keepdims=True)
+    baseline = np.where(mad > 0, median, mean)
+    sigma = np.maximum(np.where(mad > 0, mad, np.sqrt(mean)), 1.0)
+
+    cumulative = np.cumsum((counts - baseline) / sigma - k, axis=1)
+    s = cumulative - np.minimum.accumulate(np.minimum(cumulative, 0), axis=1)
+    return s, baseline[:, 0], sigma[:, 0]
+
+
+def load_rollup(table):
+    """
+    Rollup rows of a base table
+
+    Kept per process until the base table's version changes; triggers
+    update the rollup in the same statement as the base table, so the
+    version covers both.
+
+    Args:
+        table: A key of ROLLUPS
+
+    Returns:
+        pd.DataFrame: The rollup table; rows with no parseable day are dropped
+    """
+    if table not in ROLLUPS:
+        raise ValueError(f"No rollup for table: {table}")
+    version = table_version(table)
+    loaded = _loaded.get(table)
+    if loaded and loaded[0] == connection.DB_PATH and version is not None and loaded[1] == version:
+        return loaded[2]
+
+    conn = connection.get_read_connection()
+    try:
+        with trace(f"analytics.load_{ROLLUPS[table]}"):
+            rollup = pd.read_sql_query(f"SELECT * FROM {ROLLUPS[table]} WHERE day != ''", conn)
+    finally:
+        conn.close()
+
+    with _loaded_lock:
+        _loaded[table] = (connection.DB_PATH, version, rollup)
+    return rollup
+
+
+def _group_resolution(rollup, key):
+    """Tickets, mean resolution time and robust z per value of a rollup column"""
+    groups = rollup.groupby(key)[["ticket_count", "resolution_count", "resolution_sum"]].sum()
+    counts = groups["resolution_count"].to_numpy(dtype=float)
+    mean = np.divide(groups["resolution_sum"].to_numpy(dtype=float), counts,
+                     out=np.full(len(groups), np.nan), where=counts > 0)
+    return pd.DataFrame({
+        "total_tickets": groups["ticket_count"].to_numpy(),
+        "avg_resolution_time": mean,
+        "robust_z": robust_z(mean),
+    }, index=groups.index)
+
+
+@traced()
+def staff_anomalies(threshold=ROBUST_Z_THRESHOLD):
+    """
+    Staff members whose average resolution time is unusual among their peers
+
+    Returns:
+        tuple: (DataFrame indexed by assigned_to with total_tickets,
+            avg_resolution_time and robust_z; list of Finding)
+    """
+    staff = _group_resolution(load_rollup("it_tickets"), "assigned_to")
+    findings = []
+    for name, row in staff[staff["robust_z"].abs() > threshold].sort_values("robust_z", ascending=False).iterrows():
+        slower = row["robust_z"] > 0
+        findings.append(Finding(
+            "warning" if slower else "info", name, float(row["robust_z"]),
+            f"Performance Anomaly: {name} averages {row['avg_resolution_time']:.1f} hours per ticket, "
+            f"{'slower' if slower else 'faster'} than peers (robust z {row['robust_z']:+.1f})"))
+    return staff, findings
+
+
+@traced()
+def status_bottlenecks(threshold=ROBUST_Z_THRESHOLD):
+    """
+    Ticket statuses whose average resolution time stands out from the others
+
+    Returns:
+        tuple: (DataFrame indexed by status with total_tickets,
+            avg_resolution_time and robust_z; list of Finding)
+    """
+    statuses = _group_resolution(load_rollup("it_tickets"), "status")
+    findings = [
+        Finding("warning", status, float(row["robust_z"]),
+                f"Bottleneck Identified: Tickets in '{status}' status average {row['avg_resolution_time']:.1f} hours "
+                f"to resolve (robust z {row['robust_z']:+.1f})")
+        for status, row in statuses[statuses["robust_z"] > threshold].sort_values(
+            "robust_z", ascending=False).iterrows()
+    ]
+    return statuses, findings
+
+
+def daily_counts(rollup, key, value):
+    """
+    Dense matrix of daily totals per group, with zero-count days filled in
+
+    Returns:
+        pd.DataFrame: One row per group, one column per day from the first
+            to the last day in the rollup
+    """
+    matrix = rollup.pivot_table(index=key, columns="day", values=value, aggfunc="sum", fill_value=0)
+    matrix.columns = pd.to_datetime(matrix.columns)
+    days = pd.date_range(matrix.columns.min(), matrix.columns.max(), freq="D")
+    return matrix.reindex(columns=days, fill_value=0)
+
+
+@traced()
+def incident_surges(k=CUSUM_K, h=CUSUM_H, recent_days=RECENT_DAYS):
+    """
+    Categories whose daily incident count has risen above their baseline
+
+    Runs CUSUM over every category's daily counts at once. A category whose
+    CUSUM is above h on the latest day is in an ongoing surge; one that
+    crossed h within the last recent_days days had a recent one.
+
+    Returns:
+        tuple: (DataFrame indexed by category with incidents,
+            baseline_per_day, cusum, peak_cusum and surge_since; list of Finding)
+    """
+    rollup = load_rollup("cyber_incidents")
+    if rollup.empty:
+        return pd.DataFrame(), []
+    matrix = daily_counts(rollup, "category", "incident_count")
+    s, baseline, _ = cusum(matrix.to_numpy(), k)
+
+    days = matrix.columns
+    positions = np.arange(s.shape[1])
+    # Start of the current run above zero: the day after the last day the CUSUM was reset
+    last_reset = np.maximum.accumulate(np.where(s <= 0, positions, -1), axis=1)[:, -1]
+    alarm = s > h
+    last_alarm = np.where(alarm.any(axis=1), s.shape[1] - 1 - np.argmax(alarm[:, ::-1], axis=1), -1)
+    ongoing = alarm[:, -1]
+
+    summary = pd.DataFrame({
+        "incidents": matrix.sum(axis=1).to_numpy(),
+        "baseline_per_day": baseline,
+        "cusum": s[:, -1],
+        "peak_cusum": s.max(axis=1),
+        "surge_since": [days[start + 1].date() if flag else None for start, flag in zip(last_reset, ongoing)],
+    }, index=matrix.index)
+
+    findings = []
+    for i, category in enumerate(matrix.index):
+        if ongoing[i]:
+            findings.append(Finding(
+                "warning", category, float(s[i, -1]),
+                f"Surge: {category} incidents have been above their baseline of {baseline[i]:.2f}/day "
+                f"since {days[last_reset[i] + 1].date()} (CUSUM {s[i, -1]:.1f} > {h:g})"))
+        elif last_alarm[i] >= 0 and last_alarm[i] >= len(days) - recent_days:
+            findings.append(Finding(
+                "info", category, float(s[i, last_alarm[i]]),
+                f"Recent surge: {category} incidents were above their baseline of {baseline[i]:.2f}/day "
+                f"until {days[last_alarm[i]].date()}"))
+    findings.sort(key=lambda finding: (finding.level != "warning", -finding.score))
+    return summary, findings
+
+
+@traced()
+def incident_backlog(threshold=ROBUST_Z_THRESHOLD):
+    """
+    Categories with an unusually large share of unresolved incidents
+
+    Returns:
+        tuple: (DataFrame indexed by category with incidents, unresolved,
+            unresolved_share and robust_z; list of Finding)
+    """
+    rollup = load_rollup("cyber_incidents")
+    unresolved = rollup["incident_count"].where(rollup["status"].isin(UNRESOLVED_STATES), 0)
+    groups = rollup.assign(unresolved=unresolved).groupby("category")[["incident_count", "unresolved"]].sum()
+    share = groups["unresolved"].to_numpy(dtype=float) / groups["incident_count"].to_numpy(dtype=float)
+    backlog = pd.DataFrame({
+        "incidents": groups["incident_count"].to_numpy(),
+        "unresolved": groups["unresolved"].to_numpy(),
+        "unresolved_share": share,
+        "robust_z": robust_z(share),
+    }, index=groups.index)
+    findings = [
+        Finding("warning", category, float(row["robust_z"]),
+                f"Response Bottleneck: {row['unresolved_share']:.0%} of {category} incidents are still "
+                f"unresolved (robust z {row['robust_z']:+.1f})")
+        for category, row in backlog[backlog["robust_z"] > threshold].sort_values(
+            "robust_z", ascending=False).iterrows()
+    ]
+    return backlog, findings
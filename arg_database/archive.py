@@ -0,0 +1,320 @@
+import logging
+import os
+import re
+import threading
+import time
+
+import arg_database.connection as connection
+from arg_database.dedup import DEDUP_TABLES, remove_from_index
+from arg_database.sketches import record_archived
+from arg_database.snapshots import table_version
+from arg_database.statements import TABLE_COLUMNS, PRIMARY_KEYS
+from arg_metrics.tracing import get_gauge, trace
+
+logger = logging.getLogger(__name__)
+
+# Rows in a terminal state are archived once they are older than this
+ARCHIVE_AFTER_DAYS = 180
+
+# Table -> column holding the row's time and the states a row never leaves
+ARCHIVE_POLICIES = {
+    "cyber_incidents": {"time_column": "timestamp", "terminal_states": ("Resolved", "Closed")},
+    "it_tickets": {"time_column": "created_at", "terminal_states": ("Resolved",)},
+}
+
+# Archiver thread, or None
+_archiver = None
+_archiver_lock = threading.Lock()
+
+
+def archive_table_name(table, month):
+    """
+    Name of the archive table of one month, e.g. it_tickets_archive_2024_01
+
+    Args:
+        table: One of ARCHIVE_POLICIES
+        month: "YYYY_MM"
+
+    Returns:
+        str: Archive table name
+    """
+    if table not in ARCHIVE_POLICIES:
+        raise ValueError(f"Table is not archived: {table}")
+    if not re.fullmatch(r"\d{4}_\d{2}", month):
+        raise ValueError(f"Bad archive month: {month}")
+    return f"{table}_archive_{month}"
+
+
+def list_archive_tables(conn, table):
+    """
+    Archive tables of a table, oldest month first
+
+    Args:
+        conn: Database connection object
+        table: One of ARCHIVE_POLICIES
+
+    Returns:
+        list: Archive table names
+    """
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? ORDER BY name",
+                        (f"{table}_archive_%",)).fetchall()
+    pattern = re.compile(rf"{table}_archive_\d{{4}}_\d{{2}}")
+    return [row[0] for row in rows if pattern.fullmatch(row[0])]
+
+
+def create_archive_table(conn, table, month):
+    """
+    Create the archive table of one month with the hot table's columns
+
+    Archive tables have no search index or version triggers; they are only
+    read through the history view. The id column is indexed but not a
+    primary key: ids are chosen by whoever writes the hot table, and one
+    that was archived can be used again (e.g. after the newest rows are
+    deleted), which must not stop the archiver.
+
+    Args:
+        conn: Database connection object
+        table: One of ARCHIVE_POLICIES
+        month: "YYYY_MM"
+
+    Returns:
+        str: Archive table name
+    """
+    name = archive_table_name(table, month)
+    declared = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+    columns = [f"{column} {declared.get(column, '')}".strip() for column in TABLE_COLUMNS[table]]
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {name} ({', '.join(columns)})")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_{PRIMARY_KEYS[table]} ON {name} ({PRIMARY_KEYS[table]})")
+    return name
+
+
+def _drop_archive_primary_key(conn, table, name):
+    """Rebuild an archive table made with the id as PRIMARY KEY (before reused ids were allowed)"""
+    if not any(row[5] for row in conn.execute(f"PRAGMA table_info({name})")):
+        return
+    month = name[len(f"{table}_archive_"):]
+    columns = ", ".join(TABLE_COLUMNS[table])
+    # SQLite refuses a rename while any view is broken; create_history_views puts it back
+    conn.execute(f"DROP VIEW IF EXISTS {table}_history")
+    conn.execute(f"ALTER TABLE {name} RENAME TO {name}_old")
+    create_archive_table(conn, table, month)
+    conn.execute(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {name}_old")
+    conn.execute(f"DROP TABLE {name}_old")
+
+
+def history_source(conn, table):
+    """
+    What to read for every row a table ever had: <table>_history once it exists, else the table
+
+    Args:
+        conn: Database connection object
+        table: Table name
+
+    Returns:
+        str: View or table name
+    """
+    if table not in ARCHIVE_POLICIES or connection.is_postgres():
+        return table
+    view = conn.execute("SELECT name FROM sqlite_master WHERE type = 'view' AND name = ?",
+                        (f"{table}_history",)).fetchone()
+    return view[0] if view else table
+
+
+def create_history_view(conn, table):
+    """
+    (Re)create <table>_history: the hot table UNION ALL its archive tables
+
+    Use the view for historical queries; the pages keep reading the hot
+    table. The view is rebuilt whenever a new month is archived.
+
+    Args:
+        conn: Database connection object
+        table: One of ARCHIVE_POLICIES
+    """
+    columns = ", ".join(TABLE_COLUMNS[table])
+    selects = [f"SELECT {columns} FROM {source}" for source in [table] + list_archive_tables(conn, table)]
+    sql = f"CREATE VIEW {table}_history AS {' UNION ALL '.join(selects)}"
+    existing = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?",
+                            (f"{table}_history",)).fetchone()
+    if existing and existing[0] == sql:
+        # Unchanged; leave the schema (and every connection's statement cache) alone
+        return
+    conn.execute(f"DROP VIEW IF EXISTS {table}_history")
+    conn.execute(sql)
+
+
+def create_history_views(conn):
+    """
+    Create the history view of every archived table
+
+    Archive tables from before reused ids were allowed lose their primary
+    key here.
+
+    Args:
+        conn: Database connection object
+    """
+    for table in ARCHIVE_POLICIES:
+        for name in list_archive_tables(conn, table):
+            _drop_archive_primary_key(conn, table, name)
+        create_history_view(conn, table)
+    conn.commit()
+
+
+def _archivable(table, days):
+    """WHERE clause and params selecting the rows of a table to archive"""
+    policy = ARCHIVE_POLICIES[table]
+    states = policy["terminal_states"]
+    key = PRIMARY_KEYS[table]
+    # The row with the highest id stays, so the forms' next id (max + 1) does not reuse an archived one
+    where = (f"status IN ({', '.join('?' * len(states))})"
+             f" AND julianday({policy['time_column']}) < julianday('now', ?)"
+             f" AND {key} < (SELECT MAX({key}) FROM {table})")
+    return where, list(states) + [f"-{int(days)} days"]
+
+
+def archive_table(conn, table, days=ARCHIVE_AFTER_DAYS, dry_run=False):
+    """
+    Move old rows in terminal states into per-month archive tables
+
+    Each row goes to the archive table of the month of its time column.
+    The copy and the delete are one transaction, so a row is always in
+    exactly one place. Deleting from the hot table fires the search-index
+    and version triggers as usual, so caches and snapshots pick it up; the
+    rollups and the forecast log skip it (see tables.create_archiving_table)
+    and the sketches keep it (sketches.record_archived), since the row
+    still exists in <table>_history. Its near-duplicate index entries go
+    in the same transaction, as the create forms only look for duplicates
+    in the hot table.
+
+    Args:
+        conn: Database connection object
+        table: One of ARCHIVE_POLICIES
+        days: Minimum age in days
+        dry_run: Only count the rows that would move
+
+    Returns:
+        dict: "YYYY_MM" -> number of rows archived (or to be archived)
+
+    Raises:
+        RuntimeError: On PostgreSQL, where archiving is not supported
+    """
+    if table not in ARCHIVE_POLICIES:
+        raise ValueError(f"Table is not archived: {table}")
+    if connection.is_postgres():
+        raise RuntimeError("Archiving is only supported on the SQLite database")
+    time_column = ARCHIVE_POLICIES[table]["time_column"]
+    where, params = _archivable(table, days)
+    month = f"strftime('%Y_%m', {time_column})"
+
+    count_sql = f"SELECT {month}, COUNT(*) FROM {table} WHERE {where} GROUP BY 1 ORDER BY 1"
+    if dry_run:
+        return dict(conn.execute(count_sql, params).fetchall())
+
+    columns = ", ".join(TABLE_COLUMNS[table])
+    with trace(f"archive.{table}"):
+        try:
+            # Count inside the write transaction so the delete removes exactly what was copied
+            conn.execute("BEGIN IMMEDIATE")
+            counts = dict(conn.execute(count_sql, params).fetchall())
+            for archive_month in counts:
+                name = create_archive_table(conn, table, archive_month)
+                conn.execute(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {table}"
+                             f" WHERE {where} AND {month} = ?", params + [archive_month])
+            if counts:
+                if table in DEDUP_TABLES:
+                    remove_from_index(conn, table, conn.execute(
+                        f"SELECT {PRIMARY_KEYS[table]}, description FROM {table} WHERE {where}", params).fetchall())
+                before = table_version(conn, table)
+                # Listed in archiving, the rows leave the hot table but stay in the rollups, forecast and sketches
+                conn.execute("INSERT INTO archiving (table_name) VALUES (?)", (table,))
+                conn.execute(f"DELETE FROM {table} WHERE {where}", params)
+                conn.execute("DELETE FROM archiving WHERE table_name = ?", (table,))
+                record_archived(conn, table, before)
+                create_history_view(conn, table)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return counts
+
+
+def archive_all(days=ARCHIVE_AFTER_DAYS, dry_run=False):
+    """
+    Archive every table in ARCHIVE_POLICIES
+
+    Args:
+        days: Minimum age in days
+        dry_run: Only count the rows that would move
+
+    Returns:
+        dict: Table name -> archive_table result
+    """
+    conn = connection.get_db_connection()
+    try:
+        return {table: archive_table(conn, table, days, dry_run) for table in ARCHIVE_POLICIES}
+    finally:
+        conn.close()
+
+
+def start_archiver(interval, days=ARCHIVE_AFTER_DAYS):
+    """
+    Archive old rows every `interval` seconds from a background thread
+
+    Safe to call on every rerun; only the first call starts a thread.
+    Each table is archived on its own, so one failing does not hold up
+    the other. Failures are logged and counted in the "archive.failures"
+    gauge, and retried next interval.
+
+    Args:
+        interval: Seconds between runs
+        days: Minimum age in days
+    """
+    global _archiver
+
+    failures = get_gauge("archive.failures")
+
+    def run():
+        while True:
+            for table in ARCHIVE_POLICIES:
+                try:
+                    conn = connection.get_db_connection()
+                    try:
+                        archive_table(conn, table, days)
+                    finally:
+                        conn.close()
+                except Exception:
+                    failures.set(failures.value + 1)
+                    logger.exception("Archiving %s failed; retrying in %s s", table, interval)
+            time.sleep(interval)
+
+    with _archiver_lock:
+        if _archiver is not None:
+            return
+        _archiver = threading.Thread(target=run, name="arg-archiver", daemon=True)
+    _archiver.start()
+
+
+def start_archiver_from_env():
+    """
+    Start the archiver if ARG_ARCHIVE_INTERVAL (seconds) is set
+
+    ARG_ARCHIVE_DAYS overrides the minimum age (ARCHIVE_AFTER_DAYS).
+    """
+    interval = os.environ.get("ARG_ARCHIVE_INTERVAL")
+    if interval:
+        start_archiver(float(interval), int(os.environ.get("ARG_ARCHIVE_DAYS", ARCHIVE_AFTER_DAYS)))
+
+
+if __name__ == "__main__":
+    # python -m arg_database.archive [--days N] [--dry-run]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move old closed incidents and resolved tickets to archive tables")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    for table, counts in archive_all(args.days, args.dry_run).items():
+        verb = "would archive" if args.dry_run else "archived"
+        months = ", ".join(f"{month}: {count}" for month, count in counts.items()) or "nothing"
+        print(f"{table} {verb} {sum(counts.values())} row(s) ({months})")
@@ -1,35 +1,298 @@
+import hashlib
+import os
 import sqlite3
+import threading
 from pathlib import Path
 
+import pandas as pd
+
+from arg_metrics.tracing import traced
+
 # Define the path to the SQLite database file
-DB_PATH = Path(__file__).parent.parent / "DATA" / "platform.db"
+# (ARG_DB_PATH overrides it, e.g. to point benchmarks at a synthetic database)
+DB_PATH = Path(os.environ.get("ARG_DB_PATH", Path(__file__).parent.parent / "DATA" / "platform.db"))
+
+# PostgreSQL URL, e.g. postgresql://argus@localhost/argus; when set the
+# platform runs on PostgreSQL (see arg_database.postgres) instead of DB_PATH
+DATABASE_URL = os.environ.get("ARG_DATABASE_URL")
+
+# Rows per fetch when a query is read in chunks
+CHUNK_ROWS = 50_000
+
+# Idle read-only connections each process keeps open for reuse
+# (ARG_READ_POOL_SIZE); more can be in use at once, the extras are closed
+READ_POOL_SIZE = int(os.environ.get("ARG_READ_POOL_SIZE", 8))
+
+
+class PlatformConnection(sqlite3.Connection):
+    """
+    SQLite connection that remembers one cursor per prepared statement
+
+    sqlite3 already keeps compiled statements in a per-connection cache keyed
+    by the SQL text; holding on to the cursor as well lets the statement
+    registry (arg_database.statements) skip cursor creation on repeat calls.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statement_cursors = {}
+
+    def discard(self):
+        """Really close the connection (close() may hand it back for reuse)"""
+        sqlite3.Connection.close(self)
+
+
+class ReadConnection(PlatformConnection):
+    """
+    Read-only SQLite connection from this process's reader pool
+
+    Opened with a mode=ro URI, so a write through it fails at once instead
+    of queueing for the write lock. close() hands it back to the pool.
+    """
+
+    def close(self):
+        _readers.put(self)
+
+
+class WriteConnection(PlatformConnection):
+    """
+    This process's one read-write SQLite connection
+
+    close() hands it on to the next thread waiting to write.
+    """
+
+    def close(self):
+        _writer.release(self)
+
+
+class _ReaderPool:
+    """Idle ReadConnections of DB_PATH, most recently used last"""
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def get(self):
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                if conn.db_path == DB_PATH:
+                    return conn
+                # Left over from a previous DB_PATH (benchmarks switch databases)
+                conn.discard()
+        conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False, factory=ReadConnection)
+        # Same rows as the writer hands out (put() restores this on reuse)
+        conn.row_factory = sqlite3.Row
+        conn.db_path = DB_PATH
+        return conn
+
+    def put(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = sqlite3.Row
+        with self._lock:
+            if conn.db_path == DB_PATH and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.discard()
+
+
+class _Writer:
+    """
+    The WriteConnection of DB_PATH and the lock that gives it to one thread at a time
+
+    The lock is reentrant: a thread that asks again while it holds the
+    connection gets the same one (and the same transaction) back, and only
+    its outermost close() releases it. Each close() restores the row factory
+    the caller found, and the outermost one rolls back anything left
+    uncommitted.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._conn = None
+        self._owner = None
+        self._row_factories = []
+
+    def acquire(self):
+        self._lock.acquire()
+        try:
+            if not self._row_factories and (self._conn is None or self._conn.db_path != DB_PATH):
+                if self._conn is not None:
+                    self._conn.discard()
+                    self._conn = None
+                DB_PATH.parent.mkdir(exist_ok=True)
+                conn = sqlite3.connect(DB_PATH, check_same_thread=False, factory=WriteConnection)
+                conn.db_path = DB_PATH
+                try:
+                    # Readers then see the last commit without blocking the writer (the mode is kept in the file)
+                    conn.execute("PRAGMA journal_mode = WAL")
+                except sqlite3.OperationalError:
+                    # Another process holds the database; it stays in its current mode until the next open
+                    pass
+                self._conn = conn
+        except BaseException:
+            self._lock.release()
+            raise
+        self._owner = threading.get_ident()
+        self._row_factories.append(self._conn.row_factory)
+        self._conn.row_factory = sqlite3.Row
+        return self._conn
 
+    def release(self, conn):
+        if conn is not self._conn or self._owner != threading.get_ident() or not self._row_factories:
+            # Closed twice, or a connection this writer has since replaced
+            return
+        conn.row_factory = self._row_factories.pop()
+        if not self._row_factories:
+            self._owner = None
+            if conn.in_transaction:
+                conn.rollback()
+        self._lock.release()
 
+
+# Shared by everything in this process
+_readers = _ReaderPool(READ_POOL_SIZE)
+_writer = _Writer()
+
+
+def is_postgres():
+    """Whether this process's database is PostgreSQL (ARG_DATABASE_URL) rather than the SQLite file"""
+    return bool(DATABASE_URL)
+
+
+def storage_name():
+    """
+    Name of the current database for the files kept beside it (snapshots, job output)
+
+    Returns:
+        str: DB_PATH's stem, or postgres_<hash of the URL> on PostgreSQL
+    """
+    if is_postgres():
+        return f"postgres_{hashlib.sha1(DATABASE_URL.encode()).hexdigest()[:8]}"
+    return DB_PATH.stem
+
+
+@traced("db.get_db_connection")
 def get_db_connection():
     """
-    Create and return a database connection
+    Get this process's write connection
+
+    There is one read-write SQLite connection per process, and a thread
+    waits here until the previous writer has closed it, so writes from the
+    same process queue in order instead of failing with "database is
+    locked". Close it promptly; reads that do not write belong on
+    get_read_connection. The database is in WAL mode, so those readers
+    never block the writer, or the writer them.
+
+    On PostgreSQL the connection comes from this process's pool and close()
+    returns it there; it takes the same SQL (see postgres.PostgresConnection).
 
     Returns:
-        sqlite3.Connection: A connection object to the SQLite database
+        sqlite3.Connection: A connection object to the SQLite database (a
+            postgres.PostgresConnection on PostgreSQL)
     """
-    # Ensure the DATA directory exists
-    DB_PATH.parent.mkdir(exist_ok=True)
+    if is_postgres():
+        from arg_database.postgres import connect
+        return connect(DATABASE_URL)
+    return _writer.acquire()
 
-    # Create database connection with row factory for dict-like access
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
 
-    return conn
+@traced("db.get_read_connection")
+def get_read_connection():
+    """
+    Get a read-only connection, for loaders, searches and aggregations
+
+    SQLite connections come from a per-process pool of mode=ro connections
+    and never wait for the writer. On PostgreSQL, where readers never block
+    writers anyway, this is a connection from the same pool as
+    get_db_connection.
+
+    Returns:
+        sqlite3.Connection: A read-only connection (a
+            postgres.PostgresConnection on PostgreSQL); close() returns it
+            to its pool
+    """
+    if is_postgres():
+        from arg_database.postgres import connect
+        return connect(DATABASE_URL)
+    return _readers.get()
+
+
+def bulk_insert(conn, table, columns, rows):
+    """
+    Insert many rows in the connection's current (or a new) transaction
+
+    executemany on SQLite; COPY on PostgreSQL, which avoids a statement per row.
+
+    Args:
+        conn: Database connection object
+        table: Table name (never user input)
+        columns: Column names, in the order of each row's values
+        rows: Iterable of row tuples
+    """
+    if getattr(conn, "backend", "sqlite") == "postgres":
+        conn.copy_rows(table, columns, rows)
+        return
+    conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+
+
+def iter_query(conn, sql, params=(), chunk_rows=CHUNK_ROWS):
+    """
+    Run a query and yield its rows a chunk at a time as plain tuples
+
+    On PostgreSQL the rows stay on the server (a server-side cursor), so a
+    full-table read never holds the whole result on the client.
+
+    Yields:
+        list: Up to chunk_rows row tuples
+    """
+    if getattr(conn, "backend", "sqlite") == "postgres":
+        yield from conn.iter_chunks(sql, params, chunk_rows)
+        return
+    cursor = conn.cursor()
+    # Plain tuples; building a sqlite3.Row per row dominates a full scan
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        yield rows
+
+
+def read_frame(conn, sql, params=None):
+    """
+    A query's result as a DataFrame
+
+    pandas.read_sql_query on SQLite; on PostgreSQL the rows are streamed
+    through a server-side cursor.
+
+    Returns:
+        pd.DataFrame: The rows, with the query's column names
+    """
+    if getattr(conn, "backend", "sqlite") == "postgres":
+        return conn.read_frame(sql, params)
+    return pd.read_sql_query(sql, conn, params=params)
 
 
 def setup_database():
     """
-    Initialize the database and create all tables
+    Initialize the database, create all tables and seed them from CSV once
     This function is called on application startup
     """
     from arg_database.tables import initialize_all_tables
+    from arg_database.seeding import seed_database
+    from arg_database.dedup import index_all_pending
 
-    # Open connection, initialize tables, then close
+    # Open connection, initialize and seed tables, index new descriptions, then close
     conn = get_db_connection()
-    initialize_all_tables(conn)
-    conn.close()
\ No newline at end of file
+    try:
+        initialize_all_tables(conn)
+        seed_database(conn)
+        index_all_pending(conn)
+    finally:
+        conn.close()
\ No newline at end of file
@@ -1,85 +1,261 @@
+import re
 import pandas as pd
-from pathlib import Path
-from arg_database.connection import get_db_connection
-
-# Define paths to CSV data files
-DATA_DIR = Path(__file__).parent.parent / "DATA"
-CYBER_CSV = DATA_DIR / "cyber_incidents.csv"
-DATASETS_CSV = DATA_DIR / "datasets_metadata.csv"
-TICKETS_CSV = DATA_DIR / "it_tickets.csv"
+from arg_database.connection import get_db_connection, get_read_connection, is_postgres, read_frame
+from arg_database.tables import SEARCH_VECTOR
+from arg_database.statements import check_columns, execute_update
+from arg_metrics.tracing import traced
+from arg_database.snapshots import read_table
+from arg_database.sketches import record_insert, record_update
+from arg_database.dedup import index_pending
+from arg_database.write_queue import queue_insert
 
 
+@traced()
 def load_cyber_incidents():
     """
-    Load cyber incidents from database or CSV
+    Load cyber incidents from the database
+
+    The tables are seeded from the CSV files once, by setup_database
+    (see arg_database.seeding); this never reads CSV or changes the schema.
 
     Returns:
         pd.DataFrame: DataFrame containing cyber incident data
     """
-    conn = get_db_connection()
+    conn = get_read_connection()
     try:
-        # Try to load from database
-        df = pd.read_sql_query("SELECT * FROM cyber_incidents", conn)
-        if df.empty:
-            # If database is empty, load from CSV and populate database
-            df = pd.read_csv(CYBER_CSV)
-            df.to_sql('cyber_incidents', conn, if_exists='replace', index=False)
-    except:
-        # If table doesn't exist, load from CSV and create table
-        df = pd.read_csv(CYBER_CSV)
-        df.to_sql('cyber_incidents', conn, if_exists='replace', index=False)
-    conn.close()
-    return df
+        return read_table(conn, 'cyber_incidents')
+    finally:
+        conn.close()
 
 
+@traced()
 def load_datasets_metadata():
     """
-    Load datasets metadata from database or CSV
+    Load datasets metadata from the database
 
     Returns:
         pd.DataFrame: DataFrame containing dataset metadata
     """
-    conn = get_db_connection()
+    conn = get_read_connection()
     try:
-        # Try to load from database
-        df = pd.read_sql_query("SELECT * FROM datasets_metadata", conn)
-        if df.empty:
-            # If database is empty, load from CSV and populate database
-            df = pd.read_csv(DATASETS_CSV)
-            df.to_sql('datasets_metadata', conn, if_exists='replace', index=False)
-    except:
-        # If table doesn't exist, load from CSV and create table
-        df = pd.read_csv(DATASETS_CSV)
-        df.to_sql('datasets_metadata', conn, if_exists='replace', index=False)
-    conn.close()
-    return df
+        return read_table(conn, 'datasets_metadata')
+    finally:
+        conn.close()
 
 
+@traced()
 def load_it_tickets():
     """
-    Load IT tickets from database or CSV
+    Load IT tickets from the database
 
     Returns:
         pd.DataFrame: DataFrame containing IT ticket data
     """
-    conn = get_db_connection()
+    conn = get_read_connection()
     try:
-        # Try to load from database
-        df = pd.read_sql_query("SELECT * FROM it_tickets", conn)
-        if df.empty:
-            # If database is empty, load from CSV and populate database
-            df = pd.read_csv(TICKETS_CSV)
-            df.to_sql('it_tickets', conn, if_exists='replace', index=False)
-    except:
-        # If table doesn't exist, load from CSV and create table
-        df = pd.read_csv(TICKETS_CSV)
-        df.to_sql('it_tickets', conn, if_exists='replace', index=False)
-    conn.close()
+        return read_table(conn, 'it_tickets')
+    finally:
+        conn.close()
+
+
+@traced()
+def load_dataset_profiles():
+    """
+    Load the measured profiles of uploaded dataset files
+
+    Written by arg_database.profiler; datasets entered by hand have none.
+
+    Returns:
+        pd.DataFrame: One row per profiled dataset (column_profiles is JSON)
+    """
+    conn = get_read_connection()
+    try:
+        return read_table(conn, 'dataset_profiles')
+    finally:
+        conn.close()
+
+
+# Full-text search over descriptions
+
+def build_match_query(query):
+    """
+    Turn free text typed by a user into a safe FTS5 MATCH expression
+
+    Each word is quoted (so FTS5 operators in the input are treated as plain
+    text) and given a prefix wildcard, and all words must match.
+
+    Args:
+        query: Search text entered by the user
+
+    Returns:
+        str: FTS5 MATCH expression, or an empty string if there are no words
+    """
+    terms = re.findall(r"\w+", query or "")
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def build_tsquery(query):
+    """
+    Turn free text typed by a user into a PostgreSQL tsquery
+
+    The counterpart of build_match_query for the PostgreSQL search indexes:
+    every word, as a prefix, must match.
+
+    Args:
+        query: Search text entered by the user
+
+    Returns:
+        str: tsquery text, or an empty string if there are no words
+    """
+    terms = re.findall(r"\w+", query or "")
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def _filter_clause(table, filters, alias):
+    """
+    SQL that narrows a search to the page filters, applied before its LIMIT
+
+    Args:
+        table: Table name
+        filters: Dict of column name -> list of accepted values; empty lists
+            are ignored (no filter on that column)
+        alias: Alias of the table in the search query
+
+    Returns:
+        tuple: (sql, params); sql is empty or starts with ' AND '
+
+    Raises:
+        ValueError: If a filter column is not whitelisted
+    """
+    filters = {column: list(values) for column, values in (filters or {}).items() if values}
+    sql = ""
+    params = []
+    for column in check_columns(table, filters):
+        sql += f" AND {alias}.{column} IN ({', '.join('?' * len(filters[column]))})"
+        params.extend(filters[column])
+    return sql, params
+
+
+def _search_postgres(table, query, limit, filters=None):
+    """search_incidents / search_tickets on PostgreSQL, over the GIN index of SEARCH_VECTOR"""
+    tsquery = build_tsquery(query)
+    if not tsquery:
+        return pd.DataFrame()
+    where, params = _filter_clause(table, filters, "t")
+
+    conn = get_read_connection()
+    try:
+        return read_frame(
+            conn,
+            f"""
+            SELECT t.*,
+                   ts_headline('simple', t.description, q, 'StartSel=**, StopSel=**, MaxWords=12, MinWords=4')
+                       AS snippet,
+                   -ts_rank({SEARCH_VECTOR}, q) AS rank
+            FROM {table} t, to_tsquery('simple', ?) AS q
+            WHERE {SEARCH_VECTOR} @@ q{where}
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (tsquery, *params, limit)
+        )
+    finally:
+        conn.close()
+
+
+@traced()
+def search_incidents(query, limit=50, filters=None):
+    """
+    Search cyber incident descriptions using the FTS5 index (a GIN text search
+    index on PostgreSQL)
+
+    Args:
+        query: Search text entered by the user
+        limit: Maximum number of results to return
+        filters: Dict of column name -> list of accepted values, applied
+            before the limit; empty lists are ignored
+
+    Returns:
+        pd.DataFrame: Matching incidents, best match first, with a
+            highlighted 'snippet' column and a bm25 'rank' column
+            (lower is better; -ts_rank on PostgreSQL)
+    """
+    if is_postgres():
+        return _search_postgres('cyber_incidents', query, limit, filters)
+    match = build_match_query(query)
+    if not match:
+        return pd.DataFrame()
+    where, params = _filter_clause('cyber_incidents', filters, 'c')
+
+    conn = get_read_connection()
+    try:
+        df = pd.read_sql_query(
+            f"""
+            SELECT c.*,
+                   snippet(cyber_incidents_fts, 0, '**', '**', '…', 12) AS snippet,
+                   bm25(cyber_incidents_fts) AS rank
+            FROM cyber_incidents_fts
+            JOIN cyber_incidents c ON c.incident_id = cyber_incidents_fts.rowid
+            WHERE cyber_incidents_fts MATCH ?{where}
+            ORDER BY rank
+            LIMIT ?
+            """,
+            conn,
+            params=(match, *params, limit)
+        )
+    finally:
+        conn.close()
+    return df
+
+
+@traced()
+def search_tickets(query, limit=50, filters=None):
+    """
+    Search IT ticket descriptions using the FTS5 index (a GIN text search
+    index on PostgreSQL)
+
+    Args:
+        query: Search text entered by the user
+        limit: Maximum number of results to return
+        filters: Dict of column name -> list of accepted values, applied
+            before the limit; empty lists are ignored
+
+    Returns:
+        pd.DataFrame: Matching tickets, best match first, with a
+            highlighted 'snippet' column and a bm25 'rank' column
+            (lower is better; -ts_rank on PostgreSQL)
+    """
+    if is_postgres():
+        return _search_postgres('it_tickets', query, limit, filters)
+    match = build_match_query(query)
+    if not match:
+        return pd.DataFrame()
+    where, params = _filter_clause('it_tickets', filters, 't')
+
+    conn = get_read_connection()
+    try:
+        df = pd.read_sql_query(
+            f"""
+            SELECT t.*,
+                   snippet(it_tickets_fts, 0, '**', '**', '…', 12) AS snippet,
+                   bm25(it_tickets_fts) AS rank
+            FROM it_tickets_fts
+            JOIN it_tickets t ON t.ticket_id = it_tickets_fts.rowid
+            WHERE it_tickets_fts MATCH ?{where}
+            ORDER BY rank
+            LIMIT ?
+            """,
+            conn,
+            params=(match, *params, limit)
+        )
+    finally:
+        conn.close()
     return df
 
 
 # CRUD Operations for Cyber Incidents
 
+@traced()
 def create_incident(incident_id, timestamp, severity, category, status, description):
     """
     Create a new cyber incident record
@@ -93,15 +269,40 @@ def create_incident(incident_id, timestamp, severity, category, status, descript
         description: Description of the incident
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO cyber_incidents VALUES (?, ?, ?, ?, ?, ?)",
-        (incident_id, timestamp, severity, category, status, description)
-    )
-    conn.commit()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO cyber_incidents VALUES (?, ?, ?, ?, ?, ?)",
+            (incident_id, timestamp, severity, category, status, description)
+        )
+        record_insert(conn, 'cyber_incidents', (incident_id, timestamp, severity, category, status, description))
+        # Make the description findable as a near-duplicate right away
+        index_pending(conn, 'cyber_incidents')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@traced()
+def queue_incident(incident_id, timestamp, severity, category, status, description):
+    """
+    Create a cyber incident record through the group-commit write queue
+
+    For high-rate feeds (e.g. SIEM alerts): returns as soon as the row is
+    queued, and the row is committed together with the other writes queued
+    around it (see arg_database.write_queue).
+
+    Args:
+        Same as create_incident
+
+    Returns:
+        Future: Resolves once the incident is committed; result() raises
+            if it was rejected (e.g. a duplicate incident_id)
+    """
+    return queue_insert('cyber_incidents', (incident_id, timestamp, severity, category, status, description))
 
 
+@traced()
 def update_incident(incident_id, **kwargs):
     """
     Update an existing cyber incident record
@@ -109,17 +310,21 @@ def update_incident(incident_id, **kwargs):
     Args:
         incident_id: ID of the incident to update
         **kwargs: Fields to update (e.g., status="Resolved", severity="High")
+
+    Raises:
+        ValueError: If a field is not a column of the table
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    # Build SET clause dynamically from kwargs
-    set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
-    values = list(kwargs.values()) + [incident_id]
-    cursor.execute(f"UPDATE cyber_incidents SET {set_clause} WHERE incident_id = ?", values)
-    conn.commit()
-    conn.close()
+    try:
+        # Column names are checked against the whitelist and the SQL is reused
+        execute_update(conn, 'cyber_incidents', incident_id, kwargs)
+        record_update(conn, 'cyber_incidents', kwargs)
+        conn.commit()
+    finally:
+        conn.close()
 
 
+@traced()
 def delete_incident(incident_id):
     """
     Delete a cyber incident record
@@ -128,14 +333,17 @@ def delete_incident(incident_id):
         incident_id: ID of the incident to delete
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
-    conn.commit()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
+        conn.commit()
+    finally:
+        conn.close()
 
 
 # CRUD Operations for Datasets
 
+@traced()
 def create_dataset(dataset_id, name, rows, columns, uploaded_by, upload_date):
     """
     Create a new dataset metadata record
@@ -149,15 +357,19 @@ def create_dataset(dataset_id, name, rows, columns, uploaded_by, upload_date):
         upload_date: Date the dataset was uploaded
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO datasets_metadata VALUES (?, ?, ?, ?, ?, ?)",
-        (dataset_id, name, rows, columns, uploaded_by, upload_date)
-    )
-    conn.commit()
-    conn.close()
-
-
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO datasets_metadata VALUES (?, ?, ?, ?, ?, ?)",
+            (dataset_id, name, rows, columns, uploaded_by, upload_date)
+        )
+        record_insert(conn, 'datasets_metadata', (dataset_id, name, rows, columns, uploaded_by, upload_date))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@traced()
 def update_dataset(dataset_id, **kwargs):
     """
     Update an existing dataset metadata record
@@ -165,17 +377,21 @@ def update_dataset(dataset_id, **kwargs):
     Args:
         dataset_id: ID of the dataset to update
         **kwargs: Fields to update (e.g., name="New Name", rows=5000)
+
+    Raises:
+        ValueError: If a field is not a column of the table
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    # Build SET clause dynamically from kwargs
-    set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
-    values = list(kwargs.values()) + [dataset_id]
-    cursor.execute(f"UPDATE datasets_metadata SET {set_clause} WHERE dataset_id = ?", values)
-    conn.commit()
-    conn.close()
+    try:
+        # Column names are checked against the whitelist and the SQL is reused
+        execute_update(conn, 'datasets_metadata', dataset_id, kwargs)
+        record_update(conn, 'datasets_metadata', kwargs)
+        conn.commit()
+    finally:
+        conn.close()
 
 
+@traced()
 def delete_dataset(dataset_id):
     """
     Delete a dataset metadata record
@@ -184,14 +400,18 @@ def delete_dataset(dataset_id):
         dataset_id: ID of the dataset to delete
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM datasets_metadata WHERE dataset_id = ?", (dataset_id,))
-    conn.commit()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM datasets_metadata WHERE dataset_id = ?", (dataset_id,))
+        cursor.execute("DELETE FROM dataset_profiles WHERE dataset_id = ?", (dataset_id,))
+        conn.commit()
+    finally:
+        conn.close()
 
 
 # CRUD Operations for IT Tickets
 
+@traced()
 def create_ticket(ticket_id, priority, description, status, assigned_to, created_at, resolution_time):
     """
     Create a new IT ticket record
@@ -206,15 +426,39 @@ def create_ticket(ticket_id, priority, description, status, assigned_to, created
         resolution_time: Time taken to resolve (in hours)
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO it_tickets VALUES (?, ?, ?, ?, ?, ?, ?)",
-        (ticket_id, priority, description, status, assigned_to, created_at, resolution_time)
-    )
-    conn.commit()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO it_tickets VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (ticket_id, priority, description, status, assigned_to, created_at, resolution_time)
+        )
+        record_insert(conn, 'it_tickets',
+                      (ticket_id, priority, description, status, assigned_to, created_at, resolution_time))
+        index_pending(conn, 'it_tickets')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@traced()
+def queue_ticket(ticket_id, priority, description, status, assigned_to, created_at, resolution_time):
+    """
+    Create an IT ticket record through the group-commit write queue
+
+    The ticket counterpart of queue_incident.
 
+    Args:
+        Same as create_ticket
 
+    Returns:
+        Future: Resolves once the ticket is committed; result() raises
+            if it was rejected (e.g. a duplicate ticket_id)
+    """
+    return queue_insert('it_tickets',
+                        (ticket_id, priority, description, status, assigned_to, created_at, resolution_time))
+
+
+@traced()
 def update_ticket(ticket_id, **kwargs):
     """
     Update an existing IT ticket record
@@ -222,17 +466,21 @@ def update_ticket(ticket_id, **kwargs):
     Args:
         ticket_id: ID of the ticket to update
         **kwargs: Fields to update (e.g., status="Resolved", priority="High")
+
+    Raises:
+        ValueError: If a field is not a column of the table
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    # Build SET clause dynamically from kwargs
-    set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
-    values = list(kwargs.values()) + [ticket_id]
-    cursor.execute(f"UPDATE it_tickets SET {set_clause} WHERE ticket_id = ?", values)
-    conn.commit()
-    conn.close()
+    try:
+        # Column names are checked against the whitelist and the SQL is reused
+        execute_update(conn, 'it_tickets', ticket_id, kwargs)
+        record_update(conn, 'it_tickets', kwargs)
+        conn.commit()
+    finally:
+        conn.close()
 
 
+@traced()
 def delete_ticket(ticket_id):
     """
     Delete an IT ticket record
@@ -241,7 +489,9 @@ def delete_ticket(ticket_id):
         ticket_id: ID of the ticket to delete
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM it_tickets WHERE ticket_id = ?", (ticket_id,))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM it_tickets WHERE ticket_id = ?", (ticket_id,))
+        conn.commit()
+    finally:
+        conn.close()
\ No newline at end of file
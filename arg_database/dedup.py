@@ -0,0 +1,372 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+import arg_database.connection as connection
+from arg_database.statements import PRIMARY_KEYS
+from arg_metrics.tracing import trace, traced
+
+# Tables with a near-duplicate index over their description column
+DEDUP_TABLES = ("cyber_incidents", "it_tickets")
+
+# Descriptions are compared as sets of overlapping byte 5-grams of the normalised text
+SHINGLE_SIZE = 5
+
+# MinHash signature of BANDS * BAND_ROWS values; two descriptions become
+# candidates when any band matches. 12 x 3 puts the LSH threshold near a
+# Jaccard similarity of 0.44 and finds 95% of pairs at 0.6.
+BANDS = 12
+BAND_ROWS = 3
+NUM_PERM = BANDS * BAND_ROWS
+
+# Candidates at or above this (exact) Jaccard similarity are reported
+SIMILARITY_THRESHOLD = 0.6
+
+# Newest rows read per matching bucket; bounds the work when one campaign has thousands of rows
+CANDIDATES_PER_BUCKET = 25
+
+# Rows kept per bucket. Lookups only read the newest CANDIDATES_PER_BUCKET,
+# so older rows of a crowded bucket (one campaign logged over and over) are
+# dropped; the margin covers deletes of the newest ones
+MAX_BUCKET_ROWS = 4 * CANDIDATES_PER_BUCKET
+
+# Rows indexed per batch, and rows hashed at once within a batch
+INDEX_BATCH_ROWS = 20_000
+SIGNATURE_BATCH_ROWS = 1_000
+
+# Hash parameters; fixed so every process computes the same signatures
+_rng = np.random.default_rng(0x5EED)
+_MULTIPLIERS = _rng.integers(0, 2 ** 64, NUM_PERM, dtype=np.uint64, endpoint=False) | np.uint64(1)
+_INCREMENTS = _rng.integers(0, 2 ** 64, NUM_PERM, dtype=np.uint64, endpoint=False)
+
+
+def normalize(text):
+    """Lower-case the text and collapse everything but letters and digits to single spaces"""
+    return re.sub(r"[\W_]+", " ", str(text or "").lower()).strip()
+
+
+def _encode(text):
+    # Texts shorter than one shingle are padded to exactly one
+    return normalize(text).ljust(SHINGLE_SIZE).encode()
+
+
+def shingles(text):
+    """
+    Set of byte 5-grams of a description
+
+    Returns:
+        set: bytes of length SHINGLE_SIZE
+    """
+    data = _encode(text)
+    return {data[i:i + SHINGLE_SIZE] for i in range(len(data) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two shingle sets"""
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def _mix(x):
+    # splitmix64 finaliser (wraps modulo 2**64)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def shingle_codes(texts):
+    """
+    Every shingle of a batch of texts as a 64-bit hash, without Python loops over shingles
+
+    The texts are concatenated into one byte array and each 5-gram is read
+    as a 40-bit integer at every position that does not cross into the
+    next text.
+
+    Returns:
+        tuple: (uint64 hashes, index of the text each belongs to, number of
+            shingles per text); the shingles of a text are contiguous
+    """
+    encoded = [_encode(text) for text in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    counts = lengths - SHINGLE_SIZE + 1
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    text_starts = np.cumsum(lengths) - lengths
+    shingle_starts = np.cumsum(counts) - counts
+    owners = np.repeat(np.arange(len(encoded)), counts)
+    positions = np.arange(counts.sum()) - shingle_starts[owners] + text_starts[owners]
+    codes = np.zeros(len(positions), dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        codes = (codes << np.uint64(8)) | data[positions + offset]
+    return _mix(codes), owners, counts
+
+
+def signatures(texts):
+    """
+    MinHash signatures of a batch of texts
+
+    Each of the NUM_PERM hash functions is a multiply-shift of the shingle
+    hash; a signature value is the minimum over the text's shingles,
+    computed for all texts at once with np.minimum.reduceat. One hash
+    function is applied at a time into a reused buffer that stays in cache;
+    a (shingles x NUM_PERM) matrix is many times slower to fill.
+
+    Returns:
+        np.ndarray: uint32 array of shape (len(texts), NUM_PERM)
+    """
+    texts = list(texts)
+    result = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    for start in range(0, len(texts), SIGNATURE_BATCH_ROWS):
+        codes, _, counts = shingle_codes(texts[start:start + SIGNATURE_BATCH_ROWS])
+        first = np.cumsum(counts) - counts
+        hashed = np.empty_like(codes)
+        part = result[start:start + len(counts)]
+        for i in range(NUM_PERM):
+            np.multiply(codes, _MULTIPLIERS[i], out=hashed)
+            np.add(hashed, _INCREMENTS[i], out=hashed)
+            np.right_shift(hashed, np.uint64(32), out=hashed)
+            part[:, i] = np.minimum.reduceat(hashed, first)
+    return result
+
+
+def band_buckets(signature_matrix):
+    """
+    LSH bucket of every band of every signature
+
+    The band number is hashed in, so the buckets of all bands share one
+    index table without colliding.
+
+    Returns:
+        np.ndarray: int64 array of shape (rows, BANDS)
+    """
+    bands = signature_matrix.reshape(len(signature_matrix), BANDS, BAND_ROWS).astype(np.uint64)
+    bucket = np.broadcast_to(np.arange(BANDS, dtype=np.uint64), bands.shape[:2])
+    for row in range(BAND_ROWS):
+        bucket = _mix(bucket ^ _mix(bands[:, :, row]))
+    return bucket.view(np.int64)
+
+
+def index_pending(conn, table, max_rows=None):
+    """
+    Add the queued rows of a table to its LSH index; the caller commits
+
+    Rows are queued by triggers on insert and on description changes (see
+    tables.create_dedup_tables), so this is a no-op query when nothing
+    was written.
+
+    Args:
+        conn: Database connection object
+        table: One of DEDUP_TABLES
+        max_rows: Index at most this many rows (the oldest queued;
+            None indexes them all)
+
+    Returns:
+        int: Number of rows indexed (always 0 on PostgreSQL, which has no index)
+    """
+    if table not in DEDUP_TABLES:
+        raise ValueError(f"No near-duplicate index for table: {table}")
+    if connection.is_postgres():
+        return 0
+    cursor = conn.cursor()
+    # Plain tuples; sqlite3.Row objects are slow to build in bulk
+    cursor.row_factory = None
+    indexed = 0
+    while max_rows is None or indexed < max_rows:
+        batch_rows = INDEX_BATCH_ROWS if max_rows is None else min(INDEX_BATCH_ROWS, max_rows - indexed)
+        rows = cursor.execute(
+            f"SELECT p.row_id, t.description FROM dedup_pending p"
+            f" JOIN {table} t ON t.{PRIMARY_KEYS[table]} = p.row_id"
+            f" WHERE p.table_name = ? ORDER BY p.row_id LIMIT ?", (table, batch_rows)).fetchall()
+        if not rows:
+            return indexed
+        with trace(f"dedup.index.{table}"):
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            buckets = band_buckets(signatures(row[1] for row in rows))
+            # Sorted by bucket (newest row first within one), the inserts walk the index in order
+            entries = np.column_stack([buckets.ravel(), np.repeat(ids, BANDS)])
+            entries = entries[np.lexsort((-entries[:, 1], entries[:, 0]))]
+            new_bucket = np.r_[True, entries[1:, 0] != entries[:-1, 0]]
+            positions = np.arange(len(entries))
+            rank = positions - np.maximum.accumulate(np.where(new_bucket, positions, 0))
+            cursor.executemany(f"INSERT OR IGNORE INTO {table}_lsh VALUES (?, ?)",
+                               entries[rank < MAX_BUCKET_ROWS].tolist())
+            # Any bucket the batch added to may now be over the limit (a single-row create adds one entry at a time)
+            cursor.executemany(f"DELETE FROM {table}_lsh WHERE bucket = ? AND row_id < ("
+                               f"SELECT row_id FROM {table}_lsh WHERE bucket = ?"
+                               f" ORDER BY row_id DESC LIMIT 1 OFFSET {MAX_BUCKET_ROWS - 1})",
+                               [(bucket, bucket) for bucket in entries[new_bucket, 0].tolist()])
+            # The batch is every queued row up to its last id (queued ids whose row is gone included)
+            cursor.execute("DELETE FROM dedup_pending WHERE table_name = ? AND row_id <= ?", (table, int(ids[-1])))
+        indexed += len(rows)
+    return indexed
+
+
+def remove_from_index(conn, table, rows):
+    """
+    Drop rows from a table's LSH index; the caller commits
+
+    The entries are found again from the descriptions, so this costs about
+    what indexing the rows did and does not scan the index. Entries of a
+    description that has since been replaced stay (as after a delete; a
+    rebuild drops them).
+
+    Args:
+        conn: Database connection object
+        table: One of DEDUP_TABLES
+        rows: Iterable of (row id, description)
+
+    Returns:
+        int: Number of rows removed
+    """
+    if table not in DEDUP_TABLES:
+        raise ValueError(f"No near-duplicate index for table: {table}")
+    rows = list(rows)
+    if not rows or connection.is_postgres():
+        return 0
+    with trace(f"dedup.remove.{table}"):
+        for start in range(0, len(rows), INDEX_BATCH_ROWS):
+            batch = rows[start:start + INDEX_BATCH_ROWS]
+            ids = np.array([row[0] for row in batch], dtype=np.int64)
+            buckets = band_buckets(signatures(row[1] for row in batch))
+            # In bucket order, as index_pending inserts them
+            entries = np.column_stack([buckets.ravel(), np.repeat(ids, BANDS)])
+            entries = entries[np.lexsort((entries[:, 1], entries[:, 0]))]
+            conn.executemany(f"DELETE FROM {table}_lsh WHERE bucket = ? AND row_id = ?", entries.tolist())
+    return len(rows)
+
+
+def index_all_pending(conn):
+    """
+    Index the queued rows of every table and commit
+
+    Args:
+        conn: Database connection object
+
+    Returns:
+        dict: Table name -> number of rows indexed
+    """
+    counts = {table: index_pending(conn, table) for table in DEDUP_TABLES}
+    conn.commit()
+    return counts
+
+
+def rebuild_index(conn, table):
+    """
+    Rebuild a table's LSH index from scratch and commit
+
+    Entries of deleted rows and of replaced descriptions are left in the
+    index (lookups re-check every candidate against the table); a rebuild
+    drops them.
+
+    Args:
+        conn: Database connection object
+        table: One of DEDUP_TABLES
+
+    Returns:
+        int: Number of rows indexed
+    """
+    if table not in DEDUP_TABLES:
+        raise ValueError(f"No near-duplicate index for table: {table}")
+    if connection.is_postgres():
+        return 0
+    conn.execute(f"DELETE FROM {table}_lsh")
+    conn.execute(f"INSERT OR IGNORE INTO dedup_pending SELECT ?, {PRIMARY_KEYS[table]} FROM {table}", (table,))
+    indexed = index_pending(conn, table)
+    conn.commit()
+    return indexed
+
+
+@traced()
+def find_duplicates(table, description, limit=5, threshold=SIMILARITY_THRESHOLD, exclude_id=None):
+    """
+    Rows whose description is a likely duplicate of the given one
+
+    Only rows sharing an LSH bucket with the description are read (at most
+    CANDIDATES_PER_BUCKET per band), and their similarity is then computed
+    exactly, so the cost does not grow with the table.
+
+    Args:
+        table: One of DEDUP_TABLES
+        description: Description to check, e.g. from a create form
+        limit: Maximum number of rows to return
+        threshold: Minimum Jaccard similarity of the descriptions' shingles
+        exclude_id: Row to leave out (the row being checked, if it exists)
+
+    Returns:
+        pd.DataFrame: Matching rows, most similar first, with a
+            'similarity' column; empty if there are none (or on PostgreSQL,
+            where the index is not kept)
+    """
+    if table not in DEDUP_TABLES:
+        raise ValueError(f"No near-duplicate index for table: {table}")
+    if not normalize(description) or connection.is_postgres():
+        return pd.DataFrame()
+    key = PRIMARY_KEYS[table]
+    buckets = band_buckets(signatures([description]))[0].tolist()
+
+    conn = connection.get_read_connection()
+    try:
+        # Rows written without going through data_loader (e.g. seeding) are still queued
+        if conn.execute("SELECT 1 FROM dedup_pending WHERE table_name = ? LIMIT 1", (table,)).fetchone():
+            writer = connection.get_db_connection()
+            try:
+                index_pending(writer, table)
+                writer.commit()
+            finally:
+                writer.close()
+        candidates = set()
+        for bucket in buckets:
+            candidates.update(row[0] for row in conn.execute(
+                f"SELECT row_id FROM {table}_lsh WHERE bucket = ? ORDER BY row_id DESC LIMIT ?",
+                (bucket, CANDIDATES_PER_BUCKET)))
+        candidates.discard(exclude_id)
+        if not candidates:
+            return pd.DataFrame()
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"SELECT * FROM {table} WHERE {key} IN ({', '.join('?' * len(candidates))})",
+                       sorted(candidates))
+        rows = cursor.fetchall()
+        columns = [column[0] for column in cursor.description]
+    finally:
+        conn.close()
+
+    # Plain tuples: a few hundred candidates are ranked faster without pandas
+    query = shingles(description)
+    text_at = columns.index("description")
+    similarity = {text: jaccard(query, shingles(text)) for text in {row[text_at] for row in rows}}
+    key_at = columns.index(key)
+    matches = sorted((row for row in rows if similarity[row[text_at]] >= threshold),
+                     key=lambda row: (similarity[row[text_at]], row[key_at]), reverse=True)[:limit]
+    result = pd.DataFrame(matches, columns=columns)
+    result["similarity"] = [similarity[row[text_at]] for row in matches]
+    return result
+
+
+if __name__ == "__main__":
+    # python -m arg_database.dedup [--rebuild] [--check TABLE TEXT]
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Maintain and query the near-duplicate description index")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index of every table")
+    parser.add_argument("--check", nargs=2, metavar=("TABLE", "TEXT"), help="Show likely duplicates of TEXT")
+    args = parser.parse_args()
+
+    conn = connection.get_db_connection()
+    try:
+        for table in DEDUP_TABLES:
+            start = time.perf_counter()
+            if args.rebuild:
+                indexed = rebuild_index(conn, table)
+            else:
+                indexed = index_pending(conn, table)
+                conn.commit()
+            print(f"{table}: indexed {indexed:,} row(s) in {time.perf_counter() - start:.2f} s")
+    finally:
+        conn.close()
+    if args.check:
+        start = time.perf_counter()
+        matches = find_duplicates(*args.check, limit=10)
+        print(f"{len(matches)} likely duplicate(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+        if len(matches):
+            print(matches[[PRIMARY_KEYS[args.check[0]], "description", "similarity"]].to_string(index=False))
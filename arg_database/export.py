@@ -0,0 +1,292 @@
+import csv
+import io
+import json
+
+from arg_database.connection import get_read_connection, is_postgres
+from arg_database.data_loader import build_match_query, build_tsquery
+from arg_database.tables import SEARCH_VECTOR
+from arg_database.statements import TABLE_COLUMNS, PRIMARY_KEYS, check_columns
+from arg_metrics.tracing import trace
+
+# Rows fetched from SQLite (and written out) per chunk
+EXPORT_CHUNK_ROWS = 50000
+
+# Format -> display label, MIME type and file extension
+EXPORT_FORMATS = {
+    "csv": {"label": "CSV", "mime": "text/csv", "extension": "csv"},
+    "jsonl": {"label": "JSON Lines", "mime": "application/x-ndjson", "extension": "jsonl"},
+    "parquet": {"label": "Parquet", "mime": "application/vnd.apache.parquet", "extension": "parquet"},
+}
+
+# Full-text index of each searchable table
+SEARCH_INDEXES = {
+    "cyber_incidents": "cyber_incidents_fts",
+    "it_tickets": "it_tickets_fts",
+}
+
+
+def build_export_query(table, filters=None, search=None, after=None, limit=None):
+    """
+    Build the SELECT for an export with the page filters applied
+
+    Args:
+        table: Table name
+        filters: Dict of column name -> list of accepted values; empty lists
+            are ignored (no filter on that column)
+        search: Description search text (tables in SEARCH_INDEXES only)
+        after: Only rows whose primary key is greater than this
+        limit: Maximum number of rows
+
+    Returns:
+        tuple: (sql, params)
+
+    Raises:
+        ValueError: If the table or a filter column is not whitelisted, or
+            the table has no search index
+    """
+    filters = {column: list(values) for column, values in (filters or {}).items() if values}
+    filter_columns = check_columns(table, filters)
+
+    where = []
+    params = []
+    for column in filter_columns:
+        where.append(f"{column} IN ({', '.join('?' * len(filters[column]))})")
+        params.extend(filters[column])
+
+    match = build_match_query(search)
+    if match:
+        if table not in SEARCH_INDEXES:
+            raise ValueError(f"{table} has no search index")
+        index = SEARCH_INDEXES[table]
+        if is_postgres():
+            where.append(f"{SEARCH_VECTOR} @@ to_tsquery('simple', ?)")
+            params.append(build_tsquery(search))
+        else:
+            where.append(f"{PRIMARY_KEYS[table]} IN (SELECT rowid FROM {index} WHERE {index} MATCH ?)")
+            params.append(match)
+
+    if after is not None:
+        where.append(f"{PRIMARY_KEYS[table]} > ?")
+        params.append(after)
+
+    sql = f"SELECT {', '.join(TABLE_COLUMNS[table])} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {PRIMARY_KEYS[table]}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+
+def iter_export_rows(table, filters=None, search=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream the rows of an export from SQLite in chunks
+
+    Only one chunk is in memory at a time. Each chunk is its own query,
+    picking up after the last primary key of the previous one, so the read
+    lock is released between chunks and writers are not held up for the
+    length of a large export (rows changed meanwhile are exported as they
+    are when their chunk is read). The connection is closed when the
+    generator finishes or is closed early (e.g. the client disconnects).
+
+    Args:
+        table: Table name
+        filters: See build_export_query
+        search: See build_export_query
+        chunk_rows: Rows per chunk
+
+    Yields:
+        list: Row tuples in TABLE_COLUMNS order
+    """
+    key = TABLE_COLUMNS[table].index(PRIMARY_KEYS[table])
+    after = None
+    conn = get_read_connection()
+    conn.row_factory = None
+    try:
+        while True:
+            sql, params = build_export_query(table, filters, search, after, chunk_rows)
+            rows = conn.execute(sql, params).fetchall()
+            if not rows:
+                break
+            yield rows
+            if len(rows) < chunk_rows:
+                break
+            after = rows[-1][key]
+    finally:
+        conn.close()
+
+
+def stream_csv(table, filters=None, search=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream an export as UTF-8 CSV with a header row
+
+    Yields:
+        bytes: CSV text, one chunk of rows at a time
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TABLE_COLUMNS[table])
+    for rows in iter_export_rows(table, filters, search, chunk_rows):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only - nothing matched
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_jsonl(table, filters=None, search=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream an export as JSON Lines (one object per row)
+
+    Yields:
+        bytes: JSON Lines text, one chunk of rows at a time
+    """
+    columns = TABLE_COLUMNS[table]
+    for rows in iter_export_rows(table, filters, search, chunk_rows):
+        lines = [json.dumps(dict(zip(columns, row)), default=str) for row in rows]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back in pieces"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def parquet_schema(conn, table):
+    """
+    Arrow schema for a table, from the declared column types
+
+    SQLite stores a non-integral number in an INTEGER column as REAL, so such
+    columns (other than the primary key) are exported as float64 if any row
+    holds a REAL value.
+
+    Args:
+        conn: Database connection object
+        table: Whitelisted table name
+
+    Returns:
+        pyarrow.Schema: Schema in TABLE_COLUMNS order
+    """
+    import pyarrow as pa
+
+    if is_postgres():
+        declared = {row[0]: row[1].upper() for row in conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns"
+            " WHERE table_name = ? AND table_schema = current_schema()", (table,))}
+    else:
+        declared = {row[1]: (row[2] or "").upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+    fields = []
+    for column in TABLE_COLUMNS[table]:
+        column_type = declared.get(column, "")
+        if "INT" in column_type:
+            # PostgreSQL integer columns only ever hold integers
+            has_reals = column != PRIMARY_KEYS[table] and not is_postgres() and conn.execute(
+                f"SELECT 1 FROM {table} WHERE typeof({column}) = 'real' LIMIT 1").fetchone()
+            arrow_type = pa.float64() if has_reals else pa.int64()
+        elif any(name in column_type for name in ("REAL", "FLOA", "DOUB")):
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+
+def stream_parquet(table, filters=None, search=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream an export as a Parquet file, one row group per chunk
+
+    Each row group is yielded as soon as it is written; the footer comes with
+    the last piece.
+
+    Yields:
+        bytes: Parquet file bytes
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    conn = get_read_connection()
+    try:
+        schema = parquet_schema(conn, table)
+    finally:
+        conn.close()
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in iter_export_rows(table, filters, search, chunk_rows):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+STREAMERS = {
+    "csv": stream_csv,
+    "jsonl": stream_jsonl,
+    "parquet": stream_parquet,
+}
+
+
+def stream_export(table, fmt, filters=None, search=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream a filtered table export in the given format
+
+    The query is validated before the first chunk is produced, so a bad
+    request fails here rather than halfway through a download.
+
+    Args:
+        table: Table name
+        fmt: One of EXPORT_FORMATS
+        filters: Dict of column name -> list of accepted values
+        search: Description search text
+        chunk_rows: Rows per chunk
+
+    Returns:
+        Iterator[bytes]: File content in pieces
+
+    Raises:
+        ValueError: If the format, table, filters or search are invalid
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    build_export_query(table, filters, search)
+
+    def chunks():
+        with trace(f"export.{table}.{fmt}"):
+            yield from STREAMERS[fmt](table, filters, search, chunk_rows)
+
+    return chunks()
+
+
+def export_filename(table, fmt):
+    """
+    Download file name for an export, e.g. "it_tickets.csv"
+    """
+    return f"{table}.{EXPORT_FORMATS[fmt]['extension']}"
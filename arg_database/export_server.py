@@ -0,0 +1,169 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from arg_database.export import EXPORT_FORMATS, export_filename, stream_export
+
+# How long an export link stays valid (seconds)
+EXPORT_LINK_TTL = 15 * 60
+
+# Signs export links. Set ARG_EXPORT_SECRET when the export server runs in a
+# different process from the app; otherwise a per-process secret is enough.
+_secret = os.environ.get("ARG_EXPORT_SECRET", "").encode() or secrets.token_bytes(32)
+
+# Running server and the base URL links point at, or None
+_server = None
+_base_url = None
+_server_lock = threading.Lock()
+
+
+def _signature(payload):
+    return hmac.new(_secret, payload, hashlib.sha256).hexdigest()
+
+
+def sign_export(table, fmt, filters=None, search=None, username=None, ttl=EXPORT_LINK_TTL):
+    """
+    Create a signed token describing one export
+
+    The export server only serves what a token describes, so the filters and
+    table cannot be changed by editing the link.
+
+    Args:
+        table: Table name
+        fmt: Export format
+        filters: Dict of column name -> list of accepted values
+        search: Description search text
+        username: User the link was issued to (kept for auditing)
+        ttl: Seconds until the link expires
+
+    Returns:
+        str: URL-safe token
+    """
+    payload = json.dumps({
+        "table": table,
+        "format": fmt,
+        "filters": {column: list(values) for column, values in (filters or {}).items() if values},
+        "search": search or "",
+        "user": username,
+        "expires": int(time.time() + ttl),
+    }, default=str).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=") + "." + _signature(payload)
+
+
+def verify_export(token):
+    """
+    Check an export token and return the export it describes
+
+    Args:
+        token: Token from sign_export
+
+    Returns:
+        dict: table, format, filters, search, user, expires
+
+    Raises:
+        ValueError: If the token is malformed, tampered with or expired
+    """
+    encoded, _, signature = (token or "").partition(".")
+    try:
+        payload = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+    except ValueError:
+        raise ValueError("Malformed export token")
+    if not hmac.compare_digest(_signature(payload), signature):
+        raise ValueError("Invalid export token")
+    export = json.loads(payload)
+    if export["expires"] < time.time():
+        raise ValueError("Export link has expired")
+    return export
+
+
+class _ExportHandler(BaseHTTPRequestHandler):
+    """Streams an export on /export?token=... with chunked transfer encoding"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/export":
+            self.send_error(404)
+            return
+        try:
+            export = verify_export(parse_qs(url.query).get("token", [""])[0])
+            chunks = stream_export(export["table"], export["format"], export["filters"], export["search"])
+        except (ValueError, KeyError) as e:
+            self.send_error(403, str(e))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", EXPORT_FORMATS[export["format"]]["mime"])
+        self.send_header("Content-Disposition",
+                         f'attachment; filename="{export_filename(export["table"], export["format"])}"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; closing the generator closes the connection
+            pass
+        finally:
+            chunks.close()
+
+    def log_message(self, format, *args):
+        # Keep downloads out of the Streamlit console
+        pass
+
+
+def start_export_server(port, host="127.0.0.1", base_url=None):
+    """
+    Serve exports on http://host:port/export from a background thread
+
+    Safe to call on every rerun; only the first call starts a server.
+
+    Args:
+        port: Port to listen on
+        host: Interface to bind (local only by default)
+        base_url: URL browsers reach the server on, if not http://host:port
+            (e.g. behind a reverse proxy)
+    """
+    global _server, _base_url
+    with _server_lock:
+        if _server is not None:
+            return
+        _server = ThreadingHTTPServer((host, int(port)), _ExportHandler)
+        _base_url = (base_url or f"http://{host}:{_server.server_port}").rstrip("/")
+    threading.Thread(target=_server.serve_forever, name="arg-export-server", daemon=True).start()
+
+
+def start_export_server_from_env():
+    """
+    Start the export server if ARG_EXPORT_PORT is set
+
+    ARG_EXPORT_HOST sets the interface to bind and ARG_EXPORT_URL the public
+    base URL used in links.
+    """
+    port = os.environ.get("ARG_EXPORT_PORT")
+    if port:
+        start_export_server(port, os.environ.get("ARG_EXPORT_HOST", "127.0.0.1"),
+                            os.environ.get("ARG_EXPORT_URL"))
+
+
+def export_url(table, fmt, filters=None, search=None, username=None):
+    """
+    Signed download link for an export
+
+    Returns:
+        str: URL of the export, or None if the export server is not running
+    """
+    if _base_url is None:
+        return None
+    token = sign_export(table, fmt, filters, search, username)
+    return f"{_base_url}/export?{urlencode({'token': token})}"
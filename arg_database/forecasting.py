@@ -0,0 +1,408 @@
+import math
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+import arg_database.connection as connection
+from arg_database.archive import history_source
+from arg_database.invalidation import table_version
+from arg_database.snapshots import snapshot_dir
+from arg_metrics.tracing import trace, traced
+
+# Name of the model in forecast_state and of its file
+MODEL_NAME = "resolution_time"
+
+# Ridge penalty on every coefficient but the intercept
+RIDGE_ALPHA = 1.0
+
+# Resolved tickets needed before the model makes predictions
+MIN_TRAINING_ROWS = 20
+
+# Width of the expected range, in residual standard deviations (about 95%)
+INTERVAL_Z = 2.0
+
+# |z| of a resolution time against its forecast above which it is flagged
+OUTLIER_Z = 3.0
+
+# Rows fetched per batch when building feature matrices
+FETCH_ROWS = 100_000
+
+# Features present in every model, in this order; one-hot priority=... and
+# assigned_to=... columns follow, added as new values appear
+BASE_FEATURES = ["intercept", "hour_sin", "hour_cos", "weekend"]
+CATEGORICAL_FEATURES = ("priority", "assigned_to")
+
+# Columns in the order feature_matrix takes them; created_at is split into hour and weekday in SQL
+FEATURE_SQL = ("COALESCE(priority, ''), COALESCE(assigned_to, ''),"
+               " CAST(strftime('%H', created_at) AS INTEGER), CAST(strftime('%w', created_at) AS INTEGER),"
+               " resolution_time_hours")
+
+# FEATURE_SQL on PostgreSQL; hour and weekday are NULL for text that is not a timestamp, as with strftime
+POSTGRES_FEATURE_SQL = ("COALESCE(priority, ''), COALESCE(assigned_to, ''),"
+                        " CASE WHEN created_at ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}[ T][0-9]{2}'"
+                        " THEN CAST(substr(created_at, 12, 2) AS INTEGER) END,"
+                        " CASE WHEN created_at ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}'"
+                        " THEN CAST(EXTRACT(DOW FROM CAST(substr(created_at, 1, 10) AS date)) AS INTEGER) END,"
+                        " resolution_time_hours")
+
+# expected_hours and the low/high range are in hours; log_mean and log_sigma
+# are the prediction on the model's log1p scale
+Forecast = namedtuple("Forecast", ["expected_hours", "low_hours", "high_hours", "log_mean", "log_sigma"])
+
+# Model of the current database (see get_model), and the lock serialising refreshes in this process
+_model = None
+_model_lock = threading.Lock()
+
+
+def feature_matrix(priority, assigned_to, hour, weekday, names):
+    """
+    Feature matrix of a batch of tickets
+
+    Hour of day enters as a point on a circle (so 23:00 is next to 00:00),
+    the weekday as a weekend flag, and priority and staff member one-hot.
+    Values not in names get a new column.
+
+    Args:
+        priority, assigned_to: Sequences of strings
+        hour, weekday: Sequences of integers (None where created_at
+            could not be parsed)
+        names: Feature names of the model
+
+    Returns:
+        tuple: (float matrix with one row per ticket, feature names
+            including any new ones)
+    """
+    names = list(names)
+    index = {name: i for i, name in enumerate(names)}
+    rows = len(priority)
+    columns = {}
+    for feature, values in zip(CATEGORICAL_FEATURES, (priority, assigned_to)):
+        levels, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        keys = [f"{feature}={level}" for level in levels]
+        for key in keys:
+            if key not in index:
+                index[key] = len(names)
+                names.append(key)
+        columns[feature] = np.array([index[key] for key in keys], dtype=np.intp)[inverse]
+
+    x = np.zeros((rows, len(names)))
+    x[:, 0] = 1.0
+    hour = np.asarray(hour, dtype=float)
+    known = np.isfinite(hour)
+    angle = 2 * np.pi * np.where(known, hour, 0) / 24
+    x[:, 1] = np.where(known, np.sin(angle), 0.0)
+    x[:, 2] = np.where(known, np.cos(angle), 0.0)
+    x[:, 3] = np.isin(np.asarray(weekday, dtype=float), (0, 6))
+    for feature in CATEGORICAL_FEATURES:
+        x[np.arange(rows), columns[feature]] = 1.0
+    return x, names
+
+
+def target(hours):
+    """Regression target: log1p of the resolution time (resolution times are right-skewed)"""
+    return np.log1p(np.maximum(np.asarray(hours, dtype=float), 0.0))
+
+
+class ResolutionModel:
+    """
+    Ridge regression of log resolution time, kept as sufficient statistics
+
+    Only X'X, X'y, y'y and the row count are stored, so tickets can be added
+    (or removed, with weight -1) in any order and the fit is exactly the
+    one over all of them, without revisiting earlier tickets. Solving is a
+    p x p system with p the number of features (a dozen or so).
+    """
+
+    def __init__(self, names=None, xtx=None, xty=None, yty=0.0, rows=0, watermark=0):
+        self.names = list(names or BASE_FEATURES)
+        size = len(self.names)
+        self.xtx = np.zeros((size, size)) if xtx is None else xtx
+        self.xty = np.zeros(size) if xty is None else xty
+        self.yty = float(yty)
+        self.rows = int(rows)
+        self.watermark = int(watermark)
+        self.index = {}
+        self.coef = None
+        self.sigma = math.nan
+
+    def _grow(self, names):
+        # A new feature was zero for every earlier ticket, so padding with zeros is exact
+        extra = len(names) - len(self.names)
+        if extra > 0:
+            self.xtx = np.pad(self.xtx, (0, extra))
+            self.xty = np.pad(self.xty, (0, extra))
+            self.names = list(names)
+
+    def add(self, priority, assigned_to, hour, weekday, hours, weights=None):
+        """
+        Fold a batch of tickets into the statistics
+
+        Args:
+            priority, assigned_to, hour, weekday: Feature columns (see feature_matrix)
+            hours: Resolution times
+            weights: 1 to add a ticket, -1 to remove one (default: all 1)
+        """
+        if not len(hours):
+            return
+        x, names = feature_matrix(priority, assigned_to, hour, weekday, self.names)
+        self._grow(names)
+        y = target(hours)
+        w = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=float)
+        weighted = x * w[:, None]
+        self.xtx += weighted.T @ x
+        self.xty += weighted.T @ y
+        self.yty += float(w @ (y * y))
+        self.rows += int(w.sum())
+
+    def solve(self):
+        """Refit the coefficients and residual spread from the statistics"""
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if self.rows < MIN_TRAINING_ROWS:
+            self.coef, self.sigma = None, math.nan
+            return
+        penalty = np.full(len(self.names), RIDGE_ALPHA)
+        penalty[0] = 0.0
+        self.coef = np.linalg.solve(self.xtx + np.diag(penalty), self.xty)
+        sse = self.yty - 2 * self.coef @ self.xty + self.coef @ self.xtx @ self.coef
+        self.sigma = math.sqrt(max(sse, 0.0) / max(self.rows - len(self.names), 1))
+
+    def predict(self, priority, assigned_to, created_at):
+        """
+        Forecast the resolution time of one ticket
+
+        Args:
+            priority: Priority level
+            assigned_to: Staff member
+            created_at: Creation time (datetime or "YYYY-MM-DD HH:MM:SS")
+
+        Returns:
+            Forecast: Or None while there are too few resolved tickets
+        """
+        if self.coef is None:
+            return None
+        x = np.zeros(len(self.names))
+        x[0] = 1.0
+        if not isinstance(created_at, datetime):
+            try:
+                created_at = datetime.fromisoformat(str(created_at))
+            except ValueError:
+                created_at = None
+        if created_at is not None:
+            angle = 2 * math.pi * created_at.hour / 24
+            x[1], x[2] = math.sin(angle), math.cos(angle)
+            x[3] = created_at.weekday() >= 5
+        for feature, value in zip(CATEGORICAL_FEATURES, (priority, assigned_to)):
+            # A value the model has not seen contributes nothing (the intercept covers it)
+            position = self.index.get(f"{feature}={value}")
+            if position is not None:
+                x[position] = 1.0
+        log_mean = float(x @ self.coef)
+        return Forecast(float(np.expm1(log_mean)),
+                        float(max(np.expm1(log_mean - INTERVAL_Z * self.sigma), 0.0)),
+                        float(np.expm1(log_mean + INTERVAL_Z * self.sigma)),
+                        log_mean, self.sigma)
+
+    def save(self, path):
+        """Write the statistics to an .npz file (atomically)"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+        np.savez(temp_path, names=np.array(self.names), xtx=self.xtx, xty=self.xty,
+                 yty=self.yty, rows=self.rows, watermark=self.watermark)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read statistics written by save; None if the file is missing or unreadable"""
+        try:
+            with np.load(path) as data:
+                return cls([str(name) for name in data["names"]], data["xtx"], data["xty"],
+                           data["yty"], data["rows"], data["watermark"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def outlier_z(forecast, hours):
+    """
+    How far a resolution time is from its forecast, in residual standard deviations
+
+    Args:
+        forecast: Result of predict_resolution
+        hours: Actual (or entered) resolution time
+
+    Returns:
+        float: z-score on the log scale; NaN if the spread is unknown
+    """
+    if not forecast.log_sigma > 0:
+        return math.nan
+    return (float(target(hours)) - forecast.log_mean) / forecast.log_sigma
+
+
+def model_path():
+    """File holding the model's statistics, next to the table snapshots"""
+    return snapshot_dir() / f"{MODEL_NAME}.npz"
+
+
+def feature_sql():
+    """FEATURE_SQL for this process's database"""
+    return POSTGRES_FEATURE_SQL if connection.is_postgres() else FEATURE_SQL
+
+
+def _fold_rows(model, cursor, weighted=False):
+    """Fold the rows of a feature query into the model a batch at a time"""
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        model.add(*columns[:5], weights=columns[5] if weighted else None)
+
+
+def _fit_all(conn):
+    """Model over every resolved ticket, archived ones included; the caller holds the write lock"""
+    watermark = conn.execute("SELECT COALESCE(MAX(change_id), 0) FROM forecast_changes").fetchone()[0]
+    model = ResolutionModel(watermark=watermark)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {feature_sql()} FROM {history_source(conn, 'it_tickets')}"
+                   " WHERE status = 'Resolved' AND resolution_time_hours IS NOT NULL")
+    _fold_rows(model, cursor)
+    return model
+
+
+@traced()
+def refresh_model(conn, rebuild=False):
+    """
+    Bring the model up to date with forecast_changes and save it
+
+    Starts from the model file when it matches forecast_state (otherwise, or
+    with rebuild, refits from every resolved ticket), folds in the logged
+    changes past its watermark, writes the file, and drops the folded
+    changes. Runs under the database write lock, so processes sharing the
+    database take turns.
+
+    Args:
+        conn: Database connection object
+        rebuild: Refit from scratch
+
+    Returns:
+        ResolutionModel: The solved model
+    """
+    # Rows come back as plain tuples; building sqlite3.Row objects dominates on large tables
+    conn.row_factory = None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        state = conn.execute("SELECT watermark FROM forecast_state WHERE model = ?", (MODEL_NAME,)).fetchone()
+        model = None if rebuild or state is None else ResolutionModel.load(model_path())
+        if model is None or model.watermark != state[0]:
+            with trace("forecasting.fit_all"):
+                model = _fit_all(conn)
+
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {feature_sql()}, sign, change_id FROM forecast_changes WHERE change_id > ?"
+                       " ORDER BY change_id", (model.watermark,))
+        latest = conn.execute("SELECT COALESCE(MAX(change_id), 0) FROM forecast_changes").fetchone()[0]
+        with trace("forecasting.fold_changes"):
+            _fold_rows(model, cursor, weighted=True)
+        model.watermark = max(model.watermark, latest)
+
+        model.save(model_path())
+        conn.execute("INSERT INTO forecast_state VALUES (?, ?, ?) ON CONFLICT (model)"
+                     " DO UPDATE SET watermark = excluded.watermark, trained_rows = excluded.trained_rows",
+                     (MODEL_NAME, model.watermark, model.rows))
+        conn.execute("DELETE FROM forecast_changes WHERE change_id <= ?", (model.watermark,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    model.solve()
+    return model
+
+
+def get_model():
+    """
+    Current model of this process's database
+
+    Kept in memory until it_tickets changes. After a change the model is
+    only refreshed if resolved tickets were logged since its watermark (an
+    open ticket does not touch it), and only loaded from disk if another
+    process has already refreshed it.
+
+    Returns:
+        ResolutionModel: Solved model
+    """
+    global _model
+
+    version = table_version("it_tickets")
+    current = _model
+    if current and current[0] == connection.DB_PATH and version is not None and current[1] == version:
+        return current[2]
+
+    with _model_lock:
+        conn = connection.get_read_connection()
+        try:
+            conn.row_factory = None
+            state = conn.execute("SELECT watermark FROM forecast_state WHERE model = ?", (MODEL_NAME,)).fetchone()
+            latest = conn.execute("SELECT COALESCE(MAX(change_id), 0) FROM forecast_changes").fetchone()[0]
+        finally:
+            conn.close()
+        model = current[2] if current and current[0] == connection.DB_PATH else None
+        if state is not None and latest <= state[0]:
+            # Nothing new to fold; reuse this process's model or the saved one
+            if model is None or model.watermark != state[0]:
+                model = ResolutionModel.load(model_path())
+                if model is not None and model.watermark == state[0]:
+                    model.solve()
+                else:
+                    model = None
+        else:
+            model = None
+        if model is None:
+            # Only a refresh needs the write connection
+            conn = connection.get_db_connection()
+            try:
+                model = refresh_model(conn)
+            finally:
+                conn.close()
+        _model = (connection.DB_PATH, version, model)
+    return model
+
+
+@traced()
+def predict_resolution(priority, assigned_to, created_at):
+    """
+    Expected resolution time of a ticket
+
+    Args:
+        priority: Priority level
+        assigned_to: Staff member
+        created_at: Creation time (datetime or "YYYY-MM-DD HH:MM:SS")
+
+    Returns:
+        Forecast: expected_hours with a low_hours-high_hours range, or None
+            while there are fewer than MIN_TRAINING_ROWS resolved tickets
+    """
+    return get_model().predict(priority, assigned_to, created_at)
+
+
+if __name__ == "__main__":
+    # python -m arg_database.forecasting [--rebuild]
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Refresh the ticket resolution-time model")
+    parser.add_argument("--rebuild", action="store_true", help="Refit from every resolved ticket")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = connection.get_db_connection()
+    try:
+        result = refresh_model(conn, rebuild=args.rebuild)
+    finally:
+        conn.close()
+    print(f"Model over {result.rows:,} resolved tickets, {len(result.names)} features,"
+          f" residual sigma {result.sigma:.3f} (log hours), in {time.perf_counter() - start:.2f} s")
+    if result.coef is not None:
+        for name, coef in zip(result.names, result.coef):
+            print(f"  {name:<30}{coef:>+8.3f}")
@@ -0,0 +1,358 @@
+import hmac
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from arg_database.data_loader import queue_incident, queue_ticket
+from arg_database.statements import COLUMN_TYPES, PRIMARY_KEYS, TABLE_COLUMNS
+from arg_database.write_queue import get_write_queue
+from arg_metrics.tracing import traced
+
+# What can be pushed: kind (the URL path / CLI argument) -> table and the data_loader function that queues a row
+INGEST_KINDS = {
+    "incidents": ("cyber_incidents", queue_incident),
+    "tickets": ("it_tickets", queue_ticket),
+}
+
+# Largest request body the server reads (bytes); bigger batches get 413
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+# Rejected records listed in a response (the count covers all of them)
+MAX_REPORTED_ERRORS = 100
+
+# Seconds a batch waits for its commits; records not committed by then are reported as errors
+COMMIT_TIMEOUT = 60
+
+# Records the CLI submits before waiting for their commits
+CLI_CHUNK_RECORDS = 20_000
+
+# Shared secret clients send as "Authorization: Bearer ..."; without it the
+# server accepts anything that can reach it (it binds to localhost by default)
+_token = os.environ.get("ARG_INGEST_TOKEN")
+
+# Running server, or None
+_server = None
+_server_lock = threading.Lock()
+
+
+def parse_records(data):
+    """
+    Decode a JSON or NDJSON payload into records
+
+    Accepts a JSON array of objects, a single JSON object, or newline-
+    delimited JSON (one object per line; blank lines are skipped).
+
+    Args:
+        data: Payload bytes (UTF-8)
+
+    Returns:
+        list: The decoded records
+
+    Raises:
+        ValueError: If the payload is not valid JSON or NDJSON
+    """
+    text = data.decode("utf-8")
+    if not text.strip():
+        return []
+    if text.lstrip().startswith("["):
+        records = json.loads(text)
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array")
+        return records
+    try:
+        return [json.loads(text)]
+    except json.JSONDecodeError:
+        pass
+    records = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if line.strip():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number}: {e}")
+    return records
+
+
+def _value(column, value):
+    """
+    A JSON value converted to its column's type (COLUMN_TYPES; text otherwise)
+
+    Numbers and numeric strings are accepted for numeric columns, and
+    numbers for text columns; whole numbers only for integer columns.
+
+    Raises:
+        ValueError: If the value does not fit the column
+    """
+    if value is None:
+        return None
+    kind = COLUMN_TYPES.get(column, str)
+    # bool is an int in Python but not a number in a record; lists and objects fit no column
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        if kind is str:
+            return str(value)
+        # int(4.5) would silently drop the fraction
+        if not (kind is int and isinstance(value, float) and not value.is_integer()):
+            try:
+                converted = kind(value)
+            except ValueError:
+                pass
+            else:
+                # Integers the database can store (64-bit) and finite floats only
+                if -2 ** 63 <= converted < 2 ** 63 if kind is int else math.isfinite(converted):
+                    return converted
+    raise ValueError(f"Bad {column} value {json.dumps(value)[:40]} (expected {kind.__name__})")
+
+
+def _row(table, record):
+    """A record's values in table column order and type (missing columns are NULL)"""
+    if not isinstance(record, dict):
+        raise ValueError("Record is not a JSON object")
+    columns = TABLE_COLUMNS[table]
+    unknown = set(record) - set(columns)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    if record.get(PRIMARY_KEYS[table]) is None:
+        raise ValueError(f"Missing {PRIMARY_KEYS[table]}")
+    return tuple(_value(column, record.get(column)) for column in columns)
+
+
+@traced()
+def ingest(kind, records, timeout=COMMIT_TIMEOUT):
+    """
+    Create a batch of incidents or tickets and wait until they are committed
+
+    Each record goes through data_loader.queue_incident / queue_ticket, so
+    the batch, together with whatever other batches arrive at the same
+    time, is written in group commits by the write queue rather than a
+    transaction per record. A bad record (unknown field, a value of the
+    wrong type, duplicate id, ...) is rejected on its own; the rest of the
+    batch is still committed. Records still waiting for their commit after
+    timeout seconds are reported as errors too (withdrawn from the queue
+    when they have not been picked up yet).
+
+    Args:
+        kind: "incidents" or "tickets"
+        records: Iterable of dicts keyed by column name
+        timeout: Seconds to wait for the commits
+
+    Returns:
+        dict: received, accepted and rejected counts, and errors (up to
+            MAX_REPORTED_ERRORS of {"index": position in the batch, "error": message})
+
+    Raises:
+        ValueError: If kind is unknown
+    """
+    if kind not in INGEST_KINDS:
+        raise ValueError(f"Unknown kind: {kind} (expected one of {', '.join(INGEST_KINDS)})")
+    table, create = INGEST_KINDS[kind]
+    queued = []
+    errors = []
+    received = 0
+    for index, record in enumerate(records):
+        received += 1
+        try:
+            queued.append((index, create(*_row(table, record))))
+        except ValueError as e:
+            errors.append((index, str(e)))
+    # The commits are the acknowledgement: nothing is reported accepted before it is durable
+    deadline = time.monotonic() + timeout
+    for index, future in queued:
+        try:
+            future.result(max(deadline - time.monotonic(), 0))
+        except TimeoutError:
+            if future.cancel():
+                errors.append((index, f"Not committed within {timeout} s; withdrawn"))
+            else:
+                errors.append((index, f"Not committed within {timeout} s; it may still be"))
+        except Exception as e:
+            errors.append((index, str(e)))
+    errors.sort()
+    return {
+        "received": received,
+        "accepted": received - len(errors),
+        "rejected": len(errors),
+        "errors": [{"index": index, "error": message} for index, message in errors[:MAX_REPORTED_ERRORS]],
+    }
+
+
+class _IngestHandler(BaseHTTPRequestHandler):
+    """POST /ingest/incidents and /ingest/tickets take JSON or NDJSON batches; GET /ingest/stats"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this a small response waits ~40 ms for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _refuse(self, status, message=None):
+        # The body (if any) is left unread, so the connection cannot be reused
+        self.close_connection = True
+        self.send_error(status, message)
+
+    def _authorized(self):
+        if not _token:
+            return True
+        return hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {_token}")
+
+    def _kind(self):
+        path = urlparse(self.path).path.rstrip("/")
+        prefix, _, kind = path.rpartition("/")
+        return kind if prefix == "/ingest" else None
+
+    def do_GET(self):
+        if self._kind() != "stats":
+            self._refuse(404)
+        elif not self._authorized():
+            self._refuse(401)
+        else:
+            self._send_json(200, get_write_queue().stats())
+
+    def do_POST(self):
+        kind = self._kind()
+        if kind not in INGEST_KINDS:
+            self._refuse(404)
+            return
+        if not self._authorized():
+            self._refuse(401)
+            return
+        length = self.headers.get("Content-Length", "")
+        if not length.isdigit():
+            self._refuse(411)
+            return
+        if int(length) > MAX_BODY_BYTES:
+            self._refuse(413, f"Batches are limited to {MAX_BODY_BYTES:,} bytes")
+            return
+        try:
+            records = parse_records(self.rfile.read(int(length)))
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        self._send_json(200, ingest(kind, records))
+
+    def log_message(self, format, *args):
+        # One line per batch would flood the console at feed rates
+        pass
+
+
+def start_ingest_server(port, host="127.0.0.1"):
+    """
+    Accept pushed incidents and tickets on http://host:port/ingest/... from a background thread
+
+    Safe to call on every rerun; only the first call starts a server.
+
+    Args:
+        port: Port to listen on
+        host: Interface to bind (local only by default)
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return
+        _server = ThreadingHTTPServer((host, int(port)), _IngestHandler)
+    threading.Thread(target=_server.serve_forever, name="arg-ingest-server", daemon=True).start()
+
+
+def start_ingest_server_from_env():
+    """
+    Start the ingest server if ARG_INGEST_PORT is set
+
+    ARG_INGEST_HOST sets the interface to bind and ARG_INGEST_TOKEN the
+    bearer token clients must send.
+    """
+    port = os.environ.get("ARG_INGEST_PORT")
+    if port:
+        start_ingest_server(port, os.environ.get("ARG_INGEST_HOST", "127.0.0.1"))
+
+
+def read_record_chunks(stream, chunk_records=CLI_CHUNK_RECORDS):
+    """
+    Read records from a JSON or NDJSON file a chunk at a time
+
+    NDJSON is streamed line by line; a JSON array is read whole.
+
+    Args:
+        stream: Binary file object
+        chunk_records: Records per chunk
+
+    Yields:
+        list: Up to chunk_records records
+
+    Raises:
+        ValueError: If the file is not valid JSON or NDJSON
+    """
+    first = stream.readline()
+    if first.lstrip().startswith(b"["):
+        records = parse_records(first + stream.read())
+        for start in range(0, len(records), chunk_records):
+            yield records[start:start + chunk_records]
+        return
+    chunk = []
+    for number, line in enumerate(itertools.chain([first], stream), 1):
+        if not line.strip():
+            continue
+        try:
+            chunk.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number}: {e}")
+        if len(chunk) >= chunk_records:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+if __name__ == "__main__":
+    # python -m arg_database.ingest --serve [--port 8503]  |  python -m arg_database.ingest KIND FILE|-
+    import argparse
+    from arg_database.connection import setup_database
+
+    parser = argparse.ArgumentParser(description="Push incidents and tickets into the database without the UI")
+    parser.add_argument("kind", nargs="?", choices=sorted(INGEST_KINDS), help="What the file holds")
+    parser.add_argument("file", nargs="?", default="-", help="JSON or NDJSON file, or - for stdin")
+    parser.add_argument("--serve", action="store_true", help="Run the HTTP ingest server until interrupted")
+    parser.add_argument("--host", default=os.environ.get("ARG_INGEST_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("ARG_INGEST_PORT", 8503)))
+    args = parser.parse_args()
+    if not args.serve and not args.kind:
+        parser.error("give a KIND and FILE to load, or --serve")
+
+    setup_database()
+    if args.serve:
+        server = ThreadingHTTPServer((args.host, args.port), _IngestHandler)
+        print(f"Accepting batches on http://{args.host}:{server.server_port}/ingest/{{{','.join(INGEST_KINDS)}}}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    totals = {"received": 0, "accepted": 0, "rejected": 0}
+    start = time.perf_counter()
+    stream = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    try:
+        offset = 0
+        for chunk in read_record_chunks(stream):
+            result = ingest(args.kind, chunk)
+            for error in result["errors"]:
+                print(f"Record {offset + error['index']}: {error['error']}", file=sys.stderr)
+            for name in totals:
+                totals[name] += result[name]
+            offset += len(chunk)
+    finally:
+        stream.close()
+    elapsed = time.perf_counter() - start
+    print(f"{totals['accepted']:,} of {totals['received']:,} {args.kind} committed in {elapsed:.2f}s "
+          f"({totals['received'] / max(elapsed, 1e-9):,.0f} records/s), {totals['rejected']:,} rejected")
+    sys.exit(1 if totals["rejected"] else 0)
@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+
+import arg_database.connection as connection
+from arg_metrics.tracing import trace
+
+
+class VersionWatcher:
+    """
+    This process's view of table_versions, for keying caches on table versions
+
+    Several server processes can write to the same database, so a cache that
+    is only cleared by local writes goes stale in the other processes. Every
+    write bumps the table's row in table_versions (see
+    tables.create_table_versions_table); a cache keyed on that version is
+    therefore invalidated by a write from any process.
+
+    Reading table_versions on every cache lookup would cost a query each
+    time. Instead the watcher keeps one read-only connection and asks it for
+    PRAGMA data_version, which changes whenever another connection commits
+    and costs tens of microseconds; table_versions is only re-read then.
+    PostgreSQL has no data_version, and a query there costs the same round
+    trip, so on PostgreSQL table_versions is read on every lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = None
+        self._db_path = None
+        self._data_version = None
+        self._versions = {}
+
+    def _connection(self):
+        # Reconnect if the database path changed (benchmarks point DB_PATH elsewhere)
+        database = connection.DATABASE_URL or connection.DB_PATH
+        if self._conn is None or self._db_path != database:
+            if self._conn is not None:
+                self._conn.close()
+            self._db_path = database
+            self._data_version = None
+            if connection.is_postgres():
+                import psycopg
+                # Held for the life of the process, so not taken from the pool
+                self._conn = psycopg.connect(database, autocommit=True)
+            else:
+                self._conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True, check_same_thread=False)
+        return self._conn
+
+    def versions(self):
+        """
+        Current version of every versioned table
+
+        Returns:
+            dict: Table name -> (generation, version); empty if the database
+                has no table_versions table
+        """
+        with self._lock:
+            try:
+                conn = self._connection()
+            except sqlite3.OperationalError:
+                # No database file yet (setup_database has not run)
+                self._conn = None
+                return {}
+            data_version = None if connection.is_postgres() else conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version is None or data_version != self._data_version:
+                with trace("invalidation.refresh_versions"):
+                    try:
+                        rows = conn.execute("SELECT table_name, generation, version FROM table_versions").fetchall()
+                    except sqlite3.OperationalError:
+                        # Database created before table_versions existed
+                        rows = []
+                self._versions = {table: (generation, version) for table, generation, version in rows}
+                self._data_version = data_version
+            return self._versions
+
+    def version(self, table):
+        """
+        Current version of one table
+
+        Args:
+            table: Table name
+
+        Returns:
+            tuple: (generation, version), or None if the table is not versioned
+        """
+        return self.versions().get(table)
+
+
+# Shared by everything in this process
+watcher = VersionWatcher()
+
+
+def table_version(table):
+    """
+    Current version of a table as seen by this process
+
+    Use it as part of a cache key: the key changes as soon as any process
+    commits a write to the table.
+
+    Args:
+        table: Table name
+
+    Returns:
+        tuple: (generation, version), or None if the table is not versioned
+    """
+    return watcher.version(table)
@@ -0,0 +1,719 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import arg_database.connection as connection
+from arg_metrics.tracing import trace, traced
+
+# Job states; a job moves queued -> running -> one of FINISHED_STATES (or back to queued for a retry)
+ACTIVE_STATES = ("queued", "running")
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+# Runs of a failing job before it is marked failed
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Seconds before the first retry of a failed run; doubles with every further attempt
+RETRY_DELAY = 5.0
+
+# Seconds an idle worker waits between looks at the queue
+POLL_INTERVAL = 1.0
+
+# Workers touch their heartbeat file this often (seconds); a running job whose
+# worker has not done so for LOST_AFTER seconds is put back in the queue
+HEARTBEAT_INTERVAL = 5.0
+LOST_AFTER = 60.0
+
+# Progress files are rewritten at most this often (seconds)
+PROGRESS_INTERVAL = 0.5
+
+# Worker processes started with the app unless ARG_JOB_WORKERS says otherwise
+DEFAULT_WORKERS = 2
+
+# Finished jobs, and the files they own, are deleted after this many days
+KEEP_FINISHED_DAYS = 7
+
+# How long a worker waits for the write lock before giving up (milliseconds)
+WORKER_BUSY_TIMEOUT_MS = 60000
+
+# A registered job kind: function(ctx, **params) -> JSON-serialisable result
+JobKind = namedtuple("JobKind", ["function", "label", "max_attempts"])
+
+# Kind name -> JobKind (see job_kind)
+JOB_KINDS = {}
+
+# Worker processes started by this process
+_workers = []
+_workers_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when cancel_job was called for it"""
+
+
+def job_kind(kind, label, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Register a function as a job kind
+
+    The function is called as function(ctx, **params) in a worker process,
+    with ctx a JobContext; its return value is stored as the job's result.
+
+    Args:
+        kind: Name used by submit_job
+        label: Shown on the pages
+        max_attempts: Runs before a failing job is marked failed
+    """
+    def register(function):
+        JOB_KINDS[kind] = JobKind(function, label, max_attempts)
+        return function
+    return register
+
+
+def jobs_dir():
+    """
+    Directory for the files of the job runner: uploads waiting to be
+    ingested, finished exports, progress and worker heartbeat files
+
+    ARG_JOBS_DIR overrides it; by default it sits next to the database file.
+
+    Returns:
+        Path: Jobs directory
+    """
+    configured = os.environ.get("ARG_JOBS_DIR")
+    if configured:
+        return Path(configured)
+    return connection.DB_PATH.parent / f"{connection.storage_name()}_jobs"
+
+
+def _progress_path(job_id):
+    return jobs_dir() / "progress" / f"{job_id}.json"
+
+
+def _heartbeat_path(worker):
+    return jobs_dir() / "workers" / f"{worker}.alive"
+
+
+class JobContext:
+    """
+    Handed to a running job for progress reports and cancellation checks
+
+    Progress goes to a small file rather than the jobs table, so reporting
+    never waits for (or holds) the database write lock - a job may report
+    from inside its own long read or write.
+
+    Attributes:
+        job_id: Id of the running job
+        attempt: 1 for the first run, 2 for the first retry, ...
+        last_attempt: True if a failure now marks the job failed
+        message: Shown with the job; what it is doing, or the outcome once
+            it has finished
+    """
+
+    def __init__(self, job):
+        self.job_id = job["job_id"]
+        self.attempt = job["attempts"]
+        self.last_attempt = job["attempts"] >= job["max_attempts"]
+        self.message = None
+        self._reported = 0.0
+
+    def progress(self, fraction, message=None):
+        """
+        Report progress and check for cancellation
+
+        Calls closer together than PROGRESS_INTERVAL are skipped.
+
+        Args:
+            fraction: Fraction done, 0 to 1
+            message: What the job is doing
+
+        Raises:
+            JobCancelled: If cancel_job was called for this job
+        """
+        if message is not None:
+            self.message = message
+        now = time.time()
+        if now - self._reported < PROGRESS_INTERVAL:
+            return
+        self._reported = now
+
+        path = _progress_path(self.job_id)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            part = path.with_suffix(".part")
+            part.write_text(json.dumps({"progress": max(0.0, min(1.0, float(fraction))),
+                                        "message": self.message, "updated_at": now}))
+            os.replace(part, path)
+        except OSError:
+            # Progress is advisory; a reader holding the file open (Windows) just sees the previous report
+            pass
+
+        # A reader, so the check never waits behind the job's own writes
+        conn = connection.get_read_connection()
+        try:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (self.job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or row[0]:
+            raise JobCancelled()
+
+
+def _read_progress(job_id):
+    """Latest progress report of a running job, or None"""
+    try:
+        return json.loads(_progress_path(job_id).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _job(row):
+    """Job dict from a jobs row, with params and result decoded"""
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["label"] = JOB_KINDS[job["kind"]].label if job["kind"] in JOB_KINDS else job["kind"]
+    if job["status"] == "running":
+        report = _read_progress(job["job_id"])
+        if report:
+            job.update(report)
+    return job
+
+
+@traced()
+def submit_job(kind, params=None, submitted_by=None, max_attempts=None):
+    """
+    Queue a job for the workers
+
+    Args:
+        kind: One of JOB_KINDS
+        params: Keyword arguments for the job function (JSON-serialisable)
+        submitted_by: Username shown with the job
+        max_attempts: Runs before a failing job is marked failed (default:
+            the kind's)
+
+    Returns:
+        int: Job id
+
+    Raises:
+        ValueError: If the kind is unknown
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    now = time.time()
+    conn = connection.get_db_connection()
+    try:
+        job_id = conn.execute(
+            "INSERT INTO jobs (kind, params, max_attempts, submitted_by, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?) RETURNING job_id",
+            (kind, json.dumps(params or {}), max_attempts or JOB_KINDS[kind].max_attempts, submitted_by, now,
+             now)).fetchone()[0]
+        conn.commit()
+        return job_id
+    finally:
+        conn.close()
+
+
+def get_job(job_id):
+    """
+    Get one job
+
+    Returns:
+        dict: The job's columns (params and result decoded, progress and
+            message current for a running job), or None if there is no such job
+    """
+    conn = connection.get_read_connection()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _job(row) if row else None
+
+
+def list_jobs(kinds=None, submitted_by=None, params=None, limit=20):
+    """
+    Most recent jobs first
+
+    Args:
+        kinds: Only jobs of these kinds
+        submitted_by: Only jobs of this user
+        params: Dict of param name -> value the job's params must have
+        limit: Maximum number of jobs
+
+    Returns:
+        list: Job dicts (see get_job)
+    """
+    where = []
+    args = []
+    if kinds:
+        where.append(f"kind IN ({', '.join('?' * len(kinds))})")
+        args.extend(kinds)
+    if submitted_by is not None:
+        where.append("submitted_by = ?")
+        args.append(submitted_by)
+    for name, value in (params or {}).items():
+        if not name.isidentifier():
+            raise ValueError(f"Bad job parameter name: {name}")
+        if connection.is_postgres():
+            where.append(f"CAST(params AS jsonb) -> '{name}' = CAST(? AS jsonb)")
+            args.append(json.dumps(value))
+        else:
+            where.append(f"json_extract(params, '$.{name}') = ?")
+            args.append(value)
+    sql = "SELECT * FROM jobs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY job_id DESC LIMIT ?"
+
+    conn = connection.get_read_connection()
+    try:
+        rows = conn.execute(sql, args + [limit]).fetchall()
+    finally:
+        conn.close()
+    return [_job(row) for row in rows]
+
+
+@traced()
+def cancel_job(job_id):
+    """
+    Cancel a job
+
+    A queued job is cancelled at once. A running job is asked to stop and
+    does so at its next progress report; one that finishes first keeps its
+    result.
+
+    Returns:
+        bool: False if the job had already finished
+    """
+    now = time.time()
+    conn = connection.get_db_connection()
+    try:
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'cancelled', message = 'Cancelled before it started',"
+            " finished_at = ?, updated_at = ? WHERE job_id = ? AND status = 'queued'", (now, now, job_id))
+        if not cursor.rowcount:
+            cursor = conn.execute("UPDATE jobs SET cancel_requested = 1, updated_at = ?"
+                                  " WHERE job_id = ? AND status = 'running'", (now, job_id))
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+
+@traced()
+def retry_job(job_id):
+    """
+    Queue a failed or cancelled job again, with a fresh set of attempts
+
+    Returns:
+        bool: False if the job is not failed or cancelled
+    """
+    now = time.time()
+    conn = connection.get_db_connection()
+    try:
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, run_after = 0, cancel_requested = 0, progress = 0,"
+            " message = NULL, error = NULL, result = NULL, worker = NULL, started_at = NULL, finished_at = NULL,"
+            " updated_at = ? WHERE job_id = ? AND status IN ('failed', 'cancelled')", (now, job_id))
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+
+def _worker_alive(worker):
+    """True if the worker's heartbeat file was touched within LOST_AFTER seconds"""
+    try:
+        return time.time() - _heartbeat_path(worker).stat().st_mtime < LOST_AFTER
+    except OSError:
+        return False
+
+
+def claim_job(conn, worker):
+    """
+    Take the oldest queued job that is due, for one worker
+
+    Running jobs whose worker has stopped heartbeating are first put back
+    in the queue (or failed, when that was their last attempt). The queue
+    is checked with plain reads, so an idle worker only takes the write
+    lock when there is something to do.
+
+    Args:
+        conn: The worker's database connection
+        worker: The worker's id (its process id)
+
+    Returns:
+        dict: The claimed job (see get_job), or None if nothing is due
+    """
+    now = time.time()
+    lost = [(job_id, owner) for job_id, owner in
+            conn.execute("SELECT job_id, worker FROM jobs WHERE status = 'running'").fetchall()
+            if not _worker_alive(owner)]
+    due = conn.execute("SELECT 1 FROM jobs WHERE status = 'queued' AND run_after <= ? LIMIT 1", (now,)).fetchone()
+    if not lost and not due:
+        return None
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for job_id, owner in lost:
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,"
+                " error = 'Worker exited while running the job', worker = NULL, updated_at = ?,"
+                " finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END"
+                " WHERE job_id = ? AND status = 'running' AND worker = ?", (now, now, job_id, owner))
+        row = conn.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, progress = 0, message = NULL,"
+            " worker = ?, started_at = ?, updated_at = ?"
+            " WHERE job_id = (SELECT job_id FROM jobs WHERE status = 'queued' AND run_after <= ?"
+            " ORDER BY job_id LIMIT 1) RETURNING *", (worker, now, now, now)).fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if row is None:
+        return None
+    # A report left by a worker that died running this job
+    _progress_path(row["job_id"]).unlink(missing_ok=True)
+    return _job(row)
+
+
+def run_job(job):
+    """
+    Run a claimed job and record how it ended
+
+    A failure is retried after RETRY_DELAY * 2^(attempt - 1) seconds until
+    the job runs out of attempts. The job's error keeps the last failure.
+
+    Args:
+        job: Job dict from claim_job
+    """
+    job_id = job["job_id"]
+    ctx = JobContext(job)
+    try:
+        if job["kind"] not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+        with trace(f"jobs.{job['kind']}"):
+            result = JOB_KINDS[job["kind"]].function(ctx, **job["params"])
+    except JobCancelled:
+        sql = ("UPDATE jobs SET status = 'cancelled', message = 'Cancelled', finished_at = ?, updated_at = ?"
+               " WHERE job_id = ?")
+        params = (time.time(), time.time(), job_id)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        now = time.time()
+        if ctx.last_attempt:
+            sql = ("UPDATE jobs SET status = 'failed', error = ?, message = 'Failed', finished_at = ?, updated_at = ?"
+                   " WHERE job_id = ?")
+            params = (error, now, now, job_id)
+        else:
+            delay = RETRY_DELAY * 2 ** (job["attempts"] - 1)
+            sql = ("UPDATE jobs SET status = 'queued', error = ?, message = ?, run_after = ?, worker = NULL,"
+                   " updated_at = ? WHERE job_id = ?")
+            params = (error, f"Attempt {job['attempts']} of {job['max_attempts']} failed; retrying in {delay:.0f} s",
+                      now + delay, now, job_id)
+    else:
+        now = time.time()
+        sql = ("UPDATE jobs SET status = 'succeeded', progress = 1, result = ?, message = ?, error = NULL,"
+               " finished_at = ?, updated_at = ? WHERE job_id = ?")
+        params = (json.dumps(result), ctx.message or "Done", now, now, job_id)
+
+    conn = connection.get_db_connection()
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+    _progress_path(job_id).unlink(missing_ok=True)
+
+
+def _job_files(job):
+    """Files owned by a job: its upload (params) and its output (result), if inside jobs_dir()"""
+    root = jobs_dir().resolve()
+    files = []
+    for source in (job["params"], job["result"] or {}):
+        path = source.get("path") if isinstance(source, dict) else None
+        if path and Path(path).resolve().is_relative_to(root):
+            files.append(Path(path))
+    return files
+
+
+@traced()
+def prune_jobs(days=KEEP_FINISHED_DAYS):
+    """
+    Delete finished jobs older than `days`, with their files, and the
+    heartbeat files of workers that are gone
+
+    Returns:
+        int: Number of jobs deleted
+    """
+    cutoff = time.time() - days * 86400
+    conn = connection.get_db_connection()
+    try:
+        rows = conn.execute(f"SELECT * FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED_STATES))})"
+                            " AND finished_at < ?", FINISHED_STATES + (cutoff,)).fetchall()
+        for row in rows:
+            for path in _job_files(_job(row)):
+                path.unlink(missing_ok=True)
+        conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(row["job_id"],) for row in rows])
+        conn.commit()
+    finally:
+        conn.close()
+    for heartbeat in (jobs_dir() / "workers").glob("*.alive"):
+        if not _worker_alive(heartbeat.stem):
+            heartbeat.unlink(missing_ok=True)
+    return len(rows)
+
+
+def run_worker(stop=None, drain=False, poll_interval=POLL_INTERVAL):
+    """
+    Run queued jobs one at a time until stopped
+
+    Args:
+        stop: threading.Event that ends the loop (checked between jobs)
+        drain: Return as soon as no job is due instead of waiting for more
+
+    Returns:
+        int: Number of jobs run
+    """
+    stop = stop or threading.Event()
+    worker = os.getpid()
+    heartbeat = _heartbeat_path(worker)
+    heartbeat.parent.mkdir(parents=True, exist_ok=True)
+    beating = threading.Event()
+
+    def beat():
+        # Separate from the jobs table, so a job holding the write lock still shows as alive
+        while not beating.wait(HEARTBEAT_INTERVAL):
+            heartbeat.touch()
+
+    heartbeat.touch()
+    threading.Thread(target=beat, name="arg-job-heartbeat", daemon=True).start()
+    ran = 0
+    try:
+        while not stop.is_set():
+            # The process's write connection is only held to claim; the job takes its own connections
+            conn = connection.get_db_connection()
+            try:
+                if not connection.is_postgres():
+                    conn.execute(f"PRAGMA busy_timeout = {WORKER_BUSY_TIMEOUT_MS}")
+                job = claim_job(conn, worker)
+            finally:
+                conn.close()
+            if job is None:
+                if drain:
+                    break
+                stop.wait(poll_interval)
+                continue
+            run_job(job)
+            ran += 1
+    finally:
+        beating.set()
+        heartbeat.unlink(missing_ok=True)
+    return ran
+
+
+def _worker_main(db_path):
+    """Entry point of a worker process"""
+    connection.DB_PATH = Path(db_path)
+    prune_jobs()
+    run_worker()
+
+
+def start_workers(count):
+    """
+    Start `count` worker processes for this database
+
+    Safe to call on every rerun; only the first call starts processes. The
+    workers are daemons and stop with this process.
+
+    Args:
+        count: Number of worker processes
+    """
+    with _workers_lock:
+        if _workers:
+            return
+        # spawn: forking a multi-threaded server process is unsafe
+        context = multiprocessing.get_context("spawn")
+        for _ in range(count):
+            process = context.Process(target=_worker_main, args=(str(connection.DB_PATH),),
+                                      name="arg-job-worker", daemon=True)
+            process.start()
+            _workers.append(process)
+
+
+def start_workers_from_env():
+    """
+    Start DEFAULT_WORKERS job workers, or ARG_JOB_WORKERS of them
+
+    Set ARG_JOB_WORKERS=0 to run the workers separately
+    (python -m arg_database.jobs --workers N).
+    """
+    count = int(os.environ.get("ARG_JOB_WORKERS", DEFAULT_WORKERS))
+    if count > 0:
+        start_workers(count)
+
+
+# Job kinds
+
+@job_kind("ingest_dataset", "Dataset upload", max_attempts=1)
+def ingest_dataset(ctx, path, name, uploaded_by, upload_date, file_name=None):
+    """
+    Profile an uploaded file and record it as a dataset
+
+    The upload is deleted once it has been recorded. Profiling runs in the
+    worker itself (workers=1): worker processes cannot start their own.
+    """
+    from arg_database.profiler import register_dataset
+
+    ctx.progress(0.0, f"Profiling {file_name or Path(path).name}")
+    dataset_id, profile = register_dataset(path, name, uploaded_by, upload_date, file_name=file_name, workers=1)
+    Path(path).unlink(missing_ok=True)
+    ctx.message = f"Dataset {dataset_id} added: {profile['rows']:,} rows x {profile['columns']} columns"
+    return {"dataset_id": dataset_id, "rows": profile["rows"], "columns": profile["columns"]}
+
+
+@job_kind("export", "Export")
+def export_table(ctx, table, fmt, filters=None, search=None):
+    """Write a filtered table export to a file under jobs_dir()"""
+    from arg_database.export import (EXPORT_CHUNK_ROWS, EXPORT_FORMATS, build_export_query, export_filename,
+                                     stream_export)
+
+    sql, params = build_export_query(table, filters, search)
+    conn = connection.get_read_connection()
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+    finally:
+        conn.close()
+
+    file_name = export_filename(table, fmt)
+    path = jobs_dir() / "exports" / f"{ctx.job_id}_{file_name}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    part = path.with_suffix(".part")
+    try:
+        written = 0
+        with open(part, "wb") as f:
+            for data in stream_export(table, fmt, filters, search):
+                f.write(data)
+                written = min(written + EXPORT_CHUNK_ROWS, total)
+                ctx.progress(written / total if total else 1.0, f"Exported {written:,} of {total:,} rows")
+        os.replace(part, path)
+    finally:
+        part.unlink(missing_ok=True)
+    ctx.message = f"Exported {total:,} rows to {file_name}"
+    return {"path": str(path), "file_name": file_name, "mime": EXPORT_FORMATS[fmt]["mime"], "rows": total}
+
+
+@job_kind("archive", "Archive old rows")
+def archive_rows(ctx, days=None):
+    """Move old closed incidents and resolved tickets to the archive tables"""
+    from arg_database.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_POLICIES, archive_table
+
+    conn = connection.get_db_connection()
+    moved = {}
+    try:
+        for i, table in enumerate(ARCHIVE_POLICIES):
+            ctx.progress(i / len(ARCHIVE_POLICIES), f"Archiving {table}")
+            moved[table] = sum(archive_table(conn, table, days or ARCHIVE_AFTER_DAYS).values())
+    finally:
+        conn.close()
+    ctx.message = "Archived " + ", ".join(f"{count:,} {table} rows" for table, count in moved.items())
+    return moved
+
+
+@job_kind("rebuild_rollups", "Rebuild rollups")
+def rebuild_rollups(ctx):
+    """Recompute the daily rollup tables behind the anomaly findings"""
+    from arg_database import tables
+
+    ctx.progress(0.0, "Rebuilding rollups")
+    conn = connection.get_db_connection()
+    try:
+        tables.rebuild_rollups(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    ctx.message = "Rollups rebuilt"
+
+
+@job_kind("rebuild_sketches", "Rebuild sketches")
+def rebuild_sketches(ctx):
+    """Rebuild the quantile and distinct-count sketches of every table"""
+    from arg_database.sketches import SKETCHES, rebuild_sketches as rebuild
+
+    conn = connection.get_db_connection()
+    try:
+        for i, table in enumerate(SKETCHES):
+            ctx.progress(i / len(SKETCHES), f"Rebuilding {table} sketches")
+            rebuild(conn, table)
+    finally:
+        conn.close()
+    ctx.message = f"Sketches of {len(SKETCHES)} tables rebuilt"
+
+
+@job_kind("rebuild_model", "Refit resolution model")
+def rebuild_model(ctx):
+    """Refit the resolution-time model from every resolved ticket"""
+    from arg_database.forecasting import refresh_model
+
+    ctx.progress(0.0, "Refitting the resolution-time model")
+    conn = connection.get_db_connection()
+    try:
+        model = refresh_model(conn, rebuild=True)
+    finally:
+        conn.close()
+    ctx.message = f"Model refit on {model.rows:,} resolved tickets"
+    return {"rows": model.rows}
+
+
+@job_kind("rebuild_dedup_index", "Rebuild duplicate index")
+def rebuild_dedup_index(ctx):
+    """Rebuild the near-duplicate (MinHash/LSH) index of every table"""
+    from arg_database.dedup import DEDUP_TABLES, rebuild_index
+
+    conn = connection.get_db_connection()
+    indexed = {}
+    try:
+        for i, table in enumerate(DEDUP_TABLES):
+            ctx.progress(i / len(DEDUP_TABLES), f"Indexing {table}")
+            indexed[table] = rebuild_index(conn, table)
+    finally:
+        conn.close()
+    ctx.message = "Indexed " + ", ".join(f"{count:,} {table} rows" for table, count in indexed.items())
+    return indexed
+
+
+if __name__ == "__main__":
+    # python -m arg_database.jobs [--workers N | --drain | --submit KIND [--params JSON] | --cancel ID | --retry ID]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run and manage background jobs")
+    parser.add_argument("--workers", type=int, help="Run this many worker processes until interrupted")
+    parser.add_argument("--drain", action="store_true", help="Run the due jobs in this process, then exit")
+    parser.add_argument("--submit", choices=sorted(JOB_KINDS), help="Queue a job of this kind")
+    parser.add_argument("--params", default="{}", help="JSON parameters for --submit")
+    parser.add_argument("--cancel", type=int, metavar="ID")
+    parser.add_argument("--retry", type=int, metavar="ID")
+    parser.add_argument("--prune", action="store_true", help=f"Delete jobs finished over {KEEP_FINISHED_DAYS} days ago")
+    args = parser.parse_args()
+
+    if args.submit:
+        print(f"Queued job {submit_job(args.submit, json.loads(args.params), 'cli')}")
+    if args.cancel:
+        print("Cancelled" if cancel_job(args.cancel) else "Job has already finished")
+    if args.retry:
+        print("Queued again" if retry_job(args.retry) else "Only failed or cancelled jobs can be retried")
+    if args.prune:
+        print(f"Deleted {prune_jobs()} finished job(s)")
+    if args.drain:
+        print(f"Ran {run_worker(drain=True)} job(s)")
+    if args.workers:
+        start_workers(args.workers)
+        try:
+            for process in _workers:
+                process.join()
+        except KeyboardInterrupt:
+            pass
+    for job in list_jobs(limit=10):
+        progress = f"{job['progress']:.0%}" if job["status"] == "running" else ""
+        print(f"{job['job_id']:>6}  {job['label']:<26}{job['status']:<11}{progress:<6}{job['message'] or job['error'] or ''}")
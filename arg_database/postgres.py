@@ -0,0 +1,372 @@
+import itertools
+import os
+import re
+import threading
+import warnings
+from contextlib import contextmanager
+from functools import lru_cache
+
+import pandas as pd
+import psycopg
+from psycopg.pq import TransactionStatus
+from psycopg.rows import tuple_row
+from psycopg_pool import ConnectionPool
+
+# Connections each process keeps open (min) and may open (max) per database
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = int(os.environ.get("ARG_DB_POOL_SIZE", 10))
+
+# Seconds get_db_connection waits for a free pooled connection
+POOL_TIMEOUT = 30.0
+
+# Rows fetched per round trip by server-side cursors
+SERVER_CURSOR_ROWS = 50_000
+
+# Advisory lock standing in for SQLite's database write lock: BEGIN IMMEDIATE
+# takes it exclusively, writes to versioned tables take it shared
+WRITE_LOCK_KEY = 0x41524755
+
+# SQLite column types and defaults -> PostgreSQL, applied to CREATE TABLE statements
+DDL_REWRITES = [
+    (re.compile(r"\bINTEGER\s+PRIMARY\s+KEY\s+AUTOINCREMENT\b", re.I), "BIGSERIAL PRIMARY KEY"),
+    (re.compile(r"\bINTEGER\b", re.I), "BIGINT"),
+    (re.compile(r"\bREAL\b", re.I), "DOUBLE PRECISION"),
+    (re.compile(r"\bBLOB\b", re.I), "BYTEA"),
+    # Same text as SQLite's CURRENT_TIMESTAMP, e.g. 2024-05-01 12:00:00 (UTC)
+    (re.compile(r"\bDEFAULT\s+CURRENT_TIMESTAMP\b", re.I),
+     "DEFAULT to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"),
+]
+
+# String literals and quoted names (left alone), ? placeholders and % signs
+_SQL_TOKENS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\?|%")
+
+# Statements before which sqlite3 opens a transaction implicitly
+_DML = re.compile(r"\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.I)
+
+# BEGIN [DEFERRED | IMMEDIATE | EXCLUSIVE]
+_BEGIN = re.compile(r"\s*BEGIN(?:\s+(DEFERRED|IMMEDIATE|EXCLUSIVE))?(?:\s+TRANSACTION)?\s*;?\s*$", re.I)
+
+# pandas warns on every DBAPI connection but sqlite3's; PostgresConnection
+# provides the cursor interface pandas.read_sql_query uses
+warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy connectable", category=UserWarning)
+
+# URL -> pool, one per database per process
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Names of server-side cursors
+_cursor_ids = itertools.count(1)
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """
+    Rewrite a statement written for sqlite3 for psycopg
+
+    ? placeholders become %s and every literal % is doubled; ? inside
+    string literals and quoted names is left alone. CREATE TABLE statements
+    also get PostgreSQL column types (see DDL_REWRITES).
+
+    Args:
+        sql: Statement with qmark placeholders
+
+    Returns:
+        str: Statement with format placeholders
+    """
+    def replace(match):
+        token = match.group()
+        if token == "?":
+            return "%s"
+        return token.replace("%", "%%")
+
+    return _SQL_TOKENS.sub(replace, translate_ddl(sql))
+
+
+@lru_cache(maxsize=256)
+def translate_ddl(sql):
+    """SQLite column types in CREATE TABLE statements -> PostgreSQL ones; other SQL is unchanged"""
+    if not re.search(r"\bCREATE\s+TABLE\b", sql, re.I):
+        return sql
+    for pattern, replacement in DDL_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+class Row(tuple):
+    """Result row readable by position or by column name, like sqlite3.Row"""
+
+    def __new__(cls, values, index):
+        row = super().__new__(cls, values)
+        row._index = index
+        return row
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._index[key]
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return list(self._index)
+
+
+def named_row(cursor):
+    """psycopg row factory building Row objects"""
+    index = {column.name: i for i, column in enumerate(cursor.description or ())}
+    return lambda values: Row(values, index)
+
+
+class PostgresCursor:
+    """psycopg cursor taking sqlite3-style SQL (see PostgresConnection)"""
+
+    def __init__(self, connection, cursor):
+        self.connection = connection
+        self._cursor = cursor
+
+    @property
+    def row_factory(self):
+        return None if self._cursor.row_factory is tuple_row else Row
+
+    @row_factory.setter
+    def row_factory(self, factory):
+        self._cursor.row_factory = tuple_row if factory is None else named_row
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, sql, params=None):
+        if self.connection._begin(sql):
+            return self
+        self.connection._implicit_begin(sql)
+        if params is None:
+            self._cursor.execute(translate_ddl(sql))
+        else:
+            self._cursor.execute(translate(sql), params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self.connection._implicit_begin(sql)
+        self._cursor.executemany(translate(sql), seq_of_params)
+        return self
+
+    def executescript(self, script):
+        self.connection.commit()
+        self._cursor.execute(translate_ddl(script))
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+
+class PostgresConnection:
+    """
+    Pooled PostgreSQL connection with the sqlite3 interface the platform uses
+
+    The rest of arg_database is written against sqlite3, so this keeps its
+    behaviour: ? placeholders, rows readable by name (row_factory None gives
+    plain tuples), and sqlite3's transaction handling. Reads outside a
+    transaction run in autocommit; INSERT, UPDATE and DELETE open a
+    transaction that commit() ends. An explicit BEGIN starts a REPEATABLE
+    READ transaction, so the reads in it see one snapshot like a SQLite read
+    transaction; BEGIN IMMEDIATE takes the WRITE_LOCK_KEY advisory lock,
+    which serialises such sections with each other and with writes to the
+    versioned tables as SQLite's write lock does.
+
+    close() hands the connection back to its pool.
+    """
+
+    backend = "postgres"
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._conn = pool.getconn(timeout=POOL_TIMEOUT)
+        self.row_factory = Row
+        self.statement_cursors = {}
+
+    @property
+    def raw(self):
+        """The underlying psycopg connection"""
+        return self._conn
+
+    @property
+    def in_transaction(self):
+        return self._conn.info.transaction_status != TransactionStatus.IDLE
+
+    def _begin(self, sql):
+        """Run an explicit BEGIN statement; False if sql is not one"""
+        match = _BEGIN.match(sql)
+        if not match:
+            return False
+        if self.in_transaction:
+            raise psycopg.ProgrammingError("cannot start a transaction within a transaction")
+        if (match.group(1) or "").upper() in ("IMMEDIATE", "EXCLUSIVE"):
+            self._conn.execute("BEGIN")
+            self._conn.execute("SELECT pg_advisory_xact_lock(%s)", (WRITE_LOCK_KEY,))
+        else:
+            self._conn.execute("BEGIN ISOLATION LEVEL REPEATABLE READ")
+        return True
+
+    def _implicit_begin(self, sql):
+        if not self.in_transaction and _DML.match(sql):
+            self._conn.execute("BEGIN")
+
+    def cursor(self):
+        cursor = PostgresCursor(self, self._conn.cursor())
+        cursor.row_factory = self.row_factory
+        return cursor
+
+    def execute(self, sql, params=None):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def commit(self):
+        if self.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def close(self):
+        """Discard any open transaction and return the connection to its pool"""
+        if self._conn is None:
+            return
+        try:
+            if not self._conn.closed:
+                self.rollback()
+        finally:
+            self._pool.putconn(self._conn)
+            self._conn = None
+            self.statement_cursors.clear()
+
+    def copy_rows(self, table, columns, rows):
+        """
+        Bulk load rows with COPY, inside the current (or a new) transaction
+
+        Args:
+            table: Table name
+            columns: Column names, in the order of each row's values
+            rows: Iterable of row tuples
+        """
+        if not self.in_transaction:
+            self._conn.execute("BEGIN")
+        with self._conn.cursor() as cursor:
+            with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+    @contextmanager
+    def server_cursor(self, sql, params=None, chunk_rows=SERVER_CURSOR_ROWS):
+        """
+        Cursor on the server running a query, for results too large to fetch at once
+
+        Runs in the current transaction, or in a REPEATABLE READ one of its
+        own that ends with the block.
+
+        Yields:
+            psycopg.ServerCursor: The executed cursor (rows are plain tuples)
+        """
+        started = not self.in_transaction
+        if started:
+            self._conn.execute("BEGIN ISOLATION LEVEL REPEATABLE READ")
+        try:
+            with self._conn.cursor(name=f"arg_cursor_{next(_cursor_ids)}", row_factory=tuple_row) as cursor:
+                cursor.itersize = chunk_rows
+                cursor.execute(translate(sql), params or ())
+                yield cursor
+        finally:
+            if started and self._conn is not None:
+                self.commit()
+
+    def iter_chunks(self, sql, params=None, chunk_rows=SERVER_CURSOR_ROWS):
+        """
+        Stream a query's rows through a server-side cursor
+
+        Yields:
+            list: Up to chunk_rows row tuples at a time
+        """
+        with self.server_cursor(sql, params, chunk_rows) as cursor:
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield rows
+
+    def read_frame(self, sql, params=None, chunk_rows=SERVER_CURSOR_ROWS):
+        """
+        A query's result as a DataFrame, read through a server-side cursor
+
+        Returns:
+            pd.DataFrame: The rows, with the query's column names
+        """
+        frames = []
+        with self.server_cursor(sql, params, chunk_rows) as cursor:
+            columns = [column.name for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                frames.append(pd.DataFrame.from_records(rows, columns=columns))
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def get_pool(url):
+    """
+    This process's connection pool for a database, opened on first use
+
+    Args:
+        url: PostgreSQL connection URL
+
+    Returns:
+        ConnectionPool: Pool of autocommit connections
+    """
+    with _pools_lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = _pools[url] = ConnectionPool(url, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                                                kwargs={"autocommit": True}, name="arg", open=True)
+    return pool
+
+
+def connect(url):
+    """
+    Take a connection from the pool of a database
+
+    Args:
+        url: PostgreSQL connection URL
+
+    Returns:
+        PostgresConnection: Connection to close() when done
+    """
+    return PostgresConnection(get_pool(url))
+
+
+def close_pools():
+    """Close every pool of this process (e.g. before forking)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
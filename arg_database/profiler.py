@@ -0,0 +1,374 @@
+import csv
+import io
+import json
+import math
+import multiprocessing
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import arg_database.connection as connection
+from arg_database.sketches import record_insert
+from arg_metrics.tracing import trace, traced
+
+# CSV bytes parsed at a time by one worker (a block always ends on a line break)
+BLOCK_BYTES = 32 * 1024 * 1024
+
+# CSV files at least this large are split across worker processes
+PARALLEL_MIN_BYTES = 128 * 1024 * 1024
+
+# File extension -> profiled format
+PROFILE_FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}
+
+
+def dtype_name(arrow_type):
+    """
+    Short dtype label for an Arrow type
+
+    Args:
+        arrow_type: pyarrow.DataType
+
+    Returns:
+        str: int64, float64, bool, date, datetime or string; None for the
+            null type (a block where the column was always empty)
+    """
+    import pyarrow as pa
+
+    if pa.types.is_null(arrow_type):
+        return None
+    if pa.types.is_integer(arrow_type):
+        return "int64"
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "float64"
+    if pa.types.is_boolean(arrow_type):
+        return "bool"
+    if pa.types.is_date(arrow_type):
+        return "date"
+    if pa.types.is_timestamp(arrow_type):
+        return "datetime"
+    return "string"
+
+
+def merge_dtypes(a, b):
+    """
+    Narrowest dtype that holds values of both dtypes
+
+    Blocks are typed independently, so one column can come back as int64
+    from one block and float64 from another.
+    """
+    if a is None or a == b:
+        return b
+    if b is None:
+        return a
+    if {a, b} == {"int64", "float64"}:
+        return "float64"
+    if {a, b} == {"date", "datetime"}:
+        return "datetime"
+    return "string"
+
+
+def read_csv_header(path):
+    """
+    Column names of a CSV file and the byte offset where the data starts
+
+    Returns:
+        tuple: (list of column names, data offset)
+    """
+    with open(path, "rb") as f:
+        line = f.readline()
+        offset = f.tell()
+    names = next(csv.reader([line.decode("utf-8-sig")]), [])
+    if not names:
+        raise ValueError(f"{path} has no header row")
+    return names, offset
+
+
+def split_ranges(path, start, parts):
+    """
+    Cut a file into byte ranges that each begin at the start of a line
+
+    Args:
+        path: File path
+        start: Offset of the first data line
+        parts: Number of ranges wanted
+
+    Returns:
+        list: (start, end) offsets, in order, covering start..EOF
+    """
+    size = os.path.getsize(path)
+    cuts = [start]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            offset = start + (size - start) * i // parts
+            f.seek(offset - 1)
+            # Move to the start of the next line (stays put if already at one)
+            f.readline()
+            cuts.append(max(f.tell(), cuts[-1]))
+    cuts.append(size)
+    return [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+def _new_stats(names):
+    return {"rows": 0, "columns": {name: {"dtype": None, "null_count": 0} for name in names}}
+
+
+def _merge_stats(total, part):
+    total["rows"] += part["rows"]
+    for name, column in part["columns"].items():
+        merged = total["columns"][name]
+        merged["dtype"] = merge_dtypes(merged["dtype"], column["dtype"])
+        merged["null_count"] += column["null_count"]
+    return total
+
+
+def _profile_csv_range(args):
+    """
+    Profile the lines of a CSV file between two offsets (worker entry point)
+
+    Reads BLOCK_BYTES at a time and parses each block with pyarrow, so memory
+    stays at about one block whatever the file size.
+
+    Args:
+        args: (path, start, end, column names, use_threads)
+
+    Returns:
+        dict: rows, and per column dtype and null_count
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    path, start, end, names, use_threads = args
+    stats = _new_stats(names)
+    read_options = pacsv.ReadOptions(column_names=names, use_threads=use_threads)
+    # Empty cells are nulls in every column, including text ones
+    convert_options = pacsv.ConvertOptions(strings_can_be_null=True)
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            block = f.read(min(BLOCK_BYTES, end - position))
+            if not block:
+                break
+            if not block.endswith(b"\n"):
+                # Finish the last line; end is always a line start, so this stays inside the range
+                block += f.readline()
+            position += len(block)
+            try:
+                table = pacsv.read_csv(io.BytesIO(block), read_options=read_options,
+                                       convert_options=convert_options)
+            except pa.ArrowInvalid as e:
+                raise ValueError(f"{path}: cannot parse rows near byte {position - len(block)}: {e}")
+            stats["rows"] += table.num_rows
+            for name, column in zip(names, table.columns):
+                merged = stats["columns"][name]
+                merged["dtype"] = merge_dtypes(merged["dtype"], dtype_name(column.type))
+                merged["null_count"] += column.null_count
+    return stats
+
+
+def profile_csv(path, workers=None):
+    """
+    Profile a CSV file in one streaming pass
+
+    Files of PARALLEL_MIN_BYTES or more are split into line-aligned byte
+    ranges profiled by separate processes. Splitting on line breaks assumes
+    quoted values do not contain newlines; pass workers=1 for files that do.
+
+    Args:
+        path: CSV file path
+        workers: Worker processes (default: one per CPU for large files)
+
+    Returns:
+        dict: rows, and per column dtype and null_count
+    """
+    names, data_start = read_csv_header(path)
+    size = os.path.getsize(path)
+    if workers is None:
+        workers = (os.cpu_count() or 1) if size >= PARALLEL_MIN_BYTES else 1
+    # No point in more workers than blocks
+    workers = max(1, min(workers, math.ceil((size - data_start) / BLOCK_BYTES)))
+
+    if workers == 1:
+        return _profile_csv_range((path, data_start, size, names, True))
+
+    jobs = [(path, start, end, names, False) for start, end in split_ranges(path, data_start, workers)]
+    # spawn: forking a multi-threaded server process is unsafe
+    with multiprocessing.get_context("spawn").Pool(len(jobs)) as pool:
+        parts = pool.map(_profile_csv_range, jobs)
+    total = _new_stats(names)
+    for part in parts:
+        _merge_stats(total, part)
+    return total
+
+
+def profile_parquet(path):
+    """
+    Profile a Parquet file from its footer
+
+    Row counts, types and (usually) null counts are in the file metadata,
+    so nothing but the footer is read. Columns whose row groups lack null
+    count statistics are scanned one at a time.
+
+    Args:
+        path: Parquet file path
+
+    Returns:
+        dict: rows, and per column dtype and null_count
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.metadata
+    schema = parquet_file.schema_arrow
+    stats = _new_stats(schema.names)
+    stats["rows"] = metadata.num_rows
+
+    # Leaf column index of each top-level column (nested columns have several leaves)
+    leaves = {}
+    for index in range(metadata.num_columns):
+        top = metadata.schema.column(index).path.split(".")[0]
+        leaves.setdefault(top, []).append(index)
+
+    for field in schema:
+        column = stats["columns"][field.name]
+        column["dtype"] = dtype_name(field.type)
+        indexes = leaves.get(field.name, [])
+        null_counts = []
+        if len(indexes) == 1:
+            for group in range(metadata.num_row_groups):
+                statistics = metadata.row_group(group).column(indexes[0]).statistics
+                null_counts.append(statistics.null_count
+                                   if statistics is not None and statistics.has_null_count else None)
+        if null_counts and None not in null_counts:
+            column["null_count"] = sum(null_counts)
+        else:
+            column["null_count"] = sum(batch.column(0).null_count
+                                       for batch in parquet_file.iter_batches(columns=[field.name]))
+    return stats
+
+
+@traced()
+def profile_file(path, workers=None):
+    """
+    Profile a CSV or Parquet dataset file
+
+    Args:
+        path: File path; the format is taken from the extension
+        workers: Worker processes for large CSV files (see profile_csv)
+
+    Returns:
+        dict: file_format, byte_size, rows, column count, and column_profiles
+            (list of {name, dtype, null_count, null_rate} in file order)
+
+    Raises:
+        ValueError: If the format is not supported or the file cannot be parsed
+    """
+    path = Path(path)
+    file_format = PROFILE_FORMATS.get(path.suffix.lower())
+    if file_format is None:
+        raise ValueError(f"Unsupported dataset file: {path.name} (expected CSV or Parquet)")
+
+    with trace(f"profiler.{file_format}"):
+        stats = profile_csv(path, workers) if file_format == "csv" else profile_parquet(path)
+
+    rows = stats["rows"]
+    column_profiles = [
+        {"name": name, "dtype": column["dtype"] or "string", "null_count": column["null_count"],
+         "null_rate": column["null_count"] / rows if rows else 0.0}
+        for name, column in stats["columns"].items()
+    ]
+    return {
+        "file_format": file_format,
+        "byte_size": path.stat().st_size,
+        "rows": rows,
+        "columns": len(column_profiles),
+        "column_profiles": column_profiles,
+    }
+
+
+def save_profile(conn, dataset_id, file_name, profile):
+    """
+    Store (or replace) the profile of a dataset; the caller commits
+
+    Args:
+        conn: Database connection object
+        dataset_id: datasets_metadata row the file belongs to
+        file_name: Original file name
+        profile: Result of profile_file
+    """
+    conn.execute(
+        "INSERT INTO dataset_profiles (dataset_id, file_name, file_format, byte_size, column_profiles, profiled_at)"
+        " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (dataset_id) DO UPDATE SET file_name = excluded.file_name,"
+        " file_format = excluded.file_format, byte_size = excluded.byte_size,"
+        " column_profiles = excluded.column_profiles, profiled_at = excluded.profiled_at",
+        (dataset_id, file_name, profile["file_format"], profile["byte_size"],
+         json.dumps(profile["column_profiles"]),
+         # UTC, in the format of the column's CURRENT_TIMESTAMP default
+         datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+    )
+
+
+@traced()
+def register_dataset(path, name, uploaded_by, upload_date, dataset_id=None, file_name=None, workers=None):
+    """
+    Profile a dataset file and record it in datasets_metadata
+
+    The rows and columns stored are the measured ones. The metadata row and
+    the profile are committed together.
+
+    Args:
+        path: CSV or Parquet file to profile
+        name: Dataset name
+        uploaded_by: User who uploaded it
+        upload_date: Upload date
+        dataset_id: Id to use (default: highest id + 1)
+        file_name: Name to record for the file (default: the path's name)
+        workers: Worker processes for large CSV files
+
+    Returns:
+        tuple: (dataset_id, profile)
+    """
+    profile = profile_file(path, workers)
+    conn = connection.get_db_connection()
+    try:
+        if dataset_id is None:
+            dataset_id = conn.execute("SELECT COALESCE(MAX(dataset_id), 0) + 1 FROM datasets_metadata").fetchone()[0]
+        conn.execute("INSERT INTO datasets_metadata VALUES (?, ?, ?, ?, ?, ?)",
+                     (dataset_id, name, profile["rows"], profile["columns"], uploaded_by, str(upload_date)))
+        record_insert(conn, "datasets_metadata",
+                      (dataset_id, name, profile["rows"], profile["columns"], uploaded_by, str(upload_date)))
+        save_profile(conn, dataset_id, file_name or Path(path).name, profile)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return dataset_id, profile
+
+
+if __name__ == "__main__":
+    # python -m arg_database.profiler FILE [--name NAME --uploaded-by USER] [--workers N]
+    import argparse
+    from datetime import date
+
+    parser = argparse.ArgumentParser(description="Profile a CSV or Parquet dataset file")
+    parser.add_argument("path")
+    parser.add_argument("--name", help="Register the file in datasets_metadata under this name")
+    parser.add_argument("--uploaded-by", default="data_scientist")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.name:
+        dataset_id, result = register_dataset(args.path, args.name, args.uploaded_by, date.today(),
+                                              workers=args.workers)
+        print(f"Registered dataset {dataset_id}")
+    else:
+        result = profile_file(args.path, args.workers)
+    print(f"{result['file_format']}: {result['rows']:,} rows x {result['columns']} columns, "
+          f"{result['byte_size'] / 1024 ** 2:,.1f} MB in {time.perf_counter() - start:.2f} s")
+    for column in result["column_profiles"]:
+        print(f"  {column['name']:<30}{column['dtype']:<10}{column['null_rate']:>8.2%} null")
@@ -0,0 +1,116 @@
+import csv
+from pathlib import Path
+
+from arg_database.connection import bulk_insert
+from arg_database.statements import COLUMN_TYPES, TABLE_COLUMNS
+from arg_metrics.tracing import traced
+
+# Define paths to CSV data files
+DATA_DIR = Path(__file__).parent.parent / "DATA"
+CYBER_CSV = DATA_DIR / "cyber_incidents.csv"
+DATASETS_CSV = DATA_DIR / "datasets_metadata.csv"
+TICKETS_CSV = DATA_DIR / "it_tickets.csv"
+
+# Table -> CSV file it is seeded from
+SEED_FILES = {
+    "cyber_incidents": CYBER_CSV,
+    "datasets_metadata": DATASETS_CSV,
+    "it_tickets": TICKETS_CSV,
+}
+
+def read_seed_rows(table, path):
+    """
+    Read a seed CSV into typed row tuples in table column order
+
+    Empty cells become NULL.
+
+    Args:
+        table: Table name (a key of TABLE_COLUMNS)
+        path: CSV file path
+
+    Returns:
+        list: Row tuples ready for connection.bulk_insert
+
+    Raises:
+        ValueError: If the CSV is missing a column or a value has the wrong type
+    """
+    columns = TABLE_COLUMNS[table]
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = set(columns) - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path} is missing column(s): {', '.join(sorted(missing))}")
+
+        rows = []
+        for line, record in enumerate(reader, start=2):
+            row = []
+            for column in columns:
+                value = record[column]
+                if value == "":
+                    row.append(None)
+                    continue
+                try:
+                    row.append(COLUMN_TYPES.get(column, str)(value))
+                except ValueError:
+                    raise ValueError(f"{path}, line {line}: bad {column} value {value!r}")
+            rows.append(tuple(row))
+    return rows
+
+
+@traced()
+def seed_table(conn, table, path=None):
+    """
+    Seed one table from its CSV file, once
+
+    Does nothing if seed_history already has the table. A table that already
+    holds rows (e.g. created before seeding existed) is recorded as seeded
+    without inserting anything. The inserts and the seed_history row are
+    committed together, so an interrupted seed is retried in full.
+
+    Args:
+        conn: Database connection object
+        table: Table name (a key of SEED_FILES)
+        path: CSV file to use instead of the default one
+
+    Returns:
+        int: Number of rows inserted
+    """
+    path = Path(path or SEED_FILES[table])
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM seed_history WHERE table_name = ?", (table,))
+    if cursor.fetchone():
+        return 0
+
+    cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table})")
+    if cursor.fetchone()[0]:
+        cursor.execute("INSERT INTO seed_history (table_name, source, row_count) VALUES (?, 'existing', 0)",
+                       (table,))
+        conn.commit()
+        return 0
+
+    rows = read_seed_rows(table, path)
+    try:
+        # executemany on SQLite, COPY on PostgreSQL
+        bulk_insert(conn, table, TABLE_COLUMNS[table], rows)
+        cursor.execute("INSERT INTO seed_history (table_name, source, row_count) VALUES (?, ?, ?)",
+                       (table, path.name, len(rows)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+
+def seed_database(conn):
+    """
+    Seed every table that has not been seeded yet
+
+    Called from setup_database; safe to run any number of times.
+
+    Args:
+        conn: Database connection object
+
+    Returns:
+        dict: Table name -> number of rows inserted
+    """
+    return {table: seed_table(conn, table) for table in SEED_FILES}
@@ -0,0 +1,627 @@
+import json
+import logging
+import math
+import random
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import arg_database.connection as connection
+from arg_database.invalidation import table_version as current_version
+from arg_database.snapshots import read_snapshot, table_version
+from arg_database.statements import TABLE_COLUMNS
+from arg_metrics.tracing import trace
+
+logger = logging.getLogger(__name__)
+
+# One sketch over a column, optionally one per value of group_by
+SketchSpec = namedtuple("SketchSpec", ["kind", "column", "group_by"])
+
+# Sketches kept for each table
+SKETCHES = {
+    "datasets_metadata": [
+        SketchSpec("quantile", "rows", None),
+        SketchSpec("distinct", "uploaded_by", None),
+    ],
+    "it_tickets": [
+        SketchSpec("quantile", "resolution_time_hours", None),
+        SketchSpec("quantile", "resolution_time_hours", "assigned_to"),
+        SketchSpec("distinct", "assigned_to", None),
+    ],
+    "cyber_incidents": [
+        SketchSpec("distinct", "category", None),
+    ],
+}
+
+# KLL accuracy parameter: rank error is about 1.7 / k (~1% at 200)
+KLL_K = 200
+
+# HyperLogLog precision: 2**p registers, standard error 1.04 / sqrt(2**p) (~1.6% at 12)
+HLL_PRECISION = 12
+
+# Rows read per chunk when rebuilding sketches from a table
+REBUILD_CHUNK_ROWS = 100000
+
+# Table -> (database path, version, sketches) decoded in this process
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+# Tables whose sketches this process is rebuilding in the background
+_rebuilding = set()
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty 2016)
+
+    Level h holds items that each stand for 2**h inserted values. When the
+    sketch is full the lowest full level is sorted and every other item
+    (random offset) is promoted to the next level, so memory stays at
+    roughly 3k items whatever the number of values.
+    """
+
+    def __init__(self, k=KLL_K, levels=None, count=0):
+        self.k = k
+        self.levels = levels or [[]]
+        self.count = count
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _size(self):
+        return sum(map(len, self.levels))
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def _compress(self):
+        # Compact the lowest over-full level until everything fits
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self.levels):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.levels.append([])
+                    items.sort()
+                    # An odd item out stays behind
+                    keep = [items.pop()] if len(items) % 2 else []
+                    self.levels[level + 1].extend(items[random.getrandbits(1)::2])
+                    self.levels[level] = keep
+                    break
+
+    def add(self, value):
+        """Add one value (None and NaN are ignored)"""
+        if value is None or value != value:
+            return
+        self.levels[0].append(float(value))
+        self.count += 1
+        self._compress()
+
+    def add_many(self, values):
+        """
+        Add an array of values (NaN is ignored)
+
+        The batch is sorted once and halved (random offset each time) until
+        it fits in k items, which is what repeated compaction of a full
+        sorted level does, then merged in at the level it reached.
+        """
+        values = np.asarray(values, dtype="float64")
+        values = np.sort(values[~np.isnan(values)])
+        count = len(values)
+        if not count:
+            return
+        level = 0
+        while len(values) > self.k:
+            values = values[random.getrandbits(1)::2]
+            level += 1
+        while len(self.levels) <= level:
+            self.levels.append([])
+        self.levels[level].extend(values.tolist())
+        self.count += count
+        self._compress()
+
+    def quantile(self, q):
+        """
+        Estimate a quantile
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            float: Value at that rank, or None if the sketch is empty
+        """
+        items = sorted((value, 2 ** level) for level, values in enumerate(self.levels) for value in values)
+        if not items:
+            return None
+        total = sum(weight for _, weight in items)
+        rank = q * total
+        seen = 0
+        for value, weight in items:
+            seen += weight
+            if seen >= rank:
+                return value
+        return items[-1][0]
+
+    def to_bytes(self):
+        return json.dumps({"k": self.k, "count": self.count, "levels": self.levels}).encode()
+
+    @classmethod
+    def from_bytes(cls, data):
+        state = json.loads(data)
+        return cls(state["k"], state["levels"], state["count"])
+
+
+def _hash_values(values):
+    """64-bit hashes of values, the same in every process"""
+    return pd.util.hash_array(np.asarray([str(value) for value in values], dtype=object))
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch (Flajolet et al. 2007)
+
+    Each value's 64-bit hash picks a register with its top p bits; the
+    register keeps the longest run of leading zeros seen in the rest.
+    Linear counting is used while many registers are still empty, which
+    makes small counts (a handful of staff members) come out exact.
+    """
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(2 ** precision, dtype=np.uint8)
+
+    def add_many(self, values):
+        """Add values (None is ignored)"""
+        # Duplicates cannot change a register, so only distinct values are hashed
+        series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+        values = series.dropna().unique()
+        if not len(values):
+            return
+        hashes = _hash_values(values)
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        # Exact bit length of rest by binary search (floats would round)
+        bits = np.zeros(len(rest), dtype=np.int64)
+        remaining = rest.copy()
+        for shift in (32, 16, 8, 4, 2, 1):
+            high = remaining >> np.uint64(shift)
+            moved = high > 0
+            bits[moved] += shift
+            remaining = np.where(moved, high, remaining)
+        bits += (remaining > 0).astype(np.int64)
+        rank = (64 - self.precision) - bits + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def add(self, value):
+        """Add one value"""
+        self.add_many([value])
+
+    def count(self):
+        """
+        Estimate the number of distinct values
+
+        Returns:
+            int: Estimated distinct count
+        """
+        m = len(self.registers)
+        estimate = (0.7213 / (1 + 1.079 / m)) * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(int))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        registers = np.frombuffer(data, dtype=np.uint8).copy()
+        return cls(int(math.log2(len(registers))), registers)
+
+
+SKETCH_TYPES = {"quantile": KLLSketch, "distinct": HyperLogLog}
+
+
+def sketch_name(spec):
+    """Key of a sketch in column_sketches, e.g. quantile:resolution_time_hours:assigned_to"""
+    return ":".join(part for part in spec if part)
+
+
+def _group_value(spec, row):
+    return "" if spec.group_by is None else str(row[spec.group_by])
+
+
+def _numeric(values):
+    """Values as a float array for a quantile sketch; anything that is not a number becomes NaN (ignored)"""
+    if not isinstance(values, pd.Series):
+        values = pd.Series(values, dtype=object)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64")
+
+
+def _load(conn, table):
+    """Decode the stored sketches of a table -> {(name, group value): sketch}"""
+    rows = conn.execute("SELECT sketch, group_value, data FROM column_sketches WHERE table_name = ?",
+                        (table,)).fetchall()
+    kinds = {sketch_name(spec): spec.kind for spec in SKETCHES[table]}
+    return {(name, group): SKETCH_TYPES[kinds[name]].from_bytes(data)
+            for name, group, data in rows if name in kinds}
+
+
+def _save(conn, table, sketches, version, replace=False):
+    """Store sketches and the table version they are current at; the caller commits"""
+    if replace:
+        conn.execute("DELETE FROM column_sketches WHERE table_name = ?", (table,))
+    conn.executemany(
+        "INSERT INTO column_sketches (table_name, sketch, group_value, data) VALUES (?, ?, ?, ?)"
+        " ON CONFLICT (table_name, sketch, group_value) DO UPDATE SET data = excluded.data",
+        [(table, name, group, sketch.to_bytes()) for (name, group), sketch in sketches.items()]
+    )
+    conn.execute("INSERT INTO sketch_state (table_name, generation, version) VALUES (?, ?, ?)"
+                 " ON CONFLICT (table_name) DO UPDATE SET generation = excluded.generation, version = excluded.version",
+                 (table, version[0], version[1]))
+
+
+def _state(conn, table):
+    row = conn.execute("SELECT generation, version FROM sketch_state WHERE table_name = ?", (table,)).fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def _table_chunks(conn, table, columns, version):
+    """
+    The given columns of a table as DataFrame chunks
+
+    Read from the table's snapshot when there is a current one (a memory
+    map, no SQL), otherwise streamed from the database.
+    """
+    df = read_snapshot(table, version) if version is not None else None
+    if df is not None:
+        yield df[columns]
+        return
+    for rows in connection.iter_query(conn, f"SELECT {', '.join(columns)} FROM {table}",
+                                      chunk_rows=REBUILD_CHUNK_ROWS):
+        yield pd.DataFrame(rows, columns=columns)
+
+
+def build_sketches(conn, table, version=None):
+    """
+    Build every sketch of a table from a full scan
+
+    Once rows have been archived the scan reads <table>_history, so the
+    sketches cover the same rows as the rollups.
+
+    Args:
+        conn: Database connection object (inside a read transaction, so the
+            rows and the version match)
+        table: A key of SKETCHES
+        version: Table version, to read its snapshot if there is one (the
+            snapshot holds the table only, so not once rows are archived)
+
+    Returns:
+        dict: (sketch name, group value) -> sketch
+    """
+    specs = SKETCHES[table]
+    columns = sorted({spec.column for spec in specs} | {spec.group_by for spec in specs if spec.group_by})
+    sketches = {}
+    for spec in specs:
+        if spec.group_by is None:
+            sketches[(sketch_name(spec), "")] = SKETCH_TYPES[spec.kind]()
+
+    # archive imports this module (record_archived)
+    from arg_database.archive import history_source
+    source = history_source(conn, table)
+    for chunk in _table_chunks(conn, source, columns, version if source == table else None):
+        for spec in specs:
+            name = sketch_name(spec)
+            if spec.group_by is None:
+                groups = [("", chunk[spec.column])]
+            else:
+                groups = [(str(group), values) for group, values in chunk.groupby(spec.group_by)[spec.column]]
+            for group, values in groups:
+                sketch = sketches.setdefault((name, group), SKETCH_TYPES[spec.kind]())
+                if spec.kind == "quantile":
+                    sketch.add_many(_numeric(values))
+                else:
+                    sketch.add_many(values)
+    return sketches
+
+
+def _scan(conn, table):
+    """Build a table's sketches in one read transaction -> (sketches, version they are current at)"""
+    conn.execute("BEGIN")
+    try:
+        version = table_version(conn, table)
+        sketches = build_sketches(conn, table, version)
+    finally:
+        conn.commit()
+    return sketches, version
+
+
+def _store(conn, table, sketches, version):
+    """Store rebuilt sketches unless newer ones were stored meanwhile"""
+    if version is None:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        stored = _state(conn, table)
+        if stored is None or stored[0] != version[0] or stored[1] < version[1]:
+            _save(conn, table, sketches, version, replace=True)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def rebuild_sketches(conn, table):
+    """
+    Rebuild and store the sketches of a table
+
+    The scan runs in a read transaction; the result is only stored if no
+    newer sketches were stored meanwhile.
+
+    Returns:
+        dict: (sketch name, group value) -> sketch
+    """
+    with trace(f"sketches.rebuild.{table}"):
+        sketches, version = _scan(conn, table)
+        _store(conn, table, sketches, version)
+    return sketches
+
+
+def record_insert(conn, table, row):
+    """
+    Fold a row just inserted on conn into the table's sketches
+
+    Call after the INSERT and before the commit. The version trigger has
+    already counted the insert, so the sketches are only updated if they
+    were current just before it; otherwise they are stale anyway and are
+    rebuilt on the next read.
+
+    Args:
+        conn: Database connection object with the insert pending
+        table: Table name
+        row: Tuple in TABLE_COLUMNS order, or dict of column -> value
+    """
+    if table not in SKETCHES:
+        return
+    if not isinstance(row, dict):
+        row = dict(zip(TABLE_COLUMNS[table], row))
+    version = table_version(conn, table)
+    state = _state(conn, table)
+    if version is None or state != (version[0], version[1] - 1):
+        return
+
+    stored = _load(conn, table)
+    changed = {}
+    for spec in SKETCHES[table]:
+        key = (sketch_name(spec), _group_value(spec, row))
+        sketch = stored.get(key) or SKETCH_TYPES[spec.kind]()
+        sketch.add_many(_numeric([row[spec.column]]) if spec.kind == "quantile" else [row[spec.column]])
+        changed[key] = sketch
+    _save(conn, table, changed, version)
+
+
+def record_update(conn, table, fields):
+    """
+    Keep a table's sketches current across an update on conn
+
+    Updates that do not touch a sketched or grouping column leave the
+    sketches valid, so only the stored version moves on. Other updates
+    (and deletes) leave them stale; they are rebuilt on the next read.
+
+    Args:
+        conn: Database connection object with the update pending
+        table: Table name
+        fields: Columns the update set
+    """
+    if table not in SKETCHES:
+        return
+    sketched = {spec.column for spec in SKETCHES[table]} | {spec.group_by for spec in SKETCHES[table]}
+    if sketched & set(fields):
+        return
+    version = table_version(conn, table)
+    if version is not None and _state(conn, table) == (version[0], version[1] - 1):
+        conn.execute("UPDATE sketch_state SET version = ? WHERE table_name = ?", (version[1], table))
+
+
+def record_archived(conn, table, before):
+    """
+    Keep a table's sketches current across archiving on conn
+
+    Archived rows leave the table but stay in <table>_history, which is
+    what the sketches (like the rollups) describe, so only the stored
+    version moves on, and only if the sketches were current before.
+
+    Args:
+        conn: Database connection object with the archiving delete pending
+        table: Table name
+        before: table_version(conn, table) read in the same transaction,
+            before the delete
+    """
+    if table not in SKETCHES or before is None:
+        return
+    version = table_version(conn, table)
+    if version is not None and _state(conn, table) == before:
+        conn.execute("UPDATE sketch_state SET version = ? WHERE table_name = ?", (version[1], table))
+
+
+def record_writes(conn, table, before, rows=(), updates=()):
+    """
+    Fold a batch of writes made on conn into the table's sketches
+
+    The batch form of record_insert and record_update, for writers that put
+    many rows in one transaction (see arg_database.write_queue). Call
+    before the commit. The sketches stay current only if they were current
+    at `before` and no update set a sketched column. Values that are not
+    numbers are left out of the quantile sketches, as a rebuild does.
+
+    Args:
+        conn: Database connection object with the writes pending
+        table: Table name
+        before: table_version(conn, table) read in the same transaction,
+            before the first write
+        rows: Inserted rows, as tuples in TABLE_COLUMNS order or dicts
+        updates: Field names set by each update
+    """
+    if table not in SKETCHES or before is None:
+        return
+    sketched = {spec.column for spec in SKETCHES[table]} | {spec.group_by for spec in SKETCHES[table]}
+    if any(sketched & set(fields) for fields in updates):
+        return
+    version = table_version(conn, table)
+    if version is None or _state(conn, table) != before:
+        return
+
+    values = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            row = dict(zip(TABLE_COLUMNS[table], row))
+        for spec in SKETCHES[table]:
+            values.setdefault((spec, _group_value(spec, row)), []).append(row[spec.column])
+    stored = _load(conn, table) if values else {}
+    changed = {}
+    for (spec, group), column_values in values.items():
+        key = (sketch_name(spec), group)
+        sketch = stored.get(key) or SKETCH_TYPES[spec.kind]()
+        sketch.add_many(_numeric(column_values) if spec.kind == "quantile" else column_values)
+        changed[key] = sketch
+    _save(conn, table, changed, version)
+
+
+def _rebuild(table):
+    """Rebuild a table's sketches outside any caller's connection -> (sketches, version they are current at)"""
+    conn = connection.get_read_connection()
+    try:
+        # Scanned on a reader; only storing the result waits for the write connection
+        with trace(f"sketches.rebuild.{table}"):
+            sketches, version = _scan(conn, table)
+    finally:
+        conn.close()
+    writer = connection.get_db_connection()
+    try:
+        _store(writer, table, sketches, version)
+    finally:
+        writer.close()
+    return sketches, version
+
+
+def _rebuild_in_background(table):
+    """Start rebuilding a table's sketches on a thread, unless this process already is"""
+    db_path = connection.DB_PATH
+
+    def run():
+        try:
+            sketches, version = _rebuild(table)
+            with _loaded_lock:
+                if connection.DB_PATH == db_path:
+                    _loaded[table] = (db_path, version, sketches)
+        except Exception:
+            logger.exception("Rebuilding the %s sketches failed", table)
+        finally:
+            with _loaded_lock:
+                _rebuilding.discard(table)
+
+    with _loaded_lock:
+        if table in _rebuilding:
+            return
+        _rebuilding.add(table)
+    threading.Thread(target=run, name=f"arg-sketches-{table}", daemon=True).start()
+
+
+def get_sketches(table):
+    """
+    Current sketches of a table
+
+    Decoded sketches are kept per process until the table version changes.
+    Stored sketches left stale by a delete or an update of a sketched
+    column are still served, without the rows changed since, while a
+    background thread rebuilds them; the rebuilt ones replace them here
+    once stored. Only a table that has never had sketches is scanned by
+    the caller.
+
+    Args:
+        table: A key of SKETCHES
+
+    Returns:
+        dict: (sketch name, group value) -> sketch
+    """
+    if table not in SKETCHES:
+        raise ValueError(f"No sketches for table: {table}")
+    version = current_version(table)
+    loaded = _loaded.get(table)
+    if loaded and loaded[0] == connection.DB_PATH and version is not None and loaded[1] == version:
+        return loaded[2]
+
+    conn = connection.get_read_connection()
+    try:
+        conn.execute("BEGIN")
+        try:
+            stored_version = table_version(conn, table)
+            state = _state(conn, table)
+            sketches = _load(conn, table) if state is not None else None
+        finally:
+            conn.commit()
+    finally:
+        conn.close()
+
+    current = True
+    if sketches is None:
+        sketches, stored_version = _rebuild(table)
+    elif stored_version is None or state != stored_version:
+        current = False
+        _rebuild_in_background(table)
+
+    with _loaded_lock:
+        # Unless a background rebuild has already finished and cached newer sketches
+        if current or table in _rebuilding:
+            _loaded[table] = (connection.DB_PATH, stored_version, sketches)
+    return sketches
+
+
+def _sketches_of(table, kind, column, group_by=None):
+    """Group value -> sketch for one SketchSpec"""
+    spec = SketchSpec(kind, column, group_by)
+    if spec not in SKETCHES.get(table, ()):
+        raise ValueError(f"No {kind} sketch for {table}.{column}" + (f" by {group_by}" if group_by else ""))
+    name = sketch_name(spec)
+    return {group: sketch for (key, group), sketch in get_sketches(table).items() if key == name}
+
+
+def quantile(table, column, q):
+    """
+    Approximate quantile of a column
+
+    Args:
+        table: Table name
+        column: Column with a quantile sketch in SKETCHES
+        q: Quantile between 0 and 1
+
+    Returns:
+        float: Estimated value, or None if the column has no values
+    """
+    sketch = _sketches_of(table, "quantile", column).get("")
+    return sketch.quantile(q) if sketch else None
+
+
+def group_quantiles(table, column, group_by, q):
+    """
+    Approximate quantile of a column within each group
+
+    Returns:
+        dict: Group value -> estimated quantile
+    """
+    return {group: sketch.quantile(q) for group, sketch in _sketches_of(table, "quantile", column, group_by).items()
+            if sketch.count}
+
+
+def distinct_count(table, column):
+    """
+    Approximate number of distinct values in a column
+
+    Returns:
+        int: Estimated distinct count
+    """
+    sketch = _sketches_of(table, "distinct", column).get("")
+    return sketch.count() if sketch else 0
@@ -0,0 +1,249 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import arg_database.connection as connection
+from arg_database.tables import VERSIONED_TABLES
+from arg_metrics.tracing import trace
+
+# Refresher thread, or None
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def snapshot_dir():
+    """
+    Directory holding the snapshots of the current database
+
+    ARG_SNAPSHOT_DIR overrides it; by default it sits next to the database
+    file, so each database (e.g. the synthetic benchmark ones) has its own.
+    A PostgreSQL database gets one in the same DATA directory.
+
+    Returns:
+        Path: Snapshot directory
+    """
+    configured = os.environ.get("ARG_SNAPSHOT_DIR")
+    if configured:
+        return Path(configured)
+    return connection.DB_PATH.parent / f"{connection.storage_name()}_snapshots"
+
+
+def table_version(conn, table):
+    """
+    Get the current generation and version of a table
+
+    Args:
+        conn: Database connection object
+        table: Table name
+
+    Returns:
+        tuple: (generation, version), or None if the table is not versioned
+    """
+    try:
+        row = conn.execute("SELECT generation, version FROM table_versions WHERE table_name = ?",
+                           (table,)).fetchone()
+    except sqlite3.OperationalError:
+        # Database created before table_versions existed
+        return None
+    return (row[0], row[1]) if row else None
+
+
+def snapshot_path(table, version):
+    """
+    File name of the snapshot of one table version
+
+    Args:
+        table: Table name
+        version: (generation, version) from table_version
+
+    Returns:
+        Path: Snapshot file path
+    """
+    generation, number = version
+    return snapshot_dir() / f"{table}.{generation}.{number}.arrow"
+
+
+def read_snapshot(table, version):
+    """
+    Memory-map the snapshot of a table version
+
+    Args:
+        table: Table name
+        version: (generation, version) from table_version
+
+    Returns:
+        pd.DataFrame: The table, or None if there is no usable snapshot
+    """
+    path = snapshot_path(table, version)
+    if not path.exists():
+        return None
+    try:
+        with trace(f"snapshot.read.{table}"):
+            return ipc.open_file(pa.memory_map(str(path))).read_all().to_pandas()
+    except (OSError, pa.ArrowException):
+        return None
+
+
+def write_snapshot(table, version, df):
+    """
+    Save a DataFrame as the snapshot of a table version
+
+    The file is written under a temporary name and renamed, so readers never
+    see a partial snapshot. Snapshots of older versions are removed.
+
+    Args:
+        table: Table name
+        version: (generation, version) the data was read at
+        df: Table contents
+
+    Returns:
+        Path: Snapshot path, or None if the data could not be converted
+    """
+    try:
+        arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowException, TypeError):
+        # E.g. a column mixing numbers and text; stay on SQLite for this table
+        return None
+
+    path = snapshot_path(table, version)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with trace(f"snapshot.write.{table}"):
+        with ipc.new_file(str(temp_path), arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+        os.replace(temp_path, path)
+
+    for old in path.parent.glob(f"{table}.*.arrow"):
+        if old != path:
+            try:
+                old.unlink()
+            except OSError:
+                # Still mapped by a reader on a platform that forbids deleting it
+                pass
+    return path
+
+
+def _read_from_database(conn, table):
+    """
+    Read a table and its version in one read transaction
+
+    Returns:
+        tuple: (DataFrame, version or None)
+    """
+    started = not conn.in_transaction
+    if started:
+        conn.execute("BEGIN")
+    try:
+        version = table_version(conn, table)
+        # Streamed through a server-side cursor on PostgreSQL
+        df = connection.read_frame(conn, f"SELECT * FROM {table}")
+    finally:
+        if started:
+            conn.commit()
+    return df, version
+
+
+def read_table(conn, table):
+    """
+    Load a whole table, from its snapshot when that is current
+
+    A snapshot is the table written as an uncompressed Arrow IPC file, named
+    after the table's generation and version in table_versions. Reading one
+    memory-maps the file, so the DataFrame is built almost without copying
+    (tens of ms for 5M tickets, against ~50 s for pandas over SELECT *).
+    When the snapshot is missing or stale the table is read from SQLite and
+    a fresh snapshot is written for the next cold load.
+
+    Args:
+        conn: Database connection object
+        table: One of VERSIONED_TABLES
+
+    Returns:
+        pd.DataFrame: The table contents
+    """
+    if table not in VERSIONED_TABLES:
+        raise ValueError(f"Unknown versioned table: {table}")
+
+    version = table_version(conn, table)
+    if version is not None:
+        df = read_snapshot(table, version)
+        if df is not None:
+            return df
+
+    df, version = _read_from_database(conn, table)
+    if version is not None and not df.empty:
+        write_snapshot(table, version, df)
+    return df
+
+
+def refresh_snapshots(tables=VERSIONED_TABLES):
+    """
+    Write a new snapshot for every table whose snapshot is stale
+
+    Args:
+        tables: Tables to check
+
+    Returns:
+        list: Names of the tables that were refreshed
+    """
+    refreshed = []
+    conn = connection.get_read_connection()
+    try:
+        for table in tables:
+            version = table_version(conn, table)
+            if version is None or snapshot_path(table, version).exists():
+                continue
+            df, version = _read_from_database(conn, table)
+            if not df.empty and write_snapshot(table, version, df):
+                refreshed.append(table)
+    finally:
+        conn.close()
+    return refreshed
+
+
+def start_snapshot_refresher(interval):
+    """
+    Refresh stale snapshots every `interval` seconds from a background thread
+
+    Keeps snapshots current after writes, so a cold load after a restart
+    does not have to read the tables from SQLite. Safe to call on every
+    rerun; only the first call starts a thread.
+
+    Args:
+        interval: Seconds between refreshes
+    """
+    global _refresher
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                refresh_snapshots()
+            except Exception:
+                # Keep refreshing; a failed round is retried next interval
+                pass
+
+    with _refresher_lock:
+        if _refresher is not None:
+            return
+        _refresher = threading.Thread(target=run, name="arg-snapshot-refresher", daemon=True)
+    _refresher.start()
+
+
+def start_snapshot_refresher_from_env():
+    """
+    Start the snapshot refresher if ARG_SNAPSHOT_INTERVAL (seconds) is set
+    """
+    interval = os.environ.get("ARG_SNAPSHOT_INTERVAL")
+    if interval:
+        start_snapshot_refresher(float(interval))
+
+
+if __name__ == "__main__":
+    # python -m arg_database.snapshots - refresh stale snapshots now
+    print("Refreshed:", ", ".join(refresh_snapshots()) or "nothing (all snapshots current)")
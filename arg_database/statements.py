@@ -0,0 +1,135 @@
+from functools import lru_cache
+
+# Columns that exist on each table, in table order. Only these names are
+# ever interpolated into SQL; everything else is passed as a parameter.
+TABLE_COLUMNS = {
+    "cyber_incidents": ("incident_id", "timestamp", "severity", "category", "status", "description"),
+    "datasets_metadata": ("dataset_id", "name", "rows", "columns", "uploaded_by", "upload_date"),
+    "it_tickets": ("ticket_id", "priority", "description", "status", "assigned_to", "created_at",
+                   "resolution_time_hours"),
+}
+
+# Type of each non-text column; everything else is text
+COLUMN_TYPES = {
+    "incident_id": int,
+    "dataset_id": int,
+    "rows": int,
+    "columns": int,
+    "ticket_id": int,
+    "resolution_time_hours": float,
+}
+
+# Primary key of each table (used in WHERE clauses, never updated)
+PRIMARY_KEYS = {
+    "cyber_incidents": "incident_id",
+    "datasets_metadata": "dataset_id",
+    "it_tickets": "ticket_id",
+}
+
+
+def check_columns(table, columns):
+    """
+    Validate a table name and a set of column names against the whitelist
+
+    Args:
+        table: Table name
+        columns: Iterable of column names
+
+    Returns:
+        tuple: The columns in canonical (table) order
+
+    Raises:
+        ValueError: If the table or any column is not whitelisted
+    """
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    allowed = TABLE_COLUMNS[table]
+    unknown = set(columns) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown column(s) for {table}: {', '.join(sorted(unknown))}")
+    # Sort into table order so the same fields always give the same SQL
+    return tuple(column for column in allowed if column in columns)
+
+
+@lru_cache(maxsize=None)
+def _build_update_sql(table, columns):
+    """
+    Generate the UPDATE statement for one table/column combination
+
+    Cached, so each distinct statement shape is built exactly once.
+
+    Args:
+        table: Whitelisted table name
+        columns: Tuple of whitelisted columns in canonical order
+
+    Returns:
+        str: Parameterised UPDATE statement
+    """
+    set_clause = ", ".join(f"{column} = ?" for column in columns)
+    return f"UPDATE {table} SET {set_clause} WHERE {PRIMARY_KEYS[table]} = ?"
+
+
+def update_statement(table, columns):
+    """
+    Get the prepared UPDATE statement for a set of columns
+
+    Args:
+        table: Table name
+        columns: Iterable of column names to set
+
+    Returns:
+        tuple: (sql, columns) - the SQL text and the column order its
+            parameters must follow
+
+    Raises:
+        ValueError: If nothing is being updated, a name is not whitelisted,
+            or the primary key is among the columns
+    """
+    columns = check_columns(table, columns)
+    if not columns:
+        raise ValueError("No fields given to update")
+    if PRIMARY_KEYS[table] in columns:
+        raise ValueError(f"{PRIMARY_KEYS[table]} cannot be updated")
+    return _build_update_sql(table, columns), columns
+
+
+def get_cursor(conn, sql):
+    """
+    Get a reusable cursor for a statement on this connection
+
+    Connections from get_db_connection() keep one cursor per SQL text; any
+    other connection simply gets a fresh cursor.
+
+    Args:
+        conn: Database connection object
+        sql: Statement the cursor will execute
+
+    Returns:
+        sqlite3.Cursor: Cursor to execute the statement with
+    """
+    cursors = getattr(conn, "statement_cursors", None)
+    if cursors is None:
+        return conn.cursor()
+    cursor = cursors.get(sql)
+    if cursor is None:
+        cursor = cursors[sql] = conn.cursor()
+    return cursor
+
+
+def execute_update(conn, table, key, fields):
+    """
+    Run a whitelisted single-row UPDATE through the statement registry
+
+    Args:
+        conn: Database connection object
+        table: Table name
+        key: Primary key value of the row to update
+        fields: Dict of column name -> new value
+
+    Returns:
+        int: Number of rows updated
+    """
+    sql, columns = update_statement(table, fields.keys())
+    cursor = get_cursor(conn, sql)
+    cursor.execute(sql, [fields[column] for column in columns] + [key])
+    return cursor.rowcount
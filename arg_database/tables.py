@@ -1,3 +1,14 @@
+import secrets
+
+from arg_database.connection import is_postgres
+
+# Text search indexes on PostgreSQL (see initialize_search_tables): index name -> table
+POSTGRES_SEARCH_INDEXES = {"cyber_incidents_fts": "cyber_incidents", "it_tickets_fts": "it_tickets"}
+
+# Indexed document of a row on PostgreSQL; 'simple' splits words without stemming, like the FTS5 tables
+SEARCH_VECTOR = "to_tsvector('simple', COALESCE(description, ''))"
+
+
 def create_users_table(conn):
     """
     Create users table for authentication
@@ -183,6 +194,935 @@ def create_tickets_table(conn):
     conn.commit()
 
 
+def create_dataset_profiles_table(conn):
+    """
+    Create dataset profiles table (measured facts about uploaded dataset files)
+
+    Table structure:
+        - dataset_id: Primary key, the datasets_metadata row profiled
+        - file_name: Name of the profiled file
+        - file_format: csv or parquet
+        - byte_size: File size in bytes
+        - column_profiles: JSON list of {name, dtype, null_count, null_rate}
+        - profiled_at: When the file was profiled
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS dataset_profiles
+                   (
+                       dataset_id
+                       INTEGER
+                       PRIMARY
+                       KEY,
+                       file_name
+                       TEXT
+                       NOT
+                       NULL,
+                       file_format
+                       TEXT
+                       NOT
+                       NULL,
+                       byte_size
+                       INTEGER
+                       NOT
+                       NULL,
+                       column_profiles
+                       TEXT
+                       NOT
+                       NULL,
+                       profiled_at
+                       TEXT
+                       DEFAULT
+                       CURRENT_TIMESTAMP
+                   )
+                   """)
+    conn.commit()
+
+
+def create_incidents_search_table(conn):
+    """
+    Create the full-text search index over cyber incident descriptions
+
+    The FTS5 table is an external-content index on cyber_incidents, so the
+    description text is stored once and only the search index is added.
+    Triggers keep the index in sync with every insert, update and delete.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS cyber_incidents_fts USING fts5(
+            description,
+            content='cyber_incidents',
+            content_rowid='incident_id'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS cyber_incidents_fts_insert
+        AFTER INSERT ON cyber_incidents BEGIN
+            INSERT INTO cyber_incidents_fts(rowid, description)
+            VALUES (new.incident_id, new.description);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS cyber_incidents_fts_delete
+        AFTER DELETE ON cyber_incidents BEGIN
+            INSERT INTO cyber_incidents_fts(cyber_incidents_fts, rowid, description)
+            VALUES ('delete', old.incident_id, old.description);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS cyber_incidents_fts_update
+        AFTER UPDATE OF incident_id, description ON cyber_incidents BEGIN
+            INSERT INTO cyber_incidents_fts(cyber_incidents_fts, rowid, description)
+            VALUES ('delete', old.incident_id, old.description);
+            INSERT INTO cyber_incidents_fts(rowid, description)
+            VALUES (new.incident_id, new.description);
+        END;
+    """)
+    conn.commit()
+
+
+def create_tickets_search_table(conn):
+    """
+    Create the full-text search index over IT ticket descriptions
+
+    Works the same way as the incidents index: an external-content FTS5
+    table on it_tickets kept in sync by triggers.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS it_tickets_fts USING fts5(
+            description,
+            content='it_tickets',
+            content_rowid='ticket_id'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_fts_insert
+        AFTER INSERT ON it_tickets BEGIN
+            INSERT INTO it_tickets_fts(rowid, description)
+            VALUES (new.ticket_id, new.description);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_fts_delete
+        AFTER DELETE ON it_tickets BEGIN
+            INSERT INTO it_tickets_fts(it_tickets_fts, rowid, description)
+            VALUES ('delete', old.ticket_id, old.description);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_fts_update
+        AFTER UPDATE OF ticket_id, description ON it_tickets BEGIN
+            INSERT INTO it_tickets_fts(it_tickets_fts, rowid, description)
+            VALUES ('delete', old.ticket_id, old.description);
+            INSERT INTO it_tickets_fts(rowid, description)
+            VALUES (new.ticket_id, new.description);
+        END;
+    """)
+    conn.commit()
+
+
+def rebuild_search_index(conn, fts_table):
+    """
+    Rebuild a full-text search index from its content table
+
+    Needed after rows are written without the sync triggers in place,
+    e.g. when a table has been bulk loaded or recreated.
+
+    Args:
+        conn: Database connection object
+        fts_table: Name of the FTS5 table (cyber_incidents_fts or it_tickets_fts)
+    """
+    if fts_table not in ("cyber_incidents_fts", "it_tickets_fts"):
+        raise ValueError(f"Unknown search index: {fts_table}")
+    cursor = conn.cursor()
+    if is_postgres():
+        cursor.execute(f"REINDEX INDEX {fts_table}")
+        return
+    cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+    conn.commit()
+
+
+def initialize_search_tables(conn):
+    """
+    Create both full-text search indexes and backfill any existing rows
+
+    On PostgreSQL the indexes are GIN indexes over SEARCH_VECTOR of the
+    description, which the database keeps current itself.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    if is_postgres():
+        for index, table in POSTGRES_SEARCH_INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} USING gin ({SEARCH_VECTOR})")
+        conn.commit()
+        return
+
+    # Check which indexes are new before creating them
+    cursor.execute("SELECT name FROM sqlite_master WHERE name IN ('cyber_incidents_fts', 'it_tickets_fts')")
+    existing = {row[0] for row in cursor.fetchall()}
+
+    create_incidents_search_table(conn)
+    create_tickets_search_table(conn)
+
+    # A freshly created index is empty, so populate it from the base table
+    for fts_table in ("cyber_incidents_fts", "it_tickets_fts"):
+        if fts_table not in existing:
+            rebuild_search_index(conn, fts_table)
+
+
+def create_archiving_table(conn):
+    """
+    Create the archiving table: tables the archiver is moving rows out of
+
+    archive.archive_table lists its table here for the length of its own
+    transaction, so no other connection ever sees the row. The rollup and
+    forecast delete triggers do nothing while it is listed: an archived
+    row has moved to <table>_history, it has not gone away.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE IF NOT EXISTS archiving (table_name TEXT PRIMARY KEY)")
+    conn.commit()
+
+
+def drop_outdated_triggers(conn, triggers, marker):
+    """
+    Drop triggers whose SQL lacks marker, so CREATE TRIGGER IF NOT EXISTS installs the current version
+
+    Args:
+        conn: Database connection object
+        triggers: Trigger names
+        marker: Text the current version of each trigger contains
+
+    Returns:
+        bool: Whether any trigger was dropped
+    """
+    placeholders = ", ".join("?" * len(triggers))
+    rows = conn.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+                        tuple(triggers)).fetchall()
+    outdated = [name for name, sql in rows if marker not in sql]
+    for name in outdated:
+        conn.execute(f"DROP TRIGGER {name}")
+    return bool(outdated)
+
+
+def create_ticket_rollup_table(conn):
+    """
+    Create the daily ticket rollup and the triggers that maintain it
+
+    One row per staff member, status and creation day with the ticket count
+    and the count, sum and sum of squares of resolution times, so per-staff
+    and per-status statistics (see arg_database.analytics) read a few
+    hundred rollup rows instead of every ticket. Triggers keep it in step
+    with every insert, update and delete, except the deletes of the
+    archiver: an archived ticket still counts (see create_archiving_table).
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS ticket_daily_rollup (
+            assigned_to TEXT NOT NULL,
+            status TEXT NOT NULL,
+            day TEXT NOT NULL,
+            ticket_count INTEGER NOT NULL,
+            resolution_count INTEGER NOT NULL,
+            resolution_sum REAL NOT NULL,
+            resolution_sumsq REAL NOT NULL,
+            PRIMARY KEY (assigned_to, status, day)
+        );
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_rollup_insert
+        AFTER INSERT ON it_tickets BEGIN
+            INSERT INTO ticket_daily_rollup VALUES (
+                COALESCE(new.assigned_to, ''), COALESCE(new.status, ''), COALESCE(date(new.created_at), ''), 1,
+                new.resolution_time_hours IS NOT NULL, COALESCE(new.resolution_time_hours, 0),
+                COALESCE(new.resolution_time_hours * new.resolution_time_hours, 0))
+            ON CONFLICT (assigned_to, status, day) DO UPDATE SET
+                ticket_count = ticket_count + 1,
+                resolution_count = resolution_count + excluded.resolution_count,
+                resolution_sum = resolution_sum + excluded.resolution_sum,
+                resolution_sumsq = resolution_sumsq + excluded.resolution_sumsq;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_rollup_delete
+        AFTER DELETE ON it_tickets
+        WHEN NOT EXISTS (SELECT 1 FROM archiving WHERE table_name = 'it_tickets') BEGIN
+            UPDATE ticket_daily_rollup SET
+                ticket_count = ticket_count - 1,
+                resolution_count = resolution_count - (old.resolution_time_hours IS NOT NULL),
+                resolution_sum = resolution_sum - COALESCE(old.resolution_time_hours, 0),
+                resolution_sumsq = resolution_sumsq - COALESCE(old.resolution_time_hours * old.resolution_time_hours, 0)
+            WHERE assigned_to = COALESCE(old.assigned_to, '') AND status = COALESCE(old.status, '')
+              AND day = COALESCE(date(old.created_at), '');
+            DELETE FROM ticket_daily_rollup
+            WHERE assigned_to = COALESCE(old.assigned_to, '') AND status = COALESCE(old.status, '')
+              AND day = COALESCE(date(old.created_at), '') AND ticket_count <= 0;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_rollup_update
+        AFTER UPDATE OF assigned_to, status, created_at, resolution_time_hours ON it_tickets BEGIN
+            UPDATE ticket_daily_rollup SET
+                ticket_count = ticket_count - 1,
+                resolution_count = resolution_count - (old.resolution_time_hours IS NOT NULL),
+                resolution_sum = resolution_sum - COALESCE(old.resolution_time_hours, 0),
+                resolution_sumsq = resolution_sumsq - COALESCE(old.resolution_time_hours * old.resolution_time_hours, 0)
+            WHERE assigned_to = COALESCE(old.assigned_to, '') AND status = COALESCE(old.status, '')
+              AND day = COALESCE(date(old.created_at), '');
+            DELETE FROM ticket_daily_rollup
+            WHERE assigned_to = COALESCE(old.assigned_to, '') AND status = COALESCE(old.status, '')
+              AND day = COALESCE(date(old.created_at), '') AND ticket_count <= 0;
+            INSERT INTO ticket_daily_rollup VALUES (
+                COALESCE(new.assigned_to, ''), COALESCE(new.status, ''), COALESCE(date(new.created_at), ''), 1,
+                new.resolution_time_hours IS NOT NULL, COALESCE(new.resolution_time_hours, 0),
+                COALESCE(new.resolution_time_hours * new.resolution_time_hours, 0))
+            ON CONFLICT (assigned_to, status, day) DO UPDATE SET
+                ticket_count = ticket_count + 1,
+                resolution_count = resolution_count + excluded.resolution_count,
+                resolution_sum = resolution_sum + excluded.resolution_sum,
+                resolution_sumsq = resolution_sumsq + excluded.resolution_sumsq;
+        END;
+    """)
+    conn.commit()
+
+
+def create_incident_rollup_table(conn):
+    """
+    Create the daily incident rollup and the triggers that maintain it
+
+    One row per category, status and day with the number of incidents;
+    daily counts per category (for CUSUM surge detection) and backlog per
+    category are sums over it. Like the ticket rollup it keeps counting
+    archived incidents.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS incident_daily_rollup (
+            category TEXT NOT NULL,
+            status TEXT NOT NULL,
+            day TEXT NOT NULL,
+            incident_count INTEGER NOT NULL,
+            PRIMARY KEY (category, status, day)
+        );
+
+        CREATE TRIGGER IF NOT EXISTS cyber_incidents_rollup_insert
+        AFTER INSERT ON cyber_incidents BEGIN
+            INSERT INTO incident_daily_rollup
+            VALUES (COALESCE(new.category, ''), COALESCE(new.status, ''), COALESCE(date(new.timestamp), ''), 1)
+            ON CONFLICT (category, status, day) DO UPDATE SET incident_count = incident_count + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS cyber_incidents_rollup_delete
+        AFTER DELETE ON cyber_incidents
+        WHEN NOT EXISTS (SELECT 1 FROM archiving WHERE table_name = 'cyber_incidents') BEGIN
+            UPDATE incident_daily_rollup SET incident_count = incident_count - 1
+            WHERE category = COALESCE(old.category, '') AND status = COALESCE(old.status, '')
+              AND day = COALESCE(date(old.timestamp), '');
+            DELETE FROM incident_daily_rollup
+            WHERE category = COALESCE(old.category, '') AND status = COALESCE(old.status, '')
+              AND day = COALESCE(date(old.timestamp), '') AND incident_count <= 0;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS cyber_incidents_rollup_update
+        AFTER UPDATE OF category, status, timestamp ON cyber_incidents BEGIN
+            UPDATE incident_daily_rollup SET incident_count = incident_count - 1
+            WHERE category = COALESCE(old.category, '') AND status = COALESCE(old.status, '')
+              AND day = COALESCE(date(old.timestamp), '');
+            DELETE FROM incident_daily_rollup
+            WHERE category = COALESCE(old.category, '') AND status = COALESCE(old.status, '')
+              AND day = COALESCE(date(old.timestamp), '') AND incident_count <= 0;
+            INSERT INTO incident_daily_rollup
+            VALUES (COALESCE(new.category, ''), COALESCE(new.status, ''), COALESCE(date(new.timestamp), ''), 1)
+            ON CONFLICT (category, status, day) DO UPDATE SET incident_count = incident_count + 1;
+        END;
+    """)
+    conn.commit()
+
+
+def rebuild_rollups(conn):
+    """
+    Recompute both rollup tables from their base tables
+
+    Needed after rows are written without the rollup triggers in place.
+    Archived rows are included (the history views are read once they
+    exist). Nothing to do on PostgreSQL, where the rollups are views.
+
+    Args:
+        conn: Database connection object
+    """
+    from arg_database.archive import history_source
+
+    if is_postgres():
+        return
+    cursor = conn.cursor()
+    cursor.executescript(f"""
+        DELETE FROM ticket_daily_rollup;
+        INSERT INTO ticket_daily_rollup
+        SELECT COALESCE(assigned_to, ''), COALESCE(status, ''), COALESCE(date(created_at), ''), COUNT(*), COUNT(resolution_time_hours),
+               COALESCE(SUM(resolution_time_hours), 0),
+               COALESCE(SUM(resolution_time_hours * resolution_time_hours), 0)
+        FROM {history_source(conn, 'it_tickets')}
+        GROUP BY 1, 2, 3;
+
+        DELETE FROM incident_daily_rollup;
+        INSERT INTO incident_daily_rollup
+        SELECT COALESCE(category, ''), COALESCE(status, ''), COALESCE(date(timestamp), ''), COUNT(*)
+        FROM {history_source(conn, 'cyber_incidents')}
+        GROUP BY 1, 2, 3;
+    """)
+    conn.commit()
+
+
+def initialize_rollup_tables(conn):
+    """
+    Create the rollup tables and backfill them if they are new
+
+    On PostgreSQL they are created as views instead (see
+    create_postgres_rollup_views).
+
+    Args:
+        conn: Database connection object
+    """
+    if is_postgres():
+        create_postgres_rollup_views(conn)
+        return
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name IN ('ticket_daily_rollup', 'incident_daily_rollup')")
+    existing = cursor.fetchone()[0]
+    # Delete triggers from before archived rows were kept
+    outdated = drop_outdated_triggers(conn, ("it_tickets_rollup_delete", "cyber_incidents_rollup_delete"), "archiving")
+
+    create_ticket_rollup_table(conn)
+    create_incident_rollup_table(conn)
+
+    # New rollups start empty, and the outdated triggers dropped archived rows, so fill them from the base tables
+    if existing < 2 or outdated:
+        rebuild_rollups(conn)
+
+
+def create_postgres_rollup_views(conn):
+    """
+    Create the rollups as views over the base tables (PostgreSQL)
+
+    Same names and columns as the SQLite rollup tables, so
+    arg_database.analytics reads them unchanged. PostgreSQL aggregates the
+    base tables on each read instead of keeping the rollups up to date with
+    row triggers; days are the date part of text timestamps, '' when there
+    is none.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE OR REPLACE VIEW ticket_daily_rollup AS
+        SELECT COALESCE(assigned_to, '') AS assigned_to, COALESCE(status, '') AS status,
+               CASE WHEN created_at ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}' THEN substr(created_at, 1, 10) ELSE '' END AS day,
+               COUNT(*) AS ticket_count, COUNT(resolution_time_hours) AS resolution_count,
+               COALESCE(SUM(resolution_time_hours), 0) AS resolution_sum,
+               COALESCE(SUM(resolution_time_hours * resolution_time_hours), 0) AS resolution_sumsq
+        FROM it_tickets
+        GROUP BY 1, 2, 3;
+
+        CREATE OR REPLACE VIEW incident_daily_rollup AS
+        SELECT COALESCE(category, '') AS category, COALESCE(status, '') AS status,
+               CASE WHEN timestamp ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}' THEN substr(timestamp, 1, 10) ELSE '' END AS day,
+               COUNT(*) AS incident_count
+        FROM cyber_incidents
+        GROUP BY 1, 2, 3;
+    """)
+    conn.commit()
+
+
+# Tables whose writes are counted in table_versions
+VERSIONED_TABLES = ("cyber_incidents", "datasets_metadata", "it_tickets", "dataset_profiles")
+
+
+def create_table_versions_table(conn):
+    """
+    Create the table_versions table and its write triggers
+
+    Every insert, update or delete on a versioned table bumps that table's
+    version, so anything derived from a table (e.g. a snapshot in
+    arg_database.snapshots) can tell whether it is still current. The
+    generation is random per database, so versions of a recreated database
+    never match files made from an older one.
+
+    Table structure:
+        - table_name: Primary key
+        - generation: Random id of the database the counter belongs to
+        - version: Number of writes so far
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS table_versions
+                   (
+                       table_name
+                       TEXT
+                       PRIMARY
+                       KEY,
+                       generation
+                       TEXT
+                       NOT
+                       NULL,
+                       version
+                       INTEGER
+                       NOT
+                       NULL
+                       DEFAULT
+                       0
+                   )
+                   """)
+    for table in VERSIONED_TABLES:
+        cursor.execute(
+            "INSERT INTO table_versions (table_name, generation) VALUES (?, ?) ON CONFLICT (table_name) DO NOTHING",
+            (table, secrets.token_hex(8))
+        )
+        create_version_triggers(conn, table)
+    conn.commit()
+
+
+def create_version_triggers(conn, table):
+    """
+    Create the triggers that bump a table's version on every write
+
+    Needed again if the table is ever recreated (dropping a table drops
+    its triggers).
+
+    Args:
+        conn: Database connection object
+        table: One of VERSIONED_TABLES
+    """
+    if table not in VERSIONED_TABLES:
+        raise ValueError(f"Unknown versioned table: {table}")
+    if is_postgres():
+        create_postgres_version_triggers(conn, table)
+        return
+    cursor = conn.cursor()
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"""
+                       CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+                       AFTER {event} ON {table}
+                       BEGIN
+                           UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                       END
+                       """)
+    conn.commit()
+
+
+def create_postgres_version_triggers(conn, table):
+    """
+    Create the version triggers of a table on PostgreSQL
+
+    Statement-level, so a bulk write (e.g. a COPY) bumps the version once.
+    Each write also takes the write lock shared before it starts (see
+    postgres.WRITE_LOCK_KEY).
+
+    Args:
+        conn: Database connection object
+        table: One of VERSIONED_TABLES
+    """
+    from arg_database.postgres import WRITE_LOCK_KEY
+
+    cursor = conn.cursor()
+    cursor.executescript(f"""
+        CREATE OR REPLACE FUNCTION track_table_write() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_WHEN = 'BEFORE' THEN
+                PERFORM pg_advisory_xact_lock_shared({WRITE_LOCK_KEY});
+            ELSE
+                UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+            END IF;
+            RETURN NULL;
+        END
+        $$;
+
+        CREATE OR REPLACE TRIGGER {table}_write_lock
+        BEFORE INSERT OR UPDATE OR DELETE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION track_table_write();
+
+        CREATE OR REPLACE TRIGGER {table}_version
+        AFTER INSERT OR UPDATE OR DELETE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION track_table_write();
+    """)
+    conn.commit()
+
+
+def create_sketch_tables(conn):
+    """
+    Create the tables holding the column sketches (see arg_database.sketches)
+
+    column_sketches:
+        - table_name, sketch, group_value: Primary key (group_value is ''
+          for sketches over the whole table)
+        - data: Serialized sketch
+
+    sketch_state:
+        - table_name: Primary key
+        - generation, version: Table version the table's sketches are
+          current at (compared with table_versions)
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS column_sketches
+                   (
+                       table_name
+                       TEXT
+                       NOT
+                       NULL,
+                       sketch
+                       TEXT
+                       NOT
+                       NULL,
+                       group_value
+                       TEXT
+                       NOT
+                       NULL,
+                       data
+                       BLOB
+                       NOT
+                       NULL,
+                       PRIMARY
+                       KEY
+                   (
+                       table_name,
+                       sketch,
+                       group_value
+                   )
+                       )
+                   """)
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS sketch_state
+                   (
+                       table_name
+                       TEXT
+                       PRIMARY
+                       KEY,
+                       generation
+                       TEXT
+                       NOT
+                       NULL,
+                       version
+                       INTEGER
+                       NOT
+                       NULL
+                   )
+                   """)
+    conn.commit()
+
+
+def create_forecast_tables(conn):
+    """
+    Create the tables behind the resolution-time forecast (see arg_database.forecasting)
+
+    forecast_changes:
+        - change_id: Autoincrement primary key (never reused, so the model's
+          watermark stays valid after old changes are pruned)
+        - sign: 1 when a resolved ticket appears, -1 when one goes away
+        - priority, assigned_to, created_at, resolution_time_hours: The
+          ticket's values at that point
+
+    forecast_state:
+        - model: Primary key
+        - watermark: Last change_id folded into the model file
+        - trained_rows: Number of tickets the model is fitted on
+
+    Triggers log every resolved ticket (with a resolution time) that is
+    inserted, deleted or changed, so the model is refit from the log
+    instead of from every ticket. Archived tickets are not logged as
+    deleted: the model keeps learning from them (see
+    create_archiving_table).
+
+    Args:
+        conn: Database connection object
+    """
+    if is_postgres():
+        create_postgres_forecast_tables(conn)
+        return
+    # The delete trigger from before archived tickets were kept
+    outdated = drop_outdated_triggers(conn, ("it_tickets_forecast_delete",), "archiving")
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS forecast_changes (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sign INTEGER NOT NULL,
+            priority TEXT,
+            assigned_to TEXT,
+            created_at TEXT,
+            resolution_time_hours REAL NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS forecast_state (
+            model TEXT PRIMARY KEY,
+            watermark INTEGER NOT NULL,
+            trained_rows INTEGER NOT NULL
+        );
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_forecast_insert
+        AFTER INSERT ON it_tickets
+        WHEN new.status = 'Resolved' AND new.resolution_time_hours IS NOT NULL BEGIN
+            INSERT INTO forecast_changes (sign, priority, assigned_to, created_at, resolution_time_hours)
+            VALUES (1, new.priority, new.assigned_to, new.created_at, new.resolution_time_hours);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_forecast_delete
+        AFTER DELETE ON it_tickets
+        WHEN old.status = 'Resolved' AND old.resolution_time_hours IS NOT NULL
+         AND NOT EXISTS (SELECT 1 FROM archiving WHERE table_name = 'it_tickets') BEGIN
+            INSERT INTO forecast_changes (sign, priority, assigned_to, created_at, resolution_time_hours)
+            VALUES (-1, old.priority, old.assigned_to, old.created_at, old.resolution_time_hours);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_forecast_update
+        AFTER UPDATE OF priority, status, assigned_to, created_at, resolution_time_hours ON it_tickets BEGIN
+            INSERT INTO forecast_changes (sign, priority, assigned_to, created_at, resolution_time_hours)
+            SELECT -1, old.priority, old.assigned_to, old.created_at, old.resolution_time_hours
+            WHERE old.status = 'Resolved' AND old.resolution_time_hours IS NOT NULL;
+            INSERT INTO forecast_changes (sign, priority, assigned_to, created_at, resolution_time_hours)
+            SELECT 1, new.priority, new.assigned_to, new.created_at, new.resolution_time_hours
+            WHERE new.status = 'Resolved' AND new.resolution_time_hours IS NOT NULL;
+        END;
+    """)
+    if outdated:
+        # Its model has unlearned the archived tickets; the next refresh refits from the history view
+        cursor.execute("DELETE FROM forecast_state")
+    conn.commit()
+
+
+def create_postgres_forecast_tables(conn):
+    """
+    Create the forecast tables and their change-logging trigger on PostgreSQL
+
+    Same tables as create_forecast_tables; one row trigger logs what the
+    three SQLite triggers do.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS forecast_changes (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sign INTEGER NOT NULL,
+            priority TEXT,
+            assigned_to TEXT,
+            created_at TEXT,
+            resolution_time_hours REAL NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS forecast_state (
+            model TEXT PRIMARY KEY,
+            watermark INTEGER NOT NULL,
+            trained_rows INTEGER NOT NULL
+        );
+
+        CREATE OR REPLACE FUNCTION log_forecast_change() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' AND OLD.status = 'Resolved' AND OLD.resolution_time_hours IS NOT NULL THEN
+                INSERT INTO forecast_changes (sign, priority, assigned_to, created_at, resolution_time_hours)
+                VALUES (-1, OLD.priority, OLD.assigned_to, OLD.created_at, OLD.resolution_time_hours);
+            END IF;
+            IF TG_OP <> 'DELETE' AND NEW.status = 'Resolved' AND NEW.resolution_time_hours IS NOT NULL THEN
+                INSERT INTO forecast_changes (sign, priority, assigned_to, created_at, resolution_time_hours)
+                VALUES (1, NEW.priority, NEW.assigned_to, NEW.created_at, NEW.resolution_time_hours);
+            END IF;
+            RETURN NULL;
+        END
+        $$;
+
+        CREATE OR REPLACE TRIGGER it_tickets_forecast
+        AFTER INSERT OR DELETE OR UPDATE OF priority, status, assigned_to, created_at, resolution_time_hours
+        ON it_tickets FOR EACH ROW EXECUTE FUNCTION log_forecast_change();
+    """)
+    conn.commit()
+
+
+def create_dedup_tables(conn):
+    """
+    Create the near-duplicate index tables (see arg_database.dedup)
+
+    cyber_incidents_lsh, it_tickets_lsh:
+        - bucket: Hash of one band of a description's MinHash signature
+        - row_id: Row whose description falls in the bucket
+        - Primary key (bucket, row_id), so the rows of a bucket are one
+          index range
+
+    dedup_pending:
+        - table_name, row_id: Primary key; rows whose description still has
+          to be indexed
+
+    Triggers queue every inserted row and every description change. A new
+    index table queues all existing rows.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE name IN ('cyber_incidents_lsh', 'it_tickets_lsh')")
+    existing = {row[0] for row in cursor.fetchall()}
+
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS dedup_pending (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            PRIMARY KEY (table_name, row_id)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS cyber_incidents_lsh (
+            bucket INTEGER NOT NULL,
+            row_id INTEGER NOT NULL,
+            PRIMARY KEY (bucket, row_id)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS it_tickets_lsh (
+            bucket INTEGER NOT NULL,
+            row_id INTEGER NOT NULL,
+            PRIMARY KEY (bucket, row_id)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER IF NOT EXISTS cyber_incidents_dedup_insert AFTER INSERT ON cyber_incidents BEGIN
+            INSERT OR IGNORE INTO dedup_pending VALUES ('cyber_incidents', new.incident_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS cyber_incidents_dedup_update
+        AFTER UPDATE OF description ON cyber_incidents BEGIN
+            INSERT OR IGNORE INTO dedup_pending VALUES ('cyber_incidents', new.incident_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS cyber_incidents_dedup_delete AFTER DELETE ON cyber_incidents BEGIN
+            DELETE FROM dedup_pending WHERE table_name = 'cyber_incidents' AND row_id = old.incident_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_dedup_insert AFTER INSERT ON it_tickets BEGIN
+            INSERT OR IGNORE INTO dedup_pending VALUES ('it_tickets', new.ticket_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_dedup_update
+        AFTER UPDATE OF description ON it_tickets BEGIN
+            INSERT OR IGNORE INTO dedup_pending VALUES ('it_tickets', new.ticket_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS it_tickets_dedup_delete AFTER DELETE ON it_tickets BEGIN
+            DELETE FROM dedup_pending WHERE table_name = 'it_tickets' AND row_id = old.ticket_id;
+        END;
+    """)
+
+    # New index tables start empty, so queue the rows already there
+    if "cyber_incidents_lsh" not in existing:
+        cursor.execute("INSERT OR IGNORE INTO dedup_pending SELECT 'cyber_incidents', incident_id FROM cyber_incidents")
+    if "it_tickets_lsh" not in existing:
+        cursor.execute("INSERT OR IGNORE INTO dedup_pending SELECT 'it_tickets', ticket_id FROM it_tickets")
+    conn.commit()
+
+
+def create_jobs_table(conn):
+    """
+    Create the jobs table behind the background job runner (see arg_database.jobs)
+
+    Table structure:
+        - job_id: Autoincrement primary key
+        - kind: One of arg_database.jobs.JOB_KINDS
+        - params: JSON object of keyword arguments for the job
+        - status: queued, running, succeeded, failed or cancelled
+        - progress: Fraction done (0-1) and message: what the job is doing
+        - result: JSON result of a succeeded job; error: last failure
+        - attempts / max_attempts: Runs so far and the limit before it fails
+        - run_after: Unix time before which a queued job is not started
+          (retries back off)
+        - cancel_requested: Set by cancel_job; a running job stops at its
+          next progress report
+        - worker: Process id of the worker running it
+        - submitted_by, created_at, started_at, finished_at, updated_at:
+          Who submitted it and when it changed (Unix times)
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress REAL NOT NULL DEFAULT 0,
+            message TEXT,
+            result TEXT,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 1,
+            run_after REAL NOT NULL DEFAULT 0,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            worker INTEGER,
+            submitted_by TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            updated_at REAL NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, run_after);
+    """)
+    conn.commit()
+
+
+def create_seed_history_table(conn):
+    """
+    Create the seed_history table (one row per table seeded from CSV)
+
+    Table structure:
+        - table_name: Primary key
+        - source: CSV file the rows came from, or 'existing' if the table
+          already had data when seeding first ran
+        - row_count: Number of rows inserted
+        - seeded_at: When seeding ran
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS seed_history
+                   (
+                       table_name
+                       TEXT
+                       PRIMARY
+                       KEY,
+                       source
+                       TEXT
+                       NOT
+                       NULL,
+                       row_count
+                       INTEGER
+                       NOT
+                       NULL,
+                       seeded_at
+                       TEXT
+                       DEFAULT
+                       CURRENT_TIMESTAMP
+                   )
+                   """)
+    conn.commit()
+
+
 def initialize_all_tables(conn):
     """
     Initialize all database tables
@@ -191,7 +1131,23 @@ def initialize_all_tables(conn):
     Args:
         conn: Database connection object
     """
+    from arg_database.archive import create_history_views
+
     create_users_table(conn)
     create_cyber_incidents_table(conn)
     create_datasets_table(conn)
-    create_tickets_table(conn)
\ No newline at end of file
+    create_tickets_table(conn)
+    create_dataset_profiles_table(conn)
+    initialize_search_tables(conn)
+    if not is_postgres():
+        create_archiving_table(conn)
+    initialize_rollup_tables(conn)
+    create_table_versions_table(conn)
+    create_seed_history_table(conn)
+    create_sketch_tables(conn)
+    create_forecast_tables(conn)
+    create_jobs_table(conn)
+    # The near-duplicate index and the archive are SQLite-only
+    if not is_postgres():
+        create_dedup_tables(conn)
+        create_history_views(conn)
\ No newline at end of file
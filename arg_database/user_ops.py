@@ -1,4 +1,4 @@
-from arg_database.connection import get_db_connection
+from arg_database.connection import get_db_connection, get_read_connection
 
 
 def add_user(username, password_hash, role):
@@ -14,18 +14,18 @@ def add_user(username, password_hash, role):
         int: The newly created user's ID
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Insert new user record
-    cursor.execute(
-        "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-        (username, password_hash, role)
-    )
-    conn.commit()
-
-    # Get the ID of the newly created user
-    user_id = cursor.lastrowid
-    conn.close()
+    try:
+        cursor = conn.cursor()
+
+        # Insert new user record and get its ID (RETURNING works on SQLite and PostgreSQL alike)
+        cursor.execute(
+            "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?) RETURNING id",
+            (username, password_hash, role)
+        )
+        user_id = cursor.fetchone()[0]
+        conn.commit()
+    finally:
+        conn.close()
 
     return user_id
 
@@ -38,16 +38,17 @@ def get_user(username):
         username: The username to search for
 
     Returns:
-        sqlite3.Row: User record if found, None otherwise
+        sqlite3.Row: User record if found (a postgres.Row on PostgreSQL), None otherwise
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Query for user by username
-    cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-
-    conn.close()
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+
+        # Query for user by username
+        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
+        user = cursor.fetchone()
+    finally:
+        conn.close()
     return user
 
 
@@ -61,12 +62,13 @@ def check_user_exists(username):
     Returns:
         bool: True if username exists, False otherwise
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Check if any user exists with this username
-    cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-    exists = cursor.fetchone() is not None
-
-    conn.close()
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+
+        # Check if any user exists with this username
+        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
+        exists = cursor.fetchone() is not None
+    finally:
+        conn.close()
     return exists
\ No newline at end of file
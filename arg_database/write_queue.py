@@ -0,0 +1,365 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+import arg_database.connection as connection
+from arg_database.dedup import DEDUP_TABLES, INDEX_BATCH_ROWS, index_pending
+from arg_database.sketches import record_writes
+from arg_database.snapshots import table_version
+from arg_database.statements import TABLE_COLUMNS, execute_update, update_statement
+from arg_metrics.tracing import get_gauge, get_histogram, trace
+
+logger = logging.getLogger(__name__)
+
+# A group commit takes at most this many writes...
+MAX_BATCH_WRITES = 5000
+
+# ...and waits at most this long (seconds) after its first write for more to arrive
+MAX_BATCH_DELAY = 0.01
+
+# Writes waiting to be committed before submitting blocks the caller
+MAX_QUEUE_DEPTH = 100_000
+
+# While writes keep arriving, up to INDEX_BATCH_ROWS rows are added to the
+# near-duplicate index after every this many group commits
+INDEX_EVERY_BATCHES = 4
+
+# One queued write: kind is "insert", "update" or "flush" (a marker that only waits for the writes ahead of it)
+Write = namedtuple("Write", ["kind", "table", "key", "values", "future", "queued_at"])
+
+# Process-wide queue, started on first use (see get_write_queue)
+_queue = None
+_queue_lock = threading.Lock()
+
+
+class WriteQueue:
+    """
+    Write-behind queue that commits incoming inserts and updates in groups
+
+    Callers get a Future for each write and carry on; one background thread
+    takes writes off the queue and applies up to MAX_BATCH_WRITES of them,
+    or whatever arrived within MAX_BATCH_DELAY of the first, in a single
+    transaction under the process's write connection. A burst of N writes
+    therefore costs one commit (one fsync) instead of N. A Future is only
+    resolved once the commit holding its write has returned, so
+    future.result() is the durability acknowledgement; it raises the
+    write's error instead if the write was rejected (e.g. a duplicate id).
+    future.cancel() withdraws a write until the thread takes it off the
+    queue.
+
+    Consecutive inserts into one table go in with connection.bulk_insert
+    (COPY on PostgreSQL), and the sketches are brought up to date once per
+    batch, as data_loader does per row. Indexing descriptions for the
+    near-duplicate check costs about as much as the insert itself, so it
+    is left out of the group commits and done a slice (INDEX_BATCH_ROWS
+    rows) at a time: after every INDEX_EVERY_BATCHES commits under a
+    steady feed, and slice after slice whenever the queue runs empty. The
+    backlog a find_duplicates call has to index first stays small.
+
+    Metrics: the "write_queue.depth" gauge holds the number of writes
+    waiting and "write_queue.batch_writes" the size of the last group
+    commit; "write_queue.commit" times each group commit and
+    "write_queue.ack" each write from submission to acknowledgement.
+    """
+
+    def __init__(self, max_batch_writes=MAX_BATCH_WRITES, max_batch_delay=MAX_BATCH_DELAY,
+                 max_depth=MAX_QUEUE_DEPTH):
+        self.max_batch_writes = max_batch_writes
+        self.max_batch_delay = max_batch_delay
+        self._queue = queue.Queue(max_depth)
+        self._depth = get_gauge("write_queue.depth")
+        self._batch_size = get_gauge("write_queue.batch_writes")
+        self._ack = get_histogram("write_queue.ack")
+        self._stats_lock = threading.Lock()
+        self._stats = {"committed": 0, "failed": 0, "batches": 0}
+        # Tables with inserts not yet in the near-duplicate index
+        self._unindexed = set()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="arg-write-queue", daemon=True)
+        self._thread.start()
+
+    def insert(self, table, row):
+        """
+        Queue an insert
+
+        Args:
+            table: Table name (a key of TABLE_COLUMNS)
+            row: Tuple in TABLE_COLUMNS order, or dict of column -> value
+                (missing columns are NULL)
+
+        Returns:
+            Future: Resolves to None once the row is committed
+
+        Raises:
+            ValueError: If the table, a column or the row length is wrong
+        """
+        if table not in TABLE_COLUMNS:
+            raise ValueError(f"Unknown table: {table}")
+        columns = TABLE_COLUMNS[table]
+        if isinstance(row, dict):
+            unknown = set(row) - set(columns)
+            if unknown:
+                raise ValueError(f"Unknown column(s) for {table}: {', '.join(sorted(unknown))}")
+            row = tuple(row.get(column) for column in columns)
+        elif len(row) != len(columns):
+            raise ValueError(f"{table} rows have {len(columns)} values, got {len(row)}")
+        return self._submit("insert", table, None, tuple(row))
+
+    def update(self, table, key, **fields):
+        """
+        Queue a single-row update (the queued form of data_loader.update_*)
+
+        Args:
+            table: Table name
+            key: Primary key value of the row
+            **fields: Columns to set
+
+        Returns:
+            Future: Resolves to the number of rows updated (0 if there is no
+                such row) once the update is committed
+
+        Raises:
+            ValueError: If a field is not a column of the table
+        """
+        update_statement(table, fields.keys())
+        return self._submit("update", table, key, fields)
+
+    def flush(self, timeout=None):
+        """
+        Wait until every write queued so far is committed
+
+        Args:
+            timeout: Seconds to wait at most (None waits as long as it takes)
+
+        Raises:
+            TimeoutError: If the writes are not committed in time
+        """
+        self._submit("flush", None, None, None).result(timeout)
+
+    def close(self):
+        """Commit what is queued and stop the background thread; later writes raise RuntimeError"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        """
+        Counters since the queue started
+
+        Returns:
+            dict: depth (writes waiting), committed and failed writes, and
+                the number of group commits (batches)
+        """
+        with self._stats_lock:
+            return {"depth": self._queue.qsize(), **self._stats}
+
+    def _submit(self, kind, table, key, values):
+        if self._closed:
+            raise RuntimeError("The write queue is closed")
+        future = Future()
+        # Blocks while the queue is full, so a feed cannot outrun the database indefinitely
+        self._queue.put(Write(kind, table, key, values, future, time.perf_counter()))
+        self._depth.set(self._queue.qsize())
+        return future
+
+    def _run(self):
+        stopping = False
+        batches = 0
+        while not stopping:
+            # With rows left to index, an idle queue indexes them a slice at a time instead of waiting
+            try:
+                write = self._queue.get(block=not self._unindexed)
+            except queue.Empty:
+                self._index_pending()
+                continue
+            if write is None:
+                break
+            batch = [write]
+            deadline = time.monotonic() + self.max_batch_delay
+            while len(batch) < self.max_batch_writes:
+                try:
+                    write = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if write is None:
+                    stopping = True
+                    break
+                batch.append(write)
+            self._depth.set(self._queue.qsize())
+            # Writes cancelled while they waited are dropped; from here on the rest cannot be cancelled
+            batch = [write for write in batch if write.future.set_running_or_notify_cancel()]
+            try:
+                if batch:
+                    self._commit(batch)
+                batches += 1
+                if self._unindexed and (stopping or batches % INDEX_EVERY_BATCHES == 0):
+                    self._index_pending()
+            except Exception as e:
+                # Whatever went wrong, the thread keeps serving the writes behind this batch
+                logger.exception("The write queue failed to commit a batch")
+                for write in batch:
+                    if not write.future.done():
+                        write.future.set_exception(e)
+
+    def _commit(self, batch):
+        """Apply a batch in one transaction and resolve its Futures"""
+        writes = [write for write in batch if write.kind != "flush"]
+        results = {}
+        if writes:
+            self._batch_size.set(len(writes))
+            try:
+                conn = connection.get_db_connection()
+                try:
+                    with trace("write_queue.commit"):
+                        try:
+                            results = self._apply(conn, writes)
+                        except Exception:
+                            conn.rollback()
+                            # Some write was rejected; redo them one by one so only that one fails
+                            results = self._apply(conn, writes, isolate=True)
+                finally:
+                    conn.close()
+            except Exception as e:
+                results = {id(write): e for write in writes}
+
+        failed = 0
+        now = time.perf_counter()
+        for write in batch:
+            result = results.get(id(write))
+            if isinstance(result, Exception):
+                failed += 1
+                write.future.set_exception(result)
+            else:
+                write.future.set_result(result)
+            if write.kind != "flush":
+                self._ack.observe(now - write.queued_at)
+        with self._stats_lock:
+            self._stats["committed"] += len(writes) - failed
+            self._stats["failed"] += failed
+            self._stats["batches"] += 1 if writes else 0
+
+    def _apply(self, conn, writes, isolate=False):
+        """
+        Apply writes and commit
+
+        With isolate, each write runs under its own savepoint and a failure
+        is returned as that write's result instead of being raised.
+
+        Returns:
+            dict: id(write) -> rows updated (updates) or exception (rejected writes)
+        """
+        # The write lock is taken first, so no other writer can move a table's version under the sketches
+        conn.execute("BEGIN IMMEDIATE")
+        results = {}
+        before = {}
+        inserted = {}
+        updated = {}
+        for run in ([[write] for write in writes] if isolate else _runs(writes)):
+            first = run[0]
+            if first.table not in before:
+                before[first.table] = table_version(conn, first.table)
+            if isolate:
+                conn.execute("SAVEPOINT queued_write")
+            try:
+                if first.kind == "insert":
+                    connection.bulk_insert(conn, first.table, TABLE_COLUMNS[first.table],
+                                           [write.values for write in run])
+                else:
+                    results[id(first)] = execute_update(conn, first.table, first.key, first.values)
+            except Exception as e:
+                if not isolate:
+                    raise
+                conn.execute("ROLLBACK TO SAVEPOINT queued_write")
+                conn.execute("RELEASE SAVEPOINT queued_write")
+                results[id(first)] = e
+                continue
+            if isolate:
+                conn.execute("RELEASE SAVEPOINT queued_write")
+            if first.kind == "insert":
+                inserted.setdefault(first.table, []).extend(write.values for write in run)
+            else:
+                updated.setdefault(first.table, []).append(first.values.keys())
+
+        for table, version in before.items():
+            # The writes stand even if the sketches cannot take them; rolled back, they are stale and get rebuilt
+            conn.execute("SAVEPOINT queued_sketches")
+            try:
+                record_writes(conn, table, version, inserted.get(table, ()), updated.get(table, ()))
+            except Exception:
+                conn.execute("ROLLBACK TO SAVEPOINT queued_sketches")
+                logger.exception("Updating the %s sketches failed; they will be rebuilt", table)
+            conn.execute("RELEASE SAVEPOINT queued_sketches")
+        conn.commit()
+        self._unindexed.update(table for table in inserted if table in DEDUP_TABLES)
+        return results
+
+    def _index_pending(self):
+        """Add up to INDEX_BATCH_ROWS rows per table to the near-duplicate index"""
+        tables, self._unindexed = self._unindexed, set()
+        try:
+            conn = connection.get_db_connection()
+            try:
+                for table in tables:
+                    if index_pending(conn, table, max_rows=INDEX_BATCH_ROWS) == INDEX_BATCH_ROWS:
+                        # Possibly more left; the next slice takes them
+                        self._unindexed.add(table)
+                    conn.commit()
+            finally:
+                conn.close()
+        except Exception:
+            # Still queued in dedup_pending; the next find_duplicates or catch-up indexes them
+            pass
+
+
+def _runs(writes):
+    """Split writes into runs that go in with one statement: consecutive inserts into one table, or one update"""
+    runs = []
+    for write in writes:
+        if (write.kind == "insert" and runs and runs[-1][0].kind == "insert"
+                and runs[-1][0].table == write.table):
+            runs[-1].append(write)
+        else:
+            runs.append([write])
+    return runs
+
+
+def get_write_queue():
+    """
+    This process's write queue, started on first use
+
+    Whatever is still queued is committed when the process exits normally.
+
+    Returns:
+        WriteQueue: The queue
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WriteQueue()
+            atexit.register(_queue.close)
+    return _queue
+
+
+def queue_insert(table, row):
+    """
+    Queue an insert on the process's write queue (see WriteQueue.insert)
+
+    Returns:
+        Future: Resolves once the row is committed
+    """
+    return get_write_queue().insert(table, row)
+
+
+def queue_update(table, key, **fields):
+    """
+    Queue an update on the process's write queue (see WriteQueue.update)
+
+    Returns:
+        Future: Resolves to the number of rows updated once committed
+    """
+    return get_write_queue().update(table, key, **fields)
@@ -0,0 +1,53 @@
+import time
+from contextlib import contextmanager
+
+from arg_metrics.tracing import get_histogram
+
+# Active recording, or None when nobody is collecting section timings
+_recording = None
+
+
+@contextmanager
+def section(name):
+    """
+    Time a named section of a page script
+
+    Every section is recorded in the "section.<name>" latency histogram
+    (see arg_metrics.tracing). Individual timings are also kept while a
+    recording started with start_recording() is active.
+
+    Args:
+        name: Section name, e.g. "data load" or "figure: Severity Distribution"
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        get_histogram(f"section.{name}").observe(elapsed)
+        if _recording is not None:
+            _recording.append((name, elapsed))
+
+
+def start_recording():
+    """
+    Start collecting section timings (replaces any recording in progress)
+    """
+    global _recording
+    _recording = []
+
+
+def stop_recording():
+    """
+    Stop collecting section timings
+
+    Returns:
+        dict: Section name -> total seconds spent in it
+    """
+    global _recording
+    recorded, _recording = _recording or [], None
+
+    totals = {}
+    for name, seconds in recorded:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return totals
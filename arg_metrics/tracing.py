@@ -0,0 +1,312 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds (50us up to 60s, roughly x2 apart)
+BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"),
+)
+
+# Operation name -> Histogram, shared by every session in this process
+_histograms = {}
+_registry_lock = threading.Lock()
+
+# Gauge name -> Gauge, likewise
+_gauges = {}
+
+# HTTP exporter started by start_http_exporter(), if any
+_exporter = None
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram for one operation
+
+    Recording is a bisect and a few increments under a lock, so it is cheap
+    enough to leave on for every call. Percentiles are estimated by linear
+    interpolation inside the bucket that contains them.
+    """
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Record one duration in seconds"""
+        index = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds < self.min:
+                self.min = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """
+        Estimate a quantile of the recorded durations
+
+        Args:
+            q: Quantile between 0 and 1 (e.g. 0.95)
+
+        Returns:
+            float: Estimated duration in seconds (0.0 if nothing recorded)
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = max(BUCKETS[index - 1] if index else 0.0, self.min)
+                upper = min(BUCKETS[index], self.max)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+
+class Gauge:
+    """
+    Current value of something that goes up and down (e.g. a queue depth)
+
+    Also keeps the highest value set since start (or the last reset()).
+    """
+
+    def __init__(self):
+        self.value = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        """Set the current value"""
+        with self._lock:
+            self.value = value
+            if value > self.peak:
+                self.peak = value
+
+
+def get_histogram(name):
+    """
+    Get (or create) the histogram for an operation
+
+    Args:
+        name: Operation name, e.g. "data_loader.load_it_tickets"
+
+    Returns:
+        Histogram: The operation's histogram
+    """
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _registry_lock:
+            histogram = _histograms.setdefault(name, Histogram())
+    return histogram
+
+
+def get_gauge(name):
+    """
+    Get (or create) a gauge
+
+    Args:
+        name: Gauge name, e.g. "write_queue.depth"
+
+    Returns:
+        Gauge: The gauge
+    """
+    gauge = _gauges.get(name)
+    if gauge is None:
+        with _registry_lock:
+            gauge = _gauges.setdefault(name, Gauge())
+    return gauge
+
+
+@contextmanager
+def trace(name):
+    """
+    Time a block of code and record it under an operation name
+
+    Args:
+        name: Operation name
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_histogram(name).observe(time.perf_counter() - start)
+
+
+def traced(name=None):
+    """
+    Decorator that records the latency of every call to a function
+
+    Args:
+        name: Operation name (defaults to "<module>.<function>", using the
+            last part of the module path)
+
+    Returns:
+        Callable: The decorator
+    """
+    def decorate(func):
+        operation = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+        histogram = get_histogram(operation)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+def snapshot():
+    """
+    Summarise every operation recorded so far
+
+    Returns:
+        list: One dict per operation (name, count, mean/p50/p95/p99/max in
+            milliseconds), sorted by name
+    """
+    rows = []
+    for name, histogram in sorted(_histograms.items()):
+        if histogram.count == 0:
+            continue
+        rows.append({
+            "operation": name,
+            "count": histogram.count,
+            "mean_ms": histogram.total / histogram.count * 1000,
+            "p50_ms": histogram.quantile(0.50) * 1000,
+            "p95_ms": histogram.quantile(0.95) * 1000,
+            "p99_ms": histogram.quantile(0.99) * 1000,
+            "max_ms": histogram.max * 1000,
+        })
+    return rows
+
+
+def gauges():
+    """
+    Current value and peak of every gauge
+
+    Returns:
+        list: One dict per gauge (name, value, peak), sorted by name
+    """
+    return [{"gauge": name, "value": gauge.value, "peak": gauge.peak} for name, gauge in sorted(_gauges.items())]
+
+
+def reset():
+    """Clear all recorded latencies, and bring gauge peaks down to the current values"""
+    with _registry_lock:
+        for histogram in _histograms.values():
+            with histogram._lock:
+                histogram.counts = [0] * len(BUCKETS)
+                histogram.count = 0
+                histogram.total = 0.0
+                histogram.min = float("inf")
+                histogram.max = 0.0
+        for gauge in _gauges.values():
+            with gauge._lock:
+                gauge.peak = gauge.value
+
+
+def render_prometheus():
+    """
+    Render all histograms and gauges in the Prometheus text exposition format
+
+    Returns:
+        str: Metrics text for arg_operation_duration_seconds and arg_gauge
+    """
+    lines = [
+        "# HELP arg_operation_duration_seconds Latency of instrumented A.R.G.U.S. operations",
+        "# TYPE arg_operation_duration_seconds histogram",
+    ]
+    for name, histogram in sorted(_histograms.items()):
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, histogram.counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'arg_operation_duration_seconds_bucket{{operation="{label}",le="{le}"}} {cumulative}')
+        lines.append(f'arg_operation_duration_seconds_sum{{operation="{label}"}} {histogram.total}')
+        lines.append(f'arg_operation_duration_seconds_count{{operation="{label}"}} {histogram.count}')
+    if _gauges:
+        lines.append("# HELP arg_gauge Current value of instrumented A.R.G.U.S. gauges")
+        lines.append("# TYPE arg_gauge gauge")
+        for name, gauge in sorted(_gauges.items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'arg_gauge{{gauge="{label}"}} {gauge.value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """
+    Write the Prometheus text to a file (e.g. for node_exporter's textfile collector)
+
+    The file is written to a temporary name and renamed, so scrapers never
+    see a half-written file.
+
+    Args:
+        path: Destination file path
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(render_prometheus())
+    os.replace(temp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves render_prometheus() on /metrics"""
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep scrapes out of the Streamlit console
+        pass
+
+
+def start_http_exporter(port, host="127.0.0.1"):
+    """
+    Serve the metrics on http://host:port/metrics from a background thread
+
+    Safe to call on every rerun; only the first call starts a server.
+
+    Args:
+        port: Port to listen on
+        host: Interface to bind (local only by default)
+    """
+    global _exporter
+    with _registry_lock:
+        if _exporter is not None:
+            return
+        _exporter = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    threading.Thread(target=_exporter.serve_forever, name="arg-metrics-exporter", daemon=True).start()
+
+
+def start_exporter_from_env():
+    """
+    Start the HTTP exporter if ARG_METRICS_PORT is set
+    """
+    port = os.environ.get("ARG_METRICS_PORT")
+    if port:
+        start_http_exporter(port)
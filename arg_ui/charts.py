@@ -0,0 +1,104 @@
+import hashlib
+import json
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from arg_metrics.tracing import trace
+from arg_ui.downsample import box_summary_figure
+
+# Figure kinds built by our own functions instead of Plotly Express
+CUSTOM_BUILDERS = {
+    "box_summary": box_summary_figure,
+}
+
+
+def _as_frame(data):
+    """
+    Normalise chart input to a DataFrame
+
+    A Series (e.g. the result of value_counts()) becomes two columns, "x"
+    for the index and "y" for the values, which are the names Plotly Express
+    uses for array arguments - so labels={'x': ..., 'y': ...} keep working.
+    """
+    if isinstance(data, pd.Series):
+        return pd.DataFrame({"x": data.index, "y": data.values})
+    return data
+
+
+def figure_key(kind, frame, spec):
+    """
+    Hash the aggregated chart input together with the chart spec
+
+    Args:
+        kind: Plotly Express function name ("bar", "pie", ...)
+        frame: DataFrame the chart is drawn from
+        spec: Keyword arguments for the Plotly Express call
+
+    Returns:
+        str: Hex digest identifying this exact figure
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(kind.encode())
+    digest.update(json.dumps(spec, sort_keys=True, default=str).encode())
+    digest.update(json.dumps([str(c) for c in frame.columns]).encode())
+    try:
+        digest.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+    except TypeError:
+        # Unhashable cells (e.g. lists of outliers) - fall back to the JSON form
+        digest.update(frame.to_json(orient="split").encode())
+    return digest.hexdigest()
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _build_figure(key, kind, _frame, _spec, _layout):
+    """
+    Build a figure once per key; shared by every session in the process
+
+    Only key and kind are hashed by Streamlit (the underscored arguments are
+    already folded into the key).
+    """
+    with trace(f"chart.build.{kind}"):
+        builder = CUSTOM_BUILDERS.get(kind) or getattr(px, kind)
+        fig = builder(_frame, **_spec)
+        if _layout:
+            fig.update_layout(**_layout)
+    return fig
+
+
+def cached_figure(kind, data, layout=None, **spec):
+    """
+    Get a Plotly Express figure, building it only when its input changes
+
+    Figures are cached process-wide, keyed on a hash of the aggregated data
+    plus the chart spec, so reruns that don't change the data skip figure
+    construction and validation entirely. Cached figures are shared: treat
+    the returned figure as read-only and pass layout changes via layout=.
+
+    Args:
+        kind: Plotly Express function name ("bar", "pie", "box", "scatter", ...)
+            or a CUSTOM_BUILDERS name such as "box_summary"
+        data: Aggregated DataFrame or Series to plot
+        layout: Optional dict passed to fig.update_layout()
+        **spec: Keyword arguments for the Plotly Express call
+
+    Returns:
+        plotly.graph_objects.Figure: The (possibly cached) figure
+    """
+    frame = _as_frame(data)
+    key = figure_key(kind, frame, {**spec, "_layout": layout})
+    return _build_figure(key, kind, frame, spec, layout)
+
+
+def plotly_chart(kind, data, layout=None, **spec):
+    """
+    Render a cached Plotly Express figure at full container width
+
+    Args:
+        kind: Plotly Express function name or a CUSTOM_BUILDERS name
+        data: Aggregated DataFrame or Series to plot
+        layout: Optional dict passed to fig.update_layout()
+        **spec: Keyword arguments for the Plotly Express call
+    """
+    st.plotly_chart(cached_figure(kind, data, layout=layout, **spec), use_container_width=True)
@@ -0,0 +1,107 @@
+import streamlit as st
+
+from arg_database.data_loader import (
+    load_cyber_incidents, load_datasets_metadata, load_it_tickets, load_dataset_profiles
+)
+from arg_database.invalidation import table_version
+
+
+# Table name -> loader
+LOADERS = {
+    "cyber_incidents": load_cyber_incidents,
+    "datasets_metadata": load_datasets_metadata,
+    "it_tickets": load_it_tickets,
+    "dataset_profiles": load_dataset_profiles,
+}
+
+
+@st.cache_resource(show_spinner=False, max_entries=2 * len(LOADERS))
+def _cached_table(table, version):
+    """
+    One version of a table, shared by all sessions in this process
+
+    The version is only part of the cache key: a write from any server
+    process bumps it, so the next read here misses the cache and loads the
+    new data (from the snapshot the first process to reload writes). Room
+    for two versions per table keeps the old copy alive for sessions still
+    rendering it.
+    """
+    return LOADERS[table]()
+
+
+def cached_table(table):
+    """
+    Current contents of a table, cached until any process writes to it
+
+    The DataFrame is not copied per session, so treat it as read-only.
+
+    Args:
+        table: Table name (a key of LOADERS)
+
+    Returns:
+        pd.DataFrame: The table contents
+    """
+    return _cached_table(table, table_version(table))
+
+
+def cached_cyber_incidents():
+    """
+    Cyber incidents shared by all sessions until the next write (read-only)
+
+    Returns:
+        pd.DataFrame: DataFrame containing cyber incident data
+    """
+    return cached_table("cyber_incidents")
+
+
+def cached_datasets_metadata():
+    """
+    Dataset metadata shared by all sessions until the next write (read-only)
+
+    Returns:
+        pd.DataFrame: DataFrame containing dataset metadata
+    """
+    return cached_table("datasets_metadata")
+
+
+def cached_it_tickets():
+    """
+    IT tickets shared by all sessions until the next write (read-only)
+
+    Returns:
+        pd.DataFrame: DataFrame containing IT ticket data
+    """
+    return cached_table("it_tickets")
+
+
+def cached_dataset_profiles():
+    """
+    Dataset file profiles shared by all sessions until the next write (read-only)
+
+    Returns:
+        pd.DataFrame: DataFrame containing dataset profiles
+    """
+    return cached_table("dataset_profiles")
+
+
+def refresh_after_write(table, message, fragments, forget=()):
+    """
+    Finish a create/update/delete callback with a targeted refresh
+
+    The write already bumped the table's version, so the cached copy is
+    replaced on the next read. This clears widget state that should go back
+    to its defaults (e.g. the create form after a successful create) and
+    reruns only the named fragments instead of the whole page. Must be called from
+    a widget callback (on_click / on_change).
+
+    Args:
+        table: Table that was written to (kept for callers; the version
+            bump does the invalidation)
+        message: Confirmation shown as a toast
+        fragments: Keys of the fragments that show this table
+        forget: Widget keys to reset
+    """
+    for key in forget:
+        st.session_state.pop(key, None)
+    st.toast(message)
+    st.rerun(list(fragments))
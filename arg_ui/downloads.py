@@ -0,0 +1,86 @@
+import streamlit as st
+
+from arg_database.export import EXPORT_FORMATS, build_export_query
+from arg_database.export_server import export_url
+from arg_ui.jobs import show_jobs, submit
+
+
+def show_filters(df, columns, key):
+    """
+    Display one multiselect per column and return the chosen values
+
+    Args:
+        df: DataFrame the options are taken from
+        columns: Dict of column name -> label
+        key: Prefix for the widget keys
+
+    Returns:
+        dict: Column name -> list of selected values (empty = no filter)
+    """
+    filters = {}
+    for col, (column, label) in zip(st.columns(len(columns)), columns.items()):
+        with col:
+            options = sorted(df[column].dropna().unique().tolist())
+            filters[column] = st.multiselect(label, options, key=f"{key}_{column}")
+    return filters
+
+
+def apply_filters(df, filters):
+    """
+    Keep the rows of a DataFrame that match every non-empty filter
+
+    Args:
+        df: DataFrame to filter
+        filters: Dict of column name -> list of accepted values
+
+    Returns:
+        pd.DataFrame: Matching rows (df itself if no filter is set)
+    """
+    for column, values in filters.items():
+        if values:
+            df = df[df[column].isin(values)]
+    return df
+
+
+def _submit_export(table, fmt, filters, search, fragments):
+    """Queue an export job (button callback)"""
+    try:
+        build_export_query(table, filters, search)
+    except ValueError as e:
+        st.toast(f"Cannot export: {e}")
+        return
+    submit("export", {"table": table, "fmt": fmt, "filters": filters, "search": search},
+           f"Preparing the {EXPORT_FORMATS[fmt]['label']} export in the background", fragments)
+
+
+def show_export(table, filters=None, search=None, key="export", fragments=()):
+    """
+    Display export controls for a table with the current filters applied
+
+    With the export server running (ARG_EXPORT_PORT) the button is a signed
+    link and the file is streamed from SQLite in constant memory. Without it
+    the button queues an export job that writes the file in the background;
+    the job list below it offers the file once it is ready.
+
+    Args:
+        table: Table name
+        filters: Dict of column name -> list of accepted values
+        search: Description search text
+        key: Prefix for the widget keys
+        fragments: Keys of the fragments containing the controls (none: the
+            whole page)
+    """
+    col1, col2 = st.columns([1, 3], vertical_alignment="bottom")
+    with col1:
+        fmt = st.selectbox("Export format", list(EXPORT_FORMATS),
+                           format_func=lambda name: EXPORT_FORMATS[name]["label"], key=f"{key}_format")
+    with col2:
+        label = f"Export {EXPORT_FORMATS[fmt]['label']}"
+        url = export_url(table, fmt, filters, search, st.session_state.get("username"))
+        if url:
+            st.link_button(label, url)
+        else:
+            st.button(label, key=f"{key}_submit", on_click=_submit_export,
+                      args=(table, fmt, filters, search, fragments))
+    if not url:
+        show_jobs(f"{key}_jobs", kinds=["export"], params={"table": table}, fragments=fragments, limit=3)
@@ -0,0 +1,171 @@
+import math
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Most points a scatter plot sends to the browser
+MAX_SCATTER_POINTS = 5_000
+
+# Most outliers drawn per box
+MAX_OUTLIERS_PER_BOX = 200
+
+
+def box_stats(df, x, y, max_outliers=MAX_OUTLIERS_PER_BOX, seed=0):
+    """
+    Precompute box plot statistics per group instead of shipping raw rows
+
+    Quartiles use linear interpolation and whiskers follow Tukey's rule
+    (furthest point within 1.5 IQR of the box), matching Plotly's own box
+    plots. A bounded random sample of outliers is kept for each group.
+
+    Args:
+        df: Raw DataFrame
+        x: Grouping column (one box per value)
+        y: Numeric column
+        max_outliers: Most outliers kept per group
+        seed: Random seed for outlier sampling
+
+    Returns:
+        pd.DataFrame: One row per group with x, count, q1, median, q3,
+            lowerfence, upperfence, mean and an 'outliers' list column
+    """
+    data = df[[x, y]].dropna()
+    grouped = data.groupby(x, sort=True)[y]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "median", "q3"]
+    stats["count"] = grouped.size()
+    stats["mean"] = grouped.mean()
+
+    # Whiskers reach the furthest data point inside the 1.5 IQR fences
+    iqr = stats["q3"] - stats["q1"]
+    low_limit = data[x].map(stats["q1"] - 1.5 * iqr)
+    high_limit = data[x].map(stats["q3"] + 1.5 * iqr)
+    inside = data[(data[y] >= low_limit) & (data[y] <= high_limit)].groupby(x)[y]
+    stats["lowerfence"] = inside.min()
+    stats["upperfence"] = inside.max()
+
+    # Keep only a bounded sample of the outliers
+    outliers = data[(data[y] < low_limit) | (data[y] > high_limit)]
+    outliers = stratified_sample(outliers, x, max_outliers * max(len(stats), 1), seed=seed,
+                                 per_group_cap=max_outliers)
+    stats["outliers"] = outliers.groupby(x)[y].agg(list).reindex(stats.index)
+    stats["outliers"] = stats["outliers"].apply(lambda values: values if isinstance(values, list) else [])
+
+    return stats.reset_index()
+
+
+def box_summary_figure(stats, x, y, labels=None, title=None):
+    """
+    Draw box plots from box_stats() output
+
+    Args:
+        stats: DataFrame returned by box_stats()
+        x: Name of the grouping column in stats
+        y: Name of the measured column (used for the axis label)
+        labels: Optional axis label overrides, like Plotly Express labels=
+        title: Chart title
+
+    Returns:
+        plotly.graph_objects.Figure: Box plot figure
+    """
+    labels = labels or {}
+    fig = go.Figure(go.Box(
+        x=stats[x].astype(str),
+        q1=stats["q1"], median=stats["median"], q3=stats["q3"],
+        lowerfence=stats["lowerfence"], upperfence=stats["upperfence"],
+        mean=stats["mean"], name=labels.get(y, y), showlegend=False,
+    ))
+
+    # Outliers as a separate point trace (precomputed boxes can't carry them)
+    outlier_x = [group for group, values in zip(stats[x].astype(str), stats["outliers"]) for _ in values]
+    outlier_y = [value for values in stats["outliers"] for value in values]
+    if outlier_y:
+        fig.add_trace(go.Scatter(x=outlier_x, y=outlier_y, mode="markers", name="Outliers",
+                                 marker={"size": 4, "opacity": 0.6}, showlegend=False))
+
+    fig.update_layout(title=title, template="plotly",
+                      xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y))
+    return fig
+
+
+def stratified_sample(df, by, max_points=MAX_SCATTER_POINTS, seed=0, per_group_cap=None):
+    """
+    Downsample rows while keeping each group's share of the data
+
+    Every group keeps at least one row, so small groups never disappear
+    from the chart.
+
+    Args:
+        df: DataFrame to sample
+        by: Column to stratify on
+        max_points: Target number of rows
+        seed: Random seed (same input and seed give the same sample)
+        per_group_cap: Optional maximum rows per group
+
+    Returns:
+        pd.DataFrame: The sampled rows (df itself if it is already small enough)
+    """
+    if len(df) <= max_points and per_group_cap is None:
+        return df
+
+    fraction = min(1.0, max_points / max(len(df), 1))
+    sizes = df.groupby(by)[by].transform("size")
+    quota = np.maximum(1, np.ceil(sizes * fraction))
+    if per_group_cap is not None:
+        quota = np.minimum(quota, per_group_cap)
+
+    # Rank rows randomly within their group and keep each group's quota
+    rng = np.random.default_rng(seed)
+    order = pd.Series(rng.random(len(df)), index=df.index).groupby(df[by]).rank(method="first")
+    return df[order <= quota]
+
+
+def density_bins(df, x, y, bins=60):
+    """
+    Aggregate points into a 2-D grid for density-style scatter plots
+
+    Args:
+        df: DataFrame with numeric x and y columns
+        x: X column
+        y: Y column
+        bins: Number of bins along each axis
+
+    Returns:
+        pd.DataFrame: Non-empty bins with their centre x, y and a 'count'
+    """
+    data = df[[x, y]].dropna()
+    if data.empty:
+        return pd.DataFrame(columns=[x, y, "count"])
+
+    counts, x_edges, y_edges = np.histogram2d(data[x], data[y], bins=bins)
+    x_centres = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centres = (y_edges[:-1] + y_edges[1:]) / 2
+    xi, yi = np.nonzero(counts)
+    return pd.DataFrame({x: x_centres[xi], y: y_centres[yi], "count": counts[xi, yi].astype(int)})
+
+
+def scatter_points(df, x, y, by=None, max_points=MAX_SCATTER_POINTS):
+    """
+    Pick the rows a scatter plot should draw
+
+    Small tables are drawn as-is. Larger ones are stratified-sampled on
+    `by` when given, otherwise density-binned.
+
+    Args:
+        df: Raw DataFrame
+        x: X column
+        y: Y column
+        by: Optional column to stratify the sample on
+        max_points: Most points to draw
+
+    Returns:
+        tuple: (DataFrame to plot, description of what was done or None)
+    """
+    if len(df) <= max_points:
+        return df, None
+    if by is not None:
+        sample = stratified_sample(df, by, max_points)
+        return sample, f"Showing a stratified sample of {len(sample):,} of {len(df):,} points"
+    bins = density_bins(df, x, y, bins=int(math.sqrt(max_points)))
+    return bins, f"Showing {len(bins):,} density bins summarising {len(df):,} points"
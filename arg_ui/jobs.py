@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import streamlit as st
+
+from arg_database.jobs import ACTIVE_STATES, cancel_job, list_jobs, retry_job, submit_job
+
+# Seconds between refreshes of a job list while any of its jobs is queued or running
+JOB_POLL_SECONDS = 2
+
+
+def _rerun(fragments):
+    """Rerun the named fragments, or the whole page if none are named"""
+    st.rerun(list(fragments) if fragments else "app")
+
+
+def submit(kind, params, message, fragments=(), forget=()):
+    """
+    Queue a job and show it (button or form callback)
+
+    Reruns the fragments that contain its job list, so the list starts
+    polling.
+
+    Args:
+        kind: One of arg_database.jobs.JOB_KINDS
+        params: Keyword arguments for the job
+        message: Confirmation shown as a toast
+        fragments: Keys of the fragments showing the job list (none: the
+            whole page)
+        forget: Widget keys to reset
+    """
+    submit_job(kind, params, st.session_state.get("username"))
+    for key in forget:
+        st.session_state.pop(key, None)
+    st.toast(message)
+    # A callback outside any fragment is followed by a full rerun anyway
+    if fragments:
+        st.rerun(list(fragments))
+
+
+def _cancel(job_id):
+    st.toast("Cancelling job" if cancel_job(job_id) else "The job has already finished")
+
+
+def _retry(job_id, fragments):
+    if retry_job(job_id):
+        st.toast("Job queued again")
+        if fragments:
+            st.rerun(list(fragments))
+
+
+def _show_job(job, key, fragments):
+    """One job: progress while active, the outcome (and any file to download) once finished"""
+    title, body, action = st.columns([2, 5, 1], vertical_alignment="center")
+    with title:
+        st.markdown(f"**{job['label']}** #{job['job_id']}")
+    with body:
+        if job["status"] == "queued":
+            st.progress(0.0, text=job["message"] or "Waiting for a worker")
+        elif job["status"] == "running":
+            text = "Cancelling..." if job["cancel_requested"] else job["message"] or "Running"
+            st.progress(job["progress"], text=text)
+        elif job["status"] == "succeeded":
+            st.caption(job["message"])
+        elif job["status"] == "failed":
+            st.caption(f"Failed: {job['error']}")
+        else:
+            st.caption(job["message"])
+    with action:
+        result = job["result"] or {}
+        if job["status"] in ACTIVE_STATES:
+            st.button("Cancel", key=f"{key}_cancel_{job['job_id']}", disabled=bool(job["cancel_requested"]),
+                      on_click=_cancel, args=(job["job_id"],))
+        elif job["status"] != "succeeded":
+            st.button("Retry", key=f"{key}_retry_{job['job_id']}", on_click=_retry,
+                      args=(job["job_id"], fragments))
+        elif result.get("path") and Path(result["path"]).exists():
+            st.download_button("Download", data=lambda: Path(result["path"]).read_bytes(),
+                               file_name=result["file_name"], mime=result.get("mime"), on_click="ignore",
+                               key=f"{key}_download_{job['job_id']}")
+
+
+def show_jobs(key, kinds=None, params=None, fragments=(), everyone=False, limit=5):
+    """
+    Display recent background jobs with their progress
+
+    While any job is queued or running the list refreshes itself every
+    JOB_POLL_SECONDS. When one finishes, its outcome is shown as a toast
+    and the fragments are rerun, so they pick up what the job wrote.
+
+    Args:
+        key: Unique key for the list
+        kinds: Only jobs of these kinds
+        params: Dict of job parameter -> value the jobs must have
+        fragments: Keys of the fragments that contain the list and show
+            data the jobs change (none: the whole page)
+        everyone: Show every user's jobs, not only the current user's
+        limit: Maximum number of jobs shown
+    """
+    def matching():
+        return list_jobs(kinds, None if everyone else st.session_state.get("username"), params, limit)
+
+    jobs = matching()
+    if not jobs:
+        return
+    # Polling reruns call the same job_list, so these carry over from one poll to the next
+    active = {job["job_id"] for job in jobs if job["status"] in ACTIVE_STATES}
+    polled = []
+
+    @st.fragment(key=key, run_every=JOB_POLL_SECONDS if active else None)
+    def job_list():
+        current = matching() if polled else jobs
+        polled.append(True)
+        finished = [job for job in current if job["job_id"] in active and job["status"] not in ACTIVE_STATES]
+        for job in current:
+            _show_job(job, key, fragments)
+        if finished:
+            for job in finished:
+                active.discard(job["job_id"])
+                st.toast(f"{job['label']} failed: {job['error']}" if job["status"] == "failed" else job["message"])
+            # Stop polling, and let the pages show what the jobs wrote
+            _rerun(fragments)
+
+    job_list()
@@ -0,0 +1,37 @@
+import streamlit as st
+
+from arg_metrics.timing import section
+
+
+def show_lazy_tabs(sections, key):
+    """
+    Display tabs where only the open tab does any work
+
+    Plain st.tabs runs the body of every tab on every rerun, even the hidden
+    ones. These tabs track which one is open (switching tabs triggers a
+    rerun) and only call the function for that tab, so the groupbys and
+    figures of hidden tabs are skipped entirely.
+
+    Args:
+        sections: Dict of tab label -> function (no arguments) that draws the tab body
+        key: Unique widget key for the tab selection
+    """
+    tabs = st.tabs(list(sections), key=key, on_change="rerun")
+    for tab, (label, show) in zip(tabs, sections.items()):
+        if tab.open:
+            with tab, section(f"tab: {label}"):
+                show()
+
+
+def show_findings(findings, none_message):
+    """
+    Display analytics findings as warnings or notes
+
+    Args:
+        findings: List of arg_database.analytics.Finding
+        none_message: Shown (as a success note) when there are no findings
+    """
+    for finding in findings:
+        (st.warning if finding.level == "warning" else st.info)(finding.message)
+    if not findings:
+        st.success(none_message)
@@ -0,0 +1,211 @@
+import base64
+import io
+from pathlib import Path
+
+import streamlit as st
+from PIL import Image
+
+from arg_metrics.timing import section
+
+# Page script -> page settings (title/icon for set_page_config, sidebar label, background image)
+PAGES = {
+    "pages/dash.py": {"title": "A.R.G.U.S. Dashboard", "icon": "🅰️", "label": "Dashboard"},
+    "pages/cybersecurity.py": {"title": "Cybersecurity Dashboard", "icon": "🛡️", "label": "Cybersecurity"},
+    "pages/data_science.py": {"title": "Data Science Dashboard", "icon": "📊", "label": "Data Science"},
+    "pages/IT_tickets.py": {"title": "IT Operations Dashboard", "icon": "💻", "label": "IT Operations"},
+    "pages/performance.py": {"title": "Performance Monitor", "icon": "⏱️", "label": "Performance Monitor"},
+    "pages/ai_assistant.py": {"title": "AI Assistant", "icon": "🤖", "label": "AI assistant",
+                              "background": "imgs/code.jpg"},
+}
+
+DEFAULT_BACKGROUND = "imgs/matte.jpg"
+
+# Role -> pages the role may open, in sidebar order
+ROLE_PAGES = {
+    "user": ["pages/dash.py", "pages/cybersecurity.py", "pages/data_science.py",
+             "pages/IT_tickets.py", "pages/ai_assistant.py"],
+    "cybersecurity": ["pages/dash.py", "pages/cybersecurity.py", "pages/ai_assistant.py"],
+    "data_scientist": ["pages/dash.py", "pages/data_science.py", "pages/ai_assistant.py"],
+    "it_admin": ["pages/dash.py", "pages/IT_tickets.py", "pages/performance.py", "pages/ai_assistant.py"],
+}
+
+# Backgrounds larger than this (px, longest side) are scaled down before inlining
+BACKGROUND_MAX_SIZE = 2560
+
+# MIME type by image file extension
+IMAGE_MIME_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".gif": "image/gif"}
+
+BACKGROUND_CSS = """<style>
+/* Background on whole app */
+.stApp {
+    background-image: url("data:%s;base64,%s");
+    background-size: cover;
+    background-position: center center;
+    background-repeat: no-repeat;
+    background-attachment: fixed;
+}
+
+/* Main content readable */
+.main .block-container {
+    background: rgba(255, 255, 255, 0.9) !important;
+    padding: 2rem !important;
+    border-radius: 10px !important;
+}
+</style>"""
+
+BUTTON_CSS = """<style>
+.stButton > button {
+    border: 2px solid #DC143C;
+}
+
+.stButton > button:hover {
+    background-color: #DC143C;
+    color: white;
+    border: 2px solid #DC143C;
+}
+</style>"""
+
+
+class StyleBlock:
+    """
+    Finished <style> markup for st.html
+
+    st.markdown and st.html dedent string bodies on every call, which for a
+    background image inlined as base64 (several MB) costs tens of
+    milliseconds per rerun. Objects with _repr_html_ are sent as they are.
+    """
+
+    def __init__(self, html):
+        self.html = html
+
+    def _repr_html_(self):
+        return self.html
+
+
+def background_image(path):
+    """
+    Read a background image, scaled down to BACKGROUND_MAX_SIZE if larger
+
+    The image is inlined into the page CSS and sent with every rerun, so a
+    full-resolution photo (imgs/matte.jpg is 6000x4000, 2 MB) costs far more
+    than the screen can show. Scaled images are re-encoded as JPEG.
+
+    Args:
+        path: Image file path
+
+    Returns:
+        tuple: (MIME type, image bytes)
+    """
+    with Image.open(path) as image:
+        if max(image.size) <= BACKGROUND_MAX_SIZE:
+            return IMAGE_MIME_TYPES.get(path.suffix.lower(), "image/jpeg"), path.read_bytes()
+
+        image.thumbnail((BACKGROUND_MAX_SIZE, BACKGROUND_MAX_SIZE))
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=85, optimize=True)
+        return "image/jpeg", buffer.getvalue()
+
+
+def build_page_css(image_path):
+    """
+    Build the page styling: background image (if the file exists) and buttons
+
+    Every page used to do this (without the scaling) on every rerun; see page_css.
+
+    Args:
+        image_path: Background image path relative to the repository root
+
+    Returns:
+        str: <style> blocks
+    """
+    path = Path(image_path)
+    if not path.exists():
+        return BUTTON_CSS
+
+    mime, image_bytes = background_image(path)
+    encoded = base64.b64encode(image_bytes).decode()
+    return BACKGROUND_CSS % (mime, encoded) + "\n" + BUTTON_CSS
+
+
+@st.cache_resource(show_spinner=False)
+def page_css(image_path):
+    """
+    Page styling built once per server process and shared by all sessions
+
+    Args:
+        image_path: Background image path relative to the repository root
+
+    Returns:
+        StyleBlock: Styling ready for st.html
+    """
+    return StyleBlock(build_page_css(image_path))
+
+
+def can_open(role, page):
+    """
+    Check whether a role may open a page
+
+    Args:
+        role: User role
+        page: Page script path, e.g. "pages/dash.py"
+
+    Returns:
+        bool: True if the page is in the role's navigation
+    """
+    return page in ROLE_PAGES.get(role, [])
+
+
+def show_navigation(page):
+    """
+    Display the sidebar: user details, links to the role's other pages, logout
+
+    Args:
+        page: Current page script path (not linked to itself)
+    """
+    st.sidebar.title("ARG NAVIGATION💢")
+    st.sidebar.write(f"**User:** {st.session_state.username}")
+    st.sidebar.write(f"**Role:** {st.session_state.role}")
+
+    # Add navigation links based on user role
+    for target in ROLE_PAGES.get(st.session_state.role, []):
+        if target != page:
+            st.sidebar.page_link(target, label=PAGES[target]["label"])
+
+    st.sidebar.markdown("---")
+
+    # Logout button - clears session state and returns to login
+    if st.sidebar.button("Logout", use_container_width=True):
+        st.session_state.logged_in = False
+        st.session_state.username = None
+        st.session_state.role = None
+        st.switch_page("arg_app.py")
+
+
+def page_shell(page):
+    """
+    Common setup for a page: page config, login and role check, styling and sidebar
+
+    Call this first in the page script. Stops the script if the user is not
+    logged in or the role may not open the page.
+
+    Args:
+        page: Page script path, e.g. "pages/cybersecurity.py" (a key of PAGES)
+    """
+    settings = PAGES[page]
+
+    # Configure the Streamlit page settings
+    st.set_page_config(page_title=settings["title"], page_icon=settings["icon"], layout="wide")
+
+    with section("shell"):
+        # Check if user is logged in - redirect to login if not
+        if not st.session_state.get("logged_in"):
+            st.error("Please login first")
+            st.stop()
+
+        # Check if user has permission to view this page
+        if not can_open(st.session_state.role, page):
+            st.error("Access Denied - You don't have permission to view this page")
+            st.stop()
+
+        st.html(page_css(settings.get("background", DEFAULT_BACKGROUND)))
+        show_navigation(page)
@@ -1,7 +1,9 @@
 import bcrypt
 from arg_database.user_ops import add_user, get_user, check_user_exists
+from arg_metrics.tracing import traced
 
 
+@traced("auth.bcrypt_hash")
 def hash_password(password):
     """
     Hash a password using bcrypt
@@ -23,6 +25,7 @@ def hash_password(password):
     return hashed.decode('utf-8')
 
 
+@traced("auth.bcrypt_verify")
 def verify_password(password, hashed_password):
     """
     Verify a password against its hash
@@ -0,0 +1,6 @@
+"""
+Benchmarks for the A.R.G.U.S. data layer
+
+Run a benchmark module directly, e.g.:
+    python -m benchmarks.update_latency
+"""
@@ -0,0 +1,185 @@
+"""
+Synthetic data generators for cyber_incidents, it_tickets and datasets_metadata
+
+Value distributions (severity, category, status, priority, staff, resolution
+times) follow the sample data in DATA/*.csv, and descriptions are built from
+per-category templates so full-text search has realistic text to index.
+Everything is driven by a seed, so the same size and seed always produce the
+same database.
+"""
+import numpy as np
+
+from arg_database.tables import initialize_all_tables
+
+# Named sizes used by the benchmark runner
+SIZES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+# Rows generated and inserted per batch
+CHUNK_SIZE = 100_000
+
+SEVERITIES = (["Low", "Medium", "High", "Critical"], [0.30, 0.43, 0.23, 0.04])
+CATEGORIES = (["Phishing", "Malware", "DDoS", "Unauthorized Access", "Misconfiguration"],
+              [0.54, 0.19, 0.11, 0.08, 0.08])
+INCIDENT_STATUSES = (["Open", "In Progress", "Resolved", "Closed"], [0.19, 0.29, 0.36, 0.16])
+
+PRIORITIES = (["Low", "Medium", "High", "Critical"], [0.27, 0.43, 0.24, 0.06])
+TICKET_STATUSES = (["Open", "In Progress", "Resolved", "Waiting for User"], [0.17, 0.15, 0.59, 0.09])
+STAFF = (["IT_Support_A", "IT_Support_B", "IT_Support_C"], [0.37, 0.30, 0.33])
+
+DATASET_SOURCES = (["data_scientist", "cyber_admin", "it_admin"], [0.6, 0.25, 0.15])
+
+INCIDENT_TEMPLATES = {
+    "Phishing": ["Suspicious email impersonating {0} asking staff to {1}",
+                 "Credential harvesting page mimicking {0} login reported by {2}"],
+    "Malware": ["Endpoint alert: {3} detected on workstation in {2}",
+                "Ransomware note found after {3} execution in {2}"],
+    "DDoS": ["Traffic spike against {0} gateway from botnet",
+             "Volumetric attack degrading {0} portal availability"],
+    "Unauthorized Access": ["Repeated failed logins then success on {0} account in {2}",
+                            "Privilege escalation attempt on {0} server"],
+    "Misconfiguration": ["Public bucket exposing {0} backups",
+                         "Firewall rule allowing inbound {3} traffic to {2} subnet"],
+}
+TICKET_TEMPLATES = [
+    "Cannot {1} on {0}",
+    "{0} is slow for users in {2}",
+    "Request access to {0} for new starter in {2}",
+    "{0} error after update, need to {1}",
+    "Printer in {2} offline",
+    "VPN disconnects while using {0}",
+]
+NOUNS = ["Outlook", "SharePoint", "payroll", "VPN", "HR portal", "Teams", "CRM", "finance share"]
+ACTIONS = ["reset password", "verify account", "sign in", "open attachment", "update MFA", "approve invoice"]
+DEPARTMENTS = ["finance", "HR", "research", "operations", "legal", "sales"]
+MALWARE = ["trojan", "worm", "keylogger", "cryptominer", "RAT", "SMB"]
+
+# Timestamps are spread over 2024
+START = np.datetime64("2024-01-01T00:00:00")
+SECONDS_IN_YEAR = 366 * 24 * 3600
+
+
+def _choice(rng, options, size):
+    """Pick from (values, weights) and return an array of strings"""
+    values, weights = options
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=weights)]
+
+
+def _timestamps(rng, size):
+    """Random timestamps within 2024 as 'YYYY-MM-DD HH:MM:SS' strings"""
+    offsets = rng.integers(0, SECONDS_IN_YEAR, size=size).astype("timedelta64[s]")
+    stamps = np.datetime_as_string(START + offsets, unit="s")
+    return np.char.replace(stamps, "T", " ")
+
+
+def _fill(rng, templates, size):
+    """Fill description templates with random words"""
+    picks = rng.integers(0, len(templates), size=size)
+    words = [rng.integers(0, len(pool), size=size) for pool in (NOUNS, ACTIONS, DEPARTMENTS, MALWARE)]
+    return [templates[t].format(NOUNS[a], ACTIONS[b], DEPARTMENTS[c], MALWARE[d])
+            for t, a, b, c, d in zip(picks, *words)]
+
+
+def generate_incidents(count, seed=0, start_id=1000):
+    """
+    Generate cyber incident rows in chunks
+
+    Args:
+        count: Total number of rows
+        seed: Random seed
+        start_id: First incident_id
+
+    Yields:
+        list: Tuples matching the cyber_incidents column order
+    """
+    rng = np.random.default_rng(seed)
+    for offset in range(0, count, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, count - offset)
+        ids = range(start_id + offset, start_id + offset + size)
+        categories = _choice(rng, CATEGORIES, size)
+        descriptions = [None] * size
+        for category, templates in INCIDENT_TEMPLATES.items():
+            mask = np.flatnonzero(categories == category)
+            for i, text in zip(mask, _fill(rng, templates, len(mask))):
+                descriptions[i] = text
+        yield list(zip(ids, _timestamps(rng, size).tolist(), _choice(rng, SEVERITIES, size),
+                       categories, _choice(rng, INCIDENT_STATUSES, size), descriptions))
+
+
+def generate_tickets(count, seed=0, start_id=2000):
+    """
+    Generate IT ticket rows in chunks
+
+    Resolution times are log-normal (median around a day) and scale with
+    priority the way the sample data does.
+
+    Args:
+        count: Total number of rows
+        seed: Random seed
+        start_id: First ticket_id
+
+    Yields:
+        list: Tuples matching the it_tickets column order
+    """
+    rng = np.random.default_rng(seed + 1)
+    priority_scale = {"Low": 1.3, "Medium": 1.0, "High": 0.8, "Critical": 0.5}
+    for offset in range(0, count, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, count - offset)
+        ids = range(start_id + offset, start_id + offset + size)
+        priorities = _choice(rng, PRIORITIES, size)
+        scale = np.vectorize(priority_scale.get)(priorities)
+        hours = np.clip(np.round(rng.lognormal(np.log(30), 0.6, size) * scale), 1, 240)
+        yield list(zip(ids, priorities, _fill(rng, TICKET_TEMPLATES, size),
+                       _choice(rng, TICKET_STATUSES, size), _choice(rng, STAFF, size),
+                       _timestamps(rng, size).tolist(), hours.tolist()))
+
+
+def generate_datasets(count, seed=0, start_id=1):
+    """
+    Generate dataset metadata rows in chunks
+
+    Row counts are log-uniform between 1k and 10M, as in the sample data.
+
+    Args:
+        count: Total number of rows
+        seed: Random seed
+        start_id: First dataset_id
+
+    Yields:
+        list: Tuples matching the datasets_metadata column order
+    """
+    rng = np.random.default_rng(seed + 2)
+    for offset in range(0, count, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, count - offset)
+        ids = range(start_id + offset, start_id + offset + size)
+        names = [f"{NOUNS[n].replace(' ', '_')}_{i}" for n, i in zip(rng.integers(0, len(NOUNS), size), ids)]
+        rows = np.round(10 ** rng.uniform(3, 7, size)).astype(int)
+        columns = rng.integers(3, 60, size)
+        dates = np.datetime_as_string(START + rng.integers(0, 366, size).astype("timedelta64[D]"), unit="D")
+        yield list(zip(ids, names, rows.tolist(), columns.tolist(), _choice(rng, DATASET_SOURCES, size),
+                       dates.tolist()))
+
+
+def build_database(conn, incidents, tickets, datasets, seed=0):
+    """
+    Create all tables and fill them with synthetic rows
+
+    Args:
+        conn: Database connection object (should point at an empty database)
+        incidents: Number of cyber incidents
+        tickets: Number of IT tickets
+        datasets: Number of dataset metadata rows
+        seed: Random seed
+    """
+    initialize_all_tables(conn)
+    for sql, chunks in (
+        ("INSERT INTO cyber_incidents VALUES (?, ?, ?, ?, ?, ?)", generate_incidents(incidents, seed)),
+        ("INSERT INTO it_tickets VALUES (?, ?, ?, ?, ?, ?, ?)", generate_tickets(tickets, seed)),
+        ("INSERT INTO datasets_metadata VALUES (?, ?, ?, ?, ?, ?)", generate_datasets(datasets, seed)),
+    ):
+        for chunk in chunks:
+            conn.executemany(sql, chunk)
+            conn.commit()
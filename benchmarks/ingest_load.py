@@ -0,0 +1,151 @@
+"""
+Load test: push incidents to the ingest server and report throughput
+
+Starts `python -m arg_database.ingest --serve` on a scratch database (or
+targets --url), then several client threads POST NDJSON batches of
+generated incidents as fast as the server acknowledges them. Reports
+committed records per second and the per-request latency; a batch is only
+acknowledged once its records are committed, so the rate is durable rows.
+
+Usage:
+    python -m benchmarks.ingest_load [--records 100000] [--batch 500] [--clients 4] [--url http://127.0.0.1:8503]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from benchmarks.generators import generate_incidents
+
+# Well above the seeded sample data, so generated ids never collide with it
+START_ID = 10_000_000
+
+
+def free_port():
+    """A port nothing is listening on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path, port):
+    """
+    Run the ingest server in its own process, as it would be deployed
+
+    Returns:
+        subprocess.Popen: The server process, once it accepts connections
+    """
+    env = dict(os.environ, ARG_DB_PATH=str(db_path))
+    env.pop("ARG_DATABASE_URL", None)
+    server = subprocess.Popen([sys.executable, "-m", "arg_database.ingest", "--serve", "--port", str(port)],
+                              env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("Ingest server exited during startup")
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("Ingest server did not start")
+
+
+def make_batches(records, batch):
+    """Generated incidents as NDJSON request bodies of batch records each"""
+    columns = ("incident_id", "timestamp", "severity", "category", "status", "description")
+    lines = [json.dumps(dict(zip(columns, row)), default=str)
+             for chunk in generate_incidents(records, seed=3, start_id=START_ID) for row in chunk]
+    return ["\n".join(lines[start:start + batch]).encode() for start in range(0, len(lines), batch)]
+
+
+def client(url, batches, token, latencies, totals, lock):
+    """POST batches over one keep-alive connection until none are left"""
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port)
+    headers = {"Content-Type": "application/x-ndjson"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    while True:
+        with lock:
+            if not batches:
+                break
+            body = batches.pop()
+        start = time.perf_counter()
+        conn.request("POST", "/ingest/incidents", body, headers)
+        response = conn.getresponse()
+        result = json.loads(response.read())
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed * 1000)
+            totals["accepted"] += result["accepted"]
+            totals["rejected"] += result["rejected"]
+    conn.close()
+
+
+def pending_index_rows(db_path):
+    """Rows of the scratch database still waiting for the near-duplicate index"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM dedup_pending").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=500, help="Records per request")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent client connections")
+    parser.add_argument("--url", help="Ingest server to load (default: start one on a scratch database)")
+    args = parser.parse_args()
+
+    batches = make_batches(args.records, args.batch)
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        url = args.url
+        if url is None:
+            port = free_port()
+            server = start_server(Path(tmp) / "ingest.db", port)
+            url = f"http://127.0.0.1:{port}"
+        try:
+            latencies, totals, lock = [], {"accepted": 0, "rejected": 0}, threading.Lock()
+            threads = [threading.Thread(target=client, args=(url, batches, os.environ.get("ARG_INGEST_TOKEN"),
+                                                             latencies, totals, lock))
+                       for _ in range(args.clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            # Rows the feed left for the near-duplicate index (a create form's lookup indexes them first)
+            backlog = pending_index_rows(Path(tmp) / "ingest.db") if server is not None else None
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    latencies.sort()
+    print(f"{args.records:,} incidents, {args.batch} per request, {args.clients} clients -> {url}")
+    print(f"Committed {totals['accepted']:,} ({totals['rejected']:,} rejected) in {elapsed:.2f}s: "
+          f"{totals['accepted'] / elapsed:,.0f} records/s")
+    print(f"Request latency: p50 {statistics.median(latencies):.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:.1f} ms, max {latencies[-1]:.1f} ms")
+    if backlog is not None:
+        print(f"Left to index for near-duplicate checks: {backlog:,} rows")
+
+
+if __name__ == "__main__":
+    main()
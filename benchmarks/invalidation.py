@@ -0,0 +1,114 @@
+"""
+Cross-process invalidation: how soon other processes see a write
+
+Several reader processes (standing in for Streamlit workers) poll
+arg_database.invalidation.table_version, as arg_ui.data does on every cached
+read, while a writer process updates tickets. Each reader records the delay
+between the writer's commit and the first poll that sees the new version,
+and the cost of a poll that finds nothing changed.
+
+Usage:
+    python -m benchmarks.invalidation [--readers 4] [--writes 200] [--poll-ms 1]
+"""
+import argparse
+import multiprocessing
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import arg_database.connection as connection
+from arg_database.tables import initialize_all_tables
+from arg_database.statements import execute_update
+from benchmarks.generators import generate_tickets
+
+TICKET_ROWS = 10000
+
+
+def populate(db_path):
+    """Create a scratch database with some tickets"""
+    connection.DB_PATH = db_path
+    conn = connection.get_db_connection()
+    initialize_all_tables(conn)
+    for chunk in generate_tickets(TICKET_ROWS, seed=42, start_id=0):
+        conn.executemany("INSERT INTO it_tickets VALUES (?, ?, ?, ?, ?, ?, ?)", chunk)
+    conn.commit()
+    conn.close()
+
+
+def reader(db_path, writes, poll_seconds, committed_at, ready, results):
+    """
+    Poll the ticket version until every write has been seen
+
+    Puts (detection delays in ms, idle poll costs in us) on results.
+    """
+    from arg_database.invalidation import table_version
+
+    connection.DB_PATH = db_path
+    last = table_version("it_tickets")
+    ready.release()
+
+    delays, idle_costs = [], []
+    while len(delays) < writes:
+        start = time.perf_counter()
+        version = table_version("it_tickets")
+        cost = time.perf_counter() - start
+        if version != last:
+            delays.append((time.time() - committed_at.value) * 1000)
+            last = version
+        else:
+            idle_costs.append(cost * 1e6)
+        time.sleep(poll_seconds)
+    results.put((delays, idle_costs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cross-process cache invalidation latency")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--poll-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "invalidation.db"
+        populate(db_path)
+
+        ctx = multiprocessing.get_context("spawn")
+        committed_at = ctx.Value("d", 0.0)
+        ready = ctx.Semaphore(0)
+        results = ctx.Queue()
+        readers = [ctx.Process(target=reader, args=(db_path, args.writes, args.poll_ms / 1000,
+                                                   committed_at, ready, results))
+                   for _ in range(args.readers)]
+        for process in readers:
+            process.start()
+        for _ in readers:
+            ready.acquire()
+
+        # Writes are spaced out so every reader sees each one separately
+        gap = max(args.poll_ms / 1000 * 20, 0.02)
+        conn = connection.get_db_connection()
+        for i in range(args.writes):
+            execute_update(conn, "it_tickets", i % TICKET_ROWS, {"status": "Resolved" if i % 2 else "Open"})
+            conn.commit()
+            committed_at.value = time.time()
+            time.sleep(gap)
+        conn.close()
+
+        delays, idle_costs = [], []
+        for _ in readers:
+            reader_delays, reader_costs = results.get()
+            delays.extend(reader_delays)
+            idle_costs.extend(reader_costs)
+        for process in readers:
+            process.join()
+
+    delays.sort()
+    print(f"{args.readers} readers, {args.writes} writes, polling every {args.poll_ms} ms")
+    print(f"Write visible after:  p50 {statistics.median(delays):.2f} ms, "
+          f"p99 {delays[int(len(delays) * 0.99) - 1]:.2f} ms, max {delays[-1]:.2f} ms")
+    print(f"Poll with no change: median {statistics.median(idle_costs):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
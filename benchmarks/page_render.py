@@ -0,0 +1,213 @@
+"""
+End-to-end page render benchmark built on Streamlit's AppTest
+
+For every role, logs in (a benchmark user is created per role and signed in
+through arg_app.py's login form, on each database's first read connections,
+and the later page runs start from the session that login produced),
+switches to every page that role can open (and to every tab of pages with
+tabs) and reruns it headlessly against synthetic databases of increasing
+size.
+
+Recorded per page: wall time of the first (cold) run and of warm reruns, peak
+Python memory (tracemalloc) during one extra rerun, and the time spent in
+each instrumented section of the page script (data load, metrics, dataframe
+and each Plotly figure - see arg_metrics.timing.section).
+
+Usage:
+    python -m benchmarks.page_render --sizes 10k 1m --reruns 3 --output render.json
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+import arg_database.connection as connection
+from arg_metrics.timing import start_recording, stop_recording
+from arg_ui.shell import ROLE_PAGES
+from arg_database.user_ops import add_user
+from authy.security import hash_password
+from benchmarks.generators import SIZES
+from benchmarks.run import prepare_database
+
+ROOT = Path(__file__).parent.parent
+
+# Lazy tabs on each page (widget key, tab labels); each tab is measured separately
+PAGE_TABS = {
+    "pages/cybersecurity.py": ("cyber_tab", ["Incidents Management", "Threat Analysis"]),
+    "pages/IT_tickets.py": ("tickets_tab", ["Ticket Management", "Performance Analysis"]),
+    "pages/data_science.py": ("datasets_tab", ["Dataset Management", "Governance Analysis"]),
+}
+
+BENCH_PASSWORD = "Bench123"
+
+
+def login(role, timeout):
+    """
+    Create the benchmark user for a role and sign in through the login form
+
+    The user is written directly (the database is a fresh copy), so the
+    login is the first read of the database and runs on a new read
+    connection, as the first login after a server start does.
+
+    Args:
+        role: User role
+        timeout: AppTest timeout per run in seconds
+
+    Returns:
+        dict: username and role of the signed-in session
+    """
+    username = f"bench{role.replace('_', '')}"
+    add_user(username, hash_password(BENCH_PASSWORD), role)
+
+    at = AppTest.from_file(str(ROOT / "arg_app.py"), default_timeout=timeout)
+    at.run()
+    # The login form's fields come first (the register tab's follow)
+    at.text_input[0].input(username)
+    at.text_input[1].input(BENCH_PASSWORD)
+    at.button[0].click().run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    if not at.session_state.logged_in:
+        raise RuntimeError(f"Benchmark login failed for {username}: {[e.value for e in at.error]}")
+    return {"username": at.session_state.username, "role": at.session_state.role}
+
+
+def timed_run(at):
+    """
+    Run the app once and collect wall time and section timings
+
+    Returns:
+        tuple: (milliseconds, {section: milliseconds})
+    """
+    start_recording()
+    start = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    sections = {name: seconds * 1000 for name, seconds in stop_recording().items()}
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed, sections
+
+
+def measure_page(user, page, tab, reruns, timeout):
+    """
+    Render one page as one user: a cold run, warm reruns and a memory run
+
+    Args:
+        user: Signed-in session from login
+        page: Page script path relative to the repository root
+        tab: Label of the tab to open, or None for pages without tabs
+        reruns: Number of warm reruns to time
+        timeout: AppTest timeout per run in seconds
+
+    Returns:
+        dict: Timings for the page
+    """
+    at = AppTest.from_file(str(ROOT / "arg_app.py"), default_timeout=timeout)
+    at.session_state.logged_in = True
+    at.session_state.username = user['username']
+    at.session_state.role = user['role']
+    at.switch_page(page)
+    if tab is not None:
+        at.session_state[PAGE_TABS[page][0]] = tab
+
+    cold_ms, _ = timed_run(at)
+
+    warm = [timed_run(at) for _ in range(reruns)]
+    section_names = sorted({name for _, sections in warm for name in sections})
+    sections = {name: round(statistics.fmean(s.get(name, 0.0) for _, s in warm), 3)
+                for name in section_names}
+
+    tracemalloc.start()
+    at.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "cold_ms": round(cold_ms, 3),
+        "warm_mean_ms": round(statistics.fmean(ms for ms, _ in warm), 3),
+        "warm_p50_ms": round(statistics.median(ms for ms, _ in warm), 3),
+        "peak_mb": round(peak / 2 ** 20, 2),
+        "sections_ms": sections,
+    }
+
+
+def write_results(results, output):
+    """
+    Write results to JSON, or to CSV with one row per page and section
+
+    Args:
+        results: List of result dicts
+        output: Output path; .csv writes CSV, anything else JSON
+    """
+    output = Path(output)
+    if output.suffix.lower() != ".csv":
+        output.write_text(json.dumps(results, indent=2))
+        return
+
+    fields = ["size", "role", "page", "tab", "cold_ms", "warm_mean_ms", "warm_p50_ms", "peak_mb",
+              "section", "section_ms"]
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for result in results:
+            base = {k: v for k, v in result.items() if k != "sections_ms"}
+            for name, ms in result["sections_ms"].items() or [("", "")]:
+                writer.writerow({**base, "section": name, "section_ms": ms})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full page reruns with AppTest")
+    parser.add_argument("--sizes", nargs="+", default=["10k"], choices=list(SIZES))
+    parser.add_argument("--roles", nargs="+", default=list(ROLE_PAGES), choices=list(ROLE_PAGES))
+    parser.add_argument("--reruns", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-dir", default=None,
+                        help="Where to keep generated databases (default: a temporary directory)")
+    parser.add_argument("--output", default=None, help="Write results to this .json or .csv file")
+    args = parser.parse_args()
+
+    # Page scripts load images by relative path
+    os.chdir(ROOT)
+    # No jobs are measured, and workers spawned under AppTest would re-run arg_app.py against the default database
+    os.environ["ARG_JOB_WORKERS"] = "0"
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_dir = Path(args.db_dir or tmp)
+        db_dir.mkdir(parents=True, exist_ok=True)
+        for size in args.sizes:
+            work_db = Path(tmp) / f"render_{size}.db"
+            shutil.copyfile(prepare_database(db_dir, size, args.seed), work_db)
+            connection.DB_PATH = work_db
+
+            for role in args.roles:
+                user = login(role, args.timeout)
+                for page in ROLE_PAGES[role]:
+                    for tab in PAGE_TABS.get(page, (None, [None]))[1]:
+                        result = {"size": size, "role": role, "page": page, "tab": tab,
+                                  **measure_page(user, page, tab, args.reruns, args.timeout)}
+                        results.append(result)
+                        slowest = max(((name, ms) for name, ms in result["sections_ms"].items()
+                                       if not name.startswith("tab: ")),
+                                      key=lambda item: item[1], default=("-", 0))
+                        print(f"{size:>4} {role:<15}{page:<26}{tab or '':<22}"
+                              f"cold {result['cold_ms']:>9.1f} ms  warm {result['warm_mean_ms']:>9.1f} ms  "
+                              f"peak {result['peak_mb']:>7.1f} MB  slowest: {slowest[0]} ({slowest[1]:.1f} ms)")
+
+    if args.output:
+        write_results(results, args.output)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
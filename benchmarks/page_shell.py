@@ -0,0 +1,141 @@
+"""
+Per-rerun cost of the page styling, before and after arg_ui.shell
+
+Before the shared shell every page read its background image, base64-encoded
+it and injected the CSS with st.markdown (which dedents the multi-MB body) on
+every rerun. page_shell builds the CSS once per process (page_css), with
+oversized backgrounds scaled down, and sends it with st.html as-is.
+
+For each of the five dashboard pages both variants are run headlessly with
+AppTest and the "shell" section is timed over warm reruns, next to the size
+of the style payload sent to the browser on each rerun. Navigation is not
+included: it renders the same page links before and after. For full page
+timings including the shell section see benchmarks.page_render.
+
+Usage:
+    python -m benchmarks.page_shell --reruns 20
+"""
+import argparse
+import base64
+import os
+import statistics
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from arg_metrics.timing import start_recording, stop_recording
+from arg_ui.shell import PAGES, DEFAULT_BACKGROUND, build_page_css
+
+ROOT = Path(__file__).parent.parent
+
+DASHBOARD_PAGES = ["pages/dash.py", "pages/cybersecurity.py", "pages/data_science.py",
+                   "pages/IT_tickets.py", "pages/ai_assistant.py"]
+
+
+def legacy_styling(image_path):
+    """The styling block every page used to run on each rerun"""
+    import base64
+    from pathlib import Path
+
+    import streamlit as st
+
+    from arg_metrics.timing import section
+
+    with section("shell"):
+        if Path(image_path).exists():
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+            mime = "image/png" if image_path.lower().endswith(".png") else "image/jpeg"
+            encoded = base64.b64encode(image_bytes).decode()
+            st.markdown(
+                f"""
+                <style>
+                .stApp {{
+                    background-image: url("data:{mime};base64,{encoded}");
+                    background-size: cover;
+                    background-position: center center;
+                    background-repeat: no-repeat;
+                    background-attachment: fixed;
+                }}
+
+                .main .block-container {{
+                    background: rgba(255, 255, 255, 0.9) !important;
+                    padding: 2rem !important;
+                    border-radius: 10px !important;
+                }}
+                </style>
+                """,
+                unsafe_allow_html=True
+            )
+
+        st.markdown("""
+        <style>
+        .stButton > button {
+            border: 2px solid #DC143C;
+        }
+
+        .stButton > button:hover {
+            background-color: #DC143C;
+            color: white;
+            border: 2px solid #DC143C;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+
+
+def shared_styling(image_path):
+    """The styling block as run by arg_ui.shell.page_shell"""
+    import streamlit as st
+
+    from arg_metrics.timing import section
+    from arg_ui.shell import page_css
+
+    with section("shell"):
+        st.html(page_css(image_path))
+
+
+def time_styling(script, image_path, reruns):
+    """
+    Run a styling script once (cold) and time the shell section over warm reruns
+
+    Returns:
+        float: Median milliseconds spent in the shell section per rerun
+    """
+    at = AppTest.from_function(script, args=(image_path,), default_timeout=60)
+    at.run()
+
+    timings = []
+    for _ in range(reruns):
+        start_recording()
+        at.run()
+        timings.append(stop_recording().get("shell", 0.0) * 1000)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-rerun page styling cost before/after the shared shell")
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+
+    # Background images are referenced by relative path
+    os.chdir(ROOT)
+
+    print(f"{'page':<26}{'image':<18}{'legacy KB':>10}{'shell KB':>10}{'legacy ms':>11}{'shell ms':>10}"
+          f"{'removed ms':>12}")
+    total_removed = 0.0
+    for page in DASHBOARD_PAGES:
+        image_path = PAGES[page].get("background", DEFAULT_BACKGROUND)
+        legacy = time_styling(legacy_styling, image_path, args.reruns)
+        shared = time_styling(shared_styling, image_path, args.reruns)
+        total_removed += legacy - shared
+        legacy_kb = len(base64.b64encode(Path(image_path).read_bytes())) / 1024
+        shared_kb = len(build_page_css(image_path)) / 1024
+        print(f"{page:<26}{image_path:<18}{legacy_kb:>10.0f}{shared_kb:>10.0f}"
+              f"{legacy:>11.2f}{shared:>10.2f}{legacy - shared:>12.2f}")
+    print(f"Removed per rerun across {len(DASHBOARD_PAGES)} pages: {total_removed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
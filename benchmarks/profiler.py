@@ -0,0 +1,70 @@
+"""
+Dataset profiling: arg_database.profiler against loading the file with pandas
+
+Writes a synthetic CSV (and the same data as Parquet) with integer, float,
+text, timestamp and boolean columns and some nulls, then times
+profile_file with different worker counts next to the obvious alternative,
+pd.read_csv followed by isna().mean(). Parallel CSV workers only pay off on
+files of a few hundred MB and up, on a host with several cores.
+
+Usage:
+    python -m benchmarks.profiler [--rows 3000000] [--workers 1 2 4]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from arg_database.profiler import profile_file
+
+
+def write_files(directory, rows, seed=0):
+    """Write the synthetic dataset as CSV and Parquet; returns both paths"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "value": rng.normal(size=rows),
+        "category": rng.choice(["alpha", "beta", "gamma", None], rows),
+        "observed_at": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 3 * 10 ** 7, rows), unit="s"),
+        "flag": rng.choice([True, False], rows),
+    })
+    df.loc[::7, "value"] = np.nan
+    csv_path, parquet_path = Path(directory) / "dataset.csv", Path(directory) / "dataset.parquet"
+    df.to_csv(csv_path, index=False)
+    df.to_parquet(parquet_path)
+    return csv_path, parquet_path
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dataset profiling")
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, parquet_path = write_files(tmp, args.rows)
+        print(f"{args.rows:,} rows: CSV {csv_path.stat().st_size / 1024 ** 2:,.0f} MB, "
+              f"Parquet {parquet_path.stat().st_size / 1024 ** 2:,.0f} MB")
+
+        seconds, _ = timed(lambda: pd.read_csv(csv_path).isna().mean())
+        print(f"{'pandas read_csv + isna':<30}{seconds:>8.2f} s")
+        for workers in args.workers:
+            seconds, _ = timed(lambda: profile_file(csv_path, workers=workers))
+            print(f"{f'profile_file CSV, {workers} worker(s)':<30}{seconds:>8.2f} s")
+        seconds, _ = timed(lambda: pd.read_parquet(parquet_path).isna().mean())
+        print(f"{'pandas read_parquet + isna':<30}{seconds:>8.2f} s")
+        seconds, _ = timed(lambda: profile_file(parquet_path))
+        print(f"{'profile_file Parquet':<30}{seconds:>8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
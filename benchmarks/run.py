@@ -0,0 +1,152 @@
+"""
+Run the data-layer benchmark scenarios against synthetic databases
+
+Databases are generated once per size (see benchmarks.generators) and kept
+in --db-dir, so later runs only pay for the generation the first time.
+Results are written as JSON or CSV (picked from the --output extension) so
+runs from different commits can be compared.
+
+Usage:
+    python -m benchmarks.run --sizes 10k 1m --repeat 5 --output results.json
+    python -m benchmarks.run --sizes 10k --only load/ crud/update_ticket
+"""
+import argparse
+import csv
+import json
+import platform
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import arg_database.connection as connection
+from benchmarks.generators import SIZES, build_database
+from benchmarks.scenarios import SCENARIOS, Context
+
+RESULT_FIELDS = ["scenario", "size", "rows", "repeat", "mean_ms", "p50_ms", "min_ms", "max_ms"]
+
+
+def prepare_database(db_dir, size, seed):
+    """
+    Get the synthetic database for a size, generating it if needed
+
+    Args:
+        db_dir: Directory holding generated databases
+        size: Named size from SIZES
+        seed: Random seed
+
+    Returns:
+        Path: Path to the database file
+    """
+    path = Path(db_dir) / f"bench_{size}_seed{seed}.db"
+    if not path.exists():
+        rows = SIZES[size]
+        print(f"Generating {size} database ({rows:,} rows per table) at {path} ...")
+        start = time.perf_counter()
+        partial = path.with_suffix(".partial")
+        partial.unlink(missing_ok=True)
+        conn = sqlite3.connect(partial)
+        build_database(conn, rows, rows, rows, seed)
+        conn.close()
+        partial.rename(path)
+        print(f"  done in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def run_scenario(func, ctx, repeat):
+    """
+    Time a scenario over several repeats, after one warm-up call
+
+    Args:
+        func: Scenario function
+        ctx: Scenario context
+        repeat: Number of timed repeats
+
+    Returns:
+        list: Durations in milliseconds
+    """
+    func(ctx)
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(ctx)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def write_results(results, output):
+    """
+    Write results to a JSON or CSV file
+
+    Args:
+        results: List of result dicts
+        output: Output path; .csv writes CSV, anything else JSON
+    """
+    output = Path(output)
+    if output.suffix.lower() == ".csv":
+        with open(output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        payload = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "results": results,
+        }
+        output.write_text(json.dumps(payload, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the arg_database layer")
+    parser.add_argument("--sizes", nargs="+", default=["10k"], choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", default=[],
+                        help="Run only scenarios whose name starts with one of these prefixes")
+    parser.add_argument("--db-dir", default=None,
+                        help="Where to keep generated databases (default: a temporary directory)")
+    parser.add_argument("--output", default=None, help="Write results to this .json or .csv file")
+    args = parser.parse_args()
+
+    selected = {name: func for name, func in SCENARIOS.items()
+                if not args.only or any(name.startswith(prefix) for prefix in args.only)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_dir = Path(args.db_dir or tmp)
+        db_dir.mkdir(parents=True, exist_ok=True)
+        results = []
+        for size in args.sizes:
+            source = prepare_database(db_dir, size, args.seed)
+            # CRUD scenarios write, so run against a copy to keep the source repeatable
+            work_db = Path(tmp) / f"work_{size}.db"
+            shutil.copyfile(source, work_db)
+            connection.DB_PATH = work_db
+
+            ctx = Context(SIZES[size], args.seed)
+            for name, func in selected.items():
+                durations = run_scenario(func, ctx, args.repeat)
+                result = {
+                    "scenario": name,
+                    "size": size,
+                    "rows": SIZES[size],
+                    "repeat": args.repeat,
+                    "mean_ms": round(statistics.fmean(durations), 3),
+                    "p50_ms": round(statistics.median(durations), 3),
+                    "min_ms": round(min(durations), 3),
+                    "max_ms": round(max(durations), 3),
+                }
+                results.append(result)
+                print(f"{size:>4}  {name:<40}{result['mean_ms']:>12.3f} ms")
+
+        if args.output:
+            write_results(results, args.output)
+            print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
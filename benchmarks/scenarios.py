@@ -0,0 +1,303 @@
+"""
+Repeatable benchmark scenarios for the arg_database layer
+
+Each scenario is a function taking a Context and doing one unit of work.
+Scenarios fall into these groups:
+    - load: the load_* functions the pages call on every rerun (served from
+      table snapshots once written), plus the plain SELECT * they replace
+    - crud: single-row create/update/delete through data_loader
+    - aggregate: the pandas aggregations the analysis tabs run
+    - sketch: percentiles and distinct counts from the column sketches,
+      next to the full-scan pandas versions they replace
+    - analytics: anomaly scores over the rollup tables, cold (after a
+      write) and cached
+    - forecast: resolution-time predictions, the incremental refit after a
+      resolved ticket is created, and a full refit
+    - dedup: near-duplicate lookups for the create forms, with and without
+      a row indexed just before, and a full index rebuild
+"""
+import random
+
+import pandas as pd
+
+from arg_database import analytics, data_loader, dedup, forecasting, sketches, tables
+from arg_database.connection import get_db_connection
+from benchmarks.generators import PRIORITIES, STAFF
+
+SCENARIOS = {}
+
+
+class Context:
+    """
+    State shared between scenario runs against one database
+
+    Attributes:
+        rows: Number of rows per table in the database
+        rng: Seeded random generator for picking rows and values
+        frames: Loaded DataFrames reused by the aggregation scenarios
+        next_ids: Next free primary key per table for create scenarios
+    """
+
+    def __init__(self, rows, seed=0):
+        self.rows = rows
+        self.rng = random.Random(seed)
+        self.frames = {}
+        self.next_ids = {}
+
+    def frame(self, name, loader):
+        """Load a DataFrame once and reuse it"""
+        if name not in self.frames:
+            self.frames[name] = loader()
+        return self.frames[name]
+
+    def new_id(self, table, start):
+        """Return a primary key that is not yet used in the table"""
+        self.next_ids[table] = self.next_ids.get(table, start + self.rows + 1_000_000) + 1
+        return self.next_ids[table]
+
+
+def scenario(group, name):
+    """Register a scenario function under group/name"""
+    def register(func):
+        SCENARIOS[f"{group}/{name}"] = func
+        return func
+    return register
+
+
+# Load paths
+
+@scenario("load", "load_cyber_incidents")
+def load_incidents(ctx):
+    data_loader.load_cyber_incidents()
+
+
+@scenario("load", "load_it_tickets")
+def load_tickets(ctx):
+    data_loader.load_it_tickets()
+
+
+@scenario("load", "load_datasets_metadata")
+def load_datasets(ctx):
+    data_loader.load_datasets_metadata()
+
+
+@scenario("load", "it_tickets_select_all")
+def select_all_tickets(ctx):
+    # What load_it_tickets costs without a current snapshot
+    conn = get_db_connection()
+    pd.read_sql_query("SELECT * FROM it_tickets", conn)
+    conn.close()
+
+
+@scenario("load", "search_incidents")
+def search_incidents(ctx):
+    data_loader.search_incidents(ctx.rng.choice(["phishing", "ransomware", "vpn", "payroll"]))
+
+
+@scenario("load", "search_tickets")
+def search_tickets(ctx):
+    data_loader.search_tickets(ctx.rng.choice(["printer", "password", "vpn", "outlook"]))
+
+
+# CRUD paths
+
+@scenario("crud", "create_incident")
+def create_incident(ctx):
+    data_loader.create_incident(ctx.new_id("cyber_incidents", 1000), "2024-06-01 12:00:00", "High",
+                                "Phishing", "Open", "Benchmark phishing email")
+
+
+@scenario("crud", "update_incident")
+def update_incident(ctx):
+    data_loader.update_incident(1000 + ctx.rng.randrange(ctx.rows),
+                                status=ctx.rng.choice(["Open", "In Progress", "Resolved"]))
+
+
+@scenario("crud", "delete_incident")
+def delete_incident(ctx):
+    incident_id = ctx.new_id("cyber_incidents", 1000)
+    data_loader.create_incident(incident_id, "2024-06-01 12:00:00", "Low", "Malware", "Open", "tmp")
+    data_loader.delete_incident(incident_id)
+
+
+@scenario("crud", "create_ticket")
+def create_ticket(ctx):
+    data_loader.create_ticket(ctx.new_id("it_tickets", 2000), "Medium", "Benchmark VPN ticket", "Open",
+                              "IT_Support_A", "2024-06-01 12:00:00", 0.0)
+
+
+@scenario("crud", "update_ticket")
+def update_ticket(ctx):
+    data_loader.update_ticket(2000 + ctx.rng.randrange(ctx.rows), status="Resolved",
+                              priority=ctx.rng.choice(["Low", "High"]),
+                              resolution_time_hours=ctx.rng.uniform(1, 72))
+
+
+@scenario("crud", "delete_ticket")
+def delete_ticket(ctx):
+    ticket_id = ctx.new_id("it_tickets", 2000)
+    data_loader.create_ticket(ticket_id, "Low", "tmp", "Open", "IT_Support_B", "2024-06-01 12:00:00", 0.0)
+    data_loader.delete_ticket(ticket_id)
+
+
+@scenario("crud", "create_dataset")
+def create_dataset(ctx):
+    data_loader.create_dataset(ctx.new_id("datasets_metadata", 1), "Benchmark_Set", 5000, 12,
+                               "data_scientist", "2024-06-01")
+
+
+@scenario("crud", "update_dataset")
+def update_dataset(ctx):
+    data_loader.update_dataset(1 + ctx.rng.randrange(ctx.rows), rows=ctx.rng.randrange(1000, 10 ** 6))
+
+
+@scenario("crud", "delete_dataset")
+def delete_dataset(ctx):
+    dataset_id = ctx.new_id("datasets_metadata", 1)
+    data_loader.create_dataset(dataset_id, "tmp", 1, 1, "it_admin", "2024-06-01")
+    data_loader.delete_dataset(dataset_id)
+
+
+# Aggregation paths (mirror the analysis tabs)
+
+@scenario("aggregate", "incident_threat_analysis")
+def incident_threat_analysis(ctx):
+    df = ctx.frame("incidents", data_loader.load_cyber_incidents)
+    phishing_df = df[df['category'] == 'Phishing']
+    phishing_df['status'].value_counts()
+    df['category'].value_counts()
+    df['severity'].value_counts()
+    df.groupby(['category', 'status']).size().reset_index(name='count')
+
+
+@scenario("aggregate", "ticket_performance_analysis")
+def ticket_performance_analysis(ctx):
+    df = ctx.frame("tickets", data_loader.load_it_tickets)
+    df.groupby('assigned_to').agg({'ticket_id': 'count', 'resolution_time_hours': 'mean'})
+    df.groupby('status')['resolution_time_hours'].mean().sort_values(ascending=False)
+    df['priority'].value_counts()
+
+
+@scenario("aggregate", "dataset_governance_analysis")
+def dataset_governance_analysis(ctx):
+    df = ctx.frame("datasets", data_loader.load_datasets_metadata)
+    df.nlargest(3, 'rows')
+    df.groupby('uploaded_by')['rows'].sum().sort_values(ascending=False)
+    df[df['rows'] > df['rows'].quantile(0.75)]
+    df.groupby('uploaded_by').agg({'dataset_id': 'count', 'rows': 'sum'})
+    df['uploaded_by'].nunique()
+
+
+# Sketch paths (percentiles and distinct counts)
+
+@scenario("sketch", "ticket_percentiles_scan")
+def ticket_percentiles_scan(ctx):
+    df = ctx.frame("tickets", data_loader.load_it_tickets)
+    df['resolution_time_hours'].quantile(0.95)
+    df.groupby('assigned_to')['resolution_time_hours'].quantile(0.95)
+    df['assigned_to'].nunique()
+
+
+@scenario("sketch", "ticket_percentiles_sketch")
+def ticket_percentiles_sketch(ctx):
+    sketches.quantile("it_tickets", "resolution_time_hours", 0.95)
+    sketches.group_quantiles("it_tickets", "resolution_time_hours", "assigned_to", 0.95)
+    sketches.distinct_count("it_tickets", "assigned_to")
+
+
+@scenario("sketch", "ticket_percentiles_after_create")
+def ticket_percentiles_after_create(ctx):
+    # The insert is folded into the stored sketches, so the read decodes them instead of rescanning
+    create_ticket(ctx)
+    ticket_percentiles_sketch(ctx)
+
+
+@scenario("sketch", "ticket_percentiles_after_edit")
+def ticket_percentiles_after_edit(ctx):
+    # The edit leaves the sketches stale; the read serves them and a background thread rebuilds them
+    data_loader.update_ticket(2000 + ctx.rng.randrange(ctx.rows), resolution_time_hours=ctx.rng.uniform(1, 72))
+    ticket_percentiles_sketch(ctx)
+
+
+@scenario("sketch", "rebuild_it_tickets")
+def rebuild_ticket_sketches(ctx):
+    conn = get_db_connection()
+    sketches.rebuild_sketches(conn, "it_tickets")
+    conn.close()
+
+
+# Analytics paths (anomaly findings from the rollup tables)
+
+@scenario("analytics", "ticket_anomalies")
+def ticket_anomalies(ctx):
+    analytics.staff_anomalies()
+    analytics.status_bottlenecks()
+
+
+@scenario("analytics", "ticket_anomalies_after_create")
+def ticket_anomalies_after_create(ctx):
+    # The write changes the table version, so the rollup is re-read
+    create_ticket(ctx)
+    ticket_anomalies(ctx)
+
+
+@scenario("analytics", "incident_anomalies")
+def incident_anomalies(ctx):
+    analytics.incident_surges()
+    analytics.incident_backlog()
+
+
+@scenario("analytics", "incident_anomalies_after_create")
+def incident_anomalies_after_create(ctx):
+    create_incident(ctx)
+    incident_anomalies(ctx)
+
+
+@scenario("analytics", "rebuild_rollups")
+def rebuild_rollups(ctx):
+    conn = get_db_connection()
+    tables.rebuild_rollups(conn)
+    conn.close()
+
+
+# Forecast paths (resolution-time model)
+
+@scenario("forecast", "predict_resolution")
+def predict_resolution(ctx):
+    forecasting.predict_resolution(ctx.rng.choice(PRIORITIES[0]), ctx.rng.choice(STAFF[0]), "2024-06-01 10:00:00")
+
+
+@scenario("forecast", "predict_after_resolved_create")
+def predict_after_resolved_create(ctx):
+    # The new resolved ticket is logged by trigger and folded in; no refit over all tickets
+    data_loader.create_ticket(ctx.new_id("it_tickets", 2000), ctx.rng.choice(PRIORITIES[0]), "bench", "Resolved",
+                              ctx.rng.choice(STAFF[0]), "2024-06-01 10:00:00", ctx.rng.uniform(1, 72))
+    predict_resolution(ctx)
+
+
+@scenario("forecast", "rebuild_model")
+def rebuild_model(ctx):
+    conn = get_db_connection()
+    forecasting.refresh_model(conn, rebuild=True)
+    conn.close()
+
+
+# Dedup paths (MinHash/LSH over descriptions)
+
+@scenario("dedup", "find_duplicates")
+def find_duplicates(ctx):
+    dedup.find_duplicates("cyber_incidents", "Benchmark phishing email")
+
+
+@scenario("dedup", "find_duplicates_after_create")
+def find_duplicates_after_create(ctx):
+    # create_incident indexes its own row, so the lookup finds nothing pending
+    create_incident(ctx)
+    find_duplicates(ctx)
+
+
+@scenario("dedup", "rebuild_index")
+def rebuild_dedup_index(ctx):
+    conn = get_db_connection()
+    dedup.rebuild_index(conn, "cyber_incidents")
+    conn.close()
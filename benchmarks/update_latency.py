@@ -0,0 +1,118 @@
+"""
+Microbenchmark: single-row UPDATE latency before and after the statement registry
+
+"before" is the original update_ticket implementation, which builds the SET
+clause with an f-string on every call. "after" goes through
+arg_database.statements. Both are measured with a fresh connection per call
+(how the pages use data_loader) and on one held connection (where the
+registry's cached SQL and cursor can be reused).
+
+Usage:
+    python -m benchmarks.update_latency [--rows 10000] [--iterations 5000]
+"""
+import argparse
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import arg_database.connection as connection
+from arg_database.tables import initialize_all_tables
+from arg_database.statements import execute_update
+from benchmarks.generators import generate_tickets
+
+STATUSES = ["Open", "In Progress", "Resolved", "Waiting for User"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+
+
+def legacy_update_ticket(conn, ticket_id, **kwargs):
+    """Original dynamic-SQL update, kept here as the baseline"""
+    cursor = conn.cursor()
+    set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
+    values = list(kwargs.values()) + [ticket_id]
+    cursor.execute(f"UPDATE it_tickets SET {set_clause} WHERE ticket_id = ?", values)
+
+
+def registry_update_ticket(conn, ticket_id, **kwargs):
+    """Update through the statement registry"""
+    execute_update(conn, "it_tickets", ticket_id, kwargs)
+
+
+def populate(rows):
+    """
+    Create a scratch database with the given number of tickets
+
+    Args:
+        rows: Number of ticket rows to insert
+    """
+    conn = connection.get_db_connection()
+    initialize_all_tables(conn)
+    for chunk in generate_tickets(rows, seed=42, start_id=0):
+        conn.executemany("INSERT INTO it_tickets VALUES (?, ?, ?, ?, ?, ?, ?)", chunk)
+    conn.commit()
+    conn.close()
+
+
+def time_updates(update, rows, iterations, held_conn):
+    """
+    Time a number of single-row updates
+
+    Args:
+        update: Update function taking (conn, ticket_id, **fields)
+        rows: Number of rows in the table
+        iterations: Number of updates to run
+        held_conn: Reuse one connection instead of opening one per update
+
+    Returns:
+        list: Per-update latencies in microseconds
+    """
+    rng = random.Random(7)
+    latencies = []
+    conn = connection.get_db_connection() if held_conn else None
+    for _ in range(iterations):
+        ticket_id = rng.randrange(rows)
+        fields = {"status": rng.choice(STATUSES), "priority": rng.choice(PRIORITIES),
+                  "resolution_time_hours": rng.uniform(1, 72)}
+        start = time.perf_counter()
+        c = conn if held_conn else connection.get_db_connection()
+        update(c, ticket_id, **fields)
+        c.commit()
+        if not held_conn:
+            c.close()
+        latencies.append((time.perf_counter() - start) * 1e6)
+    if conn is not None:
+        conn.close()
+    return latencies
+
+
+def summarize(latencies):
+    """Return mean, p50 and p95 of a list of latencies"""
+    ordered = sorted(latencies)
+    return (statistics.fmean(ordered), ordered[len(ordered) // 2],
+            ordered[int(len(ordered) * 0.95)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Point the data layer at a scratch database
+        connection.DB_PATH = Path(tmp) / "bench.db"
+        populate(args.rows)
+
+        print(f"sqlite {sqlite3.sqlite_version}, {args.rows:,} rows, {args.iterations:,} updates")
+        print(f"{'variant':<28}{'mean us':>10}{'p50 us':>10}{'p95 us':>10}")
+        for held in (False, True):
+            for name, update in (("before", legacy_update_ticket), ("after", registry_update_ticket)):
+                label = f"{name} ({'held conn' if held else 'conn per call'})"
+                mean, p50, p95 = summarize(time_updates(update, args.rows, args.iterations, held))
+                print(f"{label:<28}{mean:>10.1f}{p50:>10.1f}{p95:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
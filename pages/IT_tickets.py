@@ -1,178 +1,187 @@
 import streamlit as st
-import plotly.express as px
-from pathlib import Path
-import base64
-import plotly.graph_objects as go
+import pandas as pd
 from datetime import datetime
+from arg_metrics.timing import section
+from arg_ui.charts import plotly_chart
+from arg_ui.sections import show_lazy_tabs, show_findings
+from arg_ui.shell import page_shell
+from arg_ui.downloads import show_filters, apply_filters, show_export
+from arg_ui.downsample import box_stats
+from arg_ui.data import cached_it_tickets, refresh_after_write
 from arg_database.data_loader import (
-    load_it_tickets, create_ticket, update_ticket, delete_ticket
+    search_tickets, create_ticket, update_ticket, delete_ticket
 )
+from arg_database.sketches import quantile, group_quantiles
+from arg_database.analytics import staff_anomalies, status_bottlenecks
+from arg_database.forecasting import predict_resolution, outlier_z, OUTLIER_Z
+from arg_database.dedup import find_duplicates
 
-# Configure the Streamlit page settings
-st.set_page_config(
-    page_title="IT Operations Dashboard",
-    page_icon="💻",
-    layout="wide"
-)
-
-# Check if user is logged in - redirect to login if not
-if "logged_in" not in st.session_state or not st.session_state.logged_in:
-    st.error("Please login first")
-    st.stop()
-
-# Check if user has permission to view this page
-if st.session_state.role not in ["user", "it_admin"]:
-    st.error("Access Denied - You don't have permission to view this page")
-    st.stop()
-
-# Path to background image
-image_path = "imgs/matte.jpg"
-
-# Apply background image styling if the file exists
-if Path(image_path).exists():
-    # Read the image file as bytes
-    with open(image_path, "rb") as f:
-        image_bytes = f.read()
-
-    # Determine MIME type based on file extension
-    if image_path.lower().endswith(('.png')):
-        mime = "image/png"
-    elif image_path.lower().endswith(('.jpg', '.jpeg')):
-        mime = "image/jpeg"
-    elif image_path.lower().endswith(('.gif')):
-        mime = "image/gif"
-    else:
-        mime = "image/jpeg"
-
-    # Encode image to base64 for embedding in CSS
-    encoded = base64.b64encode(image_bytes).decode()
-
-    # Inject custom CSS with background image
-    st.markdown(
-        f"""
-        <style>
-        /* Background on whole app */
-        .stApp {{
-            background-image: url("data:{mime};base64,{encoded}");
-            background-size: cover;
-            background-position: center center;
-            background-repeat: no-repeat;
-            background-attachment: fixed;
-        }}
-
-        /* Main content readable */
-        .main .block-container {{
-            background: rgba(255, 255, 255, 0.9) !important;
-            padding: 2rem !important;
-            border-radius: 10px !important;
-        }}
-
-        /* Don't mess with sidebar at all - let it be default */
-
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-# Add custom button styling
-st.markdown(""" 
-<style>
-.stButton > button {
-    border: 2px solid #DC143C;
-}
-
-.stButton > button:hover {
-    background-color: #DC143C;
-    color: white;
-    border: 2px solid #DC143C;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# Create sidebar with navigation
-st.sidebar.title("ARG NAVIGATION💢")
-st.sidebar.write(f"**User:** {st.session_state.username}")
-st.sidebar.write(f"**Role:** {st.session_state.role}")
-
-# Add navigation links based on user role
-st.sidebar.page_link("pages/dash.py", label="Dashboard")
-if st.session_state.role == "user":
-    st.sidebar.page_link("pages/cybersecurity.py", label="Cybersecurity")
-    st.sidebar.page_link("pages/data_science.py", label="Data Science")
-    st.sidebar.page_link("pages/ai_assistant.py", label="AI assistant")
-
-st.sidebar.markdown("---")
-
-# Logout button - clears session state and returns to login
-if st.sidebar.button("Logout", use_container_width=True):
-    st.session_state.logged_in = False
-    st.session_state.username = None
-    st.session_state.role = None
-    st.switch_page("arg_app.py")
+# Page config, login and role check, styling and sidebar
+page_shell("pages/IT_tickets.py")
 
 # Load ticket data from database
-df = load_it_tickets()
+with section("data load"):
+    df = cached_it_tickets()
 
 # Main page title
 st.title("IT Operations Dashboard")
 st.markdown("### Service Desk Performance & Ticket Management")
 
-# Display key metrics in a 2x2 grid
+# Fragments that show ticket data; a write reruns only these
+TICKET_FRAGMENTS = ["ticket_overview", "ticket_management"]
+
+# Options for the ticket form fields
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+STATUSES = ["Open", "In Progress", "Resolved", "Waiting for User"]
+ASSIGNEES = ["IT_Support_A", "IT_Support_B", "IT_Support_C"]
+# Columns the ticket table can be filtered on (column -> label)
+TICKET_FILTERS = {"priority": "Priority", "status": "Status", "assigned_to": "Assigned To"}
+CREATE_FORM_KEYS = ["new_ticket_id", "new_ticket_priority", "new_ticket_status", "new_ticket_assigned",
+                    "new_ticket_created", "new_ticket_resolution", "new_ticket_description",
+                    "new_ticket_allow_duplicate"]
+# Columns shown for likely duplicates of a new ticket
+DUPLICATE_COLUMNS = ["ticket_id", "priority", "status", "assigned_to", "created_at", "description", "similarity"]
+
+
+@st.fragment(key="ticket_overview")
+def show_ticket_overview():
+    """Display key metrics in a 2x2 grid"""
+    df = cached_it_tickets()
+    with section("metrics"):
+        row1_col1, row1_col2 = st.columns(2)
+        with row1_col1:
+            st.metric("Total Tickets", len(df))
+        with row1_col2:
+            st.metric("Open Tickets", len(df[df['status'] == 'Open']))
+
+        row2_col1, row2_col2 = st.columns(2)
+        with row2_col1:
+            # Calculate average resolution time across all tickets
+            avg_resolution = df['resolution_time_hours'].mean()
+            p95_resolution = quantile("it_tickets", "resolution_time_hours", 0.95)
+            st.metric("Avg Resolution", f"{avg_resolution:.1f} hrs",
+                      help=f"95th percentile: {p95_resolution:.1f} hrs" if p95_resolution is not None else None)
+        with row2_col2:
+            st.metric("Critical", len(df[df['priority'] == 'Critical']))
+
+
 st.markdown("#### System Overview")
-row1_col1, row1_col2 = st.columns(2)
-with row1_col1:
-    st.metric("Total Tickets", len(df))
-with row1_col2:
-    st.metric("Open Tickets", len(df[df['status'] == 'Open']))
-
-row2_col1, row2_col2 = st.columns(2)
-with row2_col1:
-    # Calculate average resolution time across all tickets
-    avg_resolution = df['resolution_time_hours'].mean()
-    st.metric("Avg Resolution", f"{avg_resolution:.1f} hrs")
-with row2_col2:
-    st.metric("Critical", len(df[df['priority'] == 'Critical']))
+show_ticket_overview()
 
 st.markdown("---")
 
-# Create tabs for ticket management and performance analysis
-tab1, tab2 = st.tabs(["Ticket Management", "Performance Analysis"])
+
+def submit_new_ticket():
+    """Create the ticket entered in the create form (form callback)"""
+    state = st.session_state
+    # Hold the ticket back if it looks like one already raised, unless the user chose to create it anyway
+    duplicates = find_duplicates("it_tickets", state.new_ticket_description)
+    if not duplicates.empty and not state.new_ticket_allow_duplicate:
+        state.ticket_duplicates = duplicates
+        return
+    state.pop("ticket_duplicates", None)
+    # Forecast from the tickets resolved so far, before this one is folded into the model
+    forecast = predict_resolution(state.new_ticket_priority, state.new_ticket_assigned, state.new_ticket_created)
+    create_ticket(state.new_ticket_id, state.new_ticket_priority, state.new_ticket_description,
+                  state.new_ticket_status, state.new_ticket_assigned, state.new_ticket_created,
+                  state.new_ticket_resolution)
+
+    message = "Ticket created successfully"
+    if forecast is not None:
+        expected = (f"{forecast.expected_hours:.1f} hrs "
+                    f"(typically {forecast.low_hours:.0f}-{forecast.high_hours:.0f})")
+        message += f". Expected resolution: {expected}"
+        # Flag an entered resolution time far outside what similar tickets took
+        if state.new_ticket_resolution and abs(outlier_z(forecast, state.new_ticket_resolution)) > OUTLIER_Z:
+            st.toast(f"Unusual resolution time: {state.new_ticket_resolution:.1f} hrs for a "
+                     f"{state.new_ticket_priority} ticket assigned to {state.new_ticket_assigned}; "
+                     f"expected {expected}", icon="⚠️")
+    refresh_after_write("it_tickets", message, TICKET_FRAGMENTS, forget=CREATE_FORM_KEYS)
+
+
+def submit_ticket_update(ticket_id):
+    """Save the update form for one ticket (form callback)"""
+    update_ticket(ticket_id,
+                  status=st.session_state[f"upd_ticket_status_{ticket_id}"],
+                  priority=st.session_state[f"upd_ticket_priority_{ticket_id}"],
+                  resolution_time_hours=st.session_state[f"upd_ticket_resolution_{ticket_id}"])
+    refresh_after_write("it_tickets", "Ticket updated successfully", TICKET_FRAGMENTS)
+
+
+def submit_ticket_delete():
+    """Delete the ticket picked in the delete section (button callback)"""
+    delete_ticket(st.session_state.delete)
+    refresh_after_write("it_tickets", "Ticket deleted successfully", TICKET_FRAGMENTS)
+
 
 # Tab 1: Ticket Management
-with tab1:
+@st.fragment(key="ticket_management")
+def show_ticket_management():
+    """Display the ticket forms and the ticket table"""
+    df = cached_it_tickets()
+
     # Form to create new ticket
     st.markdown("#### Create New Ticket")
     with st.form("create_ticket"):
         col1, col2, col3 = st.columns(3)
         with col1:
             # Generate next available ticket ID
-            new_id = st.number_input("Ticket ID", min_value=1, value=int(df['ticket_id'].max() + 1))
-            new_priority = st.selectbox("Priority", ["Low", "Medium", "High", "Critical"])
+            next_id = int(df['ticket_id'].max()) + 1 if len(df) else 1
+            st.number_input("Ticket ID", min_value=1, value=next_id, key="new_ticket_id")
+            st.selectbox("Priority", PRIORITIES, key="new_ticket_priority")
         with col2:
-            new_status = st.selectbox("Status", ["Open", "In Progress", "Resolved", "Waiting for User"])
-            new_assigned = st.selectbox("Assign To", ["IT_Support_A", "IT_Support_B", "IT_Support_C"])
+            st.selectbox("Status", STATUSES, key="new_ticket_status")
+            st.selectbox("Assign To", ASSIGNEES, key="new_ticket_assigned")
         with col3:
             # Default to current timestamp
-            new_created = st.text_input("Created At", value=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            new_resolution = st.number_input("Resolution Time (hours)", min_value=0.0, value=0.0)
+            st.text_input("Created At", value=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                          key="new_ticket_created")
+            st.number_input("Resolution Time (hours)", min_value=0.0, value=0.0, key="new_ticket_resolution",
+                            help="Creating the ticket shows its expected resolution time, "
+                                 "and flags a value far outside it")
 
-        new_description = st.text_area("Description")
+        st.text_area("Description", key="new_ticket_description")
+        st.checkbox("Create even if similar tickets exist", key="new_ticket_allow_duplicate")
 
         # Submit button - creates ticket in database
-        if st.form_submit_button("Create Ticket"):
-            create_ticket(new_id, new_priority, new_description, new_status,
-                          new_assigned, new_created, new_resolution)
-            st.success("Ticket created successfully")
-            st.rerun()
+        st.form_submit_button("Create Ticket", on_click=submit_new_ticket)
+
+    # Likely duplicates found when the form was submitted
+    duplicates = st.session_state.get("ticket_duplicates")
+    if duplicates is not None:
+        st.warning(f"Not created: {len(duplicates)} similar ticket(s) already raised. "
+                   "Tick 'Create even if similar tickets exist' to create it anyway.")
+        st.dataframe(duplicates[DUPLICATE_COLUMNS], use_container_width=True, hide_index=True)
 
     st.markdown("---")
 
     # Display all tickets in a table
     st.markdown("#### All Tickets")
-    st.dataframe(df, use_container_width=True)
+
+    # Full-text search over ticket descriptions, narrowed by the filters
+    search_query = st.text_input("Search descriptions", key="ticket_search",
+                                 placeholder="e.g. credential reset")
+    filters = show_filters(df, TICKET_FILTERS, key="ticket_filter")
+    with section("dataframe"):
+        if search_query:
+            results = search_tickets(search_query, filters=filters)
+            if results.empty:
+                st.info("No tickets match your search")
+            else:
+                st.caption(f"{len(results)} best matches")
+                st.dataframe(results, use_container_width=True)
+        else:
+            st.dataframe(apply_filters(df, filters), use_container_width=True)
+
+    # Export every matching ticket (not just the best search matches)
+    show_export("it_tickets", filters, search_query, key="ticket_export", fragments=["ticket_management"])
 
     st.markdown("---")
 
+    # Nothing to update or delete in an empty table
+    if df.empty:
+        return
+
     # Update and Delete sections side by side
     col1, col2 = st.columns(2)
 
@@ -184,43 +193,43 @@ with tab1:
         ticket = df[df['ticket_id'] == update_id].iloc[0]
 
         with st.form("update_ticket"):
-            # Pre-populate fields with current values
-            upd_status = st.selectbox("Status", ["Open", "In Progress", "Resolved", "Waiting for User"],
-                                      index=["Open", "In Progress", "Resolved", "Waiting for User"].index(
-                                          ticket['status']))
-            upd_priority = st.selectbox("Priority", ["Low", "Medium", "High", "Critical"],
-                                        index=["Low", "Medium", "High", "Critical"].index(ticket['priority']))
-            upd_resolution = st.number_input("Resolution Time (hrs)", value=float(ticket['resolution_time_hours']))
+            # Pre-populate fields with current values (keys are per ticket)
+            st.selectbox("Status", STATUSES, index=STATUSES.index(ticket['status']),
+                         key=f"upd_ticket_status_{update_id}")
+            st.selectbox("Priority", PRIORITIES, index=PRIORITIES.index(ticket['priority']),
+                         key=f"upd_ticket_priority_{update_id}")
+            st.number_input("Resolution Time (hrs)", value=float(ticket['resolution_time_hours']),
+                            key=f"upd_ticket_resolution_{update_id}")
 
             # Submit button - updates ticket in database
-            if st.form_submit_button("Update"):
-                update_ticket(update_id, status=upd_status, priority=upd_priority,
-                              resolution_time_hours=upd_resolution)
-                st.success("Ticket updated successfully")
-                st.rerun()
+            st.form_submit_button("Update", on_click=submit_ticket_update, args=(update_id,))
 
     with col2:
         # Delete ticket section
         st.markdown("#### Delete Ticket")
-        delete_id = st.selectbox("Select Ticket ID to Delete", df['ticket_id'].values, key="delete")
+        st.selectbox("Select Ticket ID to Delete", df['ticket_id'].values, key="delete")
         st.markdown("")
         st.markdown("")
         # Delete button - removes ticket from database
-        if st.button("Delete Ticket", type="primary"):
-            delete_ticket(delete_id)
-            st.success("Ticket deleted successfully")
-            st.rerun()
+        st.button("Delete Ticket", type="primary", on_click=submit_ticket_delete)
+
 
 # Tab 2: Performance Analysis
-with tab2:
+def show_performance_analysis(df):
+    """Display the staff performance and bottleneck analysis"""
+    if df.empty:
+        st.info("No tickets to analyse yet")
+        return
+
     # Staff performance analysis - highest priority insight
     st.markdown("#### High-Value Insight: Staff Performance")
 
-    # Aggregate performance metrics by staff member
-    staff_performance = df.groupby('assigned_to').agg({
-        'ticket_id': 'count',
-        'resolution_time_hours': 'mean'
-    }).rename(columns={'ticket_id': 'total_tickets', 'resolution_time_hours': 'avg_resolution_time'})
+    # Performance metrics by staff member from the ticket rollup, with robust z-scores against their peers
+    staff_performance, staff_findings = staff_anomalies()
+    # 95th percentile per staff member from the quantile sketches (no sort over all tickets); like the
+    # rollup averages next to it, these cover archived tickets too
+    staff_performance['p95_resolution_time'] = pd.Series(
+        group_quantiles("it_tickets", "resolution_time_hours", "assigned_to", 0.95))
 
     # Sort by average resolution time (descending)
     staff_performance = staff_performance.sort_values('avg_resolution_time', ascending=False)
@@ -230,43 +239,36 @@ with tab2:
     with perf_col1:
         # Display staff performance table
         st.dataframe(staff_performance, use_container_width=True)
-        # Identify slowest staff member
-        slowest_staff = staff_performance['avg_resolution_time'].idxmax()
-        slowest_time = staff_performance['avg_resolution_time'].max()
-        st.warning(
-            f"Performance Anomaly: {slowest_staff} has the highest average resolution time ({slowest_time:.1f} hours)")
+        show_findings(staff_findings, "No staff member's average resolution time stands out from their peers")
 
     with perf_col2:
         # Bar chart of average resolution time by staff
-        fig = px.bar(staff_performance, x=staff_performance.index, y='avg_resolution_time',
-                     labels={'x': 'Staff Member', 'avg_resolution_time': 'Avg Resolution Time (hrs)'},
-                     title="Average Resolution Time by Staff")
-        st.plotly_chart(fig, use_container_width=True)
+        with section("figure: Average Resolution Time by Staff"):
+            plotly_chart("bar", staff_performance.reset_index(), x='assigned_to', y='avg_resolution_time',
+                         labels={'assigned_to': 'Staff Member', 'avg_resolution_time': 'Avg Resolution Time (hrs)'},
+                         title="Average Resolution Time by Staff")
 
     st.markdown("---")
 
     # Process bottleneck analysis
     st.markdown("#### Process Bottleneck Analysis")
-    # Calculate average resolution time by ticket status
-    status_resolution = df.groupby('status')['resolution_time_hours'].mean().sort_values(ascending=False)
+    # Average resolution time by ticket status, scored like the staff table
+    status_performance, status_findings = status_bottlenecks()
+    status_resolution = status_performance['avg_resolution_time'].sort_values(ascending=False)
 
     bottleneck_col1, bottleneck_col2 = st.columns([1, 2])
 
     with bottleneck_col1:
         # Display status resolution time table
         st.dataframe(status_resolution, use_container_width=True)
-        # Identify bottleneck status
-        bottleneck_status = status_resolution.idxmax()
-        bottleneck_time = status_resolution.max()
-        st.info(
-            f"Bottleneck Identified: Tickets in '{bottleneck_status}' status have the longest resolution time ({bottleneck_time:.1f} hours)")
+        show_findings(status_findings, "No ticket status has an unusually long resolution time")
 
     with bottleneck_col2:
         # Bar chart of resolution time by status
-        fig = px.bar(x=status_resolution.index, y=status_resolution.values,
-                     labels={'x': 'Status', 'y': 'Avg Resolution Time (hrs)'},
-                     title="Resolution Time by Status")
-        st.plotly_chart(fig, use_container_width=True)
+        with section("figure: Resolution Time by Status"):
+            plotly_chart("bar", status_resolution, x='x', y='y',
+                         labels={'x': 'Status', 'y': 'Avg Resolution Time (hrs)'},
+                         title="Resolution Time by Status")
 
     st.markdown("---")
 
@@ -277,18 +279,27 @@ with tab2:
 
     with chart_col1:
         # Bar chart of ticket priority distribution
-        priority_counts = df['priority'].value_counts()
-        fig1 = px.bar(x=priority_counts.index, y=priority_counts.values,
-                      labels={'x': 'Priority', 'y': 'Count'},
-                      title="Ticket Priority Distribution")
-        st.plotly_chart(fig1, use_container_width=True)
+        with section("figure: Ticket Priority Distribution"):
+            priority_counts = df['priority'].value_counts()
+            plotly_chart("bar", priority_counts, x='x', y='y',
+                         labels={'x': 'Priority', 'y': 'Count'},
+                         title="Ticket Priority Distribution")
 
     with chart_col2:
         # Box plot showing resolution time distribution by priority
-        fig2 = px.box(df, x='priority', y='resolution_time_hours',
-                      labels={'priority': 'Priority', 'resolution_time_hours': 'Resolution Time (hours)'},
-                      title="Resolution Time Distribution by Priority")
-        st.plotly_chart(fig2, use_container_width=True)
+        with section("figure: Resolution Time Distribution by Priority"):
+            # Quartiles and whiskers are computed here so only a few numbers reach the browser
+            resolution_boxes = box_stats(df, 'priority', 'resolution_time_hours')
+            plotly_chart("box_summary", resolution_boxes, x='priority', y='resolution_time_hours',
+                         labels={'priority': 'Priority', 'resolution_time_hours': 'Resolution Time (hours)'},
+                         title="Resolution Time Distribution by Priority")
+
+
+# Create tabs for ticket management and performance analysis (only the open tab is rendered)
+show_lazy_tabs({
+    "Ticket Management": show_ticket_management,
+    "Performance Analysis": lambda: show_performance_analysis(df),
+}, key="tickets_tab")
 
 st.markdown("---")
 st.caption("IT Operations Module - A.R.G.U.S.")
\ No newline at end of file
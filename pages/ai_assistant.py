@@ -1,10 +1,10 @@
 import streamlit as st
 import google.generativeai as genai
+from arg_metrics.tracing import traced
+from arg_ui.shell import page_shell
 from arg_database.data_loader import (
     load_cyber_incidents, load_datasets_metadata, load_it_tickets
 )
-from pathlib import Path
-import base64
 import os
 from dotenv import load_dotenv
 
@@ -14,102 +14,8 @@ load_dotenv()
 # Get Gemini API key from environment
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# Configure the Streamlit page settings
-st.set_page_config(
-    page_title="AI Assistant",
-    page_icon="🤖",
-    layout="wide"
-)
-
-# Check if user is logged in - redirect to login if not
-if "logged_in" not in st.session_state or not st.session_state.logged_in:
-    st.error("Please login first")
-    st.stop()
-
-# Path to background image
-image_path = "imgs/code.jpg"
-
-# Apply background image styling if the file exists
-if Path(image_path).exists():
-    # Read the image file as bytes
-    with open(image_path, "rb") as f:
-        image_bytes = f.read()
-
-    # Determine MIME type based on file extension
-    if image_path.lower().endswith(('.png')):
-        mime = "image/png"
-    elif image_path.lower().endswith(('.jpg', '.jpeg')):
-        mime = "image/jpeg"
-    elif image_path.lower().endswith(('.gif')):
-        mime = "image/gif"
-    else:
-        mime = "image/jpeg"
-
-    # Encode image to base64 for embedding in CSS
-    encoded = base64.b64encode(image_bytes).decode()
-
-    # Inject custom CSS with background image
-    st.markdown(
-        f"""
-        <style>
-        /* Background on whole app */
-        .stApp {{
-            background-image: url("data:{mime};base64,{encoded}");
-            background-size: cover;
-            background-position: center center;
-            background-repeat: no-repeat;
-            background-attachment: fixed;
-        }}
-
-        /* Main content readable */
-        .main .block-container {{
-            background: rgba(255, 255, 255, 0.9) !important;
-            padding: 2rem !important;
-            border-radius: 10px !important;
-        }}
-
-        /* Don't mess with sidebar at all - let it be default */
-
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-# Add custom button styling
-st.markdown(""" 
-<style>
-.stButton > button {
-    border: 2px solid #DC143C;
-}
-
-.stButton > button:hover {
-    background-color: #DC143C;
-    color: white;
-    border: 2px solid #DC143C;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# Create sidebar with navigation
-st.sidebar.title("ARG NAVIGATION💢")
-st.sidebar.write(f"**User:** {st.session_state.username}")
-st.sidebar.write(f"**Role:** {st.session_state.role}")
-
-# Add navigation links based on user role
-st.sidebar.page_link("pages/dash.py", label="Dashboard")
-if st.session_state.role == "user":
-    st.sidebar.page_link("pages/cybersecurity.py", label="Cybersecurity")
-    st.sidebar.page_link("pages/data_science.py", label="Data Science")
-    st.sidebar.page_link("pages/IT_tickets.py", label="IT Operations")
-
-st.sidebar.markdown("---")
-
-# Logout button - clears session state and returns to login
-if st.sidebar.button("Logout", use_container_width=True):
-    st.session_state.logged_in = False
-    st.session_state.username = None
-    st.session_state.role = None
-    st.switch_page("arg_app.py")
+# Page config, login and role check, styling and sidebar
+page_shell("pages/ai_assistant.py")
 
 # Main page content
 st.title("AI ASSISTANT \" GIDEON \" 🗣️")
@@ -153,6 +59,7 @@ def get_data_context():
     return context
 
 
+@traced("ai.get_ai_response")
 def get_ai_response(user_message):
     """
     Send message to Gemini AI and get response
@@ -1,175 +1,162 @@
 import streamlit as st
-import plotly.express as px
-from pathlib import Path
-import base64
-import plotly.graph_objects as go
 from datetime import datetime
+from arg_metrics.timing import section
+from arg_ui.charts import plotly_chart
+from arg_ui.sections import show_lazy_tabs, show_findings
+from arg_ui.shell import page_shell
+from arg_ui.downloads import show_filters, apply_filters, show_export
+from arg_ui.data import cached_cyber_incidents, refresh_after_write
+from arg_database.analytics import incident_surges, incident_backlog
+from arg_database.dedup import find_duplicates
 from arg_database.data_loader import (
-    load_cyber_incidents, create_incident, update_incident, delete_incident
+    search_incidents, create_incident, update_incident, delete_incident
 )
 
-# Configure the Streamlit page settings
-st.set_page_config(
-    page_title="Cybersecurity Dashboard",
-    page_icon="🛡️",
-    layout="wide"
-)
-
-# Check if user is logged in - redirect to login if not
-if "logged_in" not in st.session_state or not st.session_state.logged_in:
-    st.error("Please login first")
-    st.stop()
-
-# Check if user has permission to view this page
-if st.session_state.role not in ["user", "cybersecurity"]:
-    st.error("Access Denied - You don't have permission to view this page")
-    st.stop()
-
-# Path to background image
-image_path = "imgs/matte.jpg"
-
-# Apply background image styling if the file exists
-if Path(image_path).exists():
-    # Read the image file as bytes
-    with open(image_path, "rb") as f:
-        image_bytes = f.read()
-
-    # Determine MIME type based on file extension
-    if image_path.lower().endswith(('.png')):
-        mime = "image/png"
-    elif image_path.lower().endswith(('.jpg', '.jpeg')):
-        mime = "image/jpeg"
-    elif image_path.lower().endswith(('.gif')):
-        mime = "image/gif"
-    else:
-        mime = "image/jpeg"
-
-    # Encode image to base64 for embedding in CSS
-    encoded = base64.b64encode(image_bytes).decode()
-
-    # Inject custom CSS with background image
-    st.markdown(
-        f"""
-        <style>
-        /* Background on whole app */
-        .stApp {{
-            background-image: url("data:{mime};base64,{encoded}");
-            background-size: cover;
-            background-position: center center;
-            background-repeat: no-repeat;
-            background-attachment: fixed;
-        }}
-
-        /* Main content readable */
-        .main .block-container {{
-            background: rgba(255, 255, 255, 0.9) !important;
-            padding: 2rem !important;
-            border-radius: 10px !important;
-        }}
-
-        /* Don't mess with sidebar at all - let it be default */
-
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-# Add custom button styling
-st.markdown(""" 
-<style>
-.stButton > button {
-    border: 2px solid #DC143C;
-}
-
-.stButton > button:hover {
-    background-color: #DC143C;
-    color: white;
-    border: 2px solid #DC143C;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# Create sidebar with navigation
-st.sidebar.title("ARG NAVIGATION💢")
-st.sidebar.write(f"**User:** {st.session_state.username}")
-st.sidebar.write(f"**Role:** {st.session_state.role}")
-
-# Add navigation links based on user role
-st.sidebar.page_link("pages/dash.py", label="Dashboard")
-if st.session_state.role == "user":
-    st.sidebar.page_link("pages/data_science.py", label="Data Science")
-    st.sidebar.page_link("pages/IT_tickets.py", label="IT Operations")
-    st.sidebar.page_link("pages/ai_assistant.py", label="AI assistant")
-
-st.sidebar.markdown("---")
-
-# Logout button - clears session state and returns to login
-if st.sidebar.button("Logout", use_container_width=True):
-    st.session_state.logged_in = False
-    st.session_state.username = None
-    st.session_state.role = None
-    st.switch_page("arg_app.py")
+# Page config, login and role check, styling and sidebar
+page_shell("pages/cybersecurity.py")
 
 # Load incident data from database
-df = load_cyber_incidents()
+with section("data load"):
+    df = cached_cyber_incidents()
 
 # Main page title
 st.title("Cybersecurity Dashboard")
 st.markdown("### Incident Response & Threat Analysis")
 
-# Display key metrics in a 2x2 grid
+# Fragments that show incident data; a write reruns only these
+INCIDENT_FRAGMENTS = ["incident_overview", "incident_management"]
+
+# Options for the incident form fields
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+CATEGORIES = ["Phishing", "Malware", "DDoS", "Unauthorized Access", "Misconfiguration"]
+STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+# Columns the incident table can be filtered on (column -> label)
+INCIDENT_FILTERS = {"severity": "Severity", "category": "Category", "status": "Status"}
+CREATE_FORM_KEYS = ["new_incident_id", "new_incident_timestamp", "new_incident_severity",
+                    "new_incident_category", "new_incident_status", "new_incident_description",
+                    "new_incident_allow_duplicate"]
+# Columns shown for likely duplicates of a new incident
+DUPLICATE_COLUMNS = ["incident_id", "timestamp", "category", "status", "description", "similarity"]
+
+
+@st.fragment(key="incident_overview")
+def show_incident_overview():
+    """Display key metrics in a 2x2 grid"""
+    df = cached_cyber_incidents()
+    with section("metrics"):
+        row1_col1, row1_col2 = st.columns(2)
+        with row1_col1:
+            st.metric("Total Incidents", len(df))
+        with row1_col2:
+            st.metric("Open Cases", len(df[df['status'] == 'Open']))
+
+        row2_col1, row2_col2 = st.columns(2)
+        with row2_col1:
+            st.metric("Critical", len(df[df['severity'] == 'Critical']))
+        with row2_col2:
+            st.metric("Phishing Alerts", len(df[df['category'] == 'Phishing']))
+
+
 st.markdown("#### System Overview")
-row1_col1, row1_col2 = st.columns(2)
-with row1_col1:
-    st.metric("Total Incidents", len(df))
-with row1_col2:
-    st.metric("Open Cases", len(df[df['status'] == 'Open']))
-
-row2_col1, row2_col2 = st.columns(2)
-with row2_col1:
-    st.metric("Critical", len(df[df['severity'] == 'Critical']))
-with row2_col2:
-    st.metric("Phishing Alerts", len(df[df['category'] == 'Phishing']))
+show_incident_overview()
 
 st.markdown("---")
 
-# Create tabs for incident management and analysis
-tab1, tab2 = st.tabs(["Incidents Management", "Threat Analysis"])
+
+def submit_new_incident():
+    """Create the incident entered in the create form (form callback)"""
+    state = st.session_state
+    # Hold the incident back if it looks like one already logged, unless the analyst chose to create it anyway
+    duplicates = find_duplicates("cyber_incidents", state.new_incident_description)
+    if not duplicates.empty and not state.new_incident_allow_duplicate:
+        state.incident_duplicates = duplicates
+        return
+    state.pop("incident_duplicates", None)
+    create_incident(state.new_incident_id, state.new_incident_timestamp, state.new_incident_severity,
+                    state.new_incident_category, state.new_incident_status, state.new_incident_description)
+    refresh_after_write("cyber_incidents", "Incident created successfully", INCIDENT_FRAGMENTS,
+                        forget=CREATE_FORM_KEYS)
+
+
+def submit_incident_update(incident_id):
+    """Save the update form for one incident (form callback)"""
+    update_incident(incident_id,
+                    status=st.session_state[f"upd_incident_status_{incident_id}"],
+                    severity=st.session_state[f"upd_incident_severity_{incident_id}"])
+    refresh_after_write("cyber_incidents", "Incident updated successfully", INCIDENT_FRAGMENTS)
+
+
+def submit_incident_delete():
+    """Delete the incident picked in the delete section (button callback)"""
+    delete_incident(st.session_state.delete)
+    refresh_after_write("cyber_incidents", "Incident deleted successfully", INCIDENT_FRAGMENTS)
+
 
 # Tab 1: Incident Management
-with tab1:
+@st.fragment(key="incident_management")
+def show_incident_management():
+    """Display the incident forms and the incident table"""
+    df = cached_cyber_incidents()
+
     # Form to create new incident
     st.markdown("#### Create New Incident")
     with st.form("create_incident"):
         col1, col2, col3 = st.columns(3)
         with col1:
             # Generate next available incident ID
-            new_id = st.number_input("Incident ID", min_value=1, value=int(df['incident_id'].max() + 1))
-            new_severity = st.selectbox("Severity", ["Low", "Medium", "High", "Critical"])
+            next_id = int(df['incident_id'].max()) + 1 if len(df) else 1
+            st.number_input("Incident ID", min_value=1, value=next_id, key="new_incident_id")
+            st.selectbox("Severity", SEVERITIES, key="new_incident_severity")
         with col2:
             # Default to current timestamp
-            new_timestamp = st.text_input("Timestamp", value=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            new_category = st.selectbox("Category",
-                                        ["Phishing", "Malware", "DDoS", "Unauthorized Access", "Misconfiguration"])
+            st.text_input("Timestamp", value=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                          key="new_incident_timestamp")
+            st.selectbox("Category", CATEGORIES, key="new_incident_category")
         with col3:
-            new_status = st.selectbox("Status", ["Open", "In Progress", "Resolved", "Closed"])
+            st.selectbox("Status", STATUSES, key="new_incident_status")
 
-        new_description = st.text_area("Description")
+        st.text_area("Description", key="new_incident_description")
+        st.checkbox("Create even if similar incidents exist", key="new_incident_allow_duplicate")
 
         # Submit button - creates incident in database
-        if st.form_submit_button("Create Incident"):
-            create_incident(new_id, new_timestamp, new_severity, new_category, new_status, new_description)
-            st.success("Incident created successfully")
-            st.rerun()
+        st.form_submit_button("Create Incident", on_click=submit_new_incident)
+
+    # Likely duplicates found when the form was submitted
+    duplicates = st.session_state.get("incident_duplicates")
+    if duplicates is not None:
+        st.warning(f"Not created: {len(duplicates)} similar incident(s) already logged. "
+                   "Tick 'Create even if similar incidents exist' to create it anyway.")
+        st.dataframe(duplicates[DUPLICATE_COLUMNS], use_container_width=True, hide_index=True)
 
     st.markdown("---")
 
     # Display all incidents in a table
     st.markdown("#### All Incidents")
-    st.dataframe(df, use_container_width=True)
+
+    # Full-text search over incident descriptions, narrowed by the filters
+    search_query = st.text_input("Search descriptions", key="incident_search",
+                                 placeholder="e.g. suspicious login")
+    filters = show_filters(df, INCIDENT_FILTERS, key="incident_filter")
+    with section("dataframe"):
+        if search_query:
+            results = search_incidents(search_query, filters=filters)
+            if results.empty:
+                st.info("No incidents match your search")
+            else:
+                st.caption(f"{len(results)} best matches")
+                st.dataframe(results, use_container_width=True)
+        else:
+            st.dataframe(apply_filters(df, filters), use_container_width=True)
+
+    # Export every matching incident (not just the best search matches)
+    show_export("cyber_incidents", filters, search_query, key="incident_export", fragments=["incident_management"])
 
     st.markdown("---")
 
+    # Nothing to update or delete in an empty table
+    if df.empty:
+        return
+
     # Update and Delete sections side by side
     col1, col2 = st.columns(2)
 
@@ -181,32 +168,32 @@ with tab1:
         incident = df[df['incident_id'] == update_id].iloc[0]
 
         with st.form("update_incident"):
-            # Pre-populate fields with current values
-            upd_status = st.selectbox("Status", ["Open", "In Progress", "Resolved", "Closed"],
-                                      index=["Open", "In Progress", "Resolved", "Closed"].index(incident['status']))
-            upd_severity = st.selectbox("Severity", ["Low", "Medium", "High", "Critical"],
-                                        index=["Low", "Medium", "High", "Critical"].index(incident['severity']))
+            # Pre-populate fields with current values (keys are per incident)
+            st.selectbox("Status", STATUSES, index=STATUSES.index(incident['status']),
+                         key=f"upd_incident_status_{update_id}")
+            st.selectbox("Severity", SEVERITIES, index=SEVERITIES.index(incident['severity']),
+                         key=f"upd_incident_severity_{update_id}")
 
             # Submit button - updates incident in database
-            if st.form_submit_button("Update"):
-                update_incident(update_id, status=upd_status, severity=upd_severity)
-                st.success("Incident updated successfully")
-                st.rerun()
+            st.form_submit_button("Update", on_click=submit_incident_update, args=(update_id,))
 
     with col2:
         # Delete incident section
         st.markdown("#### Delete Incident")
-        delete_id = st.selectbox("Select Incident ID to Delete", df['incident_id'].values, key="delete")
+        st.selectbox("Select Incident ID to Delete", df['incident_id'].values, key="delete")
         st.markdown("")
         st.markdown("")
         # Delete button - removes incident from database
-        if st.button("Delete Incident", type="primary"):
-            delete_incident(delete_id)
-            st.success("Incident deleted successfully")
-            st.rerun()
+        st.button("Delete Incident", type="primary", on_click=submit_incident_delete)
+
 
 # Tab 2: Threat Analysis
-with tab2:
+def show_threat_analysis(df):
+    """Display the phishing, category and bottleneck analysis"""
+    if df.empty:
+        st.info("No incidents to analyse yet")
+        return
+
     # Phishing analysis section - highest priority insight
     st.markdown("#### High-Value Insight: Phishing Surge Analysis")
     phishing_df = df[df['category'] == 'Phishing']
@@ -220,10 +207,10 @@ with tab2:
 
     with analysis_col2:
         # Pie chart showing phishing incident status distribution
-        phish_status = phishing_df['status'].value_counts()
-        fig = px.pie(values=phish_status.values, names=phish_status.index,
-                     title="Phishing Incident Status")
-        st.plotly_chart(fig, use_container_width=True)
+        with section("figure: Phishing Incident Status"):
+            phish_status = phishing_df['status'].value_counts()
+            plotly_chart("pie", phish_status, values='y', names='x',
+                         title="Phishing Incident Status")
 
     st.markdown("---")
 
@@ -234,37 +221,59 @@ with tab2:
 
     with chart_col1:
         # Bar chart of incidents by category
-        category_counts = df['category'].value_counts()
-        fig1 = px.bar(
-            x=category_counts.index,
-            y=category_counts.values,
-            labels={'x': 'Category', 'y': 'Count'},
-            title="Incidents by Category"
-        )
-        st.plotly_chart(fig1, use_container_width=True)
+        with section("figure: Incidents by Category"):
+            category_counts = df['category'].value_counts()
+            plotly_chart(
+                "bar", category_counts,
+                x='x',
+                y='y',
+                labels={'x': 'Category', 'y': 'Count'},
+                title="Incidents by Category"
+            )
 
     with chart_col2:
         # Pie chart of severity distribution
-        severity_counts = df['severity'].value_counts()
-        fig2 = px.pie(
-            values=severity_counts.values,
-            names=severity_counts.index,
-            title="Severity Distribution"
-        )
-        st.plotly_chart(fig2, use_container_width=True)
+        with section("figure: Severity Distribution"):
+            severity_counts = df['severity'].value_counts()
+            plotly_chart(
+                "pie", severity_counts,
+                values='y',
+                names='x',
+                title="Severity Distribution"
+            )
 
     # Resolution bottleneck analysis
     st.markdown("#### Resolution Bottleneck Analysis")
     # Group incidents by category and status
-    status_summary = df.groupby(['category', 'status']).size().reset_index(name='count')
-    fig = px.bar(status_summary, x='category', y='count', color='status',
-                 title="Incidents by Category and Status",
-                 barmode='group')
-    st.plotly_chart(fig, use_container_width=True)
-
-    # Display key finding about phishing resolution times
-    st.info(
-        "Key Finding: Phishing incidents show the longest resolution times, with the highest concentration in 'In Progress' status, indicating a response bottleneck.")
+    with section("figure: Incidents by Category and Status"):
+        status_summary = df.groupby(['category', 'status']).size().reset_index(name='count')
+        plotly_chart("bar", status_summary, x='category', y='count', color='status',
+                     title="Incidents by Category and Status",
+                     barmode='group')
+
+    # Categories with an unusual share of unresolved incidents (robust z-scores over the incident rollup)
+    backlog, backlog_findings = incident_backlog()
+    show_findings(backlog_findings, "No category has an unusually large share of unresolved incidents")
+
+    st.markdown("---")
+
+    # Sustained rises in daily incident counts per category (CUSUM over the incident rollup)
+    st.markdown("#### Incident Surge Detection")
+    surges, surge_findings = incident_surges()
+    surge_col1, surge_col2 = st.columns([2, 1])
+
+    with surge_col1:
+        st.dataframe(surges.join(backlog[['unresolved_share']]), use_container_width=True)
+
+    with surge_col2:
+        show_findings(surge_findings, "No category shows a sustained rise in daily incidents")
+
+
+# Create tabs for incident management and analysis (only the open tab is rendered)
+show_lazy_tabs({
+    "Incidents Management": show_incident_management,
+    "Threat Analysis": lambda: show_threat_analysis(df),
+}, key="cyber_tab")
 
 st.markdown("---")
 st.caption("Cybersecurity Module - A.R.G.U.S.")
\ No newline at end of file
@@ -1,177 +1,199 @@
 import streamlit as st
-import plotly.express as px
-from pathlib import Path
-import base64
-import plotly.graph_objects as go
+import pandas as pd
+import json
+import shutil
+import uuid
 from datetime import datetime
+from pathlib import Path
+from arg_metrics.timing import section
+from arg_ui.charts import plotly_chart
+from arg_ui.sections import show_lazy_tabs
+from arg_ui.shell import page_shell
+from arg_ui.downloads import show_filters, apply_filters, show_export
+from arg_ui.downsample import scatter_points
+from arg_ui.data import cached_datasets_metadata, cached_dataset_profiles, refresh_after_write
+from arg_ui.jobs import show_jobs, submit
 from arg_database.data_loader import (
-    load_datasets_metadata, create_dataset, update_dataset, delete_dataset
-)
-
-# Configure the Streamlit page settings
-st.set_page_config(
-    page_title="Data Science Dashboard",
-    page_icon="📊",
-    layout="wide"
+    create_dataset, update_dataset, delete_dataset
 )
+from arg_database.jobs import jobs_dir
+from arg_database.sketches import quantile, distinct_count
 
-# Check if user is logged in - redirect to login if not
-if "logged_in" not in st.session_state or not st.session_state.logged_in:
-    st.error("Please login first")
-    st.stop()
-
-# Check if user has permission to view this page
-if st.session_state.role not in ["user", "data_scientist"]:
-    st.error("Access Denied - You don't have permission to view this page")
-    st.stop()
-
-# Path to background image
-image_path = "imgs/matte.jpg"
-
-# Apply background image styling if the file exists
-if Path(image_path).exists():
-    # Read the image file as bytes
-    with open(image_path, "rb") as f:
-        image_bytes = f.read()
-
-    # Determine MIME type based on file extension
-    if image_path.lower().endswith(('.png')):
-        mime = "image/png"
-    elif image_path.lower().endswith(('.jpg', '.jpeg')):
-        mime = "image/jpeg"
-    elif image_path.lower().endswith(('.gif')):
-        mime = "image/gif"
-    else:
-        mime = "image/jpeg"
-
-    # Encode image to base64 for embedding in CSS
-    encoded = base64.b64encode(image_bytes).decode()
-
-    # Inject custom CSS with background image
-    st.markdown(
-        f"""
-        <style>
-        /* Background on whole app */
-        .stApp {{
-            background-image: url("data:{mime};base64,{encoded}");
-            background-size: cover;
-            background-position: center center;
-            background-repeat: no-repeat;
-            background-attachment: fixed;
-        }}
-
-        /* Main content readable */
-        .main .block-container {{
-            background: rgba(255, 255, 255, 0.9) !important;
-            padding: 2rem !important;
-            border-radius: 10px !important;
-        }}
-
-        /* Don't mess with sidebar at all - let it be default */
-
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-# Add custom button styling
-st.markdown(""" 
-<style>
-.stButton > button {
-    border: 2px solid #DC143C;
-}
-
-.stButton > button:hover {
-    background-color: #DC143C;
-    color: white;
-    border: 2px solid #DC143C;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# Create sidebar with navigation
-st.sidebar.title("ARG NAVIGATION💢")
-st.sidebar.write(f"**User:** {st.session_state.username}")
-st.sidebar.write(f"**Role:** {st.session_state.role}")
-
-# Add navigation links based on user role
-st.sidebar.page_link("pages/dash.py", label="Dashboard")
-if st.session_state.role == "user":
-    st.sidebar.page_link("pages/cybersecurity.py", label="Cybersecurity")
-    st.sidebar.page_link("pages/IT_tickets.py", label="IT Operations")
-    st.sidebar.page_link("pages/ai_assistant.py", label="AI assistant")
-
-st.sidebar.markdown("---")
-
-# Logout button - clears session state and returns to login
-if st.sidebar.button("Logout", use_container_width=True):
-    st.session_state.logged_in = False
-    st.session_state.username = None
-    st.session_state.role = None
-    st.switch_page("arg_app.py")
+# Page config, login and role check, styling and sidebar
+page_shell("pages/data_science.py")
 
 # Load dataset metadata from database
-df = load_datasets_metadata()
+with section("data load"):
+    df = cached_datasets_metadata()
+    profiles = cached_dataset_profiles()
 
 # Main page title
 st.title("Data Science Dashboard")
 st.markdown("### Dataset Management & Analytics")
 
-# Display key metrics in a 2x2 grid
+# Fragments that show dataset data; a write reruns only these
+DATASET_FRAGMENTS = ["dataset_overview", "dataset_management"]
+
+# Options for the dataset form fields
+UPLOADERS = ["data_scientist", "cyber_admin", "it_admin"]
+# Columns the dataset table can be filtered on (column -> label)
+DATASET_FILTERS = {"uploaded_by": "Uploaded By"}
+CREATE_FORM_KEYS = ["new_dataset_id", "new_dataset_name", "new_dataset_rows", "new_dataset_columns",
+                    "new_dataset_uploaded_by", "new_dataset_upload_date"]
+UPLOAD_FORM_KEYS = ["upload_dataset_file", "upload_dataset_name", "upload_dataset_uploaded_by",
+                    "upload_dataset_date"]
+
+
+def storage_bytes(df, profiles):
+    """
+    Storage used by the datasets: measured file sizes where a file was
+    profiled, 1KB per row for datasets entered by hand
+
+    Returns:
+        tuple: (bytes, number of datasets with a measured size)
+    """
+    profiles = profiles[profiles['dataset_id'].isin(df['dataset_id'])]
+    estimated_rows = df.loc[~df['dataset_id'].isin(profiles['dataset_id']), 'rows'].sum()
+    return int(profiles['byte_size'].sum()) + int(estimated_rows) * 1000, len(profiles)
+
+
+@st.fragment(key="dataset_overview")
+def show_dataset_overview():
+    """Display key metrics in a 2x2 grid"""
+    df = cached_datasets_metadata()
+    profiles = cached_dataset_profiles()
+    with section("metrics"):
+        row1_col1, row1_col2 = st.columns(2)
+        with row1_col1:
+            st.metric("Total Datasets", len(df))
+        with row1_col2:
+            total_rows = df['rows'].sum()
+            st.metric("Total Rows", f"{total_rows:,}")
+
+        row2_col1, row2_col2 = st.columns(2)
+        with row2_col1:
+            # Measured for profiled files, estimated at 1KB per row for the rest
+            storage, measured = storage_bytes(df, profiles)
+            st.metric("Storage", f"{storage / 1024 ** 3:.2f} GB",
+                      help=f"Measured for {measured} of {len(df)} datasets, 1KB per row for the rest")
+        with row2_col2:
+            # Count unique data sources (from the distinct-count sketch)
+            sources = distinct_count("datasets_metadata", "uploaded_by")
+            st.metric("Data Sources", sources)
+
+
 st.markdown("#### System Overview")
-row1_col1, row1_col2 = st.columns(2)
-with row1_col1:
-    st.metric("Total Datasets", len(df))
-with row1_col2:
-    total_rows = df['rows'].sum()
-    st.metric("Total Rows", f"{total_rows:,}")
-
-row2_col1, row2_col2 = st.columns(2)
-with row2_col1:
-    # Estimate storage size (assuming 1KB per row)
-    storage_gb = (total_rows * 1000) / (1024 ** 3)
-    st.metric("Est. Storage", f"{storage_gb:.2f} GB")
-with row2_col2:
-    # Count unique data sources
-    sources = df['uploaded_by'].nunique()
-    st.metric("Data Sources", sources)
+show_dataset_overview()
 
 st.markdown("---")
 
-# Create tabs for dataset management and governance analysis
-tab1, tab2 = st.tabs(["Dataset Management", "Governance Analysis"])
+
+def submit_new_dataset():
+    """Create the dataset entered in the create form (form callback)"""
+    state = st.session_state
+    create_dataset(state.new_dataset_id, state.new_dataset_name, state.new_dataset_rows,
+                   state.new_dataset_columns, state.new_dataset_uploaded_by, str(state.new_dataset_upload_date))
+    refresh_after_write("datasets_metadata", "Dataset added successfully", DATASET_FRAGMENTS,
+                        forget=CREATE_FORM_KEYS)
+
+
+def submit_dataset_file():
+    """Queue the uploaded file to be profiled and recorded as a dataset (form callback)"""
+    state = st.session_state
+    uploaded = state.upload_dataset_file
+    if uploaded is None:
+        st.toast("Choose a CSV or Parquet file first")
+        return
+
+    # The worker profiles a file path; large uploads are streamed to disk (the job deletes the file)
+    path = jobs_dir() / "uploads" / f"{uuid.uuid4().hex}{Path(uploaded.name).suffix}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    uploaded.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(uploaded, f)
+    submit("ingest_dataset",
+           {"path": str(path), "name": state.upload_dataset_name or Path(uploaded.name).stem,
+            "uploaded_by": state.upload_dataset_uploaded_by, "upload_date": str(state.upload_dataset_date),
+            "file_name": uploaded.name},
+           f"Profiling {uploaded.name} in the background", DATASET_FRAGMENTS, forget=UPLOAD_FORM_KEYS)
+
+
+def submit_dataset_update(dataset_id):
+    """Save the update form for one dataset (form callback)"""
+    update_dataset(dataset_id,
+                   name=st.session_state[f"upd_dataset_name_{dataset_id}"],
+                   rows=st.session_state[f"upd_dataset_rows_{dataset_id}"],
+                   columns=st.session_state[f"upd_dataset_columns_{dataset_id}"])
+    refresh_after_write("datasets_metadata", "Dataset updated successfully", DATASET_FRAGMENTS)
+
+
+def submit_dataset_delete():
+    """Delete the dataset picked in the delete section (button callback)"""
+    delete_dataset(st.session_state.delete)
+    refresh_after_write("datasets_metadata", "Dataset deleted successfully", DATASET_FRAGMENTS)
+
 
 # Tab 1: Dataset Management
-with tab1:
-    # Form to add new dataset
+@st.fragment(key="dataset_management")
+def show_dataset_management():
+    """Display the dataset forms and the dataset table"""
+    df = cached_datasets_metadata()
+
+    # Upload a file and take rows, columns, size and null rates from it
+    st.markdown("#### Upload Dataset File")
+    with st.form("upload_dataset"):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.file_uploader("CSV or Parquet file", type=["csv", "parquet"], key="upload_dataset_file")
+        with col2:
+            st.text_input("Dataset Name", placeholder="File name if left empty", key="upload_dataset_name")
+            st.selectbox("Uploaded By", UPLOADERS, key="upload_dataset_uploaded_by")
+            st.date_input("Upload Date", value=datetime.now(), key="upload_dataset_date")
+
+        # Submit button - queues the file to be profiled and added as a dataset
+        st.form_submit_button("Profile and Add", on_click=submit_dataset_file)
+
+    # Uploads being profiled, and how the recent ones went
+    show_jobs("dataset_upload_jobs", kinds=["ingest_dataset"], fragments=DATASET_FRAGMENTS)
+
+    st.markdown("---")
+
+    # Form to add new dataset by hand
     st.markdown("#### Add New Dataset")
     with st.form("create_dataset"):
         col1, col2, col3 = st.columns(3)
         with col1:
             # Generate next available dataset ID
-            new_id = st.number_input("Dataset ID", min_value=1, value=int(df['dataset_id'].max() + 1))
-            new_name = st.text_input("Dataset Name")
+            next_id = int(df['dataset_id'].max()) + 1 if len(df) else 1
+            st.number_input("Dataset ID", min_value=1, value=next_id, key="new_dataset_id")
+            st.text_input("Dataset Name", key="new_dataset_name")
         with col2:
-            new_rows = st.number_input("Number of Rows", min_value=0, value=1000)
-            new_columns = st.number_input("Number of Columns", min_value=1, value=10)
+            st.number_input("Number of Rows", min_value=0, value=1000, key="new_dataset_rows")
+            st.number_input("Number of Columns", min_value=1, value=10, key="new_dataset_columns")
         with col3:
-            new_uploaded_by = st.selectbox("Uploaded By", ["data_scientist", "cyber_admin", "it_admin"])
-            new_upload_date = st.date_input("Upload Date", value=datetime.now())
+            st.selectbox("Uploaded By", UPLOADERS, key="new_dataset_uploaded_by")
+            st.date_input("Upload Date", value=datetime.now(), key="new_dataset_upload_date")
 
         # Submit button - creates dataset in database
-        if st.form_submit_button("Add Dataset"):
-            create_dataset(new_id, new_name, new_rows, new_columns, new_uploaded_by, str(new_upload_date))
-            st.success("Dataset added successfully")
-            st.rerun()
+        st.form_submit_button("Add Dataset", on_click=submit_new_dataset)
 
     st.markdown("---")
 
     # Display all datasets in a table
     st.markdown("#### All Datasets")
-    st.dataframe(df, use_container_width=True)
+    filters = show_filters(df, DATASET_FILTERS, key="dataset_filter")
+    with section("dataframe"):
+        st.dataframe(apply_filters(df, filters), use_container_width=True)
+
+    # Export the matching datasets
+    show_export("datasets_metadata", filters, key="dataset_export", fragments=["dataset_management"])
 
     st.markdown("---")
 
+    # Nothing to update or delete in an empty table
+    if df.empty:
+        return
+
     # Update and Delete sections side by side
     col1, col2 = st.columns(2)
 
@@ -183,31 +205,31 @@ with tab1:
         dataset = df[df['dataset_id'] == update_id].iloc[0]
 
         with st.form("update_dataset"):
-            # Pre-populate fields with current values
-            upd_name = st.text_input("Name", value=dataset['name'])
-            upd_rows = st.number_input("Rows", value=int(dataset['rows']))
-            upd_columns = st.number_input("Columns", value=int(dataset['columns']))
+            # Pre-populate fields with current values (keys are per dataset)
+            st.text_input("Name", value=dataset['name'], key=f"upd_dataset_name_{update_id}")
+            st.number_input("Rows", value=int(dataset['rows']), key=f"upd_dataset_rows_{update_id}")
+            st.number_input("Columns", value=int(dataset['columns']), key=f"upd_dataset_columns_{update_id}")
 
             # Submit button - updates dataset in database
-            if st.form_submit_button("Update"):
-                update_dataset(update_id, name=upd_name, rows=upd_rows, columns=upd_columns)
-                st.success("Dataset updated successfully")
-                st.rerun()
+            st.form_submit_button("Update", on_click=submit_dataset_update, args=(update_id,))
 
     with col2:
         # Delete dataset section
         st.markdown("#### Delete Dataset")
-        delete_id = st.selectbox("Select Dataset ID to Delete", df['dataset_id'].values, key="delete")
+        st.selectbox("Select Dataset ID to Delete", df['dataset_id'].values, key="delete")
         st.markdown("")
         st.markdown("")
         # Delete button - removes dataset from database
-        if st.button("Delete Dataset", type="primary"):
-            delete_dataset(delete_id)
-            st.success("Dataset deleted successfully")
-            st.rerun()
+        st.button("Delete Dataset", type="primary", on_click=submit_dataset_delete)
+
 
 # Tab 2: Governance Analysis
-with tab2:
+def show_governance_analysis(df, profiles):
+    """Display the resource consumption and governance analysis"""
+    if df.empty:
+        st.info("No datasets to analyse yet")
+        return
+
     # Resource consumption analysis - highest priority insight
     st.markdown("#### High-Value Insight: Resource Consumption")
 
@@ -220,19 +242,19 @@ with tab2:
 
     with resource_col2:
         # Bar chart showing total rows by data source
-        source_rows = df.groupby('uploaded_by')['rows'].sum().sort_values(ascending=False)
-        fig = px.bar(x=source_rows.index, y=source_rows.values,
-                     labels={'x': 'Source', 'y': 'Total Rows'},
-                     title="Source Dependency")
-        st.plotly_chart(fig, use_container_width=True)
+        with section("figure: Source Dependency"):
+            source_rows = df.groupby('uploaded_by')['rows'].sum().sort_values(ascending=False)
+            plotly_chart("bar", source_rows, x='x', y='y',
+                         labels={'x': 'Source', 'y': 'Total Rows'},
+                         title="Source Dependency")
 
     st.markdown("---")
 
     # Data governance recommendations
     st.markdown("#### Data Governance Recommendations")
 
-    # Identify datasets in the top 25% by size
-    large_threshold = df['rows'].quantile(0.75)
+    # Identify datasets in the top 25% by size (threshold from the quantile sketch)
+    large_threshold = quantile("datasets_metadata", "rows", 0.75)
     large_datasets = df[df['rows'] > large_threshold]
 
     # Display archiving recommendation
@@ -252,18 +274,23 @@ with tab2:
 
     with chart_col1:
         # Bar chart of rows per dataset
-        fig1 = px.bar(df, x='name', y='rows',
-                      title="Rows per Dataset",
-                      labels={'name': 'Dataset', 'rows': 'Number of Rows'})
-        fig1.update_layout(xaxis_tickangle=-45)
-        st.plotly_chart(fig1, use_container_width=True)
+        with section("figure: Rows per Dataset"):
+            plotly_chart("bar", df[['name', 'rows']], x='name', y='rows',
+                         title="Rows per Dataset",
+                         labels={'name': 'Dataset', 'rows': 'Number of Rows'},
+                         layout={'xaxis_tickangle': -45})
 
     with chart_col2:
         # Scatter plot showing dataset complexity (rows vs columns)
-        fig2 = px.scatter(df, x='rows', y='columns', size='rows',
-                          hover_data=['name'], title="Dataset Complexity",
-                          labels={'rows': 'Number of Rows', 'columns': 'Number of Columns'})
-        st.plotly_chart(fig2, use_container_width=True)
+        with section("figure: Dataset Complexity"):
+            # Large catalogues are sampled per source so the chart stays a bounded size
+            points, sample_note = scatter_points(df[['rows', 'columns', 'name', 'uploaded_by']],
+                                                 'rows', 'columns', by='uploaded_by')
+            plotly_chart("scatter", points, x='rows', y='columns', size='rows',
+                         hover_data=['name'], title="Dataset Complexity",
+                         labels={'rows': 'Number of Rows', 'columns': 'Number of Columns'})
+            if sample_note:
+                st.caption(sample_note)
 
     st.markdown("---")
 
@@ -277,5 +304,37 @@ with tab2:
 
     st.dataframe(total_by_source, use_container_width=True)
 
+    # Column-level quality of the datasets uploaded as files
+    profiles = profiles[profiles['dataset_id'].isin(df['dataset_id'])]
+    if profiles.empty:
+        return
+
+    st.markdown("---")
+    st.markdown("#### Data Quality of Profiled Files")
+    quality = []
+    for profile in profiles.merge(df[['dataset_id', 'name']], on='dataset_id').itertuples():
+        columns = json.loads(profile.column_profiles)
+        worst = max(columns, key=lambda column: column['null_rate'], default=None)
+        quality.append({
+            'name': profile.name,
+            'file': profile.file_name,
+            'size_mb': profile.byte_size / 1024 ** 2,
+            'mean_null_rate': sum(column['null_rate'] for column in columns) / len(columns) if columns else 0.0,
+            'worst_column': worst['name'] if worst else None,
+            'worst_null_rate': worst['null_rate'] if worst else 0.0,
+        })
+    st.dataframe(pd.DataFrame(quality), use_container_width=True,
+                 column_config={'size_mb': st.column_config.NumberColumn("Size (MB)", format="%.1f"),
+                                'mean_null_rate': st.column_config.NumberColumn("Mean Null Rate", format="percent"),
+                                'worst_null_rate': st.column_config.NumberColumn("Worst Null Rate",
+                                                                                 format="percent")})
+
+
+# Create tabs for dataset management and governance analysis (only the open tab is rendered)
+show_lazy_tabs({
+    "Dataset Management": show_dataset_management,
+    "Governance Analysis": lambda: show_governance_analysis(df, profiles),
+}, key="datasets_tab")
+
 st.markdown("---")
 st.caption("Data Science Module - A.R.G.U.S.")
\ No newline at end of file
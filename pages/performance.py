@@ -0,0 +1,116 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import os
+from pathlib import Path
+from arg_metrics.tracing import snapshot, gauges, render_prometheus, write_prometheus, reset
+from arg_database.connection import is_postgres
+from arg_database.jobs import JOB_KINDS
+from arg_ui.jobs import show_jobs, submit
+from arg_ui.shell import page_shell
+
+# Where "Write Metrics File" puts the Prometheus text (e.g. for a textfile collector)
+METRICS_FILE = os.environ.get("ARG_METRICS_FILE", str(Path("DATA") / "metrics.prom"))
+
+# Maintenance jobs that can be started from this page
+MAINTENANCE_JOBS = ["archive", "rebuild_rollups", "rebuild_sketches", "rebuild_model", "rebuild_dedup_index"]
+
+# Maintenance with nothing to work on in a PostgreSQL database (no archive tables or near-duplicate index)
+SQLITE_ONLY_JOBS = ("archive", "rebuild_dedup_index")
+
+# Page config, login and role check, styling and sidebar
+page_shell("pages/performance.py")
+
+# Main page title
+st.title("Performance Monitor")
+st.markdown("### Operation Latency Since Server Start")
+
+# Latency summary for every instrumented operation in this server process
+stats = pd.DataFrame(snapshot())
+
+if stats.empty:
+    st.info("No operations have been recorded yet")
+else:
+    # Display headline metrics
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Operations Tracked", len(stats))
+    with col2:
+        st.metric("Calls Recorded", f"{stats['count'].sum():,}")
+    with col3:
+        slowest = stats.loc[stats['p95_ms'].idxmax()]
+        st.metric("Slowest p95", f"{slowest['p95_ms']:.1f} ms", help=slowest['operation'])
+
+    st.markdown("---")
+
+    # Filter operations by name
+    name_filter = st.text_input("Filter operations", placeholder="e.g. data_loader")
+    if name_filter:
+        stats = stats[stats['operation'].str.contains(name_filter, case=False, regex=False)]
+
+    # Table of latency percentiles per operation
+    st.markdown("#### Latency Percentiles")
+    st.dataframe(
+        stats.set_index('operation').round(3),
+        use_container_width=True,
+        column_config={
+            "count": "Calls",
+            "mean_ms": "Mean (ms)",
+            "p50_ms": "p50 (ms)",
+            "p95_ms": "p95 (ms)",
+            "p99_ms": "p99 (ms)",
+            "max_ms": "Max (ms)",
+        }
+    )
+
+    # Bar chart of the slowest operations by p95
+    top = stats.nlargest(15, 'p95_ms').melt(id_vars='operation', value_vars=['p50_ms', 'p95_ms', 'p99_ms'],
+                                             var_name='percentile', value_name='ms')
+    fig = px.bar(top, x='ms', y='operation', color='percentile', barmode='group', orientation='h',
+                 labels={'ms': 'Latency (ms)', 'operation': 'Operation'},
+                 title="Slowest Operations (by p95)")
+    fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+    st.plotly_chart(fig, use_container_width=True)
+
+# Current values such as the write queue depth (only once something has set them)
+gauge_stats = pd.DataFrame(gauges())
+if not gauge_stats.empty:
+    st.markdown("#### Gauges")
+    st.dataframe(gauge_stats.set_index('gauge'), use_container_width=True,
+                 column_config={"value": "Current", "peak": "Peak"})
+
+st.markdown("---")
+
+# Prometheus export
+st.markdown("#### Export")
+export_col1, export_col2, export_col3 = st.columns(3)
+with export_col1:
+    st.download_button("Download Prometheus Metrics", render_prometheus(),
+                       file_name="argus_metrics.prom", mime="text/plain", use_container_width=True)
+with export_col2:
+    if st.button("Write Metrics File", use_container_width=True):
+        write_prometheus(METRICS_FILE)
+        st.success(f"Metrics written to {METRICS_FILE}")
+with export_col3:
+    if st.button("Reset Counters", use_container_width=True):
+        reset()
+        st.rerun()
+
+if os.environ.get("ARG_METRICS_PORT"):
+    st.caption(f"Live endpoint: http://127.0.0.1:{os.environ['ARG_METRICS_PORT']}/metrics")
+else:
+    st.caption("Set ARG_METRICS_PORT to serve these metrics over HTTP for Prometheus to scrape")
+
+st.markdown("---")
+
+# Long-running maintenance runs in the background job workers
+st.markdown("#### Maintenance Jobs")
+maintenance_jobs = [kind for kind in MAINTENANCE_JOBS if not (is_postgres() and kind in SQLITE_ONLY_JOBS)]
+for col, kind in zip(st.columns(len(maintenance_jobs)), maintenance_jobs):
+    with col:
+        st.button(JOB_KINDS[kind].label, key=f"maintenance_{kind}", use_container_width=True, on_click=submit,
+                  args=(kind, {}, f"{JOB_KINDS[kind].label} queued"))
+show_jobs("maintenance_jobs", kinds=MAINTENANCE_JOBS, everyone=True, limit=10)
+
+st.markdown("---")
+st.caption("Performance Module - A.R.G.U.S.")
@@ -0,0 +1,13 @@
+import pytest
+
+import arg_database.connection as connection
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A freshly set up and seeded SQLite database in a temporary directory, with empty connection pools"""
+    monkeypatch.setattr(connection, "DATABASE_URL", None)
+    monkeypatch.setattr(connection, "DB_PATH", tmp_path / "platform.db")
+    monkeypatch.setattr(connection, "_readers", connection._ReaderPool(connection.READ_POOL_SIZE))
+    connection.setup_database()
+    yield connection.DB_PATH
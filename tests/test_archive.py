@@ -0,0 +1,122 @@
+import arg_database.connection as connection
+from arg_database import sketches
+from arg_database.archive import archive_all, archive_table, create_history_views
+from arg_database.forecasting import refresh_model
+from arg_database.tables import rebuild_rollups
+
+TICKET_QUANTILE = ("quantile:resolution_time_hours", "")
+
+ROLLUP_QUERIES = {
+    "ticket_daily_rollup": "SELECT assigned_to, status, day, ticket_count, resolution_count,"
+                           " ROUND(resolution_sum, 6), ROUND(resolution_sumsq, 6)"
+                           " FROM ticket_daily_rollup ORDER BY 1, 2, 3",
+    "incident_daily_rollup": "SELECT category, status, day, incident_count FROM incident_daily_rollup ORDER BY 1, 2, 3",
+}
+
+
+def read_rollups():
+    conn = connection.get_read_connection()
+    try:
+        return {name: [tuple(row) for row in conn.execute(sql)] for name, sql in ROLLUP_QUERIES.items()}
+    finally:
+        conn.close()
+
+
+def test_archiving_keeps_rollups(database):
+    before = read_rollups()
+    archived = archive_all(days=30)
+    assert sum(archived["it_tickets"].values()) > 0
+    assert sum(archived["cyber_incidents"].values()) > 0
+    assert read_rollups() == before
+
+    # A rebuild reads the history views, so it agrees with the triggers
+    conn = connection.get_db_connection()
+    try:
+        rebuild_rollups(conn)
+    finally:
+        conn.close()
+    assert read_rollups() == before
+
+
+def test_deletes_still_leave_rollups(database):
+    conn = connection.get_db_connection()
+    try:
+        ticket_id, staff = conn.execute("SELECT ticket_id, assigned_to FROM it_tickets LIMIT 1").fetchone()
+        count = conn.execute("SELECT SUM(ticket_count) FROM ticket_daily_rollup WHERE assigned_to = ?",
+                             (staff,)).fetchone()[0]
+        conn.execute("DELETE FROM it_tickets WHERE ticket_id = ?", (ticket_id,))
+        conn.commit()
+        after = conn.execute("SELECT SUM(ticket_count) FROM ticket_daily_rollup WHERE assigned_to = ?",
+                             (staff,)).fetchone()[0]
+    finally:
+        conn.close()
+    assert after == count - 1
+
+
+def test_archiving_keeps_forecast_training_rows(database):
+    conn = connection.get_db_connection()
+    try:
+        trained = refresh_model(conn).rows
+        archive_all(days=30)
+        assert refresh_model(conn).rows == trained
+        assert refresh_model(conn, rebuild=True).rows == trained
+    finally:
+        conn.close()
+
+
+def test_reused_id_is_archived_again(database):
+    archive_all(days=30)
+    conn = connection.get_db_connection()
+    try:
+        archived = conn.execute("SELECT * FROM it_tickets_history WHERE ticket_id NOT IN"
+                                " (SELECT ticket_id FROM it_tickets) LIMIT 1").fetchone()
+        conn.execute("INSERT INTO it_tickets VALUES (?, ?, ?, ?, ?, ?, ?)", tuple(archived))
+        conn.commit()
+        assert sum(archive_table(conn, "it_tickets", days=30).values()) == 1
+        copies = conn.execute("SELECT COUNT(*) FROM it_tickets_history WHERE ticket_id = ?",
+                              (archived["ticket_id"],)).fetchone()[0]
+    finally:
+        conn.close()
+    assert copies == 2
+
+
+def test_old_archive_tables_lose_primary_key(database):
+    conn = connection.get_db_connection()
+    try:
+        conn.execute("CREATE TABLE it_tickets_archive_2000_01 (ticket_id INTEGER PRIMARY KEY, priority TEXT,"
+                     " description TEXT, status TEXT, assigned_to TEXT, created_at TEXT,"
+                     " resolution_time_hours REAL)")
+        conn.execute("INSERT INTO it_tickets_archive_2000_01 VALUES"
+                     " (1, 'Low', 'old', 'Resolved', 'IT_Support_A', '2000-01-05', 1.0)")
+        create_history_views(conn)
+        primary_key = [row[1] for row in conn.execute("PRAGMA table_info(it_tickets_archive_2000_01)") if row[5]]
+        kept = conn.execute("SELECT description FROM it_tickets_history WHERE created_at = '2000-01-05'").fetchall()
+    finally:
+        conn.close()
+    assert primary_key == []
+    assert [row[0] for row in kept] == ["old"]
+
+
+def test_archiving_keeps_sketches(database):
+    before = sketches.get_sketches("it_tickets")[TICKET_QUANTILE].count
+    archive_all(days=30)
+    assert sketches.get_sketches("it_tickets")[TICKET_QUANTILE].count == before
+
+    # A rebuild reads the history view too
+    conn = connection.get_db_connection()
+    try:
+        assert sketches.rebuild_sketches(conn, "it_tickets")[TICKET_QUANTILE].count == before
+    finally:
+        conn.close()
+
+
+def test_archiving_drops_index_entries(database):
+    archive_all(days=30)
+    conn = connection.get_read_connection()
+    try:
+        for table, key in (("it_tickets", "ticket_id"), ("cyber_incidents", "incident_id")):
+            orphans = conn.execute(f"SELECT COUNT(*) FROM {table}_lsh WHERE row_id NOT IN"
+                                   f" (SELECT {key} FROM {table})").fetchone()[0]
+            assert orphans == 0
+    finally:
+        conn.close()
@@ -0,0 +1,42 @@
+import sqlite3
+
+import arg_database.connection as connection
+from arg_database.user_ops import add_user
+from authy.security import hash_password, login_user
+
+
+def cold_readers(monkeypatch):
+    """Drop the idle readers so the next get_read_connection opens a new one"""
+    monkeypatch.setattr(connection, "_readers", connection._ReaderPool(connection.READ_POOL_SIZE))
+
+
+def test_new_reader_returns_rows(database, monkeypatch):
+    cold_readers(monkeypatch)
+    conn = connection.get_read_connection()
+    try:
+        row = conn.execute("SELECT 1 AS one").fetchone()
+    finally:
+        conn.close()
+    assert isinstance(row, sqlite3.Row)
+    assert row["one"] == 1
+
+
+def test_login_from_cold_reader_pool(database, monkeypatch):
+    add_user("alice1", hash_password("Passw0rd"), "cyber_admin")
+    cold_readers(monkeypatch)
+    success, user = login_user("alice1", "Passw0rd")
+    assert success
+    assert user["username"] == "alice1"
+
+
+def test_reader_is_read_only(database):
+    conn = connection.get_read_connection()
+    try:
+        try:
+            conn.execute("DELETE FROM users")
+        except sqlite3.OperationalError:
+            pass
+        else:
+            raise AssertionError("write through a read connection succeeded")
+    finally:
+        conn.close()
@@ -0,0 +1,22 @@
+import arg_database.connection as connection
+import arg_database.data_loader as data_loader
+from arg_database import dedup
+
+FIRST_ID = 9_000_000
+
+
+def test_single_row_creates_keep_buckets_bounded(database):
+    for i in range(dedup.MAX_BUCKET_ROWS + 40):
+        data_loader.create_incident(FIRST_ID + i, "2024-06-01 10:00:00", "High", "Phishing", "Open",
+                                    "Invoice phishing email sent to the finance team")
+    conn = connection.get_read_connection()
+    try:
+        largest = conn.execute("SELECT MAX(rows) FROM (SELECT COUNT(*) AS rows FROM cyber_incidents_lsh"
+                               " GROUP BY bucket)").fetchone()[0]
+    finally:
+        conn.close()
+    assert largest == dedup.MAX_BUCKET_ROWS
+
+    # The newest copies are the ones kept
+    found = dedup.find_duplicates("cyber_incidents", "Invoice phishing email sent to the finance team", limit=1)
+    assert list(found["incident_id"]) == [FIRST_ID + dedup.MAX_BUCKET_ROWS + 39]
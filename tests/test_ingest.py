@@ -0,0 +1,68 @@
+import pytest
+
+import arg_database.connection as connection
+import arg_database.write_queue as write_queue
+from arg_database.ingest import ingest
+
+FIRST_ID = 9_000_000
+
+
+@pytest.fixture
+def writes(database, monkeypatch):
+    """The process write queue, started fresh on the test database"""
+    queue = write_queue.WriteQueue()
+    monkeypatch.setattr(write_queue, "_queue", queue)
+    yield queue
+    queue.close()
+
+
+def ticket(ticket_id, **fields):
+    return {"ticket_id": ticket_id, "priority": "Low", "description": f"ingested ticket {ticket_id}",
+            "status": "Resolved", "assigned_to": "IT_Support_A", "created_at": "2024-06-03 09:00:00",
+            "resolution_time_hours": 4.5, **fields}
+
+
+def stored(ticket_id):
+    conn = connection.get_read_connection()
+    try:
+        row = conn.execute("SELECT ticket_id, resolution_time_hours, typeof(resolution_time_hours) FROM it_tickets"
+                           " WHERE ticket_id = ?", (ticket_id,)).fetchone()
+    finally:
+        conn.close()
+    return tuple(row) if row else None
+
+
+def test_values_are_checked_against_column_types(writes):
+    records = [
+        ticket(FIRST_ID),
+        ticket(FIRST_ID + 1, resolution_time_hours="twelve"),
+        ticket(FIRST_ID + 2, resolution_time_hours="12"),
+        ticket(FIRST_ID + 3, description=["a", "list"]),
+        ticket(FIRST_ID + 4, status={"an": "object"}),
+        ticket(FIRST_ID + 5.5),
+        ticket(str(FIRST_ID + 6), resolution_time_hours=True),
+        ticket(float(FIRST_ID + 7), resolution_time_hours=None),
+    ]
+    result = ingest("tickets", records)
+    assert result["accepted"] == 3
+    assert [error["index"] for error in result["errors"]] == [1, 3, 4, 5, 6]
+    assert "resolution_time_hours" in result["errors"][0]["error"]
+    assert stored(FIRST_ID) == (FIRST_ID, 4.5, "real")
+    assert stored(FIRST_ID + 2) == (FIRST_ID + 2, 12.0, "real")
+    assert stored(FIRST_ID + 7) == (FIRST_ID + 7, None, "null")
+    assert stored(FIRST_ID + 1) is None
+
+
+def test_records_not_committed_in_time_are_errors(writes):
+    # Holding the write connection stalls the queue
+    conn = connection.get_db_connection()
+    try:
+        result = ingest("tickets", [ticket(FIRST_ID + i) for i in range(3)], timeout=0.2)
+    finally:
+        conn.close()
+    assert result["accepted"] == 0
+    assert len(result["errors"]) == 3
+    assert all("Not committed within 0.2 s" in error["error"] for error in result["errors"])
+    writes.flush(timeout=10)
+    withdrawn = [error["index"] for error in result["errors"] if error["error"].endswith("withdrawn")]
+    assert [stored(FIRST_ID + index) for index in withdrawn] == [None] * len(withdrawn)
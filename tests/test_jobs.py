@@ -0,0 +1,203 @@
+import json
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import arg_database.connection as connection
+from arg_database import jobs
+
+
+@pytest.fixture
+def kinds(database, monkeypatch):
+    """Job kinds for the tests: one that fails its first `failures` runs, and one that cancels itself"""
+    runs = []
+
+    def flaky(ctx, failures=0):
+        runs.append(ctx.attempt)
+        if ctx.attempt <= failures:
+            raise RuntimeError(f"attempt {ctx.attempt} failed")
+        return {"attempt": ctx.attempt}
+
+    def cancelled(ctx):
+        jobs.cancel_job(ctx.job_id)
+        ctx.progress(0.5, "Halfway")
+        return {"finished": True}
+
+    monkeypatch.setitem(jobs.JOB_KINDS, "test_flaky", jobs.JobKind(flaky, "Flaky", 3))
+    monkeypatch.setitem(jobs.JOB_KINDS, "test_cancelled", jobs.JobKind(cancelled, "Cancelled", 3))
+    return runs
+
+
+def make_due(job_id):
+    """Skip a queued job's retry delay"""
+    conn = connection.get_db_connection()
+    try:
+        conn.execute("UPDATE jobs SET run_after = 0 WHERE job_id = ?", (job_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def alive(worker):
+    """Give a worker id a fresh heartbeat, as a running worker has"""
+    heartbeat = jobs._heartbeat_path(worker)
+    heartbeat.parent.mkdir(parents=True, exist_ok=True)
+    heartbeat.touch()
+
+
+def claim(worker):
+    conn = connection.get_db_connection()
+    try:
+        return jobs.claim_job(conn, worker)
+    finally:
+        conn.close()
+
+
+def test_export_job_writes_the_filtered_rows(database):
+    job_id = jobs.submit_job("export", {"table": "it_tickets", "fmt": "jsonl",
+                                        "filters": {"status": ["Resolved"]}}, submitted_by="alice1")
+    assert jobs.run_worker(drain=True) == 1
+
+    job = jobs.get_job(job_id)
+    assert job["status"] == "succeeded"
+    assert (job["attempts"], job["progress"]) == (1, 1)
+    conn = connection.get_read_connection()
+    try:
+        resolved = conn.execute("SELECT COUNT(*) FROM it_tickets WHERE status = 'Resolved'").fetchone()[0]
+    finally:
+        conn.close()
+    assert job["result"]["rows"] == resolved
+    with open(job["result"]["path"], encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == resolved
+    assert {row["status"] for row in rows} == {"Resolved"}
+    assert job["result"]["file_name"] == "it_tickets.jsonl"
+
+
+def test_failed_runs_are_retried_with_backoff(kinds):
+    job_id = jobs.submit_job("test_flaky", {"failures": 5})
+    assert jobs.run_worker(drain=True) == 1
+
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["attempts"]) == ("queued", 1)
+    assert job["run_after"] == pytest.approx(job["updated_at"] + jobs.RETRY_DELAY)
+    assert job["error"] == "RuntimeError: attempt 1 failed"
+    # Not due yet
+    assert jobs.run_worker(drain=True) == 0
+
+    make_due(job_id)
+    assert jobs.run_worker(drain=True) == 1
+    job = jobs.get_job(job_id)
+    assert job["run_after"] == pytest.approx(job["updated_at"] + 2 * jobs.RETRY_DELAY)
+
+    make_due(job_id)
+    assert jobs.run_worker(drain=True) == 1
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == ("failed", 3, "RuntimeError: attempt 3 failed")
+    assert job["finished_at"] is not None
+    assert kinds == [1, 2, 3]
+
+    assert jobs.retry_job(job_id)
+    assert (jobs.get_job(job_id)["status"], jobs.get_job(job_id)["attempts"]) == ("queued", 0)
+    assert not jobs.retry_job(job_id)
+
+
+def test_retry_succeeds_within_its_attempts(kinds):
+    job_id = jobs.submit_job("test_flaky", {"failures": 1})
+    jobs.run_worker(drain=True)
+    make_due(job_id)
+    jobs.run_worker(drain=True)
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["result"], job["error"]) == ("succeeded", {"attempt": 2}, None)
+
+
+def test_queued_job_is_cancelled_at_once(kinds):
+    job_id = jobs.submit_job("test_flaky")
+    assert jobs.cancel_job(job_id)
+    assert jobs.get_job(job_id)["status"] == "cancelled"
+    assert jobs.run_worker(drain=True) == 0
+    assert kinds == []
+    assert not jobs.cancel_job(job_id)
+
+
+def test_running_job_stops_at_its_next_progress_report(kinds):
+    job_id = jobs.submit_job("test_cancelled")
+    assert jobs.run_worker(drain=True) == 1
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["result"], job["message"]) == ("cancelled", None, "Cancelled")
+    assert not os.path.exists(jobs._progress_path(job_id))
+
+
+def test_job_of_a_lost_worker_is_run_again(kinds):
+    job_id = jobs.submit_job("test_flaky")
+    # Claimed by a worker that never wrote a heartbeat, i.e. one that is gone
+    assert claim(worker=999_999_999)["job_id"] == job_id
+    assert jobs.run_worker(drain=True) == 1
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["attempts"], job["worker"]) == ("succeeded", 2, os.getpid())
+
+
+def test_lost_job_on_its_last_attempt_fails(kinds):
+    job_id = jobs.submit_job("test_flaky", max_attempts=1)
+    claim(worker=999_999_999)
+    assert jobs.run_worker(drain=True) == 0
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["error"]) == ("failed", "Worker exited while running the job")
+    assert kinds == []
+
+
+def test_job_of_a_live_worker_is_left_alone(kinds):
+    alive(12345)
+    job_id = jobs.submit_job("test_flaky")
+    claim(worker=12345)
+    assert jobs.run_worker(drain=True) == 0
+    assert (jobs.get_job(job_id)["status"], jobs.get_job(job_id)["worker"]) == ("running", 12345)
+
+
+def test_each_job_is_claimed_once(kinds):
+    job_ids = [jobs.submit_job("test_flaky") for _ in range(20)]
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(number):
+        # A connection of its own, as each worker process has, so the claims race on BEGIN IMMEDIATE
+        conn = sqlite3.connect(connection.DB_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            while True:
+                job = jobs.claim_job(conn, number)
+                if job is None:
+                    return
+                with lock:
+                    claimed.append(job["job_id"])
+        finally:
+            conn.close()
+
+    for number in range(4):
+        alive(number)
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == job_ids
+    assert {job["status"] for job in jobs.list_jobs(limit=20)} == {"running"}
+
+
+def test_oldest_job_is_claimed_first(kinds):
+    job_ids = [jobs.submit_job("test_flaky") for _ in range(3)]
+    alive(1)
+    assert [claim(worker=1)["job_id"] for _ in job_ids] == job_ids
+    assert claim(worker=1) is None
+
+
+def test_claim_skips_jobs_not_yet_due(kinds):
+    first = jobs.submit_job("test_flaky", {"failures": 1})
+    second = jobs.submit_job("test_flaky")
+    jobs.run_worker(drain=True)
+    # The first failed and waits out its retry delay, so it is not claimed again
+    assert jobs.get_job(first)["status"] == "queued"
+    assert jobs.get_job(second)["status"] == "succeeded"
+    assert claim(worker=os.getpid()) is None
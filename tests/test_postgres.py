@@ -0,0 +1,171 @@
+"""
+The PostgreSQL backend against a real server
+
+Runs only when ARG_PG_DSN points at a server the tests may create and drop
+databases on, e.g. ARG_PG_DSN=postgresql://postgres@localhost/postgres;
+each test module run gets a scratch database of its own.
+"""
+import os
+import secrets
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+pytest.importorskip("psycopg_pool")
+
+import arg_database.connection as connection
+import arg_database.data_loader as data_loader
+from arg_database import postgres
+from arg_database.forecasting import refresh_model
+from arg_database.snapshots import table_version
+from arg_database.statements import TABLE_COLUMNS
+
+DSN = os.environ.get("ARG_PG_DSN")
+
+# Well above the seeded sample data
+FIRST_ID = 9_000_000
+
+
+@pytest.fixture(scope="module")
+def pg_url():
+    """URL of a scratch database, set up and seeded; dropped afterwards"""
+    if not DSN:
+        pytest.skip("ARG_PG_DSN is not set")
+    name = f"argus_test_{secrets.token_hex(4)}"
+    with psycopg.connect(DSN, autocommit=True) as admin:
+        admin.execute(f"CREATE DATABASE {name}")
+    try:
+        yield psycopg.conninfo.make_conninfo(DSN, dbname=name)
+    finally:
+        postgres.close_pools()
+        with psycopg.connect(DSN, autocommit=True) as admin:
+            admin.execute(f"DROP DATABASE {name} WITH (FORCE)")
+
+
+@pytest.fixture
+def pg(pg_url, tmp_path, monkeypatch):
+    """Point the data layer at the scratch database"""
+    monkeypatch.setenv("ARG_SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(connection, "DATABASE_URL", pg_url)
+    connection.setup_database()
+    return pg_url
+
+
+def test_translate():
+    assert postgres.translate("SELECT * FROM t WHERE a = ? AND b LIKE '50%?'") == \
+        "SELECT * FROM t WHERE a = %s AND b LIKE '50%%?'"
+    assert postgres.translate("CREATE TABLE t (id INTEGER PRIMARY KEY AUTOINCREMENT, x REAL, b BLOB)") == \
+        "CREATE TABLE t (id BIGSERIAL PRIMARY KEY, x DOUBLE PRECISION, b BYTEA)"
+
+
+def test_setup_is_repeatable_and_seeds(pg):
+    counts = {table: len(loader()) for table, loader in (
+        ("cyber_incidents", data_loader.load_cyber_incidents),
+        ("it_tickets", data_loader.load_it_tickets),
+        ("datasets_metadata", data_loader.load_datasets_metadata),
+    )}
+    connection.setup_database()
+    assert all(counts.values())
+    assert len(data_loader.load_cyber_incidents()) == counts["cyber_incidents"]
+    assert list(data_loader.load_it_tickets().columns) == list(TABLE_COLUMNS["it_tickets"])
+
+
+def test_incident_crud_and_search(pg):
+    incident_id = FIRST_ID + 1
+    data_loader.create_incident(incident_id, "2024-06-01 10:00:00", "High", "Malware",
+                                "Open", "quixotic keylogger on the payroll server")
+    found = data_loader.search_incidents("quixotic keylog")
+    assert list(found["incident_id"]) == [incident_id]
+    assert "**" in found["snippet"][0]
+
+    data_loader.update_incident(incident_id, status="Resolved", severity="Critical")
+    row = data_loader.load_cyber_incidents().set_index("incident_id").loc[incident_id]
+    assert (row["status"], row["severity"]) == ("Resolved", "Critical")
+
+    data_loader.delete_incident(incident_id)
+    assert incident_id not in set(data_loader.load_cyber_incidents()["incident_id"])
+    assert data_loader.search_incidents("quixotic").empty
+
+
+def test_ticket_crud_and_forecast_log(pg):
+    ticket_id = FIRST_ID + 2
+    conn = connection.get_db_connection()
+    try:
+        trained = refresh_model(conn).rows
+    finally:
+        conn.close()
+
+    data_loader.create_ticket(ticket_id, "High", "zephyr VPN tunnel drops", "Resolved",
+                              "IT_Support_A", "2024-06-03 09:00:00", 4.5)
+    assert list(data_loader.search_tickets("zephyr")["ticket_id"]) == [ticket_id]
+    data_loader.update_ticket(ticket_id, priority="Low")
+    row = data_loader.load_it_tickets().set_index("ticket_id").loc[ticket_id]
+    assert row["priority"] == "Low"
+
+    # The plpgsql trigger logged the insert and the update (as a -1 and a +1)
+    conn = connection.get_db_connection()
+    try:
+        assert refresh_model(conn).rows == trained + 1
+    finally:
+        conn.close()
+
+    data_loader.delete_ticket(ticket_id)
+    assert ticket_id not in set(data_loader.load_it_tickets()["ticket_id"])
+
+
+def test_copy_bumps_version_once(pg):
+    rows = [(FIRST_ID + 100 + i, "2024-06-01 10:00:00", "Low", "DDoS", "Closed", f"copied {i}") for i in range(50)]
+    conn = connection.get_db_connection()
+    try:
+        before = table_version(conn, "cyber_incidents")
+        connection.bulk_insert(conn, "cyber_incidents", TABLE_COLUMNS["cyber_incidents"], rows)
+        conn.commit()
+        after = table_version(conn, "cyber_incidents")
+        count = conn.execute("SELECT COUNT(*) FROM cyber_incidents WHERE incident_id >= ?",
+                             (FIRST_ID + 100,)).fetchone()[0]
+        conn.execute("DELETE FROM cyber_incidents WHERE incident_id >= ?", (FIRST_ID + 100,))
+        conn.commit()
+    finally:
+        conn.close()
+    assert count == 50
+    assert after == (before[0], before[1] + 1)
+
+
+def test_begin_immediate_takes_the_write_lock(pg):
+    first = connection.get_db_connection()
+    second = connection.get_db_connection()
+    try:
+        first.execute("BEGIN IMMEDIATE")
+        taken = second.execute("SELECT pg_try_advisory_lock(?)", (postgres.WRITE_LOCK_KEY,)).fetchone()[0]
+        first.commit()
+        free = second.execute("SELECT pg_try_advisory_lock(?)", (postgres.WRITE_LOCK_KEY,)).fetchone()[0]
+        second.execute("SELECT pg_advisory_unlock(?)", (postgres.WRITE_LOCK_KEY,))
+    finally:
+        first.close()
+        second.close()
+    assert not taken
+    assert free
+
+
+def test_reads_see_rows_as_mappings(pg):
+    conn = connection.get_read_connection()
+    try:
+        row = conn.execute("SELECT incident_id, status FROM cyber_incidents ORDER BY incident_id LIMIT 1").fetchone()
+    finally:
+        conn.close()
+    assert row["incident_id"] == row[0]
+    assert set(row.keys()) == {"incident_id", "status"}
+
+
+def test_search_filters_apply_before_the_limit(pg):
+    for i in range(5):
+        data_loader.create_incident(FIRST_ID + 200 + i, "2024-06-01 10:00:00", "High", "Malware",
+                                    "Open", "vorpal worm")
+    data_loader.create_incident(FIRST_ID + 205, "2024-06-01 10:00:00", "Low", "Phishing",
+                                "Resolved", "vorpal worm spread through the shared drive overnight")
+    try:
+        found = data_loader.search_incidents("vorpal", limit=5, filters={"status": ["Resolved"]})
+    finally:
+        for i in range(6):
+            data_loader.delete_incident(FIRST_ID + 200 + i)
+    assert list(found["incident_id"]) == [FIRST_ID + 205]
@@ -0,0 +1,29 @@
+import pytest
+
+import arg_database.data_loader as data_loader
+
+FIRST_ID = 9_000_000
+
+
+def add_tickets():
+    """Five open 'zephyr' tickets that outrank one longer, resolved one"""
+    for i in range(5):
+        data_loader.create_ticket(FIRST_ID + i, "High", "zephyr tunnel", "Open",
+                                  "IT_Support_A", "2024-06-03 09:00:00", None)
+    data_loader.create_ticket(FIRST_ID + 5, "Low", "zephyr tunnel drops after the nightly backup window closes",
+                              "Resolved", "IT_Support_B", "2024-06-03 09:00:00", 2.0)
+
+
+def test_filters_apply_before_the_limit(database):
+    add_tickets()
+    assert FIRST_ID + 5 not in set(data_loader.search_tickets("zephyr", limit=5)["ticket_id"])
+
+    found = data_loader.search_tickets("zephyr", limit=5, filters={"status": ["Resolved"], "priority": []})
+    assert list(found["ticket_id"]) == [FIRST_ID + 5]
+    assert data_loader.search_tickets("zephyr", filters={"status": ["Resolved"],
+                                                         "assigned_to": ["IT_Support_A"]}).empty
+
+
+def test_unknown_filter_column_is_rejected(database):
+    with pytest.raises(ValueError):
+        data_loader.search_incidents("phishing", filters={"1=1; --": ["x"]})
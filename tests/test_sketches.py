@@ -0,0 +1,65 @@
+import threading
+import time
+
+import arg_database.connection as connection
+import arg_database.data_loader as data_loader
+from arg_database import sketches
+
+TICKET_QUANTILE = ("quantile:resolution_time_hours", "")
+
+
+def wait_for_rebuilds(timeout=30):
+    deadline = time.monotonic() + timeout
+    while sketches._rebuilding and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not sketches._rebuilding
+
+
+def resolved_count():
+    conn = connection.get_read_connection()
+    try:
+        return conn.execute("SELECT COUNT(resolution_time_hours) FROM it_tickets").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_stale_sketches_are_rebuilt_off_the_request_thread(database, monkeypatch):
+    assert sketches.get_sketches("it_tickets")[TICKET_QUANTILE].count == resolved_count()
+
+    scanned_on = []
+    scan = sketches._scan
+
+    def recording_scan(conn, table):
+        scanned_on.append(threading.current_thread().name)
+        return scan(conn, table)
+
+    monkeypatch.setattr(sketches, "_scan", recording_scan)
+
+    # A delete leaves the stored sketches stale
+    conn = connection.get_read_connection()
+    try:
+        ticket_id = conn.execute("SELECT ticket_id FROM it_tickets WHERE resolution_time_hours IS NOT NULL"
+                                 " LIMIT 1").fetchone()[0]
+    finally:
+        conn.close()
+    before = resolved_count()
+    data_loader.delete_ticket(ticket_id)
+
+    served = sketches.get_sketches("it_tickets")[TICKET_QUANTILE].count
+    wait_for_rebuilds()
+    assert served == before
+    assert scanned_on == ["arg-sketches-it_tickets"]
+    assert sketches.get_sketches("it_tickets")[TICKET_QUANTILE].count == before - 1
+
+
+def test_first_sketches_are_built_by_the_caller(database):
+    conn = connection.get_db_connection()
+    try:
+        conn.execute("DELETE FROM column_sketches")
+        conn.execute("DELETE FROM sketch_state")
+        conn.commit()
+    finally:
+        conn.close()
+    sketches._loaded.clear()
+    assert sketches.get_sketches("it_tickets")[TICKET_QUANTILE].count == resolved_count()
+    assert not sketches._rebuilding
@@ -0,0 +1,132 @@
+import time
+
+import pytest
+
+import arg_database.connection as connection
+import arg_database.write_queue as write_queue
+from arg_database import sketches
+from arg_database.snapshots import table_version
+
+FIRST_ID = 9_000_000
+TICKET_QUANTILE = ("quantile:resolution_time_hours", "")
+
+
+@pytest.fixture
+def writes(database):
+    """A write queue of its own on the test database"""
+    queue = write_queue.WriteQueue()
+    yield queue
+    queue.close()
+
+
+def ticket(ticket_id, resolution_time_hours=4.0):
+    return {"ticket_id": ticket_id, "priority": "Low", "description": f"queued ticket {ticket_id}",
+            "status": "Resolved", "assigned_to": "IT_Support_A", "created_at": "2024-06-03 09:00:00",
+            "resolution_time_hours": resolution_time_hours}
+
+
+def ticket_ids():
+    conn = connection.get_read_connection()
+    try:
+        return {row[0] for row in conn.execute("SELECT ticket_id FROM it_tickets WHERE ticket_id >= ?", (FIRST_ID,))}
+    finally:
+        conn.close()
+
+
+def sketches_current():
+    conn = connection.get_read_connection()
+    try:
+        return sketches._state(conn, "it_tickets") == table_version(conn, "it_tickets")
+    finally:
+        conn.close()
+
+
+def test_non_numeric_value_does_not_fail_the_batch(writes):
+    count = sketches.get_sketches("it_tickets")[TICKET_QUANTILE].count
+    futures = [writes.insert("it_tickets", ticket(FIRST_ID + i)) for i in range(3)]
+    futures.append(writes.insert("it_tickets", ticket(FIRST_ID + 3, "twelve")))
+    assert [future.result(timeout=10) for future in futures] == [None] * 4
+    assert sketches_current()
+    assert sketches.get_sketches("it_tickets")[TICKET_QUANTILE].count == count + 3
+
+
+def test_sketch_failure_leaves_them_stale(writes, monkeypatch):
+    sketches.get_sketches("it_tickets")
+
+    def failing_record_writes(*args):
+        raise RuntimeError("sketch update failed")
+
+    monkeypatch.setattr(write_queue, "record_writes", failing_record_writes)
+    futures = [writes.insert("it_tickets", ticket(FIRST_ID + i)) for i in range(3)]
+    assert [future.result(timeout=10) for future in futures] == [None] * 3
+    assert ticket_ids() == {FIRST_ID, FIRST_ID + 1, FIRST_ID + 2}
+    assert not sketches_current()
+
+
+def test_rejected_write_fails_alone(writes):
+    writes.insert("it_tickets", ticket(FIRST_ID)).result(timeout=10)
+    futures = [writes.insert("it_tickets", ticket(FIRST_ID + i)) for i in range(3)]
+    with pytest.raises(Exception):
+        futures[0].result(timeout=10)
+    assert [future.result(timeout=10) for future in futures[1:]] == [None, None]
+    assert ticket_ids() == {FIRST_ID, FIRST_ID + 1, FIRST_ID + 2}
+
+
+def test_cancelled_write_is_dropped(database):
+    writes = write_queue.WriteQueue(max_batch_delay=0)
+    try:
+        # Holding the write connection keeps the queue thread in its first commit
+        conn = connection.get_db_connection()
+        try:
+            first = writes.insert("it_tickets", ticket(FIRST_ID))
+            time.sleep(0.1)
+            cancelled = writes.insert("it_tickets", ticket(FIRST_ID + 1))
+            assert cancelled.cancel()
+        finally:
+            conn.close()
+        assert first.result(timeout=10) is None
+        assert writes.insert("it_tickets", ticket(FIRST_ID + 2)).result(timeout=10) is None
+    finally:
+        writes.close()
+    assert ticket_ids() == {FIRST_ID, FIRST_ID + 2}
+
+
+def incident(incident_id):
+    return (incident_id, "2024-06-01 10:00:00", "High", "Phishing", "Open", f"queued phishing email {incident_id}")
+
+
+def pending_index_rows():
+    conn = connection.get_read_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM dedup_pending").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_index_keeps_up_while_writes_keep_arriving(database, monkeypatch):
+    monkeypatch.setattr(write_queue, "INDEX_BATCH_ROWS", 10)
+    depths = []
+    index_pending = write_queue.index_pending
+
+    def recording_index_pending(conn, table, max_rows=None):
+        depths.append(writes.stats()["depth"])
+        return index_pending(conn, table, max_rows)
+
+    monkeypatch.setattr(write_queue, "index_pending", recording_index_pending)
+    writes = write_queue.WriteQueue(max_batch_writes=5)
+    try:
+        conn = connection.get_db_connection()
+        try:
+            futures = [writes.insert("cyber_incidents", incident(FIRST_ID + i)) for i in range(60)]
+        finally:
+            conn.close()
+        for future in futures:
+            future.result(timeout=10)
+        deadline = time.monotonic() + 10
+        while pending_index_rows() and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        writes.close()
+    # Slices ran while writes were still waiting, and the idle queue caught up on the rest
+    assert max(depths) > 0
+    assert pending_index_rows() == 0